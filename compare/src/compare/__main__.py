@@ -1,39 +1,150 @@
 """
 Creates a `RateSongs` application with default interfaces.
-Runs `--runs` number of song ratings.
+Runs `--runs` number of song ratings, or fewer with `--target-confidence`,
+which ends the session once the ranking has converged. `--verify-top-k`
+then first plays matches between the top songs only, until they settle.
 `--music-folder` being set indicates that the tables should be
 rebuilt around a new folder. Not setting any music folder will
-load the currently active session from sql
+load the currently active session from sql.
+`--group-size` above 2 ranks groups of songs in each match instead of pairs.
+`--search` picks the Plackett-Luce matchup search, e.g. `pruned` for
+libraries too large for the default exhaustive EV table.
+`--backend glicko` uses cheaper Glicko ratings, for very large libraries.
+`--backend bradley-terry` fits ratings to the whole match history at once.
+With `--refit-threshold` above 1 it only refits every
+`--consolidate-interval` matches, approximating results in between.
+`--repeat-penalty` steers matchmaking away from pairs already played.
+Rating backend checkpoints are kept in `--checkpoint-dir`, written every
+`--checkpoint-interval` matches, to speed up resuming a session.
+Requests to the API share `--http-pool-size` keep-alive connections, with
+`--http-timeout` seconds to wait for each response. Matches are saved in
+the background, kept in `--spool-file` until the API has accepted them.
+Matches the API rejects are set aside in a `.rejected` file next to it.
+Songs and matches are cached in `--cache-dir`, so resuming a session only
+downloads the matches played since it was last loaded.
 """
 import argparse
 import curses
 from pathlib import Path
 
 from compare.audio_player import VlcAudioPlayerBuilder
+from compare.checkpoint import CheckpointStore
+from compare.match_cache import CachedMatchIO
 from compare.matchio import OnlineMatchIO
-from compare.matchmaking import PlackettLuceBackend
+from compare.matchmaking import (
+    BradleyTerryBackend, GlickoBackend, MatchupSearch, PlackettLuceBackend, RatingBackend
+)
 from compare.app import RateSongs
-from compare.render import CursesMatchRenderer
+from compare.render import MAX_GROUP_SIZE, CursesMatchRenderer
+from compare.speculation import SpeculativePicker
+from compare.write_behind import WriteBehindMatchIO
 
 def main(window: curses.window):
     parser = argparse.ArgumentParser(prog="Compare Music")
     parser.add_argument("--runs", type=int, default=10)
     parser.add_argument("--music-folder", type=Path, default=None)
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        default=Path.home() / ".cache" / "compare" / "checkpoints"
+    )
+    parser.add_argument("--checkpoint-interval", type=int, default=100)
+    parser.add_argument(
+        "--group-size",
+        type=int,
+        choices=range(2, MAX_GROUP_SIZE + 1),
+        default=2,
+        help="Number of songs ranked in each match."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("plackett-luce", "glicko", "bradley-terry"),
+        default="plackett-luce",
+        help="Rating backend. Glicko is cheaper on very large libraries."
+    )
+    parser.add_argument(
+        "--search",
+        choices=tuple(search.name.lower() for search in MatchupSearch),
+        default="exhaustive",
+        help="Plackett-Luce matchup search. Exhaustive keeps an n x n EV "
+            "table, pruned or tiered scale to much larger libraries."
+    )
+    parser.add_argument("--refit-threshold", type=int, default=1)
+    parser.add_argument("--consolidate-interval", type=int, default=100)
+    parser.add_argument(
+        "--repeat-penalty",
+        type=float,
+        default=None,
+        help="Penalty for matching a pair again, relative to the starting "
+            "uncertainty. 2 or more avoids repeats until every pair has played."
+    )
+    parser.add_argument(
+        "--target-confidence",
+        type=float,
+        default=None,
+        help="Stop once the predicted rank correlation with the true order "
+            "reaches this, and the ranking has stopped moving, e.g. 0.98."
+    )
+    parser.add_argument(
+        "--verify-top-k",
+        type=int,
+        default=None,
+        help="After convergence, only match the top k songs until they converge too."
+    )
+    parser.add_argument("--http-pool-size", type=int, default=4)
+    parser.add_argument("--http-timeout", type=float, default=10.0)
+    parser.add_argument(
+        "--spool-file",
+        type=Path,
+        default=Path.home() / ".cache" / "compare" / "unsent_matches.jsonl"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path.home() / ".cache" / "compare" / "history"
+    )
     args = parser.parse_args()
 
     renderer = CursesMatchRenderer(window, (0, 0, 80, 80))
-    rating_backend = PlackettLuceBackend()
-    database_manager = OnlineMatchIO()
+    rating_backend: RatingBackend
+    if args.backend == "glicko":
+        rating_backend = GlickoBackend(relative_repeat_penalty=args.repeat_penalty)
+    elif args.backend == "bradley-terry":
+        rating_backend = BradleyTerryBackend(
+            refit_threshold=args.refit_threshold,
+            relative_repeat_penalty=args.repeat_penalty
+        )
+    else:
+        rating_backend = PlackettLuceBackend(
+            search=MatchupSearch[args.search.upper()],
+            relative_repeat_penalty=args.repeat_penalty
+        )
     audio_player_builder = VlcAudioPlayerBuilder(0.1)
-    app = RateSongs(
-        renderer,
-        rating_backend,
-        database_manager,
-        audio_player_builder,
-        args.music_folder
-    )
-    for _ in range(args.runs):
-        app.perform_rating()
+    with (
+        OnlineMatchIO(
+            pool_size=args.http_pool_size, read_timeout=args.http_timeout
+        ) as online_match_io,
+        WriteBehindMatchIO(
+            CachedMatchIO(online_match_io, args.cache_dir), args.spool_file
+        ) as database_manager
+    ):
+        speculative_picker = SpeculativePicker()
+        try:
+            app = RateSongs(
+                renderer,
+                rating_backend,
+                database_manager,
+                audio_player_builder,
+                args.music_folder,
+                CheckpointStore(args.checkpoint_dir),
+                args.checkpoint_interval,
+                speculative_picker,
+                args.group_size,
+                args.consolidate_interval
+            )
+            app.run(args.runs, args.target_confidence, args.verify_top_k)
+        finally:
+            speculative_picker.close()
 
 if __name__ == "__main__":
     curses.wrapper(main)
@@ -1,16 +1,46 @@
 """
 Hooks together `MatchRenderer`, `RatingBackend`, `MatchLoadStore` and
 `AudioPlayerBuilder` to create a matchmaking application.
+
+With a `CheckpointStore`, the rating backend state is checkpointed every
+`checkpoint_interval` matches, so resuming a session only replays the
+matches played after the newest checkpoint. The match history is streamed
+through the backend `REPLAY_PAGE_SIZE` matches at a time and never held in
+memory whole.
+
+With a `SpeculativePicker`, the next matchup is prepared in the background
+while the current match is played. The rating backend is then replaced by
+the prepared copy after each vote, so `RateSongs` must be the only user of
+the backend passed to it. Speculation only applies to 1v1 matches.
+
+Every `consolidate_interval` matches, the rating backend is consolidated,
+refitting its ratings from the whole history if it only approximates
+results between refits.
+
+With a `group_size` above 2, each rating is a multi-way match in which
+the user ranks every song of the group, saved as a single ranked match.
+
+`RateSongs.run` can stop a session early once a `ConvergenceMonitor`
+judges the ranking settled, optionally after a final round of matches
+between the top songs only.
 """
 
+from itertools import islice
 from pathlib import Path
 import time
 
 from compare.audio_player import AudioPlayer, AudioPlayerBuilder
+from compare.checkpoint import Checkpoint, CheckpointStore, HistoryDigest
+from compare.convergence import ConvergenceMonitor
 from compare.matchio import MatchIO
 from compare.matchmaking import RatingBackend
-from compare.render import MatchInput, MatchRenderer
-from compare.song import MusicFolder, Song
+from compare.render import MAX_GROUP_SIZE, SONG_INPUTS, MatchInput, MatchRenderer
+from compare.song import MusicFolder, Song, SongID
+from compare.speculation import SpeculativePicker
+
+
+# Matches of a loaded history replayed through the backend at once.
+REPLAY_PAGE_SIZE = 10_000
 
 
 class RateSongs:
@@ -19,12 +49,37 @@ class RateSongs:
         rating_backend: RatingBackend,
         match_serializer: MatchIO,
         audio_player_builder: AudioPlayerBuilder,
-        folder_path: Path | None
+        folder_path: Path | None,
+        checkpoints: CheckpointStore | None = None,
+        checkpoint_interval: int = 100,
+        speculative_picker: SpeculativePicker | None = None,
+        group_size: int = 2,
+        consolidate_interval: int = 100
     ) -> None:
+        if checkpoint_interval <= 0:
+            raise ValueError("`checkpoint_interval` must be > 0")
+        if consolidate_interval <= 0:
+            raise ValueError("`consolidate_interval` must be > 0")
+        if not 2 <= group_size <= MAX_GROUP_SIZE:
+            raise ValueError(f"`group_size` must be between 2 and {MAX_GROUP_SIZE}")
         self._renderer: MatchRenderer = renderer
         self._rating_backend: RatingBackend = rating_backend
         self._match_serializer: MatchIO = match_serializer
         self._audio_player_builder: AudioPlayerBuilder = audio_player_builder
+        self._checkpoints: CheckpointStore | None = checkpoints
+        self._checkpoint_interval: int = checkpoint_interval
+        # Digest of every match of the session in order, to tag checkpoints with.
+        self._history: HistoryDigest = HistoryDigest()
+        self._speculative_picker: SpeculativePicker | None = speculative_picker
+        # Matchup prepared by `_speculative_picker` for the next rating.
+        self._next_pick: tuple[SongID, SongID] | None = None
+        self._group_size: int = group_size
+        self._consolidate_interval: int = consolidate_interval
+        # Song infos built from the backend's `ranks` and `overall_ratings`
+        # dictionaries, reused while the backend returns the same ones.
+        self._song_infos_cache: tuple[
+            dict[SongID, int], dict[SongID, float], dict[Song, tuple[int, float]]
+        ] | None = None
 
         if folder_path is not None:
             music_folder = MusicFolder.from_folder(folder_path)
@@ -32,12 +87,13 @@ class RateSongs:
             for song_id in [song.id for song in self._songs]:
                 self._rating_backend.new_player(song_id)
             self._match_serializer.save_songs(self._rating_backend, self._songs)
+            if self._checkpoints is not None:
+                self._checkpoints.clear()
         else:
             self._songs = self._match_serializer.load_songs()
             for song_id in [song.id for song in self._songs]:
                 self._rating_backend.new_player(song_id)
-            for match in self._match_serializer.load_match_history():
-                self._rating_backend.update(match[0], match[1])
+            self._replay_history()
 
         self._audio_players: list[AudioPlayer] = []
         for song in self._songs:
@@ -46,8 +102,152 @@ class RateSongs:
                 raise ValueError(f"Player failed for song with path {song.path}")
             self._audio_players.append(player)
 
+    @property
+    def rating_backend(self) -> RatingBackend:
+        """
+        The current rating backend, which speculation replaces after votes.
+        """
+        return self._rating_backend
+
+    def _replay_history(self) -> None:
+        """
+        Replay the loaded match history through the rating backend, from
+        the newest checkpoint consistent with it.
+
+        Checkpoints are verified against the history as it streams past,
+        so a checkpoint that turns out not to match restarts the stream
+        for the next older one. Usually the first stream succeeds.
+        """
+        if self._checkpoints is not None:
+            for checkpoint in self._checkpoints.checkpoints():
+                if self._replay_from(checkpoint):
+                    return
+        self._replay_from(None)
+
+    def _replay_from(self, checkpoint: Checkpoint | None) -> bool:
+        """
+        Stream the match history, load `checkpoint` if the matches it covers
+        are the start of the history, and replay the matches after it.
+        Returns False, with the backend unchanged, if the checkpoint cannot
+        be used.
+        """
+        history = HistoryDigest()
+        matches = iter(self._match_serializer.load_match_history())
+        covered = 0 if checkpoint is None else checkpoint.match_count
+        while history.match_count < covered:
+            page = list(islice(matches, min(REPLAY_PAGE_SIZE, covered - history.match_count)))
+            if not page:
+                return False
+            history.update(page)
+        if checkpoint is not None:
+            if history.digest() != checkpoint.history_digest:
+                return False
+            try:
+                self._rating_backend.load_state(checkpoint.state)
+            except ValueError:
+                # E.g. a checkpoint from a different backend.
+                return False
+        while page := list(islice(matches, REPLAY_PAGE_SIZE)):
+            self._rating_backend.update_many(page)
+            history.update(page)
+        self._history = history
+        return True
+
+    def _record_match(self, winner_id: SongID, loser_id: SongID) -> None:
+        """
+        Apply and save a match result, checkpointing when due.
+        """
+        prepared = None
+        if self._speculative_picker is not None:
+            prepared = self._speculative_picker.take(winner_id, loser_id)
+        if prepared is not None:
+            # The prepared copy has this result applied and its next pick made.
+            self._rating_backend, self._next_pick = prepared
+        else:
+            self._rating_backend.update(winner_id, loser_id)
+        self._match_serializer.save_match(self._rating_backend, winner_id, loser_id)
+        self._append_history((winner_id, loser_id))
+
+    def _record_ranking(self, ranking: list[SongID]) -> None:
+        """
+        Apply and save a multi-way match result, checkpointing when due.
+        """
+        self._rating_backend.update_ranked(ranking)
+        self._match_serializer.save_ranked_match(self._rating_backend, ranking)
+        self._append_history(tuple(ranking))
+
+    def _append_history(self, match: tuple[SongID, ...]) -> None:
+        self._history.update([match])
+        match_count = self._history.match_count
+        if match_count % self._consolidate_interval == 0:
+            self._rating_backend.consolidate()
+        if self._checkpoints is not None and match_count % self._checkpoint_interval == 0:
+            self._checkpoints.save(Checkpoint(
+                match_count,
+                self._history.digest(),
+                self._rating_backend.save_state()
+            ))
+
+    def _song_infos(self) -> dict[Song, tuple[int, float]]:
+        """
+        Return the rank and overall rating of every song, for rendering.
+        """
+        ranks = self._rating_backend.ranks()
+        ratings = self._rating_backend.overall_ratings()
+        cache = self._song_infos_cache
+        # Memoizing backends return the same dictionaries until they change.
+        if cache is not None and cache[0] is ranks and cache[1] is ratings:
+            return cache[2]
+        song_infos = {self._songs[id]: (rank, ratings[id]) for id, rank in ranks.items()}
+        self._song_infos_cache = (ranks, ratings, song_infos)
+        return song_infos
+
+    def _perform_group_rating(self) -> None:
+        song_ids = self._rating_backend.pick_group(self._group_size)
+        songs = [self._songs[id] for id in song_ids]
+        audio_players = [self._audio_players[id] for id in song_ids]
+        for audio_player in audio_players:
+            audio_player.set_position(0.15)
+        playing = 0
+        audio_players[playing].play()
+        # Indexes into `songs`, best first.
+        placed: list[int] = []
+
+        while True:
+            time.sleep(0.25)
+            self._renderer.render_group(
+                songs, playing, placed, self._song_infos(),
+                self._rating_backend.certainty_summary()
+            )
+
+            action: MatchInput = self._renderer.get_input()
+            if action == MatchInput.SWAP_PLAYING_SONG:
+                audio_players[playing].pause()
+                playing = (playing + 1) % len(songs)
+                audio_players[playing].play()
+            elif action in SONG_INPUTS[:len(songs)]:
+                index = SONG_INPUTS.index(action)
+                if index not in placed:
+                    placed.append(index)
+                if len(placed) == len(songs) - 1:
+                    # The last song is placed by elimination.
+                    placed += [i for i in range(len(songs)) if i not in placed]
+                    for audio_player in audio_players:
+                        audio_player.pause()
+                    self._record_ranking([song_ids[i] for i in placed])
+                    return
+
     def perform_rating(self) -> None:
-        player1_id, player2_id = self._rating_backend.pick_two_players()
+        if self._group_size > 2:
+            self._perform_group_rating()
+            return
+        if self._next_pick is not None:
+            player1_id, player2_id = self._next_pick
+            self._next_pick = None
+        else:
+            player1_id, player2_id = self._rating_backend.pick_two_players()
+        if self._speculative_picker is not None:
+            self._speculative_picker.prepare(self._rating_backend, player1_id, player2_id)
         audio_player_1 = self._audio_players[player1_id]
         audio_player_2 = self._audio_players[player2_id]
         audio_player_1.set_position(0.15)
@@ -56,38 +256,68 @@ class RateSongs:
 
         while True:
             time.sleep(0.25)
-            ranks = self._rating_backend.ranks()
-            song_infos = {
-                self._songs[id]: (rank, self._rating_backend.overall_rating(id))
-                for id, rank in ranks.items()
-            }
             self._renderer.render(
                 self._songs[player1_id],
                 self._songs[player2_id],
                 self._audio_players[player1_id].is_playing(),
-                song_infos
+                self._song_infos(),
+                self._rating_backend.certainty_summary()
             )
 
             action: MatchInput = self._renderer.get_input()
-            if action != MatchInput.NONE:
-                if action == MatchInput.SWAP_PLAYING_SONG:
-                    audio_player_1.toggle()
-                    audio_player_2.toggle()
+            if action == MatchInput.SWAP_PLAYING_SONG:
+                audio_player_1.toggle()
+                audio_player_2.toggle()
+            elif action in (MatchInput.SONG_A_WINS, MatchInput.SONG_B_WINS):
+                audio_player_1.pause()
+                audio_player_2.pause()
+                if action == MatchInput.SONG_A_WINS:
+                    self._record_match(player1_id, player2_id)
                 else:
-                    audio_player_1.pause()
-                    audio_player_2.pause()
-                    if action == MatchInput.SONG_A_WINS:
-                        self._rating_backend.update(player1_id, player2_id)
-                        self._match_serializer.save_match(
-                            self._rating_backend,
-                            player1_id,
-                            player2_id
-                        )
-                    elif action == MatchInput.SONG_B_WINS:
-                        self._rating_backend.update(player2_id, player1_id)
-                        self._match_serializer.save_match(
-                            self._rating_backend,
-                            player2_id,
-                            player1_id
-                        )
-                    return
+                    self._record_match(player2_id, player1_id)
+                return
+            # Anything else, e.g. a song c-e input, does not end a 1v1 match.
+
+    def run(self,
+        max_runs: int,
+        target_confidence: float | None = None,
+        verify_top_k: int | None = None
+    ) -> int:
+        """
+        Perform up to `max_runs` ratings, returning the number performed.
+
+        With a `target_confidence`, stops once the ranking has converged,
+        see `ConvergenceMonitor`. With `verify_top_k` as well, convergence
+        of the full ranking instead starts matches between the top
+        `verify_top_k` songs (and the next), until their order converges.
+        """
+        if max_runs < 0:
+            raise ValueError("`max_runs` must be >= 0")
+        if verify_top_k is not None and target_confidence is None:
+            raise ValueError("`verify_top_k` needs a `target_confidence`")
+        monitor = None
+        # Monitor of the top `verify_top_k`, used once the full ranking converges.
+        verification = None
+        if target_confidence is not None:
+            monitor = ConvergenceMonitor(target_confidence)
+            monitor.observe(self._rating_backend, 0)
+            if verify_top_k is not None:
+                verification = ConvergenceMonitor(target_confidence, top_k=verify_top_k)
+        for run in range(max_runs):
+            if monitor is not None and monitor is verification:
+                # Speculation replaces the backend, and the top can change.
+                # Matches stay within the players the monitor judges, the
+                # top k and the next, to settle the boundary.
+                self._rating_backend.focus(monitor.judged_players(self._rating_backend))
+            self.perform_rating()
+            if monitor is None or not monitor.observe(self._rating_backend).converged:
+                continue
+            if verification is None or monitor is verification:
+                self._rating_backend.focus(None)
+                return run + 1
+            monitor = verification
+            monitor.observe(self._rating_backend, 0)
+            # The prepared matchup may be outside the top.
+            self._next_pick = None
+        self._rating_backend.focus(None)
+        return max_runs
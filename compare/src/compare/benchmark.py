@@ -0,0 +1,394 @@
+"""
+Micro/macro benchmarks of `RatingBackend` hot paths, for
+`PlackettLuceBackend`, `GlickoBackend` or `BradleyTerryBackend`.
+
+Times `new_player`, `update`, `ranks`, `rating_certainties`,
+`certainty_summary` and `pick_two_players` over a range of pool sizes, reporting latency
+percentiles, throughput and peak traced memory per operation. Results can
+be saved as JSON to compare runs across commits.
+
+Run with `python -m compare.benchmark --help`. Backends are benchmarked
+with their default settings, so Bradley-Terry refits on every update.
+
+Read views are memoized between updates, so `ranks`, the certainty views
+and `pick_two_players` are each timed straight after
+an (untimed) update, as they are in the application loop.
+
+Exhaustive Plackett-Luce search keeps an n x n EV table, so pool sizes
+above `EXHAUSTIVE_POOL_LIMIT` are skipped for it unless the limit is
+raised, and reported as skipped.
+
+Classes
+-------
+OperationResult: Timing and memory results for one operation and pool size.
+
+Functions
+---------
+run_benchmarks: Benchmark every operation for each pool size.
+skipped_pool_sizes: Pool sizes `run_benchmarks` skips for a configuration.
+save_results: Save results and run metadata as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from compare.matchmaking import (
+    BradleyTerryBackend, GlickoBackend, MatchupSearch, PlackettLuceBackend, RatingBackend
+)
+
+
+OPERATIONS = (
+    "new_player", "update", "ranks", "rating_certainties", "certainty_summary",
+    "pick_two_players"
+)
+DEFAULT_POOL_SIZES = (10, 100, 1000, 10_000)
+BACKENDS = ("plackett-luce", "glicko", "bradley-terry")
+# Largest pool benchmarked with EXHAUSTIVE search by default. Its EV table
+# takes 8 * n^2 bytes, 800 MB at 10,000 players.
+EXHAUSTIVE_POOL_LIMIT = 5000
+
+
+@dataclass(frozen=True)
+class OperationResult:
+    """
+    Results of timing `calls` calls of `operation` on a pool of
+    `pool_size` players. Latencies are in seconds.
+
+    `peak_memory_bytes` is the highest memory traced by `tracemalloc`
+    during a single call, or None if memory was not measured.
+    """
+    operation: str
+    pool_size: int
+    calls: int
+    throughput_per_second: float
+    latency_mean: float
+    latency_p50: float
+    latency_p90: float
+    latency_p99: float
+    latency_max: float
+    peak_memory_bytes: int | None
+
+
+class _Recorder:
+    """
+    Times individual calls, optionally tracing their peak memory.
+    """
+
+    def __init__(self, trace_memory: bool) -> None:
+        self.trace_memory: bool = trace_memory
+        self.latencies: dict[str, list[float]] = {op: [] for op in OPERATIONS}
+        self.peak_memory: dict[str, int] = {op: 0 for op in OPERATIONS}
+
+    @contextmanager
+    def measure(self, operation: str) -> Iterator[None]:
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            yield
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            self.peak_memory[operation] = max(self.peak_memory[operation], peak)
+        else:
+            start = time.perf_counter()
+            yield
+            self.latencies[operation].append(time.perf_counter() - start)
+
+
+@contextmanager
+def _open_backend(
+    backend: str, seed: int, search: MatchupSearch, search_workers: int | None
+) -> Iterator[RatingBackend]:
+    """
+    Build the backend named `backend`, closing it on exit.
+    `search` and `search_workers` only apply to Plackett-Luce.
+    """
+    if backend == "glicko":
+        yield GlickoBackend(rng_seed=seed)
+        return
+    if backend == "bradley-terry":
+        yield BradleyTerryBackend(rng_seed=seed)
+        return
+    plackett_luce = PlackettLuceBackend(
+        rng_seed=seed, search=search, search_workers=search_workers
+    )
+    try:
+        yield plackett_luce
+    finally:
+        plackett_luce.close()
+
+
+def _run_scenario(
+    backend: RatingBackend,
+    pool_size: int,
+    repeats: int,
+    seed: int,
+    recorder: _Recorder
+) -> None:
+    """
+    Build a pool of `pool_size` players, then time each operation
+    `repeats` times.
+    """
+    rng = random.Random(seed)
+    for player_id in range(pool_size):
+        with recorder.measure("new_player"):
+            backend.new_player(player_id)
+
+    # Spread ratings out so picks are not dominated by ties between fresh players.
+    backend.update_many(
+        tuple(rng.sample(range(pool_size), 2)) for _ in range(2 * pool_size)
+    )
+
+    def random_update() -> None:
+        backend.update(*rng.sample(range(pool_size), 2))
+
+    for _ in range(repeats):
+        with recorder.measure("update"):
+            random_update()
+    for operation in ("ranks", "rating_certainties", "certainty_summary"):
+        method: Callable[[], object] = getattr(backend, operation)
+        for _ in range(repeats):
+            random_update()
+            with recorder.measure(operation):
+                method()
+    for _ in range(repeats):
+        with recorder.measure("pick_two_players"):
+            player1, player2 = backend.pick_two_players()
+        backend.update(player1, player2)
+
+
+def _summarize(
+    operation: str, pool_size: int, latencies: list[float], peak_memory: int | None
+) -> OperationResult:
+    values = np.asarray(latencies)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+    total = float(values.sum())
+    return OperationResult(
+        operation=operation,
+        pool_size=pool_size,
+        calls=len(values),
+        throughput_per_second=len(values) / total if total > 0 else float("inf"),
+        latency_mean=float(values.mean()),
+        latency_p50=p50,
+        latency_p90=p90,
+        latency_p99=p99,
+        latency_max=float(values.max()),
+        peak_memory_bytes=peak_memory
+    )
+
+
+def skipped_pool_sizes(
+    pool_sizes: tuple[int, ...],
+    search: MatchupSearch = MatchupSearch.EXHAUSTIVE,
+    backend: str = "plackett-luce",
+    exhaustive_limit: int | None = EXHAUSTIVE_POOL_LIMIT
+) -> tuple[int, ...]:
+    """
+    Return the pool sizes `run_benchmarks` skips, those above
+    `exhaustive_limit` for Plackett-Luce with EXHAUSTIVE search.
+    """
+    if backend != "plackett-luce" or search != MatchupSearch.EXHAUSTIVE:
+        return ()
+    if exhaustive_limit is None:
+        return ()
+    return tuple(pool_size for pool_size in pool_sizes if pool_size > exhaustive_limit)
+
+
+def run_benchmarks(
+    pool_sizes: tuple[int, ...] = DEFAULT_POOL_SIZES,
+    repeats: int = 100,
+    seed: int = 0,
+    search: MatchupSearch = MatchupSearch.EXHAUSTIVE,
+    trace_memory: bool = True,
+    search_workers: int | None = None,
+    backend: str = "plackett-luce",
+    exhaustive_limit: int | None = EXHAUSTIVE_POOL_LIMIT
+) -> list[OperationResult]:
+    """
+    Benchmark every operation in `OPERATIONS` for each pool size, except
+    those in `skipped_pool_sizes`.
+
+    Timings come from an untraced run. With `trace_memory`, the same
+    seeded scenario is run again under `tracemalloc` to measure peak
+    memory, as tracing distorts timings.
+
+    Args:
+        pool_sizes: Pool sizes to benchmark, each must be >= 2.
+        repeats: Timed calls per operation, except `new_player`, which is
+            timed once per player. Must be > 0.
+        seed: Seed for the backend and the simulated match results.
+        search: Matchmaking search strategy of the backend.
+        trace_memory: Whether to measure peak memory. Memory used by
+            PARALLEL search worker processes is not traced.
+        search_workers: Worker processes of PARALLEL search, None uses one
+            per CPU.
+        backend: Backend to benchmark, one of `BACKENDS`. `search` and
+            `search_workers` only apply to "plackett-luce".
+        exhaustive_limit: Largest pool size to benchmark with EXHAUSTIVE
+            search, None for no limit.
+    """
+    if any(pool_size < 2 for pool_size in pool_sizes):
+        raise ValueError("pool sizes must be >= 2")
+    if repeats <= 0:
+        raise ValueError("`repeats` must be > 0")
+    if backend not in BACKENDS:
+        raise ValueError(f"`backend` must be one of {BACKENDS}")
+
+    skipped = skipped_pool_sizes(pool_sizes, search, backend, exhaustive_limit)
+    results: list[OperationResult] = []
+    for pool_size in pool_sizes:
+        if pool_size in skipped:
+            continue
+        timing = _Recorder(trace_memory=False)
+        with _open_backend(backend, seed, search, search_workers) as rating_backend:
+            _run_scenario(rating_backend, pool_size, repeats, seed, timing)
+
+        memory: _Recorder | None = None
+        if trace_memory:
+            memory = _Recorder(trace_memory=True)
+            with _open_backend(backend, seed, search, search_workers) as rating_backend:
+                tracemalloc.start()
+                try:
+                    _run_scenario(rating_backend, pool_size, repeats, seed, memory)
+                finally:
+                    tracemalloc.stop()
+
+        for operation in OPERATIONS:
+            results.append(_summarize(
+                operation,
+                pool_size,
+                timing.latencies[operation],
+                None if memory is None else memory.peak_memory[operation]
+            ))
+    return results
+
+
+def _git_commit() -> str | None:
+    """
+    Return the current git commit hash, or None outside a git checkout.
+    """
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def save_results(path: Path, results: list[OperationResult], settings: dict[str, object]) -> None:
+    """
+    Save `results` as JSON, along with the benchmark `settings` and
+    metadata identifying the commit and machine they were run on.
+    """
+    document = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "settings": settings,
+        "results": [asdict(result) for result in results],
+    }
+    path.write_text(json.dumps(document, indent=2))
+
+
+def _format_table(results: list[OperationResult]) -> str:
+    header = (
+        f"{'operation':<20}{'pool':>8}{'calls':>8}{'ops/s':>12}"
+        f"{'p50 us':>11}{'p90 us':>11}{'p99 us':>11}{'max us':>11}{'peak KiB':>11}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        peak = "-" if result.peak_memory_bytes is None else f"{result.peak_memory_bytes / 1024:.1f}"
+        lines.append(
+            f"{result.operation:<20}{result.pool_size:>8}{result.calls:>8}"
+            f"{result.throughput_per_second:>12.0f}"
+            f"{result.latency_p50 * 1e6:>11.1f}{result.latency_p90 * 1e6:>11.1f}"
+            f"{result.latency_p99 * 1e6:>11.1f}{result.latency_max * 1e6:>11.1f}{peak:>11}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m compare.benchmark",
+        description="Benchmark rating backend operations."
+    )
+    parser.add_argument(
+        "--pool-sizes", type=int, nargs="+", default=list(DEFAULT_POOL_SIZES)
+    )
+    parser.add_argument("--repeats", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKENDS[0])
+    parser.add_argument(
+        "--search",
+        choices=[search.name.lower() for search in MatchupSearch],
+        default=MatchupSearch.EXHAUSTIVE.name.lower(),
+        help="Matchmaking search strategy. Exhaustive search keeps an n x n "
+            "EV table, 800 MB at 10,000 players."
+    )
+    parser.add_argument(
+        "--exhaustive-limit", type=int, default=EXHAUSTIVE_POOL_LIMIT,
+        help="Skip pool sizes above this with exhaustive search."
+    )
+    parser.add_argument(
+        "--search-workers", type=int, default=None,
+        help="Worker processes of parallel search, one per CPU by default."
+    )
+    parser.add_argument("--no-memory", action="store_true", help="Skip peak memory tracing.")
+    parser.add_argument("--output", type=Path, default=None, help="Save results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        tuple(args.pool_sizes),
+        args.repeats,
+        args.seed,
+        MatchupSearch[args.search.upper()],
+        not args.no_memory,
+        args.search_workers,
+        args.backend,
+        args.exhaustive_limit
+    )
+    print(_format_table(results))
+    skipped = skipped_pool_sizes(
+        tuple(args.pool_sizes), MatchupSearch[args.search.upper()], args.backend,
+        args.exhaustive_limit
+    )
+    if skipped:
+        print(
+            f"Skipped pool sizes {', '.join(map(str, skipped))}: exhaustive search "
+            f"above --exhaustive-limit {args.exhaustive_limit}."
+        )
+    if args.output is not None:
+        save_results(args.output, results, {
+            "pool_sizes": args.pool_sizes,
+            "repeats": args.repeats,
+            "seed": args.seed,
+            "search": args.search,
+            "search_workers": args.search_workers,
+            "backend": args.backend,
+            "exhaustive_limit": args.exhaustive_limit,
+            "skipped_pool_sizes": list(skipped),
+        })
+
+
+if __name__ == "__main__":
+    main()
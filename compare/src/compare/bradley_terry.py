@@ -0,0 +1,376 @@
+"""
+Batch maximum likelihood fits of Bradley-Terry / Plackett-Luce strengths.
+
+Online rating updates depend on the order matches are applied in. Here the
+whole match history is fitted at once instead: a player's log-strength
+`theta` maximizes the likelihood of every result, under a Plackett-Luce
+model which reduces to Bradley-Terry for 1v1 matches.
+
+Results are kept as sparse counts, 1v1 results aggregated per ordered pair,
+so memory grows with the number of distinct pairs played rather than the
+number of matches. Each player is also credited with `prior_games` virtual
+wins and losses against a player of strength 0, which keeps strengths
+finite for players who never lost (or never won) and fixes the scale.
+
+The fit iterates the fixed point of the likelihood equations in the form
+of Newman (2023), a faster converging variant of the classic
+minorization-maximization (Zermelo/Hunter) iteration, vectorized over all
+pairs and multi-way match stages. Fits can be warm started from a previous
+solution, so refits after a few new results take few iterations.
+
+Uncertainties are the standard errors of the diagonal Fisher information,
+ignoring correlations between players. Between refits, results can be
+applied approximately, as one Newton step each on this quadratic
+approximation of the likelihood.
+
+Classes
+-------
+MatchCounts: Sparse counts of 1v1 results and multi-way rankings.
+FitResult: Strengths, standard errors and iteration count of a fit.
+
+Functions
+---------
+fit: Maximum likelihood strengths of every player.
+replay_1v1: Apply 1v1 results approximately, in place, with scalar math.
+rate_ranked: Approximate strengths after a multi-way match.
+deviation_change: Change in total standard error if two players are matched.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from compare.ev_table import IntArray
+from compare.plackett_luce import FloatArray
+
+
+DEFAULT_PRIOR_GAMES = 1.0
+
+# Pairs are encoded as `winner << _PAIR_SHIFT | loser`.
+_PAIR_SHIFT = 32
+# Pending 1v1 results are merged into the aggregated counts past this many.
+_MIN_PENDING = 4096
+
+
+class MatchCounts:
+    """
+    Sparse record of match results between players given by index.
+
+    1v1 results are aggregated into win counts per ordered pair, costing
+    O(distinct pairs) memory. Multi-way rankings are kept individually.
+    """
+
+    def __init__(self) -> None:
+        # Aggregated 1v1 results: sorted pair keys and their counts.
+        self._pair_keys: IntArray = np.empty(0, dtype=np.int64)
+        self._pair_counts: IntArray = np.empty(0, dtype=np.int64)
+        # Results added since the last merge, as arrays of pair keys.
+        self._pending: list[IntArray] = []
+        self._pending_size: int = 0
+        self._rankings: list[IntArray] = []
+
+    def add_pairs(self, winners: ArrayLike, losers: ArrayLike) -> None:
+        """
+        Record 1v1 results, `winners[i]` beating `losers[i]`.
+        """
+        winners = np.asarray(winners, dtype=np.int64)
+        losers = np.asarray(losers, dtype=np.int64)
+        self._pending.append((winners << _PAIR_SHIFT) | losers)
+        self._pending_size += len(winners)
+        if self._pending_size > max(len(self._pair_keys), _MIN_PENDING):
+            self._merge()
+
+    def add_ranking(self, ranking: Sequence[int]) -> None:
+        """
+        Record a multi-way result, with players in finishing order.
+        """
+        self._rankings.append(np.array(ranking, dtype=np.intp))
+
+    def _merge(self) -> None:
+        if not self._pending:
+            return
+        keys, inverse = np.unique(
+            np.concatenate([self._pair_keys, *self._pending]), return_inverse=True
+        )
+        counts = np.bincount(
+            inverse,
+            weights=np.concatenate([
+                self._pair_counts, np.ones(self._pending_size, dtype=np.int64)
+            ]),
+            minlength=len(keys)
+        ).astype(np.int64)
+        self._pair_keys, self._pair_counts = keys, counts
+        self._pending = []
+        self._pending_size = 0
+
+    def pairs(self) -> tuple[IntArray, IntArray, IntArray]:
+        """
+        Return distinct ordered pairs as winner and loser index arrays,
+        and the number of times each winner beat each loser.
+        """
+        self._merge()
+        return (
+            self._pair_keys >> _PAIR_SHIFT,
+            self._pair_keys & ((1 << _PAIR_SHIFT) - 1),
+            self._pair_counts
+        )
+
+    def rankings(self) -> list[IntArray]:
+        """
+        Return every multi-way ranking, in the order they were added.
+        """
+        return self._rankings
+
+    def to_arrays(self) -> dict[str, IntArray]:
+        """
+        Return the counts as named arrays, for `from_arrays`.
+        """
+        self._merge()
+        return {
+            "pair_keys": self._pair_keys,
+            "pair_counts": self._pair_counts,
+            "ranking_players": np.concatenate([np.empty(0, dtype=np.intp), *self._rankings]),
+            "ranking_lengths": np.array([len(r) for r in self._rankings], dtype=np.intp),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, IntArray]) -> MatchCounts:
+        """
+        Rebuild counts from `to_arrays` output.
+
+        Raises:
+            - `ValueError` if the arrays are inconsistent.
+        """
+        counts = cls()
+        keys = np.asarray(arrays["pair_keys"], dtype=np.int64)
+        pair_counts = np.asarray(arrays["pair_counts"], dtype=np.int64)
+        lengths = np.asarray(arrays["ranking_lengths"], dtype=np.intp)
+        players = np.asarray(arrays["ranking_players"], dtype=np.intp)
+        if (
+            keys.shape != pair_counts.shape
+            or np.any(np.diff(keys) <= 0)
+            or np.any(pair_counts <= 0)
+            or int(lengths.sum()) != len(players)
+        ):
+            raise ValueError("Inconsistent match counts.")
+        counts._pair_keys, counts._pair_counts = keys, pair_counts
+        counts._rankings = np.split(players, np.cumsum(lengths)[:-1]) if len(lengths) else []
+        return counts
+
+    def max_player(self) -> int:
+        """
+        Return the highest player index with a result, or -1 if none.
+        """
+        winners, losers, _ = self.pairs()
+        return int(max(
+            winners.max(initial=-1), losers.max(initial=-1),
+            *(ranking.max() for ranking in self._rankings)
+        ))
+
+
+@dataclass(frozen=True)
+class FitResult:
+    """
+    Fitted log-strength (`theta`) and standard error (`sigma`) of every
+    player, and the number of iterations the fit took.
+    """
+    theta: FloatArray
+    sigma: FloatArray
+    iterations: int
+    converged: bool
+
+
+def _stages(rankings: list[IntArray]) -> tuple[IntArray, IntArray, IntArray]:
+    """
+    Flatten multi-way rankings into Plackett-Luce stages: stage `t` of a
+    ranking is won by its player `t` among players `t` onwards.
+
+    Returns the members of every stage, the stage of each member, and the
+    winner of each stage.
+    """
+    members: list[IntArray] = []
+    member_stages: list[IntArray] = []
+    winners: list[IntArray] = []
+    stage_count = 0
+    # Rankings of equal length are stacked, so this loops over lengths only.
+    lengths = np.array([len(ranking) for ranking in rankings], dtype=np.intp)
+    for length in np.unique(lengths).tolist():
+        stacked = np.stack([r for r, n in zip(rankings, lengths) if n == length])
+        for stage in range(length - 1):
+            remaining = stacked[:, stage:]
+            stage_ids = stage_count + np.arange(len(stacked))
+            members.append(remaining.ravel())
+            member_stages.append(np.repeat(stage_ids, length - stage))
+            winners.append(stacked[:, stage])
+            stage_count += len(stacked)
+    if not members:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, empty
+    return np.concatenate(members), np.concatenate(member_stages), np.concatenate(winners)
+
+
+def fit(
+    counts: MatchCounts,
+    n: int,
+    initial: FloatArray | None = None,
+    prior_games: float = DEFAULT_PRIOR_GAMES,
+    tolerance: float = 1e-6,
+    max_iterations: int = 1000
+) -> FitResult:
+    """
+    Fit the maximum likelihood log-strength of players `0..n-1`.
+
+    Each iteration costs O(distinct pairs + multi-way stages) and memory
+    is of the same order, independent of how often pairs were played.
+
+    Args:
+        counts: Results to fit, between players below `n`.
+        n: Number of players.
+        initial: Optional log-strengths to start from, e.g. a previous fit.
+        prior_games: Virtual wins and losses of every player against a
+            player of log-strength 0. Must be > 0.
+        tolerance: The fit stops once no log-strength changes by more
+            than this in an iteration. Must be > 0.
+        max_iterations: Iteration limit. Must be > 0.
+
+    Raises:
+        - `ValueError` if an argument is out of range, or `counts` holds
+        players of index `n` or above.
+    """
+    if not (prior_games > 0) or not (tolerance > 0) or max_iterations <= 0:
+        raise ValueError("`prior_games`, `tolerance` and `max_iterations` must be > 0")
+    if counts.max_player() >= n:
+        raise ValueError("Results reference players outside the fit.")
+    if initial is not None and len(initial) != n:
+        raise ValueError("`initial` must hold a log-strength for every player.")
+
+    winners, losers, wins = counts.pairs()
+    # Unordered pairs, with the wins of each side.
+    lower, upper = np.minimum(winners, losers), np.maximum(winners, losers)
+    keys, inverse = np.unique(lower * n + upper, return_inverse=True)
+    player1, player2 = keys // n, keys % n
+    lower_won = winners == lower
+    wins1 = np.bincount(inverse, weights=wins * lower_won, minlength=len(keys))
+    wins2 = np.bincount(inverse, weights=wins * ~lower_won, minlength=len(keys))
+    members, member_stages, stage_winners = _stages(counts.rankings())
+    stage_count = len(stage_winners)
+    member_won = members == stage_winners[member_stages]
+
+    strength = np.ones(n) if initial is None else np.exp(initial)
+    iterations = 0
+    converged = False
+    while iterations < max_iterations and not converged:
+        iterations += 1
+        # Wins are credited with the opponents' share of each match, and
+        # losses with the inverse total strength.
+        prior = prior_games / (strength + 1)
+        numerator = prior.copy()
+        denominator = prior.copy()
+        pair_total = strength[player1] + strength[player2]
+        numerator += np.bincount(player1, wins1 * strength[player2] / pair_total, n)
+        numerator += np.bincount(player2, wins2 * strength[player1] / pair_total, n)
+        denominator += np.bincount(player1, wins2 / pair_total, n)
+        denominator += np.bincount(player2, wins1 / pair_total, n)
+        if stage_count:
+            stage_total = np.bincount(member_stages, strength[members], stage_count)
+            numerator += np.bincount(
+                stage_winners, 1 - strength[stage_winners] / stage_total, n
+            )
+            denominator += np.bincount(
+                members[~member_won], 1 / stage_total[member_stages[~member_won]], n
+            )
+        new_strength = numerator / denominator
+        converged = bool(np.max(np.abs(np.log(new_strength / strength)), initial=0) <= tolerance)
+        strength = new_strength
+
+    # Diagonal Fisher information of the log-strengths.
+    share = strength / (strength + 1)
+    information = 2 * prior_games * share * (1 - share)
+    pair_share = strength[player1] / (strength[player1] + strength[player2])
+    pair_information = (wins1 + wins2) * pair_share * (1 - pair_share)
+    information += np.bincount(player1, pair_information, n)
+    information += np.bincount(player2, pair_information, n)
+    if stage_count:
+        stage_total = np.bincount(member_stages, strength[members], stage_count)
+        member_share = strength[members] / stage_total[member_stages]
+        information += np.bincount(members, member_share * (1 - member_share), n)
+    return FitResult(np.log(strength), 1 / np.sqrt(information), iterations, converged)
+
+
+def replay_1v1(
+    theta: list[float],
+    sigma: list[float],
+    winners: Sequence[int],
+    losers: Sequence[int]
+) -> None:
+    """
+    Apply matches approximately, in order, updating `theta` and `sigma`
+    in place. Match `i` is won by position `winners[i]` against
+    `losers[i]`.
+
+    Each result is one Newton step on the quadratic approximation of the
+    likelihood given by the current standard errors.
+    """
+    for winner, loser in zip(winners, losers):
+        theta_w, sigma_w, theta_l, sigma_l = theta[winner], sigma[winner], theta[loser], sigma[loser]
+        p = 1 / (1 + math.exp(theta_l - theta_w))
+        information = p * (1 - p)
+        precision_w = 1 / (sigma_w * sigma_w) + information
+        precision_l = 1 / (sigma_l * sigma_l) + information
+        theta[winner] = theta_w + (1 - p) / precision_w
+        theta[loser] = theta_l - (1 - p) / precision_l
+        sigma[winner] = 1 / math.sqrt(precision_w)
+        sigma[loser] = 1 / math.sqrt(precision_l)
+
+
+def rate_ranked(
+    theta: Sequence[float], sigma: Sequence[float]
+) -> tuple[list[float], list[float]]:
+    """
+    Approximate log-strengths and standard errors after a multi-way match,
+    with players given in finishing order, best first.
+
+    Applies one Newton step over every Plackett-Luce stage of the match,
+    costing O(k^2) for k players.
+    """
+    strength = [math.exp(t) for t in theta]
+    gradient = [0.0] * len(theta)
+    information = [0.0] * len(theta)
+    for stage in range(len(theta) - 1):
+        total = sum(strength[stage:])
+        for player in range(stage, len(theta)):
+            share = strength[player] / total
+            gradient[player] += (1.0 if player == stage else 0.0) - share
+            information[player] += share * (1 - share)
+    new_theta: list[float] = []
+    new_sigma: list[float] = []
+    for player, (player_theta, player_sigma) in enumerate(zip(theta, sigma)):
+        precision = 1 / (player_sigma * player_sigma) + information[player]
+        new_theta.append(player_theta + gradient[player] / precision)
+        new_sigma.append(1 / math.sqrt(precision))
+    return new_theta, new_sigma
+
+
+def deviation_change(
+    theta_1: ArrayLike, sigma_1: ArrayLike, theta_2: ArrayLike, sigma_2: ArrayLike
+) -> FloatArray:
+    """
+    Change in `sigma_1 + sigma_2` if player 1 and player 2 are matched up,
+    under the quadratic approximation. Always negative, and exact rather
+    than an expectation as it does not depend on the result. Arguments
+    broadcast against each other.
+    """
+    theta_1, sigma_1, theta_2, sigma_2 = (
+        np.asarray(v, dtype=np.float64) for v in (theta_1, sigma_1, theta_2, sigma_2)
+    )
+    p = 1 / (1 + np.exp(theta_2 - theta_1))
+    information = p * (1 - p)
+    return (
+        1 / np.sqrt(1 / (sigma_1 * sigma_1) + information) - sigma_1
+        + 1 / np.sqrt(1 / (sigma_2 * sigma_2) + information) - sigma_2
+    )
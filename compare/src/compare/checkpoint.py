@@ -0,0 +1,166 @@
+"""
+Local binary checkpoints of `RatingBackend` state.
+
+Resuming a session normally replays the full match history through the
+rating backend. A checkpoint stores the serialized backend state after
+the first `match_count` matches, so only matches after it need replaying.
+
+Each checkpoint also records a digest of the matches it covers, so it is
+only ever applied on top of the exact history it was taken from.
+
+Classes
+-------
+HistoryDigest: Digest of a match history, computed as matches arrive.
+Checkpoint: Backend state tagged with the match history it covers.
+CheckpointStore: Folder of checkpoint files, newest first.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+
+from compare.song import SongID
+
+
+_MAGIC = b"CMPCKPT1"
+# Magic, match count, SHA-256 history digest.
+_HEADER = struct.Struct("<8sQ32s")
+_FILE_PREFIX = "checkpoint-"
+_FILE_SUFFIX = ".bin"
+
+
+class HistoryDigest:
+    """
+    SHA-256 digest identifying the ordered sequence of every match passed
+    to `update` so far, each a ranking of songs such as `(winner, loser)`.
+
+    A history of only 1v1 matches digests its song pairs. Multi-way matches
+    are length prefixed, in a separate digest domain. Only the two running
+    hashes are kept, so arbitrarily long histories can be streamed through.
+    """
+
+    def __init__(self) -> None:
+        self._match_count: int = 0
+        # Valid while every match so far is 1v1.
+        self._pairs: hashlib._Hash | None = hashlib.sha256()
+        self._ranked: hashlib._Hash = hashlib.sha256(b"ranked")
+
+    @property
+    def match_count(self) -> int:
+        return self._match_count
+
+    def update(self, matches: Sequence[Sequence[SongID]]) -> None:
+        """
+        Append `matches` to the digested history.
+        """
+        if not matches:
+            return
+        if self._pairs is not None:
+            if all(len(match) == 2 for match in matches):
+                self._pairs.update(np.asarray(matches, dtype="<i8").tobytes())
+            else:
+                self._pairs = None
+        self._ranked.update(np.fromiter(
+            chain.from_iterable((len(match), *match) for match in matches), dtype="<i8"
+        ).tobytes())
+        self._match_count += len(matches)
+
+    def digest(self) -> bytes:
+        return (self._ranked if self._pairs is None else self._pairs).digest()
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    Serialized backend `state` after replaying the first `match_count`
+    matches of a history with digest `history_digest`.
+    """
+    match_count: int
+    history_digest: bytes
+    state: bytes
+
+
+class CheckpointStore:
+    """
+    Stores checkpoints as files in a local folder, keeping only the newest
+    `keep` of them. Files are written atomically, so a crash mid-write
+    never leaves a truncated checkpoint behind.
+    """
+
+    def __init__(self, folder: Path, keep: int = 2) -> None:
+        """
+        Args:
+            folder: Folder to store checkpoint files in, created if missing.
+            keep: Number of newest checkpoints to retain. Must be > 0.
+        """
+        if keep <= 0:
+            raise ValueError("`keep` must be > 0")
+        self._folder: Path = folder
+        self._keep: int = keep
+        self._folder.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self) -> list[tuple[int, Path]]:
+        """
+        Return `(match_count, path)` of every checkpoint file, newest first.
+        """
+        paths: list[tuple[int, Path]] = []
+        for path in self._folder.glob(_FILE_PREFIX + "*" + _FILE_SUFFIX):
+            count = path.name[len(_FILE_PREFIX):-len(_FILE_SUFFIX)]
+            if count.isdigit():
+                paths.append((int(count), path))
+        return sorted(paths, reverse=True)
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        """
+        Write `checkpoint` to disk and prune old checkpoints.
+        """
+        path = self._folder / f"{_FILE_PREFIX}{checkpoint.match_count:012d}{_FILE_SUFFIX}"
+        temporary_path = path.with_suffix(".tmp")
+        with open(temporary_path, "wb") as file:
+            file.write(_HEADER.pack(
+                _MAGIC, checkpoint.match_count, checkpoint.history_digest
+            ))
+            file.write(checkpoint.state)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+        for _, old_path in self._paths()[self._keep:]:
+            old_path.unlink(missing_ok=True)
+
+    def _read(self, path: Path) -> Checkpoint | None:
+        """
+        Read a checkpoint file, returning None if it is malformed.
+        """
+        data = path.read_bytes()
+        if len(data) < _HEADER.size:
+            return None
+        magic, match_count, digest = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            return None
+        return Checkpoint(match_count, digest, data[_HEADER.size:])
+
+    def checkpoints(self) -> Iterator[Checkpoint]:
+        """
+        Yield every readable checkpoint, newest first, reading each file
+        only when it is reached.
+        """
+        for match_count, path in self._paths():
+            checkpoint = self._read(path)
+            if checkpoint is not None and checkpoint.match_count == match_count:
+                yield checkpoint
+
+    def clear(self) -> None:
+        """
+        Delete every checkpoint, e.g. when a new session is started.
+        """
+        for _, path in self._paths():
+            path.unlink(missing_ok=True)
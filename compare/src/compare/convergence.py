@@ -0,0 +1,219 @@
+"""
+Convergence tracking, to end a rating session once the ranking has settled.
+
+Human comparisons are by far the most expensive resource of a session, so
+`ConvergenceMonitor` watches a `RatingBackend` between matches and reports
+when further comparisons are unlikely to change the ranking.
+
+Both signals are estimated cheaply from the mu/sigma arrays of the backend,
+treating every rating as an independent normal belief:
+
+- Confidence: the Spearman rank correlation between mu order and the true
+  order that the beliefs predict, from the expected squared rank error of
+  every player (`squared_rank_errors`).
+- Rank change: how many places players move in mu order per match,
+  smoothed over recent matches, i.e. how much each further match is still
+  changing the ranking.
+
+A monitor can cover the whole ranking or only the `top_k` players, the
+latter for a final round verifying just the top of the ranking.
+
+Classes
+-------
+ConvergenceStatus: Convergence measures after a number of comparisons.
+ConvergenceMonitor: Tracks convergence of a backend across updates.
+
+Functions
+---------
+squared_rank_errors: Expected squared rank error of every player.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from compare.ev_table import IntArray
+from compare.matchmaking import PlayerID, RatingBackend
+from compare.plackett_luce import FloatArray, normal_cdf
+
+
+def _correct_order_probability(
+    mu_above: FloatArray, sigma_above: FloatArray, mu_below: FloatArray, sigma_below: FloatArray
+) -> FloatArray:
+    """
+    Probability that players believed above others really are above them.
+    """
+    spread = np.sqrt(sigma_above * sigma_above + sigma_below * sigma_below)
+    gap = mu_above - mu_below
+    # Certain players are ordered by mu alone.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(spread > 0, gap / spread, np.where(gap > 0, np.inf, 0.0))
+    return normal_cdf(z)
+
+
+def squared_rank_errors(mu: FloatArray, sigma: FloatArray, window: int) -> FloatArray:
+    """
+    Return the expected squared difference between the true rank of every
+    player and its position in mu order, indexed like `mu`.
+
+    Each player is compared with the `window` players either side of it in
+    mu order, each of which is above it with an independent probability
+    `p`. The true rank then has a mean shift of the summed probabilities of
+    swapping places and a variance of the summed `p * (1 - p)`. Players
+    further apart are assumed ordered correctly, which understates the
+    error while ratings are still very uncertain. Costs O(n * window).
+    """
+    if window <= 0:
+        raise ValueError("`window` must be > 0")
+    order = np.argsort(-mu, kind="stable")
+    sorted_mu, sorted_sigma = mu[order], sigma[order]
+    shift = np.zeros(len(mu))
+    variance = np.zeros(len(mu))
+    for offset in range(1, min(window, len(mu) - 1) + 1):
+        swapped = 1 - _correct_order_probability(
+            sorted_mu[:-offset], sorted_sigma[:-offset], sorted_mu[offset:], sorted_sigma[offset:]
+        )
+        # The upper player moves down and the lower player up.
+        shift[:-offset] += swapped
+        shift[offset:] -= swapped
+        variance[:-offset] += swapped * (1 - swapped)
+        variance[offset:] += swapped * (1 - swapped)
+    errors = np.empty(len(mu))
+    errors[order] = shift * shift + variance
+    return errors
+
+
+@dataclass(frozen=True)
+class ConvergenceStatus:
+    """
+    Convergence of the ranking after `comparisons` observed matches.
+
+    `confidence` is the predicted Spearman correlation of the players in
+    scope with their true order, `expected_rank_error` the root mean
+    squared rank error of those players, and `rank_change` the smoothed
+    mean number of places they moved per match.
+    """
+    comparisons: int
+    confidence: float
+    expected_rank_error: float
+    rank_change: float
+    converged: bool
+
+
+class ConvergenceMonitor:
+    """
+    Decides when a rating session has converged, from snapshots of a
+    backend taken with `observe` after each match.
+
+    The ranking has converged once `confidence` has reached
+    `target_confidence` and `rank_change` has been at most
+    `max_rank_change`, for `patience` observations in a row.
+    """
+
+    def __init__(self,
+        target_confidence: float = 0.98,
+        max_rank_change: float = 0.1,
+        top_k: int | None = None,
+        window: int = 32,
+        smoothing: float = 0.05,
+        patience: int = 10
+    ) -> None:
+        """
+        Args:
+            target_confidence: Confidence to reach, in `(0, 1)`.
+            max_rank_change: Largest smoothed rank change per match of a
+                converged ranking. Must be >= 0.
+            top_k: Only judge the `top_k` best players by mu (and their
+                order against the next), or every player if None.
+            window: Players either side considered by
+                `squared_rank_errors`. Must be > 0.
+            smoothing: Weight of the newest match in `rank_change`, in `(0, 1]`.
+            patience: Consecutive converged observations needed. Must be > 0.
+        """
+        if not 0 < target_confidence < 1:
+            raise ValueError("`target_confidence` must be in (0, 1)")
+        if max_rank_change < 0:
+            raise ValueError("`max_rank_change` must be >= 0")
+        if top_k is not None and top_k <= 0:
+            raise ValueError("`top_k` must be > 0")
+        if window <= 0 or patience <= 0:
+            raise ValueError("`window` and `patience` must be > 0")
+        if not 0 < smoothing <= 1:
+            raise ValueError("`smoothing` must be in (0, 1]")
+        self._target_confidence: float = target_confidence
+        self._max_rank_change: float = max_rank_change
+        self._top_k: int | None = top_k
+        self._window: int = window
+        self._smoothing: float = smoothing
+        self._patience: int = patience
+        self._comparisons: int = 0
+        # Position in mu order of every player at the last observation.
+        self._positions: IntArray | None = None
+        self._rank_change: float | None = None
+        self._streak: int = 0
+
+    @property
+    def top_k(self) -> int | None:
+        return self._top_k
+
+    def _scope(self, order: IntArray) -> IntArray:
+        """
+        Internal indexes of the judged players, best first.
+        """
+        return order if self._top_k is None else order[:self._top_k + 1]
+
+    def judged_players(self, backend: RatingBackend) -> list[PlayerID]:
+        """
+        Return the ids of the players `observe` would judge in the current
+        state of `backend`, best first by mu.
+        """
+        ids, mu, _ = backend.rating_arrays()
+        return ids[self._scope(np.argsort(-mu, kind="stable"))].tolist()
+
+    def observe(self, backend: RatingBackend, matches: int = 1) -> ConvergenceStatus:
+        """
+        Record the state of `backend` after `matches` more matches.
+        The first observation only sets the baseline for `rank_change`.
+        """
+        if matches < 0:
+            raise ValueError("`matches` must be >= 0")
+        _, mu, sigma = backend.rating_arrays()
+        if len(mu) < 2:
+            raise ValueError("At least two players are needed.")
+        self._comparisons += matches
+        order = np.argsort(-mu, kind="stable")
+        positions = np.empty(len(mu), dtype=np.intp)
+        positions[order] = np.arange(len(mu))
+        scope = self._scope(order)
+
+        errors = squared_rank_errors(mu, sigma, self._window)[scope]
+        m = len(scope)
+        # Spearman's rho from rank differences, 1 - 6 sum(d^2) / (m (m^2 - 1)).
+        confidence = max(-1.0, 1 - 6 * float(errors.sum()) / (m * (m * m - 1)))
+        expected_rank_error = math.sqrt(float(errors.mean()))
+        # New players have not moved yet.
+        known = scope if self._positions is None else scope[scope < len(self._positions)]
+        if self._positions is not None and matches > 0 and len(known) > 0:
+            moved = np.abs(positions[known] - self._positions[known]).mean() / matches
+            self._rank_change = (
+                moved if self._rank_change is None
+                else self._smoothing * moved + (1 - self._smoothing) * self._rank_change
+            )
+        self._positions = positions
+
+        settled = (
+            confidence >= self._target_confidence
+            and self._rank_change is not None
+            and self._rank_change <= self._max_rank_change
+        )
+        self._streak = self._streak + 1 if settled else 0
+        return ConvergenceStatus(
+            comparisons=self._comparisons,
+            confidence=confidence,
+            expected_rank_error=expected_rank_error,
+            rank_change=math.inf if self._rank_change is None else self._rank_change,
+            converged=self._streak >= self._patience
+        )
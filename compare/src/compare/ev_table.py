@@ -0,0 +1,343 @@
+"""
+Persistent pairwise matchup EV table with incremental refresh.
+
+A rating update only changes the two players involved, so only their rows
+and columns of the pairwise EV matrix go stale. `MatchupEVTable` keeps the
+full matrix between picks, recomputes only invalidated rows/columns, and
+maintains a per-row minimum so the lowest EV can be found in O(n).
+Counting or listing the matchups within a tolerance of it still scans the
+upper triangle of each row whose minimum is within the tolerance, which
+early on, while ratings are still close, is most of the matrix, so a pick
+is O(n^2) in the worst case. `count_within` and `matchup_at` at least
+avoid materializing every such tie to choose one.
+
+Rows are evaluated and scanned in blocks of `_BLOCK_ROWS`, so beyond the
+matrix itself memory stays O(n * _BLOCK_ROWS).
+
+An optional penalty function adds to the EV of particular matchups, e.g.
+to discourage repeats of pairs that have already been played.
+
+Classes
+-------
+MatchupEVTable: Cached symmetric matrix of matchup EVs with row minima.
+
+Functions
+---------
+exhaustive_minimum: Lowest matchup EV over all pairs, in bounded memory.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+
+import numpy as np
+from numpy.typing import NDArray
+
+from compare.plackett_luce import FloatArray
+
+
+type IntArray = NDArray[np.intp]
+type BoolArray = NDArray[np.bool_]
+
+# Signature of `compare.plackett_luce.sigma_change_ev` with the model bound.
+type MatchupEVFunction = Callable[
+    [FloatArray, FloatArray, FloatArray, FloatArray], FloatArray
+]
+
+# Additive EV penalty of matchups between two broadcast arrays of player indexes.
+type MatchupPenaltyFunction = Callable[[IntArray, IntArray], FloatArray]
+
+# Rows evaluated or scanned at once, bounding temporary memory.
+_BLOCK_ROWS = 256
+
+
+class MatchupEVTable:
+    """
+    Symmetric `n x n` matrix of matchup EVs indexed by internal player index.
+
+    Entry `[i, j]` (and `[j, i]`) holds `ev_function(i, j)` with the lower
+    index as player 1, so values are identical to evaluating the upper
+    triangle of the full matrix in one pass. The diagonal is `+inf`.
+
+    With a `penalty` function, entries hold the EV plus the penalty. A
+    matchup's penalty may only change along with the rating of one of its
+    players, so that it is re-evaluated.
+
+    Players whose ratings change must be passed to `invalidate`. Newly added
+    players are detected from the array lengths given to `refresh`.
+    """
+
+    def __init__(
+        self, ev_function: MatchupEVFunction, penalty: MatchupPenaltyFunction | None = None
+    ) -> None:
+        self._ev_function: MatchupEVFunction = ev_function
+        self._penalty: MatchupPenaltyFunction | None = penalty
+        self._evs: FloatArray = np.empty((0, 0), dtype=np.float64)
+        # Minimum (and its column) of each row, excluding the diagonal.
+        self._row_minimums: FloatArray = np.empty(0, dtype=np.float64)
+        self._row_argmins: IntArray = np.empty(0, dtype=np.intp)
+        self._stale: set[int] = set()
+
+    def __len__(self) -> int:
+        return self._evs.shape[0]
+
+    def invalidate(self, index: int) -> None:
+        """
+        Mark the row/column of player `index` as stale.
+        """
+        self._stale.add(index)
+
+    def clear(self) -> None:
+        """
+        Drop all cached values, forcing a full rebuild on the next `refresh`.
+        """
+        self._evs = np.empty((0, 0), dtype=np.float64)
+        self._row_minimums = np.empty(0, dtype=np.float64)
+        self._row_argmins = np.empty(0, dtype=np.intp)
+        self._stale.clear()
+
+    def _grow(self, n: int) -> None:
+        """
+        Resize the matrix to `n` players, marking all new players as stale.
+        """
+        old_n = len(self)
+        evs = np.full((n, n), np.inf, dtype=np.float64)
+        evs[:old_n, :old_n] = self._evs
+        self._evs = evs
+        self._row_minimums = np.concatenate(
+            [self._row_minimums, np.full(n - old_n, np.inf)]
+        )
+        self._row_argmins = np.concatenate(
+            [self._row_argmins, np.zeros(n - old_n, dtype=np.intp)]
+        )
+        self._stale.update(range(old_n, n))
+
+    def _penalize(self, block: FloatArray, rows: IntArray, columns: IntArray) -> None:
+        if self._penalty is not None:
+            block += self._penalty(rows[:, None], columns[None, :])
+
+    def _rebuild(self, mu: FloatArray, sigma: FloatArray) -> None:
+        """
+        Evaluate every entry, one block of rows at a time. Each block is
+        only evaluated from its first row on, as player 1, and mirrored
+        into the columns, so every pair is evaluated once.
+        """
+        n = len(mu)
+        for start in range(0, n, _BLOCK_ROWS):
+            rows = np.arange(start, min(start + _BLOCK_ROWS, n))
+            columns = np.arange(start, n)
+            block = self._ev_function(
+                mu[rows, None], sigma[rows, None], mu[None, start:], sigma[None, start:]
+            )
+            # Pairs within the block take the orientation of their lower index.
+            square = block[:, :len(rows)]
+            lower = np.tril_indices(len(rows), -1)
+            square[lower] = square.T[lower]
+            self._penalize(block, rows, columns)
+            square[np.arange(len(rows)), np.arange(len(rows))] = np.inf
+            self._evs[start:rows[-1] + 1, start:] = block
+            self._evs[start:, start:rows[-1] + 1] = block.T
+
+    def _evaluate_rows(
+        self, rows: IntArray, mu: FloatArray, sigma: FloatArray
+    ) -> FloatArray:
+        """
+        Evaluate the full rows of the table for the player indexes `rows`.
+
+        Each entry is evaluated with the lower index as player 1, keeping
+        orientation consistent with `_rebuild`.
+        """
+        columns = np.arange(len(mu))
+        as_player1 = self._ev_function(
+            mu[rows, None], sigma[rows, None], mu[None, :], sigma[None, :]
+        )
+        as_player2 = self._ev_function(
+            mu[None, :], sigma[None, :], mu[rows, None], sigma[rows, None]
+        )
+        block = np.where(rows[:, None] < columns[None, :], as_player1, as_player2)
+        self._penalize(block, rows, columns)
+        block[np.arange(len(rows)), rows] = np.inf
+        return block
+
+    def refresh(self, mu: FloatArray, sigma: FloatArray) -> None:
+        """
+        Bring the table up to date with the current `mu`/`sigma` arrays.
+
+        Costs O(n * k) for k stale players, plus a row minimum rescan for
+        rows whose previous best partner was stale.
+        """
+        n = len(mu)
+        if n < len(self):
+            self.clear()
+        if n > len(self):
+            self._grow(n)
+        if not self._stale:
+            return
+
+        stale = np.fromiter(sorted(self._stale), np.intp, len(self._stale))
+        self._stale.clear()
+        if len(stale) == n:
+            self._rebuild(mu, sigma)
+            self._row_argmins = self._evs.argmin(axis=1)
+            self._row_minimums = self._evs[np.arange(n), self._row_argmins]
+            return
+
+        for start in range(0, len(stale), _BLOCK_ROWS):
+            rows = stale[start:start + _BLOCK_ROWS]
+            block = self._evaluate_rows(rows, mu, sigma)
+            self._evs[rows, :] = block
+            self._evs[:, rows] = block.T
+
+        # Rows whose best partner changed need a full rescan, the rest can
+        # only have improved through the stale columns.
+        is_stale = np.zeros(n, dtype=np.bool_)
+        is_stale[stale] = True
+        rescan = is_stale | is_stale[self._row_argmins]
+        rescan_rows = np.flatnonzero(rescan)
+        if len(rescan_rows) > 0:
+            rescanned = self._evs[rescan_rows]
+            self._row_argmins[rescan_rows] = rescanned.argmin(axis=1)
+            self._row_minimums[rescan_rows] = rescanned[
+                np.arange(len(rescan_rows)), self._row_argmins[rescan_rows]
+            ]
+
+        other_rows = np.flatnonzero(~rescan)
+        if len(other_rows) > 0:
+            stale_columns = self._evs[np.ix_(other_rows, stale)]
+            best_stale = stale_columns.argmin(axis=1)
+            best_stale_evs = stale_columns[np.arange(len(other_rows)), best_stale]
+            improved = best_stale_evs < self._row_minimums[other_rows]
+            improved_rows = other_rows[improved]
+            self._row_minimums[improved_rows] = best_stale_evs[improved]
+            self._row_argmins[improved_rows] = stale[best_stale[improved]]
+
+    def _row_minimums_excluding(self, excluded: BoolArray | None) -> FloatArray:
+        """
+        Return the row minima over matchups between players not `excluded`,
+        with `+inf` for excluded rows.
+        """
+        if excluded is None:
+            return self._row_minimums
+        minimums = np.where(excluded, np.inf, self._row_minimums)
+        # Rows whose best partner is excluded need a rescan.
+        rescan_rows = np.flatnonzero(~excluded & excluded[self._row_argmins])
+        if len(rescan_rows) > 0:
+            minimums[rescan_rows] = np.where(
+                excluded[None, :], np.inf, self._evs[rescan_rows]
+            ).min(axis=1)
+        return minimums
+
+    def minimum(self, excluded: BoolArray | None = None) -> float:
+        """
+        Return the lowest EV of any matchup. `refresh` must be called first.
+
+        Args:
+            excluded: Optional mask of players whose matchups are ignored.
+        """
+        return float(self._row_minimums_excluding(excluded).min())
+
+    def _blocks_within(
+        self, threshold: float, excluded: BoolArray | None
+    ) -> Iterator[tuple[int, FloatArray, BoolArray]]:
+        """
+        Yield the first row of each block of rows that can hold a matchup
+        `(i, j)`, `i < j`, with EV `<= threshold`, the block's upper
+        triangle from column `first row + 1` on, as a view, and a mask of
+        those matchups in it.
+        """
+        n = len(self)
+        has_matchup = self._row_minimums_excluding(excluded) <= threshold
+        for start in range(0, n - 1, _BLOCK_ROWS):
+            stop = min(start + _BLOCK_ROWS, n - 1)
+            if not has_matchup[start:stop].any():
+                continue
+            candidates = self._evs[start:stop, start + 1:]
+            mask = candidates <= threshold
+            mask[~has_matchup[start:stop]] = False
+            mask[:, :stop - start][np.tril_indices(stop - start, -1)] = False
+            if excluded is not None:
+                mask &= ~excluded[None, start + 1:]
+            yield start, candidates, mask
+
+    def matchups_within(
+        self, threshold: float, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray]:
+        """
+        Return all matchups `(i, j)`, `i < j`, with EV `<= threshold`.
+
+        Matchups are returned as two index arrays and their EVs, in
+        row-major order, the same order as `itertools.combinations` over
+        the player indexes. While ratings are close, this can be most of
+        the O(n^2) pairs, see `count_within` and `matchup_at`.
+
+        Args:
+            threshold: Highest EV to include.
+            excluded: Optional mask of players whose matchups are ignored.
+        """
+        player1_blocks: list[IntArray] = [np.empty(0, dtype=np.intp)]
+        player2_blocks: list[IntArray] = [np.empty(0, dtype=np.intp)]
+        ev_blocks: list[FloatArray] = [np.empty(0, dtype=np.float64)]
+        for start, candidates, mask in self._blocks_within(threshold, excluded):
+            row_positions, column_positions = np.nonzero(mask)
+            player1_blocks.append(row_positions + start)
+            player2_blocks.append(column_positions + start + 1)
+            ev_blocks.append(candidates[row_positions, column_positions])
+        return (
+            np.concatenate(player1_blocks),
+            np.concatenate(player2_blocks),
+            np.concatenate(ev_blocks)
+        )
+
+    def count_within(self, threshold: float, excluded: BoolArray | None = None) -> int:
+        """
+        Return the number of matchups `matchups_within` would return,
+        without materializing them.
+        """
+        return sum(
+            int(np.count_nonzero(mask))
+            for _, _, mask in self._blocks_within(threshold, excluded)
+        )
+
+    def matchup_at(
+        self, threshold: float, position: int, excluded: BoolArray | None = None
+    ) -> tuple[int, int, float]:
+        """
+        Return the matchup at `position` of those `matchups_within` would
+        return, as its two indexes and EV, only materializing its block.
+
+        Raises:
+            - `IndexError` if `position` is not below `count_within`.
+        """
+        if position >= 0:
+            for start, candidates, mask in self._blocks_within(threshold, excluded):
+                count = int(np.count_nonzero(mask))
+                if position < count:
+                    row_positions, column_positions = np.nonzero(mask)
+                    row, column = row_positions[position], column_positions[position]
+                    return (
+                        int(row) + start, int(column) + start + 1,
+                        float(candidates[row, column])
+                    )
+                position -= count
+        raise IndexError("No matchup at this position.")
+
+def exhaustive_minimum(
+    ev_function: MatchupEVFunction,
+    mu: FloatArray,
+    sigma: FloatArray,
+    block_rows: int = 256
+) -> float:
+    """
+    Return the lowest EV over all matchups `(i, j)`, `i < j`, evaluating
+    `block_rows` rows at a time so memory stays O(n * block_rows).
+    """
+    n = len(mu)
+    minimum = np.inf
+    for start in range(0, n - 1, block_rows):
+        rows = np.arange(start, min(start + block_rows, n - 1))
+        block = ev_function(
+            mu[rows, None], sigma[rows, None], mu[None, :], sigma[None, :]
+        )
+        block[np.arange(n)[None, :] <= rows[:, None]] = np.inf
+        minimum = min(minimum, float(block.min()))
+    return minimum
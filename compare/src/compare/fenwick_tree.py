@@ -0,0 +1,110 @@
+"""
+Fenwick (binary indexed) tree of non-negative weights, for drawing items
+with probability proportional to their weight.
+
+Appending an item, changing a weight and drawing an item all cost
+O(log n). Operations work on plain Python lists, which are faster than
+NumPy for the scalar accesses they make; bulk changes use `rebuild`,
+which is vectorized.
+
+Classes
+-------
+FenwickTree: Prefix sums of item weights with weighted sampling.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+class FenwickTree:
+    """
+    Weights of items `0..n-1`, supporting prefix sums and weighted draws.
+    """
+
+    def __init__(self) -> None:
+        self._weights: list[float] = []
+        # 1 based, node `i` holds the sum of weights `i - lowbit(i)` to `i - 1`.
+        self._tree: list[float] = [0.0]
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def _prefix(self, count: int) -> float:
+        """
+        Return the sum of the first `count` weights.
+        """
+        total = 0.0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def append(self, weight: float) -> None:
+        """
+        Add an item with `weight`, as item `n`.
+        """
+        if not (weight >= 0):
+            raise ValueError("Weights must be >= 0.")
+        node = len(self._weights) + 1
+        self._weights.append(weight)
+        self._tree.append(weight + self._prefix(node - 1) - self._prefix(node - (node & -node)))
+
+    def set(self, item: int, weight: float) -> None:
+        """
+        Change the weight of `item`.
+        """
+        if not (weight >= 0):
+            raise ValueError("Weights must be >= 0.")
+        delta = weight - self._weights[item]
+        self._weights[item] = weight
+        node = item + 1
+        while node < len(self._tree):
+            self._tree[node] += delta
+            node += node & -node
+
+    def rebuild(self, weights: ArrayLike) -> None:
+        """
+        Replace every weight, in O(n).
+        """
+        weight_array = np.asarray(weights, dtype=np.float64)
+        if np.any(~(weight_array >= 0)):
+            raise ValueError("Weights must be >= 0.")
+        prefix = np.concatenate([[0.0], np.cumsum(weight_array)])
+        nodes = np.arange(1, len(weight_array) + 1)
+        self._weights = weight_array.tolist()
+        self._tree = [0.0, *(prefix[nodes] - prefix[nodes - (nodes & -nodes)]).tolist()]
+
+    def weight(self, item: int) -> float:
+        return self._weights[item]
+
+    def total(self) -> float:
+        """
+        Return the sum of every weight.
+        """
+        return self._prefix(len(self._weights))
+
+    def find(self, value: float) -> int:
+        """
+        Return the first item whose weight, added to the weights of every
+        item before it, exceeds `value`. With `value` drawn uniformly from
+        `[0, total())`, items are drawn with probability proportional to
+        their weight.
+
+        Raises:
+            - `ValueError` if there are no items.
+        """
+        n = len(self._weights)
+        if n == 0:
+            raise ValueError("No items to find.")
+        node = 0
+        step = 1 << (n.bit_length() - 1)
+        while step > 0:
+            next_node = node + step
+            if next_node <= n and self._tree[next_node] <= value:
+                node = next_node
+                value -= self._tree[next_node]
+            step >>= 1
+        # Rounding can carry `value` past the last item.
+        return min(node, n - 1)
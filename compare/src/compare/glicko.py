@@ -0,0 +1,165 @@
+"""
+Closed-form Glicko math for 1v1 and multi-way matches.
+
+Implements the Glicko rating system (Glickman, 1999) with every match
+treated as its own rating period, so an update is a handful of arithmetic
+expressions per player. Ratings are on the Elo scale: a rating `r`
+(1500 for new players) and a rating deviation `rd` (350 for new players).
+
+Rating deviations never grow between matches here, as there is no notion
+of time between matches. Instead they are floored at a minimum, which
+keeps ratings responsive after many matches.
+
+Functions
+---------
+attenuation: Glicko `g` factor, discounting results against uncertain opponents.
+expected_score: Probability that one player beats another.
+replay_1v1: Apply a sequence of matches in place, with scalar math.
+rate_ranked: Ratings after a multi-way match, as a single rating period.
+deviation_change: Change in total rating deviation if two players are matched.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from compare.plackett_luce import FloatArray
+
+
+DEFAULT_RATING = 1500.0
+DEFAULT_DEVIATION = 350.0
+DEFAULT_MIN_DEVIATION = 30.0
+
+# Scale of the Elo logistic curve.
+_Q = math.log(10) / 400
+_G_SCALE = 3 * _Q * _Q / (math.pi * math.pi)
+
+
+def attenuation(deviation: ArrayLike) -> FloatArray:
+    """
+    Glicko `g(rd)` factor of an opponent's rating deviation, in `(0, 1]`.
+    """
+    deviation = np.asarray(deviation, dtype=np.float64)
+    return 1 / np.sqrt(1 + _G_SCALE * deviation * deviation)
+
+
+def expected_score(
+    rating: ArrayLike, opponent_rating: ArrayLike, opponent_deviation: ArrayLike
+) -> FloatArray:
+    """
+    Probability that a player with `rating` beats an opponent.
+    Arguments broadcast against each other.
+    """
+    rating, opponent_rating = (
+        np.asarray(v, dtype=np.float64) for v in (rating, opponent_rating)
+    )
+    return 1 / (1 + np.power(
+        10.0, -attenuation(opponent_deviation) * (rating - opponent_rating) / 400
+    ))
+
+
+def _rate_side(
+    rating: float,
+    deviation: float,
+    opponent_rating: float,
+    opponent_deviation: float,
+    score: float,
+    min_deviation: float
+) -> tuple[float, float]:
+    """
+    New rating and deviation of one player after a single match.
+    """
+    g = 1 / math.sqrt(1 + _G_SCALE * opponent_deviation * opponent_deviation)
+    expected = 1 / (1 + 10.0 ** (-g * (rating - opponent_rating) / 400))
+    variance = 1 / (
+        1 / (deviation * deviation) + _Q * _Q * g * g * expected * (1 - expected)
+    )
+    return (
+        rating + _Q * variance * g * (score - expected),
+        max(math.sqrt(variance), min_deviation)
+    )
+
+
+def replay_1v1(
+    ratings: list[float],
+    deviations: list[float],
+    winners: Sequence[int],
+    losers: Sequence[int],
+    min_deviation: float = DEFAULT_MIN_DEVIATION
+) -> None:
+    """
+    Apply matches in order, updating `ratings` and `deviations` in place.
+
+    Match `i` is won by player `winners[i]` against `losers[i]`, where
+    players are positions in `ratings`/`deviations`. Both players are
+    rated from their ratings before the match.
+    """
+    for winner, loser in zip(winners, losers):
+        r_w, rd_w, r_l, rd_l = ratings[winner], deviations[winner], ratings[loser], deviations[loser]
+        ratings[winner], deviations[winner] = _rate_side(r_w, rd_w, r_l, rd_l, 1.0, min_deviation)
+        ratings[loser], deviations[loser] = _rate_side(r_l, rd_l, r_w, rd_w, 0.0, min_deviation)
+
+
+def rate_ranked(
+    ratings: Sequence[float],
+    deviations: Sequence[float],
+    min_deviation: float = DEFAULT_MIN_DEVIATION
+) -> tuple[list[float], list[float]]:
+    """
+    Ratings and deviations after a multi-way match, with players given in
+    finishing order, best first.
+
+    The match is rated as a single rating period in which every player
+    beat everyone placed below them, costing O(k^2) for k players.
+    """
+    new_ratings: list[float] = []
+    new_deviations: list[float] = []
+    for i, (rating, deviation) in enumerate(zip(ratings, deviations)):
+        information = 0.0
+        surprise = 0.0
+        for j, (opponent_rating, opponent_deviation) in enumerate(zip(ratings, deviations)):
+            if i == j:
+                continue
+            g = 1 / math.sqrt(1 + _G_SCALE * opponent_deviation * opponent_deviation)
+            expected = 1 / (1 + 10.0 ** (-g * (rating - opponent_rating) / 400))
+            information += g * g * expected * (1 - expected)
+            surprise += g * ((1.0 if i < j else 0.0) - expected)
+        variance = 1 / (1 / (deviation * deviation) + _Q * _Q * information)
+        new_ratings.append(rating + _Q * variance * surprise)
+        new_deviations.append(max(math.sqrt(variance), min_deviation))
+    return new_ratings, new_deviations
+
+
+def deviation_change(
+    rating_1: ArrayLike,
+    deviation_1: ArrayLike,
+    rating_2: ArrayLike,
+    deviation_2: ArrayLike,
+    min_deviation: float = DEFAULT_MIN_DEVIATION
+) -> FloatArray:
+    """
+    Change in `deviation_1 + deviation_2` if player 1 and player 2 are
+    matched up. Negative values mean the deviations decrease.
+
+    Glicko deviations do not depend on the result, so unlike
+    `compare.plackett_luce.sigma_change_ev` this is exact rather than an
+    expectation. Arguments broadcast against each other.
+    """
+    rating_1, deviation_1, rating_2, deviation_2 = (
+        np.asarray(v, dtype=np.float64) for v in (rating_1, deviation_1, rating_2, deviation_2)
+    )
+    total = deviation_1 + deviation_2
+    new_total = np.zeros_like(total)
+    for rating, deviation, opponent_rating, opponent_deviation in (
+        (rating_1, deviation_1, rating_2, deviation_2),
+        (rating_2, deviation_2, rating_1, deviation_1),
+    ):
+        g = attenuation(opponent_deviation)
+        expected = expected_score(rating, opponent_rating, opponent_deviation)
+        variance = 1 / (1 / (deviation * deviation) + _Q * _Q * g * g * expected * (1 - expected))
+        new_total = new_total + np.maximum(np.sqrt(variance), min_deviation)
+    return new_total - total
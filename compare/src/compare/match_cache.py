@@ -0,0 +1,297 @@
+"""
+Local cache of the songs and match history of a session, so resuming it
+only downloads the matches played since it was last loaded.
+
+`CachedMatchIO` wraps a `MatchSource`, a `MatchIO` that can also fetch the
+matches after a given server matchup id. Match history on the server is
+append only, so loading it yields the cached matches and then fetches,
+caches and yields only the matches with ids above the newest cached one.
+
+Before trusting the cache, the newest cached match is fetched again along
+with the new matches. If the server disagrees about it, e.g. because the
+session was restarted from another machine, the cache is discarded and
+everything is loaded from the server.
+
+The cache folder holds:
+
+- `songs.json`: The songs of the session.
+- `match_ids.bin`: For every match, its matchup id and the end of its songs
+  in `match_songs.bin`, as little endian int64 pairs.
+- `match_songs.bin`: The songs of every match, best first, as little endian
+  int64s.
+
+Match files are only appended to, songs first. A partial record left by a
+crash is cut off when the cache is opened.
+
+Classes
+-------
+MatchSource: `MatchIO` that can fetch the matches after a matchup id.
+CachedMatchIO: `MatchIO` wrapper caching songs and matches locally.
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Protocol, final, override
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from compare.ev_table import IntArray
+from compare.matchio import MatchIO, MatchResult, SongIn
+from compare.matchmaking import RatingBackend
+from compare.song import Song, SongID
+
+
+_SONGS_FILE = "songs.json"
+_IDS_FILE = "match_ids.bin"
+_SONGS_OF_MATCHES_FILE = "match_songs.bin"
+# Cached matches read, or fetched matches written, at once.
+_CHUNK_SIZE = 10_000
+
+
+class MatchSource(MatchIO, Protocol):
+    def load_match_history_after(self, after: int) -> Iterable[tuple[int, tuple[SongID, ...]]]:
+        """
+        Return the matchup id and songs of every match with an id above
+        `after`, in play order.
+        """
+        ...
+
+
+@final
+class CachedMatchIO(MatchIO):
+    """
+    Loads songs and matches through a local cache in `folder`, fetching
+    only matches newer than the cached ones from `inner`. Saves go
+    straight to `inner`, and new matches are cached when next loaded.
+    """
+
+    def __init__(self, inner: MatchSource, folder: Path) -> None:
+        """
+        Args:
+            inner: `MatchSource` to load uncached data from and send saves to.
+            folder: Folder of the cache, created if missing.
+        """
+        self._inner: MatchSource = inner
+        self._folder: Path = folder
+        self._songs_adapter = TypeAdapter(list[SongIn])
+        self._folder.mkdir(parents=True, exist_ok=True)
+        self._repair()
+        # Matches fetched while checking the cache, from its newest match on.
+        self._fetched: Iterator[tuple[int, tuple[SongID, ...]]] | None = None
+        self._checked: bool = False
+
+    def _path(self, name: str) -> Path:
+        return self._folder / name
+
+    def _match_count(self) -> int:
+        path = self._path(_IDS_FILE)
+        return path.stat().st_size // 16 if path.exists() else 0
+
+    def _read_ids(self, start: int, count: int) -> IntArray:
+        """
+        Return the matchup ids and song ends of `count` cached matches from
+        match `start` on, as an `(n, 2)` array.
+        """
+        with open(self._path(_IDS_FILE), "rb") as file:
+            file.seek(16 * start)
+            return np.fromfile(file, dtype="<i8", count=2 * count).reshape(-1, 2)
+
+    def _read_songs_of_matches(self, start: int, end: int) -> list[SongID]:
+        with open(self._path(_SONGS_OF_MATCHES_FILE), "rb") as file:
+            file.seek(8 * start)
+            return np.fromfile(file, dtype="<i8", count=end - start).tolist()
+
+    def _song_end(self) -> int:
+        """
+        Return the number of songs of all cached matches together.
+        """
+        count = self._match_count()
+        return int(self._read_ids(count - 1, 1)[0, 1]) if count else 0
+
+    def _repair(self) -> None:
+        """
+        Cut off a partial record left by a crash, or clear matches that
+        cannot be repaired.
+        """
+        ids_path = self._path(_IDS_FILE)
+        songs_path = self._path(_SONGS_OF_MATCHES_FILE)
+        if not ids_path.exists() or not songs_path.exists():
+            self._clear_matches()
+            return
+        ids_size = ids_path.stat().st_size
+        if ids_size % 16 != 0:
+            os.truncate(ids_path, ids_size - ids_size % 16)
+        song_end = self._song_end()
+        songs_size = songs_path.stat().st_size
+        if songs_size < 8 * song_end:
+            self._clear_matches()
+        elif songs_size > 8 * song_end:
+            os.truncate(songs_path, 8 * song_end)
+
+    def _clear_matches(self) -> None:
+        for name in (_IDS_FILE, _SONGS_OF_MATCHES_FILE):
+            self._path(name).write_bytes(b"")
+
+    def _clear(self) -> None:
+        self._clear_matches()
+        self._path(_SONGS_FILE).unlink(missing_ok=True)
+        self._fetched = None
+
+    def _newest_match(self) -> tuple[int, tuple[SongID, ...]] | None:
+        count = self._match_count()
+        if count == 0:
+            return None
+        ids = self._read_ids(max(count - 2, 0), 2)
+        start = int(ids[-2, 1]) if len(ids) > 1 else 0
+        return int(ids[-1, 0]), tuple(self._read_songs_of_matches(start, int(ids[-1, 1])))
+
+    def _check(self) -> None:
+        """
+        Discard the cache unless the server still has its newest match,
+        keeping the matches fetched to check for `load_match_history`.
+        """
+        if self._checked:
+            return
+        self._checked = True
+        newest = self._newest_match()
+        if newest is None:
+            # Nothing to check songs against.
+            self._clear()
+            return
+        fetched = iter(self._inner.load_match_history_after(newest[0] - 1))
+        if next(fetched, None) != newest:
+            self._clear()
+            return
+        self._fetched = fetched
+
+    def _append(self, matches: list[tuple[int, tuple[SongID, ...]]]) -> None:
+        """
+        Cache `matches`, ignoring any not newer than the cached ones.
+        """
+        newest = self._newest_match()
+        if newest is not None:
+            matches = [match for match in matches if match[0] > newest[0]]
+        if not matches:
+            return
+        ends = self._song_end() + np.cumsum([len(songs) for _, songs in matches])
+        with open(self._path(_SONGS_OF_MATCHES_FILE), "ab") as file:
+            file.write(np.fromiter(
+                (song for _, songs in matches for song in songs), dtype="<i8"
+            ).tobytes())
+        with open(self._path(_IDS_FILE), "ab") as file:
+            file.write(np.column_stack(
+                [[match_id for match_id, _ in matches], ends]
+            ).astype("<i8").tobytes())
+
+    def _cached_matches(self) -> Iterator[tuple[SongID, ...]]:
+        count = self._match_count()
+        with (
+            open(self._path(_IDS_FILE), "rb") as ids_file,
+            open(self._path(_SONGS_OF_MATCHES_FILE), "rb") as songs_file
+        ):
+            song_start = 0
+            for start in range(0, count, _CHUNK_SIZE):
+                ends = np.fromfile(
+                    ids_file, dtype="<i8", count=2 * min(_CHUNK_SIZE, count - start)
+                ).reshape(-1, 2)[:, 1] - song_start
+                songs = np.fromfile(songs_file, dtype="<i8", count=int(ends[-1])).tolist()
+                offsets = ends.tolist()
+                yield from (
+                    tuple(songs[begin:end])
+                    for begin, end in zip([0, *offsets[:-1]], offsets)
+                )
+                song_start += int(ends[-1])
+
+    def _new_matches(self) -> Iterator[tuple[SongID, ...]]:
+        """
+        Fetch, cache and yield the matches after the cached ones.
+        """
+        fetched = self._fetched
+        self._fetched = None
+        if fetched is None:
+            newest = self._newest_match()
+            fetched = iter(self._inner.load_match_history_after(
+                0 if newest is None else newest[0]
+            ))
+        pending: list[tuple[int, tuple[SongID, ...]]] = []
+        try:
+            for match in fetched:
+                pending.append(match)
+                yield match[1]
+                if len(pending) == _CHUNK_SIZE:
+                    self._append(pending)
+                    pending = []
+        finally:
+            self._append(pending)
+
+    def clear(self) -> None:
+        """
+        Delete the cache, so everything is loaded from the server again.
+        """
+        self._clear()
+
+    @override
+    def save_songs(self, rating_backend: RatingBackend, songs: list[Song]) -> None:
+        self._inner.save_songs(rating_backend, songs)
+        self._clear()
+        self._checked = True
+        self._write_songs(songs)
+
+    def _write_songs(self, songs: list[Song]) -> None:
+        path = self._path(_SONGS_FILE)
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_bytes(self._songs_adapter.dump_json([
+            SongIn(id=song.id, path=str(song.path), title=song.title, extension=song.extension)
+            for song in songs
+        ]))
+        os.replace(temporary_path, path)
+
+    @override
+    def load_songs(self) -> list[Song]:
+        self._check()
+        path = self._path(_SONGS_FILE)
+        if path.exists():
+            try:
+                songs_data = self._songs_adapter.validate_json(path.read_bytes())
+            except ValidationError:
+                songs_data = None
+            if songs_data is not None:
+                return [
+                    Song(
+                        id=song_data.id, path=Path(song_data.path), title=song_data.title,
+                        extension=song_data.extension
+                    )
+                    for song_data in songs_data
+                ]
+        songs = self._inner.load_songs()
+        self._write_songs(songs)
+        return songs
+
+    @override
+    def load_match_history(self) -> Iterator[tuple[SongID, ...]]:
+        self._check()
+        yield from self._cached_matches()
+        yield from self._new_matches()
+
+    @override
+    def save_match(self,
+        rating_backend: RatingBackend,
+        winner: SongID,
+        loser: SongID
+    ) -> None:
+        self._inner.save_match(rating_backend, winner, loser)
+
+    @override
+    def save_ranked_match(self,
+        rating_backend: RatingBackend,
+        ranking: list[SongID]
+    ) -> None:
+        self._inner.save_ranked_match(rating_backend, ranking)
+
+    @override
+    def save_matches(self, matches: Sequence[MatchResult]) -> None:
+        self._inner.save_matches(matches)
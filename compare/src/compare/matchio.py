@@ -2,18 +2,46 @@
 Defines a public interface to save and load player and match information.
 
 OnlineMatchIO is an implementation of this interface for saving and loading
-match information from/to an external server.
+match information from/to an external server. It sends every request through
+one pooled keep-alive `requests.Session`, so match saves reuse an open
+connection instead of connecting anew, and keeps `RequestStats` of
+connection reuse and latency. Use it as a context manager, or call `close`,
+to close its connections. Match history is fetched in keyset-paginated
+pages as it is iterated, so arbitrarily long histories load in constant
+memory. `save_matches` sends many matches in batched requests, for bulk
+imports and background saving.
 """
 
 from __future__ import annotations
 
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Protocol, final, override
+from types import TracebackType
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, Protocol, Self, final, override
 import requests
+from requests.adapters import HTTPAdapter
 from compare.matchmaking import RatingBackend
 from compare.song import Song, SongID
 from pydantic import BaseModel, TypeAdapter
 
+@dataclass(frozen=True)
+class MatchResult:
+    """
+    A played match, `songs` best first, with the overall `ratings` of its
+    songs after it. 1v1 matches are `(winner, loser)`.
+    """
+    songs: tuple[SongID, ...]
+    ratings: tuple[float, ...]
+
+    @classmethod
+    def of(cls, rating_backend: RatingBackend, songs: Sequence[SongID]) -> MatchResult:
+        """
+        Capture the ratings of `songs` in `rating_backend` now.
+        """
+        return cls(tuple(songs), tuple(rating_backend.overall_rating(song) for song in songs))
+
 class MatchIO(Protocol):
     def save_songs(self, rating_backend: RatingBackend, songs: list[Song]) -> None:
         ...
@@ -21,7 +49,14 @@ class MatchIO(Protocol):
     def load_songs(self) -> list[Song]:
         ...
 
-    def load_match_history(self) -> list[tuple[SongID, SongID]]:
+    def load_match_history(self) -> Iterable[tuple[SongID, ...]]:
+        """
+        Return every match in play order, each as a ranking of its songs,
+        best first. 1v1 matches are `(winner, loser)`.
+
+        Matches may be fetched lazily while they are iterated, so long
+        histories should be consumed in pieces rather than as a list.
+        """
         ...
 
     def save_match(self,
@@ -31,6 +66,23 @@ class MatchIO(Protocol):
     ) -> None:
         ...
 
+    def save_ranked_match(self,
+        rating_backend: RatingBackend,
+        ranking: list[SongID]
+    ) -> None:
+        """
+        Save a multi-way match as a single match, with `ranking` holding
+        its songs best first.
+        """
+        ...
+
+    def save_matches(self, matches: Sequence[MatchResult]) -> None:
+        """
+        Save `matches` in play order, in as few requests as possible. On
+        failure, some of the first matches may already have been saved.
+        """
+        ...
+
 
 class SongIn(BaseModel):
     id: SongID
@@ -49,6 +101,13 @@ class MatchIn(BaseModel):
     id: int
     winner_id: SongID
     loser_id: SongID
+    # Every song of the match best first, for multi-way matches.
+    songs: list[SongID] | None = None
+
+class MatchPageIn(BaseModel):
+    matches: list[MatchIn]
+    # Id to request the next page after, or None after the last page.
+    next_after: int | None
 
 class MatchOut(BaseModel):
     winning_song: SongID
@@ -56,16 +115,129 @@ class MatchOut(BaseModel):
     winning_song_rating: float
     losing_song_rating: float
 
+class RankedMatchOut(BaseModel):
+    songs: list[SongID]
+    ratings: list[float]
+
+# Most matches sent to `/match/batch` in one request.
+_MAX_BATCH_SIZE = 1_000
+
+@dataclass(frozen=True)
+class RequestStats:
+    """
+    Requests sent by an `OnlineMatchIO`, the connections they opened and
+    their latency, in seconds until the response headers arrived.
+    """
+    requests: int
+    new_connections: int
+    total_seconds: float
+    last_seconds: float
+
+    @property
+    def reused_connections(self) -> int:
+        """
+        Requests sent over an already open connection.
+        """
+        return max(self.requests - self.new_connections, 0)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.requests if self.requests else 0.0
+
 @final
 class OnlineMatchIO(MatchIO):
-    def __init__(self, base_url: str = "http://localhost:3000/api"):
+    def __init__(self,
+        base_url: str = "http://localhost:3000/api",
+        pool_size: int = 4,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        history_page_size: int = 10_000,
+        session: requests.Session | None = None
+    ) -> None:
+        """
+        Args:
+            base_url: URL of the API, without a trailing slash.
+            pool_size: Connections kept open to the API. Must be > 0.
+            connect_timeout: Seconds to wait for a connection. Must be > 0.
+            read_timeout: Seconds to wait for each response. Must be > 0.
+            history_page_size: Matches fetched per match history request,
+                between 1 and 50,000.
+            session: Session to send requests through instead of a new
+                pooled one. It is still closed by `close`.
+        """
+        if pool_size <= 0:
+            raise ValueError("`pool_size` must be > 0")
+        if connect_timeout <= 0 or read_timeout <= 0:
+            raise ValueError("`connect_timeout` and `read_timeout` must be > 0")
+        if not 0 < history_page_size <= 50_000:
+            raise ValueError("`history_page_size` must be between 1 and 50,000")
         self._base_url = base_url
         self._songs_in_adapter = TypeAdapter(list[SongIn])
-        self._matches_in_adapter = TypeAdapter(list[MatchIn])
+        self._match_page_adapter = TypeAdapter(MatchPageIn)
+        self._history_page_size: int = history_page_size
+        self._timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self._session: requests.Session = session
+        self._request_count: int = 0
+        self._total_seconds: float = 0.0
+        self._last_seconds: float = 0.0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close every pooled connection.
+        """
+        self._session.close()
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        start = time.perf_counter()
+        response = self._session.request(
+            method, self._base_url + path, timeout=self._timeout, **kwargs
+        )
+        self._last_seconds = time.perf_counter() - start
+        self._total_seconds += self._last_seconds
+        self._request_count += 1
+        return response
+
+    def _new_connection_count(self) -> int:
+        """
+        Connections opened by the pools of the session's adapters.
+        """
+        count = 0
+        for adapter in dict.fromkeys(getattr(self._session, "adapters", {}).values()):
+            if isinstance(adapter, HTTPAdapter):
+                pools = adapter.poolmanager.pools
+                count += sum(pools[key].num_connections for key in pools.keys())
+        return count
+
+    def request_stats(self) -> RequestStats:
+        """
+        Return the requests sent so far and the connections they opened.
+        Connections of pools closed since are not counted.
+        """
+        return RequestStats(
+            self._request_count,
+            self._new_connection_count(),
+            self._total_seconds,
+            self._last_seconds
+        )
 
     @override
     def save_songs(self, rating_backend: RatingBackend, songs: list[Song]) -> None:
-        response = requests.get(self._base_url + "/delete/all", timeout=10)
+        response = self._request("GET", "/delete/all")
         response.raise_for_status()
         songs_data = [
             SongOut(
@@ -75,16 +247,14 @@ class OnlineMatchIO(MatchIO):
             )
             for song in songs
         ]
-        response = requests.post(
-            self._base_url + "/song/all",
-            json=[song_data.model_dump() for song_data in songs_data],
-            timeout=10
+        response = self._request(
+            "POST", "/song/all", json=[song_data.model_dump() for song_data in songs_data]
         )
         response.raise_for_status()
 
     @override
     def load_songs(self) -> list[Song]:
-        response = requests.get(self._base_url + "/song/all", timeout=10)
+        response = self._request("GET", "/song/all")
         if response.status_code != 200:
             raise RuntimeError("Failed to retrieve songs.")
         songs_data = self._songs_in_adapter.validate_json(response.text)
@@ -96,16 +266,30 @@ class OnlineMatchIO(MatchIO):
             for song_data in songs_data
         ]
 
+    def load_match_history_after(self, after: int) -> Iterator[tuple[int, tuple[SongID, ...]]]:
+        """
+        Yield the matchup id and songs of every match with an id above
+        `after`, in play order, fetching a page at a time.
+        """
+        next_after: int | None = after
+        while next_after is not None:
+            response = self._request(
+                "GET", "/match/page",
+                params={"after": next_after, "limit": self._history_page_size}
+            )
+            if response.status_code != 200:
+                raise RuntimeError("Failed to retrieve matches.")
+            page = self._match_page_adapter.validate_json(response.text)
+            for match_data in page.matches:
+                yield match_data.id, (
+                    tuple(match_data.songs) if match_data.songs
+                    else (match_data.winner_id, match_data.loser_id)
+                )
+            next_after = page.next_after
+
     @override
-    def load_match_history(self) -> list[tuple[SongID, SongID]]:
-        response = requests.get(self._base_url + "/match/all", timeout=10)
-        if response.status_code != 200:
-            raise RuntimeError("Failed to retrieve matches.")
-        matches_data = self._matches_in_adapter.validate_json(response.text)
-        return [
-            (match_data.winner_id, match_data.loser_id)
-            for match_data in matches_data
-        ]
+    def load_match_history(self) -> Iterator[tuple[SongID, ...]]:
+        return (songs for _, songs in self.load_match_history_after(0))
 
     @override
     def save_match(self,
@@ -121,9 +305,27 @@ class OnlineMatchIO(MatchIO):
             losing_song=loser,
             losing_song_rating=loser_rating
         )
-        response = requests.post(
-            self._base_url + "/match/one",
-            json=match_data.model_dump(),
-            timeout=10
+        response = self._request("POST", "/match/one", json=match_data.model_dump())
+        response.raise_for_status()
+
+    @override
+    def save_ranked_match(self,
+        rating_backend: RatingBackend,
+        ranking: list[SongID]
+    ) -> None:
+        match_data = RankedMatchOut(
+            songs=ranking,
+            ratings=[rating_backend.overall_rating(song) for song in ranking]
         )
+        response = self._request("POST", "/match/ranked", json=match_data.model_dump())
         response.raise_for_status()
+
+    @override
+    def save_matches(self, matches: Sequence[MatchResult]) -> None:
+        for start in range(0, len(matches), _MAX_BATCH_SIZE):
+            batch = [
+                RankedMatchOut(songs=list(match.songs), ratings=list(match.ratings)).model_dump()
+                for match in matches[start:start + _MAX_BATCH_SIZE]
+            ]
+            response = self._request("POST", "/match/batch", json=batch)
+            response.raise_for_status()
@@ -8,26 +8,175 @@ an opaque id through PlayerID. Notably, PlayerID references should
 be consistent for the lifetime of the class.
 
 `PlackettLuceBackend` is an implementation of `RatingBackend` based on
-Plackett-Luce utilities/functions from the openskill library.
+the Plackett-Luce model from the openskill library. Ratings are kept in a
+struct-of-arrays `RatingStore` and 1v1 results are applied with the
+closed-form expressions in `compare.plackett_luce`. Multi-way (ranked)
+results use openskill's full Plackett-Luce update.
+
+`GlickoBackend` is a cheaper implementation for very large libraries,
+using the closed-form Glicko updates in `compare.glicko` and matchmaking
+that only considers the neighbourhoods of the most uncertain players.
+
+`BradleyTerryBackend` fits ratings to the whole match history at once
+with `compare.bradley_terry`, so they do not depend on match order.
+
+Every backend can optionally remember which pairs have already been
+matched, in a `compare.played_pairs.PlayedPairs` bitset, and penalize
+repeats in matchmaking.
 
 Classes
 -------
 RatingBackend: Interface for ranking and matchmaking utilities.
 PlackettLuceBackend: Implementation of `RatingBackend`
     using openskill's PlackettLuce module.
+GlickoBackend: Implementation of `RatingBackend` using Glicko ratings.
+BradleyTerryBackend: Implementation of `RatingBackend` using batch
+    Bradley-Terry/Plackett-Luce maximum likelihood fits.
+MatchupSearch: Matchmaking search strategies for `PlackettLuceBackend`.
+MatchupReport: Quality of a picked matchup versus the exhaustive optimum.
+CacheStats: Hit/miss counts of `PlackettLuceBackend`'s memoized views.
+CertaintySummary: Distribution of rating certainties over every player.
 """
 
 from __future__ import annotations
+import io
 import math
 import random
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from copy import deepcopy
+from dataclasses import dataclass
+from enum import Enum, auto
+from functools import partial
 from typing import Protocol, override
-from itertools import combinations
-from openskill.models import PlackettLuce, PlackettLuceRating
+
+import numpy as np
+from openskill.models import PlackettLuce
+
+from compare import bradley_terry, glicko
+from compare.bradley_terry import FitResult, MatchCounts
+from compare.ev_table import (
+    BoolArray, IntArray, MatchupEVFunction, MatchupEVTable, exhaustive_minimum
+)
+from compare.fenwick_tree import FenwickTree
+from compare.parallel_search import ParallelMatchupSearch
+from compare.played_pairs import PlayedPairs
+from compare.plackett_luce import FloatArray, replay_1v1, sigma_change_ev
+from compare.rating_store import RatingStore
+from compare.sorted_index import SortedIndex
 
 
 # Opaque reference type.
 type PlayerID = int
 
+# Above this many touched players, `PlackettLuceBackend` re-sorts its
+# matchmaking indexes once instead of repositioning players one by one.
+_SORTED_INDEX_REBUILD_THRESHOLD = 64
+
+# Draws of an excluded player TIERED search retries before scanning for
+# the highest sigma player left.
+_TIERED_DRAW_ATTEMPTS = 32
+
+# Quantiles reported by `CertaintySummary`.
+CERTAINTY_QUANTILES: tuple[float, ...] = (0.1, 0.5, 0.9)
+# Equal width bins of `[0, 1]` in the `CertaintySummary` histogram.
+CERTAINTY_BINS = 10
+
+# Version of the `PlackettLuceBackend.save_state` format.
+_STATE_FORMAT_VERSION = 2
+
+
+class MatchupSearch(Enum):
+    """
+    Strategy used by `PlackettLuceBackend.pick_two_players` to find
+    the matchup with the best expected sigma decrease.
+
+    EXHAUSTIVE considers every pair, using a cached EV table.
+    PRUNED only considers the highest sigma players crossed with their
+    nearest neighbours in mu order, for very large pools.
+    SAMPLED considers a fixed number of uniformly random pairs.
+    PARALLEL considers every pair like EXHAUSTIVE, without the EV table,
+    evaluating them across a process pool on every pick. It picks the
+    same matchups as EXHAUSTIVE, for huge pools or audits.
+    TIERED splits players into tiers of equal size by mu, draws a player
+    with probability proportional to its sigma and only considers its own
+    and the adjacent tiers, so picks cost O(log n) for 100k+ pools.
+    """
+    EXHAUSTIVE = auto()
+    PRUNED = auto()
+    SAMPLED = auto()
+    PARALLEL = auto()
+    TIERED = auto()
+
+
+@dataclass(frozen=True)
+class MatchupReport:
+    """
+    Quality of the last picked matchup relative to the exhaustive optimum.
+
+    `ev_ratio` is `ev / optimal_ev`, where 1 means the optimal matchup
+    (or one within the tie tolerance) was found.
+    """
+    search: MatchupSearch
+    matchup: tuple[PlayerID, PlayerID]
+    ev: float
+    candidates: int
+    optimal_ev: float
+
+    @property
+    def ev_ratio(self) -> float:
+        if self.optimal_ev == 0:
+            return 1.0
+        return self.ev / self.optimal_ev
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Hit and miss counts of memoized read views, such as `ranks`.
+    """
+    hits: int
+    misses: int
+
+
+@dataclass(frozen=True)
+class CertaintySummary:
+    """
+    Distribution of `rating_certainties` over `count` players.
+
+    `quantiles[i]` is the `CERTAINTY_QUANTILES[i]` quantile, and
+    `histogram[i]` counts players in the `i`th of `CERTAINTY_BINS` equal
+    width bins of `[0, 1]`, the last bin including 1. Without players,
+    every statistic is 0.
+    """
+    count: int
+    mean: float
+    quantiles: tuple[float, ...]
+    histogram: tuple[int, ...]
+
+    @property
+    def median(self) -> float:
+        return self.quantiles[CERTAINTY_QUANTILES.index(0.5)]
+
+    @classmethod
+    def of(cls, certainties: FloatArray) -> CertaintySummary:
+        """
+        Summarize an array of certainties in `[0, 1]`.
+        """
+        if len(certainties) == 0:
+            return cls(
+                0, 0.0, (0.0,) * len(CERTAINTY_QUANTILES), (0,) * CERTAINTY_BINS
+            )
+        histogram, _ = np.histogram(certainties, bins=CERTAINTY_BINS, range=(0.0, 1.0))
+        return cls(
+            len(certainties),
+            float(certainties.mean()),
+            tuple(np.quantile(certainties, CERTAINTY_QUANTILES).tolist()),
+            tuple(histogram.tolist())
+        )
+
+
 class RatingBackend(Protocol):
     """
     Abstract interface for providing rating and matchmaking utilities.
@@ -67,6 +216,17 @@ class RatingBackend(Protocol):
         """
         ...
 
+    def overall_ratings(self) -> dict[PlayerID, float]:
+        """
+        Return the `overall_rating` of every player.
+
+        Notes:
+        - The returned dictionary is not guaranteed
+        to be sorted in any particular way.
+        - Running this with no players results in an empty dictionary.
+        """
+        ...
+
     def rating_certainties(self) -> dict[PlayerID, float]:
         """
         Return per-player rating certainty values.
@@ -86,6 +246,23 @@ class RatingBackend(Protocol):
         """
         ...
 
+    def certainty_summary(self) -> CertaintySummary:
+        """
+        Return the distribution of `rating_certainties`, without building
+        a per-player mapping, so it is cheap enough to show on every frame.
+        """
+        ...
+
+    def rating_arrays(self) -> tuple[IntArray, FloatArray, FloatArray]:
+        """
+        Return the ids of every player with the mean and standard deviation
+        of their rating, on the backend's own scale, as aligned arrays.
+
+        Notes:
+        - The arrays are copies, so are unaffected by later updates.
+        """
+        ...
+
     def ranks(self) -> dict[PlayerID, int]:
         """
         Return per-player ranks (1 is best rank).
@@ -102,6 +279,25 @@ class RatingBackend(Protocol):
         """
         ...
 
+    def rank_of(self, player: PlayerID) -> int:
+        """
+        Return the rank of a single player, as given by `ranks`.
+
+        Raises:
+            - `ValueError` if player is not found.
+        """
+        ...
+
+    def top_k(self, k: int) -> list[PlayerID]:
+        """
+        Return the `k` best ranked players, best first. Returns every
+        player if there are fewer than `k`.
+
+        Raises:
+            - `ValueError` if `k` is negative.
+        """
+        ...
+
     def update(self, winner: PlayerID, loser: PlayerID) -> None:
         """
         Apply a 1v1 result where `winner_id` defeats `loser_id`.
@@ -114,6 +310,34 @@ class RatingBackend(Protocol):
         """
         ...
 
+    def update_ranked(self, ranking: Sequence[PlayerID]) -> None:
+        """
+        Apply the result of a multi-way match, with `ranking` holding every
+        player of the match in finishing order, best first.
+
+        A ranking of two players is equivalent to `update(winner, loser)`.
+
+        Raises:
+            - `ValueError` if any of the players is not found, or a ranking
+            of more than two players contains the same player twice.
+        """
+        ...
+
+    def update_many(self, matches: Iterable[Sequence[PlayerID]]) -> None:
+        """
+        Apply a sequence of results in order. Each match is a ranking as
+        taken by `update_ranked`, so 1v1 results are `(winner, loser)`.
+        Equivalent to calling `update_ranked` for each match in turn.
+
+        Intended for bulk replay of match history, so implementations
+        should avoid per-match overhead where possible.
+
+        Raises:
+            - `ValueError` if any of the matches is invalid for
+            `update_ranked`. In this case no results are applied.
+        """
+        ...
+
     def pick_two_players(self) -> tuple[PlayerID, PlayerID]:
         """
         Picks two players from the current pool to play against each other.
@@ -126,15 +350,730 @@ class RatingBackend(Protocol):
         """
         ...
 
+    def pick_group(self, size: int) -> list[PlayerID]:
+        """
+        Pick `size` distinct players for a multi-way match, to be ranked
+        with `update_ranked`. A group of two is the pair `pick_two_players`
+        would return.
+
+        Raises:
+            - `ValueError` if `size` is less than 2 or more than the
+            number of players.
+        """
+        ...
+
+    def focus(self, players: Iterable[PlayerID] | None) -> None:
+        """
+        Restrict `pick_two_players`, `pick_group` and `pick_k_matchups` to
+        `players`, e.g. to verify the top of the ranking, or lift the
+        restriction with None. Players created later are not picked while
+        a focus is set.
+
+        Raises:
+            - `ValueError` if any of the players is not found, or fewer
+            than two players are given.
+        """
+        ...
+
+    def pick_k_matchups(self, k: int) -> list[tuple[PlayerID, PlayerID]]:
+        """
+        Pick `k` matchups that share no player, chosen together from one
+        evaluation of the current pool, e.g. for several listeners judging
+        pairs before any update.
+
+        Matchups are ordered best first, and the first matchup is the one
+        `pick_two_players` would return.
+
+        Raises:
+            - `ValueError` if `k` is negative or there are less than
+            `2 * k` players.
+        """
+        ...
+
+    def consolidate(self) -> None:
+        """
+        Refit ratings from every result applied so far, for backends that
+        only approximate results between refits. Other backends do nothing.
+        """
+        ...
+
+    def save_state(self) -> bytes:
+        """
+        Serialize the full backend state, including every player, their
+        ratings and any internal randomness, to a compact binary form.
+        """
+        ...
+
+    def load_state(self, state: bytes) -> None:
+        """
+        Replace the full backend state with one returned by `save_state`.
+        After loading, the backend behaves exactly as the saved one would.
+
+        Raises:
+            - `ValueError` if `state` is malformed or was not produced by
+            this kind of backend. In this case the state is unchanged.
+        """
+        ...
+
+
+class _ArrayBackend(RatingBackend, ABC):
+    """
+    Shared implementation of backends keeping ratings in a `RatingStore`,
+    as a mean (`mu`) and an uncertainty (`sigma`) per player.
+
+    Keeps players in sorted indexes by mu, sigma and overall rating,
+    memoizes read views per state version, and implements ranks, bulk
+    replay, state serialization and greedy group/batch matchmaking on top
+    of a few rating model specific methods.
+
+    `ranks`, `overall_ratings`, `rating_certainties` and
+    `certainty_summary` are memoized until the next mutation, so the
+    dictionaries they return are shared between calls and must not be
+    modified.
 
-class PlackettLuceBackend(RatingBackend):
+    Subclasses must set `_ev_function` (matchup quality, lower is better)
+    and `_matchup_epsilon`, and implement `_replay`, `_rate_ranking` and
+    `_search_matchups`.
+
+    With a `relative_repeat_penalty`, pairs that have been matched are
+    recorded, and their EV is increased by the penalty (relative to
+    `initial_sigma`) in every search.
+    """
+
+    # Overall ratings are `mu - _ORDINAL_SIGMAS * sigma`.
+    _ORDINAL_SIGMAS: float = 3.0
+
+    def __init__(self,
+        rng_seed: int | None,
+        initial_mu: float,
+        initial_sigma: float,
+        relative_repeat_penalty: float | None = None
+    ) -> None:
+        if relative_repeat_penalty is not None and not (0 <= relative_repeat_penalty < math.inf):
+            raise ValueError("`relative_repeat_penalty` must be finite and >= 0")
+        self._rng: random.Random = random.Random(rng_seed)
+        self._initial_mu: float = initial_mu
+        self._initial_sigma: float = initial_sigma
+        self._ev_function: MatchupEVFunction
+        self._matchup_epsilon: float
+        # Struct-of-arrays mu/sigma of every player, addressed by id or index.
+        self._store: RatingStore = RatingStore()
+        # Players in ascending mu and descending sigma order, for matchmaking.
+        self._mu_index: SortedIndex = SortedIndex()
+        self._sigma_index: SortedIndex = SortedIndex()
+        # Players in rank order: descending ordinal, tie broken by ascending id.
+        self._rank_index: SortedIndex = SortedIndex()
+        # Internal indexes picks are restricted to, see `focus`.
+        self._focus: IntArray | None = None
+        # Pairs already matched, only tracked when repeats are penalized.
+        self._played: PlayedPairs | None = (
+            None if relative_repeat_penalty is None else PlayedPairs()
+        )
+        self._repeat_penalty: float = initial_sigma * (relative_repeat_penalty or 0.0)
+        # Matchup, EV and candidate count of the last pick, for `matchup_report`.
+        self._last_pick: tuple[tuple[PlayerID, PlayerID], float, int] | None = None
+        # Incremented on every mutation. Read views are memoized per version.
+        self._version: int = 0
+        self._view_cache: dict[str, tuple[int, object]] = {}
+        self._cache_hits: int = 0
+        self._cache_misses: int = 0
+
+    @override
+    def new_player(self, id: PlayerID) -> None:
+        index = self._store.add(id, self._initial_mu, self._initial_sigma)
+        self._mu_index.insert(self._initial_mu, index)
+        self._sigma_index.insert(-self._initial_sigma, index)
+        self._rank_index.insert(-self._ordinal(self._initial_mu, self._initial_sigma), id)
+        if self._played is not None:
+            self._played.resize(len(self._store))
+        self._version += 1
+
+    def __deepcopy__(self, memo: dict[int, object]) -> _ArrayBackend:
+        # Memoized views are the only state reads change, so they are left
+        # behind, letting other threads read the backend while it is copied.
+        copy = object.__new__(type(self))
+        memo[id(self)] = copy
+        for name, value in list(vars(self).items()):
+            setattr(copy, name, {} if name == "_view_cache" else deepcopy(value, memo))
+        return copy
+
+    @property
+    def state_version(self) -> int:
+        """
+        Counter incremented on every mutation of the backend.
+        """
+        return self._version
+
+    def cache_stats(self) -> CacheStats:
+        """
+        Return hit/miss counts of the memoized views.
+        """
+        return CacheStats(self._cache_hits, self._cache_misses)
+
+    def _memoized[T](self, name: str, compute: Callable[[], T]) -> T:
+        """
+        Return the view `name` computed at the current state version,
+        calling `compute` only if it is not cached yet.
+        """
+        cached = self._view_cache.get(name)
+        if cached is not None and cached[0] == self._version:
+            self._cache_hits += 1
+            return cached[1]  # type: ignore[return-value]
+        self._cache_misses += 1
+        value = compute()
+        self._view_cache[name] = (self._version, value)
+        return value
+
+    def _certainties(self) -> FloatArray:
+        """
+        Rating certainty of every player by internal index: the fraction
+        of the initial sigma a player has lost, clamped to `[0, 1]`.
+        """
+        if self._initial_sigma == 0:
+            return np.zeros(len(self._store))
+        return np.clip(1 - self._store.sigma / self._initial_sigma, 0.0, 1.0)
+
+    @override
+    def rating_certainties(self) -> dict[PlayerID, float]:
+        return self._memoized("rating_certainties", lambda: dict(zip(
+            self._store.ids.tolist(), self._certainties().tolist()
+        )))
+
+    @override
+    def certainty_summary(self) -> CertaintySummary:
+        return self._memoized(
+            "certainty_summary", lambda: CertaintySummary.of(self._certainties())
+        )
+
+    @override
+    def rating_arrays(self) -> tuple[IntArray, FloatArray, FloatArray]:
+        return self._store.ids.copy(), self._store.mu.copy(), self._store.sigma.copy()
+
+    def _ordinal(self, mu: float, sigma: float) -> float:
+        """
+        Conservative overall rating `mu - z * sigma` of a player, as in openskill.
+        """
+        return mu - self._ORDINAL_SIGMAS * sigma
+
+    @override
+    def overall_rating(self, player: PlayerID) -> float:
+        index = self._store.index_of(player)
+        return self._ordinal(float(self._store.mu[index]), float(self._store.sigma[index]))
+
+    def _rank_keys(self) -> FloatArray:
+        """
+        Rank index keys of every player, indexed by internal index.
+        """
+        return -(self._store.mu - self._ORDINAL_SIGMAS * self._store.sigma)
+
+    @override
+    def overall_ratings(self) -> dict[PlayerID, float]:
+        return self._memoized("overall_ratings", lambda: dict(zip(
+            self._store.ids.tolist(), (-self._rank_keys()).tolist()
+        )))
+
+    def _compute_ranks(self) -> dict[PlayerID, int]:
+        # The rank index is kept sorted by ordinal rating (descending),
+        # with tie breaks based on player id (ascending).
+        order = self._rank_index.items()
+        return dict(zip(
+            self._store.ids[order].tolist(), range(1, len(order) + 1)
+        ))
+
+    @override
+    def ranks(self) -> dict[PlayerID, int]:
+        return self._memoized("ranks", self._compute_ranks)
+
+    @override
+    def rank_of(self, player: PlayerID) -> int:
+        return self._rank_index.position(self._store.index_of(player)) + 1
+
+    @override
+    def top_k(self, k: int) -> list[PlayerID]:
+        if k < 0:
+            raise ValueError("`k` must be >= 0")
+        return self._store.ids[self._rank_index.items(0, k)].tolist()
+
+    def _record_played(self, player1_indexes: IntArray, player2_indexes: IntArray) -> None:
+        """
+        Record matchups between internal indexes as played, if tracked.
+        """
+        if self._played is not None:
+            self._played.add(player1_indexes, player2_indexes)
+
+    def _record_ranking_played(self, ranking: IntArray) -> None:
+        """
+        Record every pair of a multi-way match as played, if tracked.
+        """
+        first, second = np.triu_indices(len(ranking), 1)
+        self._record_played(ranking[first], ranking[second])
+
+    @override
+    def update(self, winner: PlayerID, loser: PlayerID) -> None:
+        if winner == loser:
+            return
+        indexes = [self._store.index_of(winner), self._store.index_of(loser)]
+        self._record_played(np.array(indexes[:1]), np.array(indexes[1:]))
+        self._apply_matches(indexes, [0], [1])
+
+    @override
+    def update_ranked(self, ranking: Sequence[PlayerID]) -> None:
+        if len(ranking) == 2:
+            self.update(ranking[0], ranking[1])
+            return
+        self._validate_ranking(ranking)
+        indexes = self._store.indexes_of(ranking)
+        self._record_ranking_played(indexes)
+        self._apply_ranking(indexes.tolist())
+
+    def _validate_ranking(self, ranking: Sequence[PlayerID]) -> None:
+        """
+        Check a multi-way ranking, raising `ValueError` if it is invalid.
+        """
+        if len(ranking) < 2:
+            raise ValueError("A ranking needs at least two players.")
+        if len(ranking) > 2 and len(set(ranking)) != len(ranking):
+            raise ValueError("A ranking cannot contain the same player twice.")
+        self._store.indexes_of(ranking)
+
+    @override
+    def update_many(self, matches: Iterable[Sequence[PlayerID]]) -> None:
+        match_list = list(matches)
+        if all(len(match) == 2 for match in match_list):
+            self._update_pairs(np.array(match_list, dtype=np.intp).reshape(-1, 2))
+            return
+
+        # Validate everything up front, so no results are applied on error.
+        for match in match_list:
+            self._validate_ranking(match)
+        # Replay runs of 1v1 results in bulk, between multi-way results.
+        start = 0
+        for end, match in enumerate(match_list):
+            if len(match) > 2:
+                self._update_pairs(
+                    np.array(match_list[start:end], dtype=np.intp).reshape(-1, 2)
+                )
+                indexes = self._store.indexes_of(match)
+                self._record_ranking_played(indexes)
+                self._apply_ranking(indexes.tolist())
+                start = end + 1
+        self._update_pairs(np.array(match_list[start:], dtype=np.intp).reshape(-1, 2))
+
+    def _update_pairs(self, ids: IntArray) -> None:
+        """
+        Apply 1v1 results given as an `(n, 2)` array of winner/loser ids.
+        """
+        # Self-play is a no-op, and is skipped before player lookup as in `update`.
+        ids = ids[ids[:, 0] != ids[:, 1]]
+        if len(ids) == 0:
+            return
+        winner_indexes = self._store.indexes_of(ids[:, 0])
+        loser_indexes = self._store.indexes_of(ids[:, 1])
+        self._record_played(winner_indexes, loser_indexes)
+        touched = np.unique(np.concatenate([winner_indexes, loser_indexes]))
+        self._apply_matches(
+            touched.tolist(),
+            np.searchsorted(touched, winner_indexes).tolist(),
+            np.searchsorted(touched, loser_indexes).tolist()
+        )
+
+    @abstractmethod
+    def _replay(
+        self, mu: list[float], sigma: list[float], winners: list[int], losers: list[int]
+    ) -> None:
+        """
+        Apply 1v1 matches in order to `mu`/`sigma` in place, with match `i`
+        won by position `winners[i]` against position `losers[i]`.
+        """
+        ...
+
+    @abstractmethod
+    def _rate_ranking(
+        self, mu: list[float], sigma: list[float]
+    ) -> tuple[list[float], list[float]]:
+        """
+        Return new mu/sigma of players after a multi-way match, with
+        players given in finishing order.
+        """
+        ...
+
+    def _apply_matches(self,
+        touched: list[int],
+        winners: list[int],
+        losers: list[int]
+    ) -> None:
+        """
+        Apply 1v1 matches in order, then bring the derived matchmaking
+        structures up to date for every touched player.
+
+        Args:
+            touched: Distinct internal indexes of every player involved.
+            winners: Winner of each match, as a position in `touched`.
+            losers: Loser of each match, as a position in `touched`.
+        """
+        # Replay on plain Python lists holding only the touched players.
+        mu = self._store.mu[touched].tolist()
+        sigma = self._store.sigma[touched].tolist()
+        self._replay(mu, sigma, winners, losers)
+        self._set_ratings(touched, mu, sigma)
+
+    def _apply_ranking(self, ranking: list[int]) -> None:
+        """
+        Apply a multi-way match between distinct internal indexes, given
+        in finishing order.
+        """
+        mu, sigma = self._rate_ranking(
+            self._store.mu[ranking].tolist(), self._store.sigma[ranking].tolist()
+        )
+        self._set_ratings(ranking, mu, sigma)
+
+    def _ratings_changed(self, touched: list[int]) -> None:
+        """
+        Called with the internal indexes of players whose ratings changed.
+        """
+
+    def _set_ratings(self, touched: list[int], mu: list[float], sigma: list[float]) -> None:
+        """
+        Store new ratings of the distinct internal indexes `touched`, and
+        bring the derived matchmaking structures up to date.
+        """
+        self._store.mu[touched] = mu
+        self._store.sigma[touched] = sigma
+
+        self._ratings_changed(touched)
+        if len(touched) > _SORTED_INDEX_REBUILD_THRESHOLD:
+            order = np.arange(len(self._store))
+            self._mu_index.rebuild(self._store.mu, order)
+            self._sigma_index.rebuild(-self._store.sigma, order)
+            self._rank_index.rebuild(self._rank_keys(), self._store.ids)
+        else:
+            for index, new_mu, new_sigma in zip(touched, mu, sigma):
+                self._mu_index.update(index, new_mu)
+                self._sigma_index.update(index, -new_sigma)
+                self._rank_index.update(index, -self._ordinal(new_mu, new_sigma))
+        self._last_pick = None
+        self._version += 1
+
+    def _repeat_penalties(
+        self, player1_indexes: IntArray, player2_indexes: IntArray
+    ) -> FloatArray:
+        """
+        Repeat penalty of matchups between broadcast index arrays, as a
+        `MatchupPenaltyFunction`. Only valid when played pairs are tracked.
+        """
+        assert self._played is not None
+        return np.where(
+            self._played.mask(player1_indexes, player2_indexes), self._repeat_penalty, 0.0
+        )
+
+    def _evaluate_matchups(
+        self, player1_indexes: IntArray, player2_indexes: IntArray
+    ) -> FloatArray:
+        """
+        Return the EV of each matchup given by index arrays, including
+        any repeat penalty.
+        """
+        mu, sigma = self._store.mu, self._store.sigma
+        evs = self._ev_function(
+            mu[player1_indexes], sigma[player1_indexes],
+            mu[player2_indexes], sigma[player2_indexes]
+        )
+        if self._played is not None:
+            evs = evs + self._repeat_penalties(player1_indexes, player2_indexes)
+        return evs
+
+    def _member_evs(self, member: int) -> FloatArray:
+        """
+        Return the EV of matchups between `member` and every player,
+        including any repeat penalty.
+        """
+        mu, sigma = self._store.mu, self._store.sigma
+        evs = self._ev_function(mu[member], sigma[member], mu, sigma)
+        if self._played is not None:
+            evs = evs + self._repeat_penalties(np.array([member]), np.arange(len(mu)))
+        return evs
+
+    def _unique_matchups(
+        self, player1_indexes: IntArray, player2_indexes: IntArray
+    ) -> tuple[IntArray, IntArray]:
+        """
+        Normalize matchups to `i < j`, dropping self matchups and duplicates.
+        Matchups are returned in `combinations` (row-major) order.
+        """
+        lower = np.minimum(player1_indexes, player2_indexes)
+        upper = np.maximum(player1_indexes, player2_indexes)
+        n = len(self._store)
+        keys = np.unique((lower * n + upper)[lower != upper])
+        return keys // n, keys % n
+
+    def _neighbourhood_matchups(
+        self, candidate_count: int, radius: int, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray]:
+        """
+        Matchups between the `candidate_count` highest sigma players and
+        their `radius` nearest neighbours either side in mu order, ignoring
+        `excluded` players, in `combinations` order.
+        """
+        if excluded is None:
+            candidates = self._sigma_index.items(0, candidate_count)
+            partners = [
+                self._mu_index.neighbours(int(candidate), radius)
+                for candidate in candidates
+            ]
+        else:
+            # Skip excluded players in both orders, costing O(n).
+            sigma_order = self._sigma_index.items()
+            candidates = sigma_order[~excluded[sigma_order]][:candidate_count]
+            mu_order = self._mu_index.items()
+            mu_order = mu_order[~excluded[mu_order]]
+            positions = np.empty(len(self._store), dtype=np.intp)
+            positions[mu_order] = np.arange(len(mu_order))
+            partners = [
+                np.concatenate([
+                    mu_order[max(position - radius, 0):position],
+                    mu_order[position + 1:position + 1 + radius]
+                ])
+                for position in positions[candidates].tolist()
+            ]
+        return self._unique_matchups(
+            np.repeat(candidates, [len(p) for p in partners]),
+            np.concatenate(partners)
+        )
+
+    def _neighbourhood_search(
+        self, candidate_count: int, radius: int, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Evaluated `_neighbourhood_matchups`, in the form of `_search_matchups`.
+        """
+        player1_indexes, player2_indexes = self._neighbourhood_matchups(
+            candidate_count, radius, excluded
+        )
+        evs = self._evaluate_matchups(player1_indexes, player2_indexes)
+        return player1_indexes, player2_indexes, evs, len(evs)
+
+    @abstractmethod
+    def _search_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Candidate matchups as index arrays and their EVs, ignoring
+        `excluded` players, and the number of matchups considered.
+        """
+        ...
+
+    def _searches_exhaustively(self) -> bool:
+        """
+        Whether `_search_matchups` considers every pair, so searching
+        again after excluding players finds their best matchup.
+        """
+        return False
+
+    def _choose_best(self, evs: FloatArray) -> int:
+        """
+        Return the position of a best matchup among candidates with `evs`,
+        breaking ties within `_matchup_epsilon` at random.
+        """
+        # Candidates come in `combinations` order. Equivalent to
+        # `self._rng.choice` over the list of best matchups, without
+        # materializing the list.
+        best = np.flatnonzero(evs <= evs.min() + self._matchup_epsilon)
+        return int(best[self._rng.randrange(len(best))])
+
+    def _pick_best(self, excluded: BoolArray | None) -> tuple[int, int, float, int]:
+        """
+        Return the internal indexes and EV of a best matchup between
+        players not `excluded`, chosen by `_choose_best`, and the number
+        of matchups considered.
+        """
+        player1_indexes, player2_indexes, evs, candidates = self._search_matchups(excluded)
+        choice = self._choose_best(evs)
+        return (
+            int(player1_indexes[choice]), int(player2_indexes[choice]),
+            float(evs[choice]), candidates
+        )
+
+    @override
+    def focus(self, players: Iterable[PlayerID] | None) -> None:
+        if players is None:
+            self._focus = None
+            return
+        indexes = np.unique(
+            np.fromiter((self._store.index_of(player) for player in players), dtype=np.intp)
+        )
+        if len(indexes) < 2:
+            raise ValueError("At least two players are needed to focus on.")
+        self._focus = indexes
+
+    def _unfocused(self) -> BoolArray | None:
+        """
+        Mask of players `focus` excludes from picks, or None without a focus.
+        """
+        if self._focus is None:
+            return None
+        excluded = np.ones(len(self._store), dtype=np.bool_)
+        excluded[self._focus] = False
+        return excluded
+
+    def _pickable_count(self) -> int:
+        return len(self._store) if self._focus is None else len(self._focus)
+
+    @override
+    def pick_two_players(self) -> tuple[PlayerID, PlayerID]:
+        if len(self._store) < 2:
+            raise ValueError("Not enough players to pick 2.")
+
+        player1, player2, ev, candidates = self._pick_best(self._unfocused())
+        matchup = (int(self._store.ids[player1]), int(self._store.ids[player2]))
+        self._last_pick = (matchup, ev, candidates)
+        return matchup
+
+    @override
+    def pick_group(self, size: int) -> list[PlayerID]:
+        if size < 2:
+            raise ValueError("`size` must be >= 2")
+        if size > self._pickable_count():
+            raise ValueError(f"Not enough players to pick {size}.")
+
+        # Start from the best pair, then greedily add the player with the
+        # lowest total matchup EV against everyone already in the group.
+        excluded = self._unfocused()
+        player1, player2, _, _ = self._pick_best(excluded)
+        group = [player1, player2]
+        total_evs = np.sum([self._member_evs(member) for member in group], axis=0)
+        while len(group) < size:
+            total_evs[group] = np.inf
+            if excluded is not None:
+                total_evs[excluded] = np.inf
+            member = self._choose_best(total_evs)
+            group.append(member)
+            total_evs += self._member_evs(member)
+        return self._store.ids[group].tolist()
+
+    @override
+    def pick_k_matchups(self, k: int) -> list[tuple[PlayerID, PlayerID]]:
+        if k < 0:
+            raise ValueError("`k` must be >= 0")
+        if 2 * k > self._pickable_count():
+            raise ValueError(f"Not enough players to pick {k} disjoint matchups.")
+
+        # Greedily take the best matchup between players not yet picked.
+        # Candidates are evaluated once, and only re-searched if every
+        # remaining candidate involves an already picked player.
+        unfocused = self._unfocused()
+        player1_indexes, player2_indexes, evs, _ = self._search_matchups(unfocused)
+        excluded = (
+            np.zeros(len(self._store), dtype=np.bool_) if unfocused is None else unfocused
+        )
+        matchups: list[tuple[PlayerID, PlayerID]] = []
+        while len(matchups) < k:
+            if len(evs) == 0:
+                player1_indexes, player2_indexes, evs, _ = self._search_matchups(excluded)
+            choice = self._choose_best(evs)
+            player1, player2 = int(player1_indexes[choice]), int(player2_indexes[choice])
+            matchups.append((int(self._store.ids[player1]), int(self._store.ids[player2])))
+            excluded[player1] = excluded[player2] = True
+
+            if self._searches_exhaustively():
+                # Search the rest afresh, so picks are the exact greedy optimum.
+                evs = np.empty(0)
+            else:
+                available = ~(excluded[player1_indexes] | excluded[player2_indexes])
+                player1_indexes = player1_indexes[available]
+                player2_indexes = player2_indexes[available]
+                evs = evs[available]
+        return matchups
+
+    @override
+    def consolidate(self) -> None:
+        pass
+
+    def _extra_state(self) -> dict[str, np.ndarray]:
+        """
+        Arrays saved by `save_state` beyond ratings and randomness.
+        """
+        return {}
+
+    @override
+    def save_state(self) -> bytes:
+        version, rng_words, gauss_next = self._rng.getstate()
+        played: dict[str, np.ndarray] = (
+            {} if self._played is None else {"played_pairs": self._played.bits}
+        )
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            allow_pickle=False,
+            format=np.array([_STATE_FORMAT_VERSION, version], dtype=np.int64),
+            backend=np.array(type(self).__name__),
+            ids=self._store.ids,
+            mu=self._store.mu,
+            sigma=self._store.sigma,
+            rng_words=np.array(rng_words, dtype=np.uint32),
+            rng_gauss_next=np.array([] if gauss_next is None else [gauss_next]),
+            **played,
+            **self._extra_state()
+        )
+        return buffer.getvalue()
+
+    def _state_loaded(self) -> None:
+        """
+        Called after `load_state` replaced every player's ratings.
+        """
+
+    @override
+    def load_state(self, state: bytes) -> None:
+        try:
+            with np.load(io.BytesIO(state), allow_pickle=False) as arrays:
+                format_version, rng_version = arrays["format"].tolist()
+                if format_version != _STATE_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported state format {format_version}.")
+                if str(arrays["backend"]) != type(self).__name__:
+                    raise ValueError(f"State of a different backend, {arrays['backend']}.")
+                store = RatingStore.from_arrays(arrays["ids"], arrays["mu"], arrays["sigma"])
+                played = (
+                    None if self._played is None
+                    else PlayedPairs.from_bits(arrays["played_pairs"], len(store))
+                )
+                gauss_next = arrays["rng_gauss_next"].tolist()
+                rng = random.Random()
+                rng.setstate((
+                    rng_version,
+                    tuple(arrays["rng_words"].tolist()),
+                    gauss_next[0] if gauss_next else None
+                ))
+        except (OSError, EOFError, KeyError, TypeError, zipfile.BadZipFile) as error:
+            raise ValueError("Malformed backend state.") from error
+
+        self._store = store
+        self._rng = rng
+        self._played = played
+        order = np.arange(len(store))
+        self._mu_index.rebuild(store.mu, order)
+        self._sigma_index.rebuild(-store.sigma, order)
+        self._rank_index.rebuild(self._rank_keys(), store.ids)
+        self._state_loaded()
+        self._last_pick = None
+        # The focus is part of the session, not the state.
+        self._focus = None
+        self._version += 1
+
+
+class PlackettLuceBackend(_ArrayBackend):
     """
     `RatingBackend` implementation using `openskill` Plackett-Luce.
     """
 
     def __init__(self,
         rng_seed: int | None = None,
-        relative_matchup_epsilon: float = 0.01
+        relative_matchup_epsilon: float = 0.01,
+        search: MatchupSearch = MatchupSearch.EXHAUSTIVE,
+        pruned_candidates: int = 32,
+        pruned_neighbours: int = 8,
+        sampled_matchups: int = 4096,
+        search_workers: int | None = None,
+        relative_repeat_penalty: float | None = None,
+        tier_size: int = 64
     ) -> None:
         """
         Initialize a default Plackett-Luce model and empty player list.
@@ -149,180 +1088,518 @@ class PlackettLuceBackend(RatingBackend):
                 considered equal. The quantity is relative to the starting sigma of players.
                 E.G. Starting sigma of 2. A value of 0.1 indicates a +/- 0.2 is equal (inclusive).
                 Must be >= 0.
+            search: Matchmaking search strategy, see `MatchupSearch`.
+                EXHAUSTIVE keeps an n x n EV table, so for pools of 10k+ players
+                PRUNED or SAMPLED should be used, or PARALLEL where the exact
+                optimum is needed.
+            pruned_candidates: Number of highest sigma players considered by
+                PRUNED search. Must be > 0.
+            pruned_neighbours: Number of nearest players in mu order, on either side,
+                each PRUNED candidate is paired with. Must be > 0.
+            sampled_matchups: Number of random pairs considered by SAMPLED search.
+                Must be > 0.
+            search_workers: Number of worker processes of PARALLEL search,
+                None uses one per CPU. Must be > 0.
+            relative_repeat_penalty: Optional penalty added to the EV of pairs
+                that have already been matched, relative to the starting
+                sigma. None does not track played pairs, which otherwise
+                takes about n^2 / 16 bytes. Values of 2 or more effectively
+                exclude repeats until every pair has been played.
+                Must be finite and >= 0.
+            tier_size: Number of players per tier of TIERED search. Must be > 0.
         """
         if not (relative_matchup_epsilon >= 0):
             raise ValueError("`relative_matchup_epsilon` must be >= 0")
-        self._rng: random.Random = random.Random(rng_seed)
+        if pruned_candidates <= 0 or pruned_neighbours <= 0 or sampled_matchups <= 0:
+            raise ValueError(
+                "`pruned_candidates`, `pruned_neighbours` and `sampled_matchups` must be > 0"
+            )
+        if search_workers is not None and search_workers <= 0:
+            raise ValueError("`search_workers` must be > 0")
+        if tier_size <= 0:
+            raise ValueError("`tier_size` must be > 0")
         self._model: PlackettLuce = PlackettLuce()
-        self._matchup_epsilon: float = self._model.sigma * relative_matchup_epsilon
-        self._players: list[PlackettLuceRating] = []
-        self._id_to_index: dict[PlayerID, int] = {}
+        super().__init__(
+            rng_seed, self._model.mu, self._model.sigma, relative_repeat_penalty
+        )
+        self._search: MatchupSearch = search
+        self._pruned_candidates: int = pruned_candidates
+        self._pruned_neighbours: int = pruned_neighbours
+        self._sampled_matchup_count: int = sampled_matchups
+        # Started on the first PARALLEL search, and shared between copies.
+        self._parallel_search: ParallelMatchupSearch | None = None
+        self._search_workers: int | None = search_workers
+        self._matchup_epsilon = self._model.sigma * relative_matchup_epsilon
+        self._ev_function = partial(sigma_change_ev, self._model)
+        # Pairwise matchup EVs, kept between picks and refreshed incrementally.
+        self._ev_table: MatchupEVTable = MatchupEVTable(
+            self._ev_function, None if self._played is None else self._repeat_penalties
+        )
+        self._tier_size: int = tier_size
+        # Sigma of every player by internal index, for TIERED draws.
+        self._tier_weights: FenwickTree | None = (
+            FenwickTree() if search == MatchupSearch.TIERED else None
+        )
+
+    @override
+    def _replay(
+        self, mu: list[float], sigma: list[float], winners: list[int], losers: list[int]
+    ) -> None:
+        replay_1v1(self._model, mu, sigma, winners, losers)
+
+    @override
+    def _rate_ranking(
+        self, mu: list[float], sigma: list[float]
+    ) -> tuple[list[float], list[float]]:
+        # openskill's full Plackett-Luce update, one player per team.
+        teams = [
+            [self._model.rating(mu=player_mu, sigma=player_sigma)]
+            for player_mu, player_sigma in zip(mu, sigma)
+        ]
+        rated = self._model.rate(teams)
+        return [team[0].mu for team in rated], [team[0].sigma for team in rated]
 
     @override
     def new_player(self, id: PlayerID) -> None:
-        if id < 0:
-            raise ValueError(f"id {id} is not >= 0.")
-        if id in self._id_to_index:
-            raise ValueError(f"Player with id {id} already exists.")
-        rating = self._model.rating(name="no name")
-        self._players.append(rating)
-        self._id_to_index[id] = len(self._players) - 1
+        super().new_player(id)
+        if self._tier_weights is not None:
+            self._tier_weights.append(self._initial_sigma)
+
+    @override
+    def _ratings_changed(self, touched: list[int]) -> None:
+        for index in touched:
+            self._ev_table.invalidate(index)
+        if self._tier_weights is None:
+            return
+        if len(touched) > _SORTED_INDEX_REBUILD_THRESHOLD:
+            self._tier_weights.rebuild(self._store.sigma)
+        else:
+            for index in touched:
+                self._tier_weights.set(index, float(self._store.sigma[index]))
 
-    def _get_player(self, player: PlayerID) -> PlackettLuceRating:
+    def _exhaustive_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Candidate matchups for EXHAUSTIVE search. Only matchups within
+        `_matchup_epsilon` of the minimum are returned, from the EV table.
         """
-        Return the player rating object for `player`.
+        # Only players invalidated by `update` (and newly created players)
+        # are re-evaluated.
+        self._ev_table.refresh(self._store.mu, self._store.sigma)
+        player1_indexes, player2_indexes, evs = self._ev_table.matchups_within(
+            self._ev_table.minimum(excluded) + self._matchup_epsilon, excluded
+        )
+        n = len(self._store)
+        return player1_indexes, player2_indexes, evs, n * (n - 1) // 2
 
-        Raises:
-            `ValueError` if its an invalid index.
+    def _pick_exhaustive(self, excluded: BoolArray | None) -> tuple[int, int, float, int]:
         """
-        if player not in self._id_to_index:
-            raise ValueError("Player does not exist.")
-        return self._players[self._id_to_index[player]]
+        `_pick_best` for EXHAUSTIVE search. Draws from `_rng` exactly as
+        `_choose_best` over `_exhaustive_matchups` would, but only
+        materializes the chosen matchup, as early on most pairs tie.
+        """
+        self._ev_table.refresh(self._store.mu, self._store.sigma)
+        threshold = self._ev_table.minimum(excluded) + self._matchup_epsilon
+        position = self._rng.randrange(self._ev_table.count_within(threshold, excluded))
+        player1, player2, ev = self._ev_table.matchup_at(threshold, position, excluded)
+        n = len(self._store)
+        return player1, player2, ev, n * (n - 1) // 2
 
-    @override
-    def overall_rating(self, player: PlayerID) -> float:
-        return self._get_player(player).ordinal()
+    def _parallel_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Candidate matchups for PARALLEL search, the same as those of
+        EXHAUSTIVE search, evaluated across a process pool.
+        """
+        if self._parallel_search is None:
+            self._parallel_search = ParallelMatchupSearch(self._search_workers)
+        player1_indexes, player2_indexes, evs = self._parallel_search.search(
+            self._store.mu, self._store.sigma, self._matchup_epsilon, excluded,
+            None if self._played is None else self._played.bits, self._repeat_penalty
+        )
+        n = len(self._store)
+        return player1_indexes, player2_indexes, evs, n * (n - 1) // 2
+
+    def _pruned_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Candidate matchups for PRUNED search: the highest sigma players,
+        each paired with its nearest neighbours in mu order.
+        """
+        return self._neighbourhood_search(
+            self._pruned_candidates, self._pruned_neighbours, excluded
+        )
 
-    def _rating_certainty(self, player_obj: PlackettLuceRating) -> float:
+    def _sampled_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Candidate matchups for SAMPLED search: uniformly random distinct pairs.
         """
-        Map player Plackett-Luce uncertainty (`sigma`)
-        to a probability in `[0, 1]`.
+        pool = (
+            np.arange(len(self._store)) if excluded is None
+            else np.flatnonzero(~excluded)
+        )
+        n = len(pool)
+        generator = np.random.default_rng(self._rng.getrandbits(64))
+        player1_indexes = generator.integers(0, n, self._sampled_matchup_count)
+        # Draw from the n - 1 other players so pairs are always distinct.
+        player2_indexes = generator.integers(0, n - 1, self._sampled_matchup_count)
+        player2_indexes += player2_indexes >= player1_indexes
+        player1_indexes, player2_indexes = self._unique_matchups(
+            pool[player1_indexes], pool[player2_indexes]
+        )
+        evs = self._evaluate_matchups(player1_indexes, player2_indexes)
+        return player1_indexes, player2_indexes, evs, len(evs)
 
-        Certainty is measured relative to the model's prior sigma baseline:
-        players at prior sigma map to `0`, and lower sigma maps toward `1`.
+    def _draw_tiered_player(self, excluded: BoolArray | None = None) -> int:
         """
-        if self._model.sigma == 0:
-            return 0.0
-        # Certainty is relative to the model's sigma baseline.
-        sigma_ratio = 1 - (player_obj.sigma / self._model.sigma)
+        Draw a player not `excluded`, with probability proportional to sigma.
+        """
+        assert self._tier_weights is not None
+        for _ in range(_TIERED_DRAW_ATTEMPTS):
+            player = self._tier_weights.find(
+                self._rng.random() * self._tier_weights.total()
+            )
+            if excluded is None or not excluded[player]:
+                return player
+        # Mostly excluded pools, e.g. late in `pick_k_matchups`.
+        sigma_order = self._sigma_index.items()
+        if excluded is None:
+            return int(sigma_order[0])
+        return int(sigma_order[~excluded[sigma_order]][0])
 
-        # Clamp ratio to [0, 1]
-        sigma_ratio = min(1.0, sigma_ratio)
-        sigma_ratio = max(0.0, sigma_ratio)
-        return sigma_ratio
+    def _tiered_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        """
+        Candidate matchups for TIERED search: a player drawn by sigma, paired
+        with every other player of its tier and the tiers either side.
+        Tiers are consecutive runs of `tier_size` players in mu order.
+        """
+        player = self._draw_tiered_player(excluded)
+        tier = self._mu_index.position(player) // self._tier_size
+        partners = self._mu_index.items(
+            (tier - 1) * self._tier_size, (tier + 2) * self._tier_size
+        )
+        partners = partners[partners != player]
+        if excluded is not None:
+            partners = partners[~excluded[partners]]
+        if len(partners) == 0:
+            # Every nearby player is excluded, widen to the nearest others.
+            return self._pruned_matchups(excluded)
+        player1_indexes, player2_indexes = self._unique_matchups(
+            np.full(len(partners), player), partners
+        )
+        evs = self._evaluate_matchups(player1_indexes, player2_indexes)
+        return player1_indexes, player2_indexes, evs, len(evs)
 
     @override
-    def rating_certainties(self) -> dict[PlayerID, float]:
-        return {
-            player: self._rating_certainty(self._get_player(player))
-            for player in self._id_to_index.keys()
-        }
+    def _search_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        # The quality of a matchup is its expected *decrease* in sigma.
+        # Lower EVs indicate better matchups.
+        if self._search == MatchupSearch.TIERED:
+            return self._tiered_matchups(excluded)
+        if self._search == MatchupSearch.PRUNED:
+            return self._pruned_matchups(excluded)
+        elif self._search == MatchupSearch.SAMPLED:
+            return self._sampled_matchups(excluded)
+        elif self._search == MatchupSearch.PARALLEL:
+            return self._parallel_matchups(excluded)
+        return self._exhaustive_matchups(excluded)
 
     @override
-    def ranks(self) -> dict[PlayerID, int]:
-        if len(self._players) == 0:
-            return {}
-        elif len(self._players) == 1:
-            return {list(self._id_to_index.keys())[0]: 1}
-
-        # Sort players based on the ordinal rating (descending),
-        # with tie breaks based on player id (ascending)
-        score_tuples: list[tuple[float, PlayerID]] = [
-            (self.overall_rating(player), player)
-            for player in self._id_to_index.keys()
-        ]
-        score_tuples = sorted(
-            score_tuples, key=lambda tup: (-tup[0], tup[1])
-        )
+    def _pick_best(self, excluded: BoolArray | None) -> tuple[int, int, float, int]:
+        if self._search == MatchupSearch.EXHAUSTIVE:
+            return self._pick_exhaustive(excluded)
+        return super()._pick_best(excluded)
 
-        # Create dictionary of player ranks by using position in the
-        # sorted array.
-        ranks = {player: 0 for player in self._id_to_index.keys()}
-        for i, score_tuple in enumerate(score_tuples):
-            ranks[score_tuple[1]] = i + 1
-        return ranks
+    @override
+    def _searches_exhaustively(self) -> bool:
+        # The EV table makes a fresh EXHAUSTIVE search cheap.
+        return self._search in (MatchupSearch.EXHAUSTIVE, MatchupSearch.PARALLEL)
 
     @override
-    def update(self, winner: PlayerID, loser: PlayerID) -> None:
-        if winner == loser:
-            return
-        winner_team, loser_team = self._model.rate([
-            [self._get_player(winner)],
-            [self._get_player(loser)]
-        ])
-        self._players[self._id_to_index[winner]] = winner_team[0]
-        self._players[self._id_to_index[loser]] = loser_team[0]
+    def _state_loaded(self) -> None:
+        self._ev_table.clear()
+        if self._tier_weights is not None:
+            self._tier_weights.rebuild(self._store.sigma)
 
-    def _total_sigma_change_after_match(self,
-        hypothetical_winner: PlackettLuceRating,
-        hypothetical_loser: PlackettLuceRating
-    ) -> float:
+    def matchup_report(self) -> MatchupReport:
         """
-        Internal helper function to determine the total sigma change after a
-        particular matchup is played. Positive change implies sigma increased.
-
-        Makes no actual change to any of the players.
+        Report how close the last picked matchup is to the exhaustive optimum.
 
-        In this case total sigma change is equal to local sigma change
-        as matches can only affect the sigma of participating players.
+        Evaluates every pair in bounded memory, so this costs O(n^2) time and
+        is intended for audits and tuning of PRUNED/SAMPLED search.
+        With a repeat penalty, `ev` includes the penalty of the picked
+        matchup while `optimal_ev` ignores penalties.
 
-        Invariant:
-            - Assumes the hypothetical winner and loser are different.
-            Result is undefined if this assumption is broken.
+        Raises:
+            - `ValueError` if no matchup has been picked since the last update.
         """
-        sigma_before: float = hypothetical_winner.sigma + hypothetical_loser.sigma
-        [hypothetical_winner_after], [hypothetical_loser_after] = self._model.rate(
-            [[hypothetical_winner], [hypothetical_loser]]
+        if self._last_pick is None:
+            raise ValueError("No matchup picked since the last update.")
+        matchup, ev, candidates = self._last_pick
+        return MatchupReport(
+            search=self._search,
+            matchup=matchup,
+            ev=ev,
+            candidates=candidates,
+            optimal_ev=exhaustive_minimum(
+                self._ev_function, self._store.mu, self._store.sigma
+            )
         )
-        sigma_after: float = hypothetical_winner_after.sigma + hypothetical_loser_after.sigma
-        return sigma_after - sigma_before
 
-    def _match_sigma_change_ev(self,
-        player1: PlackettLuceRating,
-        player2: PlackettLuceRating
-    ) -> float:
+    def close(self) -> None:
+        """
+        Stop the worker processes of PARALLEL search, if started. They are
+        restarted by the next PARALLEL search.
         """
-        Helper function to predict the expected change in sigma if two players
-        are matched up with each other.
+        if self._parallel_search is not None:
+            self._parallel_search.close()
+
+
+class GlickoBackend(_ArrayBackend):
+    """
+    `RatingBackend` implementation using closed-form Glicko updates, for
+    very large libraries.
+
+    Every match is its own rating period, so an update costs O(1) plus
+    repositioning the players in the sorted indexes. Ratings are stored as
+    mu (the Glicko rating) and sigma (the rating deviation).
 
-        Absolute decrease in sigma is determined by playing the 2 possible
-        matchups (player1 win vs player2 win), while the probability of
-        each outcome is predicted by the Plackett-Luce model. The combination
-        of both gives a sigma change EV.
+    Matchups are scored by the decrease in total rating deviation, which
+    favours uncertain players matched against players of close rating.
+    Only the most uncertain players are considered, each paired with its
+    nearest players by rating, so a pick never touches all pairs and costs
+    O(candidates * neighbours) regardless of the pool size.
+    """
+
+    # Overall ratings are a conservative estimate, roughly the lower bound
+    # of a 95% confidence interval.
+    _ORDINAL_SIGMAS = 2.0
+
+    def __init__(self,
+        rng_seed: int | None = None,
+        relative_matchup_epsilon: float = 0.01,
+        candidates: int = 16,
+        neighbours: int = 4,
+        min_deviation: float = glicko.DEFAULT_MIN_DEVIATION,
+        relative_repeat_penalty: float | None = None
+    ) -> None:
         """
-        [player1_win_chance, player2_win_chance] = self._model.predict_win(
-            [[player1], [player2]]
-        )
-        player1_win_sigma_change = self._total_sigma_change_after_match(
-            player1, player2
+        Args:
+            rng_seed: Optional variable to seed all randomness,
+                allows for fully deterministic matchmaking.
+            relative_matchup_epsilon: How close matchup deviation changes have
+                to be to be considered equal, with ties broken at random,
+                relative to the starting deviation. Must be >= 0.
+            candidates: Number of highest deviation players considered by
+                matchmaking. Must be > 0.
+            neighbours: Number of nearest players by rating, on either side,
+                each candidate is paired with. Must be > 0.
+            min_deviation: Floor of rating deviations. Must be > 0.
+            relative_repeat_penalty: Optional penalty added to the deviation
+                change of pairs that have already been matched, relative to
+                the starting deviation, see `PlackettLuceBackend`.
+        """
+        if not (relative_matchup_epsilon >= 0):
+            raise ValueError("`relative_matchup_epsilon` must be >= 0")
+        if candidates <= 0 or neighbours <= 0:
+            raise ValueError("`candidates` and `neighbours` must be > 0")
+        if not (min_deviation > 0):
+            raise ValueError("`min_deviation` must be > 0")
+        super().__init__(
+            rng_seed, glicko.DEFAULT_RATING, glicko.DEFAULT_DEVIATION, relative_repeat_penalty
         )
-        player2_win_sigma_change = self._total_sigma_change_after_match(
-            player2, player1
+        self._candidates: int = candidates
+        self._neighbours: int = neighbours
+        self._min_deviation: float = min_deviation
+        self._matchup_epsilon = glicko.DEFAULT_DEVIATION * relative_matchup_epsilon
+        self._ev_function = partial(glicko.deviation_change, min_deviation=min_deviation)
+
+    @override
+    def _replay(
+        self, mu: list[float], sigma: list[float], winners: list[int], losers: list[int]
+    ) -> None:
+        glicko.replay_1v1(mu, sigma, winners, losers, self._min_deviation)
+
+    @override
+    def _rate_ranking(
+        self, mu: list[float], sigma: list[float]
+    ) -> tuple[list[float], list[float]]:
+        return glicko.rate_ranked(mu, sigma, self._min_deviation)
+
+    @override
+    def _search_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        return self._neighbourhood_search(self._candidates, self._neighbours, excluded)
+
+
+class BradleyTerryBackend(_ArrayBackend):
+    """
+    `RatingBackend` implementation fitting Bradley-Terry/Plackett-Luce
+    strengths to the whole match history at once, so ratings do not
+    depend on the order matches were played in.
+
+    Results are kept as sparse counts (see `compare.bradley_terry`), and
+    by default every update refits every player, warm started from the
+    current ratings, so updates cost O(distinct pairs played) each. That is
+    about 2 ms at 1,000 songs and 11 ms at 5,000, small next to the time
+    it takes to listen to a match, and keeps the ratings shown after every
+    vote exact. With a `refit_threshold` above 1, updates of fewer matches
+    instead apply one approximate Newton step per result, until the next
+    bulk update or `consolidate`, e.g. for simulations. Ratings are stored as mu (the log-strength) and sigma
+    (its standard error).
+
+    Matchmaking works as in `GlickoBackend`, scoring matchups by the
+    decrease in total standard error.
+    """
+
+    # Overall ratings are roughly the lower bound of a 95% confidence interval.
+    _ORDINAL_SIGMAS = 2.0
+
+    def __init__(self,
+        rng_seed: int | None = None,
+        relative_matchup_epsilon: float = 0.01,
+        candidates: int = 16,
+        neighbours: int = 4,
+        prior_games: float = bradley_terry.DEFAULT_PRIOR_GAMES,
+        refit_threshold: int = 1,
+        tolerance: float = 1e-6,
+        max_iterations: int = 1000,
+        relative_repeat_penalty: float | None = None
+    ) -> None:
+        """
+        Args:
+            rng_seed: Optional variable to seed all randomness,
+                allows for fully deterministic matchmaking.
+            relative_matchup_epsilon: How close matchup standard error changes
+                have to be to be considered equal, with ties broken at random,
+                relative to the starting standard error. Must be >= 0.
+            candidates: Number of highest sigma players considered by
+                matchmaking. Must be > 0.
+            neighbours: Number of nearest players by rating, on either side,
+                each candidate is paired with. Must be > 0.
+            prior_games: Virtual wins and losses of every player against
+                an average player, see `bradley_terry.fit`. Must be > 0.
+            refit_threshold: Updates of at least this many matches refit
+                every player, smaller updates are applied approximately.
+                Must be > 0.
+            tolerance: Convergence tolerance of refits. Must be > 0.
+            max_iterations: Iteration limit of refits. Must be > 0.
+            relative_repeat_penalty: Optional penalty added to the standard
+                error change of pairs that have already been matched,
+                relative to the starting standard error, see
+                `PlackettLuceBackend`.
+        """
+        if not (relative_matchup_epsilon >= 0):
+            raise ValueError("`relative_matchup_epsilon` must be >= 0")
+        if candidates <= 0 or neighbours <= 0:
+            raise ValueError("`candidates` and `neighbours` must be > 0")
+        if not (prior_games > 0) or not (tolerance > 0):
+            raise ValueError("`prior_games` and `tolerance` must be > 0")
+        if refit_threshold <= 0 or max_iterations <= 0:
+            raise ValueError("`refit_threshold` and `max_iterations` must be > 0")
+        # A player with only the prior games has information `prior_games / 2`.
+        super().__init__(rng_seed, 0.0, (2 / prior_games) ** 0.5, relative_repeat_penalty)
+        self._candidates: int = candidates
+        self._neighbours: int = neighbours
+        self._prior_games: float = prior_games
+        self._refit_threshold: int = refit_threshold
+        self._tolerance: float = tolerance
+        self._max_iterations: int = max_iterations
+        self._matchup_epsilon = self._initial_sigma * relative_matchup_epsilon
+        self._ev_function = bradley_terry.deviation_change
+        self._counts: MatchCounts = MatchCounts()
+        self._last_fit: FitResult | None = None
+
+    @property
+    def last_fit(self) -> FitResult | None:
+        """
+        Result of the latest refit, or None if there has not been one.
+        """
+        return self._last_fit
+
+    @override
+    def _replay(
+        self, mu: list[float], sigma: list[float], winners: list[int], losers: list[int]
+    ) -> None:
+        bradley_terry.replay_1v1(mu, sigma, winners, losers)
+
+    @override
+    def _rate_ranking(
+        self, mu: list[float], sigma: list[float]
+    ) -> tuple[list[float], list[float]]:
+        return bradley_terry.rate_ranked(mu, sigma)
+
+    @override
+    def _apply_matches(self,
+        touched: list[int],
+        winners: list[int],
+        losers: list[int]
+    ) -> None:
+        indexes = np.asarray(touched, dtype=np.intp)
+        self._counts.add_pairs(indexes[winners], indexes[losers])
+        if len(winners) >= self._refit_threshold:
+            self.consolidate()
+        else:
+            super()._apply_matches(touched, winners, losers)
+
+    @override
+    def _apply_ranking(self, ranking: list[int]) -> None:
+        self._counts.add_ranking(ranking)
+        if self._refit_threshold == 1:
+            self.consolidate()
+        else:
+            super()._apply_ranking(ranking)
+
+    @override
+    def consolidate(self) -> None:
+        n = len(self._store)
+        if n == 0:
+            return
+        self._last_fit = bradley_terry.fit(
+            self._counts,
+            n,
+            initial=self._store.mu,
+            prior_games=self._prior_games,
+            tolerance=self._tolerance,
+            max_iterations=self._max_iterations
         )
-        return (
-            player1_win_sigma_change * player1_win_chance +
-            player2_win_sigma_change * player2_win_chance
+        self._set_ratings(
+            list(range(n)), self._last_fit.theta.tolist(), self._last_fit.sigma.tolist()
         )
 
     @override
-    def pick_two_players(self) -> tuple[PlayerID, PlayerID]:
-        if len(self._players) < 2:
-            raise ValueError("Not enough players to pick 2.")
-
-        # TODO: Add a cheaper code path for large pools of players.
+    def _search_matchups(
+        self, excluded: BoolArray | None = None
+    ) -> tuple[IntArray, IntArray, FloatArray, int]:
+        return self._neighbourhood_search(self._candidates, self._neighbours, excluded)
 
-        # The quality of a matchup is its expected *decrease* in sigma.
-        # Lower EVs indicate better matchups.
-        minimum_matchup_ev = math.inf
-        matchup_evs: list[tuple[tuple[PlayerID, PlayerID], float]] = []
-
-        # Go through all possible combinations of matchups.
-        for player1, player2 in combinations(self._id_to_index.keys(), 2):
-            player1_obj = self._players[self._id_to_index[player1]]
-            player2_obj = self._players[self._id_to_index[player2]]
-            sigma_change_ev = self._match_sigma_change_ev(player1_obj, player2_obj)
-            matchup_evs.append(
-                ((player1, player2), sigma_change_ev)
-            )
-            minimum_matchup_ev = min(minimum_matchup_ev, sigma_change_ev)
-
-        # Create a list of the best matchups using `_matchup_epsilon` to
-        # determine float equivalence.
-        best_matchups = [
-            tup[0]
-            for tup in matchup_evs
-            if abs(tup[1] - minimum_matchup_ev) <= self._matchup_epsilon
-        ]
+    @override
+    def _extra_state(self) -> dict[str, np.ndarray]:
+        return self._counts.to_arrays()
 
-        # Break ties using randomness.
-        return self._rng.choice(best_matchups)
+    @override
+    def load_state(self, state: bytes) -> None:
+        # Read the counts first, so the state is unchanged if they are invalid.
+        try:
+            with np.load(io.BytesIO(state), allow_pickle=False) as arrays:
+                counts = MatchCounts.from_arrays({
+                    name: arrays[name] for name in self._counts.to_arrays()
+                })
+                player_count = len(arrays["ids"])
+        except (OSError, EOFError, KeyError, TypeError, zipfile.BadZipFile) as error:
+            raise ValueError("Malformed backend state.") from error
+        if counts.max_player() >= player_count:
+            raise ValueError("Malformed backend state.")
+        super().load_state(state)
+        self._counts = counts
+        self._last_fit = None
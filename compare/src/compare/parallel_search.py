@@ -0,0 +1,324 @@
+"""
+Exhaustive matchup search split across a process pool.
+
+`MatchupSearch.EXHAUSTIVE` keeps an n x n EV table, which needs several GB
+of memory at 20k players, and rebuilding it runs on a single core.
+`ParallelMatchupSearch` instead evaluates the upper triangle of the pairwise
+EV matrix on every search, split into row ranges of roughly equal pair
+counts across worker processes.
+
+Ratings, and optionally the bits of a `PlayedPairs` for repeat penalties,
+are published to workers through shared memory blocks rather than
+pickled with each task. Each worker sends back only its local minimum EV and
+the matchups within the tie tolerance of it. Filtering their union against
+the global minimum gives exactly the candidates of a single process search,
+in the same (`itertools.combinations`) order, so picks are identical for a
+given seed.
+
+Classes
+-------
+ParallelMatchupSearch: Exhaustive matchup search over a process pool.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from openskill.models import PlackettLuce
+
+from compare.ev_table import BoolArray, IntArray, MatchupEVFunction
+from compare.plackett_luce import FloatArray, sigma_change_ev
+from compare.played_pairs import ByteArray, played_mask
+
+
+# Row ranges per worker, so uneven progress between workers evens out.
+_TASKS_PER_WORKER = 4
+
+# Bytes per player in the shared block: mu and sigma (float64), excluded (bool).
+_BYTES_PER_PLAYER = 8 + 8 + 1
+
+
+# Worker process state, set up by `_init_worker`.
+_worker_ev_function: MatchupEVFunction | None = None
+# Attached shared blocks, by block name.
+_worker_shared: dict[str, SharedMemory] = {}
+
+
+def _init_worker() -> None:
+    """
+    Build the EV function of the default `PlackettLuce` model, as used by
+    `PlackettLuceBackend`, once per worker process.
+    """
+    global _worker_ev_function
+    _worker_ev_function = partial(sigma_change_ev, PlackettLuce())
+
+
+def _shared_arrays(
+    shared: SharedMemory, capacity: int, n: int
+) -> tuple[FloatArray, FloatArray, BoolArray]:
+    """
+    Views of the first `n` mu, sigma and excluded entries of a shared block
+    laid out for `capacity` players.
+    """
+    mu = np.ndarray((n,), dtype=np.float64, buffer=shared.buf, offset=0)
+    sigma = np.ndarray((n,), dtype=np.float64, buffer=shared.buf, offset=8 * capacity)
+    excluded = np.ndarray((n,), dtype=np.bool_, buffer=shared.buf, offset=16 * capacity)
+    return mu, sigma, excluded
+
+
+def _attach(name: str, kept: tuple[str, ...] = ()) -> SharedMemory:
+    """
+    Attach to the shared block `name`, reusing the attachment across tasks.
+    Attachments to blocks other than `name` and `kept` are closed, as the
+    search has replaced them.
+    """
+    for other in [other for other in _worker_shared if other not in (name, *kept)]:
+        _worker_shared.pop(other).close()
+    if name not in _worker_shared:
+        _worker_shared[name] = SharedMemory(name=name)
+    return _worker_shared[name]
+
+
+def _search_rows(
+    name: str,
+    capacity: int,
+    n: int,
+    start: int,
+    stop: int,
+    epsilon: float,
+    block_rows: int,
+    played_name: str | None = None,
+    repeat_penalty: float = 0.0
+) -> tuple[float, IntArray, IntArray, FloatArray]:
+    """
+    Search matchups `(i, j)`, `start <= i < stop`, `i < j`, in a worker.
+
+    Returns the lowest EV found and every matchup within `epsilon` of it,
+    in row-major order. Rows are evaluated `block_rows` at a time, so
+    memory stays O(n * block_rows). Matchups marked in the played pair
+    bits of block `played_name` have `repeat_penalty` added.
+    """
+    assert _worker_ev_function is not None
+    played: ByteArray | None = None
+    if played_name is not None:
+        played_block = _attach(played_name, kept=(name,))
+        played = np.ndarray((played_block.size,), dtype=np.uint8, buffer=played_block.buf)
+    kept = () if played_name is None else (played_name,)
+    mu, sigma, excluded = _shared_arrays(_attach(name, kept), capacity, n)
+    minimum = np.inf
+    found: list[tuple[IntArray, IntArray, FloatArray]] = []
+    for block_start in range(start, stop, block_rows):
+        rows = np.arange(block_start, min(block_start + block_rows, stop))
+        # Columns up to the first row never pair with a higher index.
+        first_column = block_start + 1
+        columns = np.arange(first_column, n)
+        block = _worker_ev_function(
+            mu[rows, None], sigma[rows, None],
+            mu[None, first_column:], sigma[None, first_column:]
+        )
+        if played is not None:
+            block[played_mask(played, rows[:, None], columns[None, :])] += repeat_penalty
+        block[
+            (columns[None, :] <= rows[:, None])
+            | excluded[rows, None] | excluded[None, first_column:]
+        ] = np.inf
+        minimum = min(minimum, float(block.min()))
+        if minimum == np.inf:
+            continue
+        row_positions, column_positions = np.nonzero(block <= minimum + epsilon)
+        found.append((
+            rows[row_positions],
+            columns[column_positions],
+            block[row_positions, column_positions]
+        ))
+
+    if not found:
+        empty = np.empty(0, dtype=np.intp)
+        return minimum, empty, empty, np.empty(0, dtype=np.float64)
+    player1_indexes, player2_indexes, evs = (np.concatenate(parts) for parts in zip(*found))
+    # Earlier blocks may hold matchups within epsilon of a since beaten minimum.
+    keep = evs <= minimum + epsilon
+    return minimum, player1_indexes[keep], player2_indexes[keep], evs[keep]
+
+
+class _Resources:
+    """
+    Process pool and shared block of a `ParallelMatchupSearch`, released
+    by `release` or when the search is garbage collected.
+    """
+
+    def __init__(self) -> None:
+        self.executor: ProcessPoolExecutor | None = None
+        self.shared: SharedMemory | None = None
+        self.played: SharedMemory | None = None
+
+    def release_shared(self) -> None:
+        if self.shared is not None:
+            self.shared.close()
+            self.shared.unlink()
+            self.shared = None
+
+    def release_played(self) -> None:
+        if self.played is not None:
+            self.played.close()
+            self.played.unlink()
+            self.played = None
+
+    def release(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        self.release_shared()
+        self.release_played()
+
+
+class ParallelMatchupSearch:
+    """
+    Finds every matchup within a tie tolerance of the lowest EV, evaluating
+    all pairs across a pool of worker processes.
+
+    The pool is started on the first search and kept until `close`. A
+    search object is shared rather than copied by `copy.deepcopy`, and
+    concurrent searches from different threads run one at a time.
+    """
+
+    def __init__(self, workers: int | None = None, block_rows: int = 256) -> None:
+        """
+        Args:
+            workers: Number of worker processes, None uses one per CPU.
+                Must be > 0.
+            block_rows: Rows of the EV matrix a worker evaluates at once.
+                Must be > 0.
+        """
+        if workers is not None and workers <= 0:
+            raise ValueError("`workers` must be > 0")
+        if block_rows <= 0:
+            raise ValueError("`block_rows` must be > 0")
+        self._workers: int = workers if workers is not None else os.cpu_count() or 1
+        self._block_rows: int = block_rows
+        self._capacity: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._resources: _Resources = _Resources()
+        self._finalizer = weakref.finalize(self, self._resources.release)
+
+    def __deepcopy__(self, memo: dict[int, object]) -> ParallelMatchupSearch:
+        return self
+
+    def _publish(
+        self, mu: FloatArray, sigma: FloatArray, excluded: BoolArray | None
+    ) -> tuple[str, int]:
+        """
+        Copy ratings into the shared block, growing it if needed.
+        Returns the block name and the capacity it is laid out for.
+        """
+        n = len(mu)
+        if self._resources.shared is None or n > self._capacity:
+            self._resources.release_shared()
+            self._capacity = max(n, 2 * self._capacity, 64)
+            self._resources.shared = SharedMemory(
+                create=True, size=_BYTES_PER_PLAYER * self._capacity
+            )
+        shared_mu, shared_sigma, shared_excluded = _shared_arrays(
+            self._resources.shared, self._capacity, n
+        )
+        shared_mu[:] = mu
+        shared_sigma[:] = sigma
+        shared_excluded[:] = False if excluded is None else excluded
+        return self._resources.shared.name, self._capacity
+
+    def _publish_played(self, bits: ByteArray) -> str:
+        """
+        Copy played pair bits into their shared block, replacing it if its
+        size differs. Returns the block name.
+        """
+        played = self._resources.played
+        if played is None or played.size != max(len(bits), 1):
+            self._resources.release_played()
+            # Shared blocks cannot be empty.
+            played = SharedMemory(create=True, size=max(len(bits), 1))
+            self._resources.played = played
+        np.ndarray((len(bits),), dtype=np.uint8, buffer=played.buf)[:] = bits
+        return played.name
+
+    def _row_ranges(self, n: int) -> list[tuple[int, int]]:
+        """
+        Split rows `0..n-2` into ranges holding roughly equal numbers of pairs.
+        """
+        # Row i pairs with the n - 1 - i players after it.
+        pairs_before = np.cumsum(np.arange(n - 1, 0, -1)) - np.arange(n - 1, 0, -1)
+        tasks = min(self._workers * _TASKS_PER_WORKER, n - 1)
+        bounds = np.searchsorted(
+            pairs_before, np.linspace(0, n * (n - 1) // 2, tasks + 1)[1:-1]
+        ).tolist()
+        edges = sorted(set([0, *bounds, n - 1]))
+        return list(zip(edges[:-1], edges[1:]))
+
+    def search(
+        self,
+        mu: FloatArray,
+        sigma: FloatArray,
+        epsilon: float,
+        excluded: BoolArray | None = None,
+        played_bits: ByteArray | None = None,
+        repeat_penalty: float = 0.0
+    ) -> tuple[IntArray, IntArray, FloatArray]:
+        """
+        Return all matchups `(i, j)`, `i < j`, with EV within `epsilon` of
+        the lowest, as two index arrays and their EVs in row-major order.
+
+        Args:
+            mu: Mu of every player, by internal index.
+            sigma: Sigma of every player, by internal index.
+            epsilon: Tie tolerance, must be >= 0.
+            excluded: Optional mask of players whose matchups are ignored.
+            played_bits: Optional `PlayedPairs.bits` of pairs already played.
+            repeat_penalty: Added to the EV of played pairs.
+
+        Raises:
+            - `ValueError` if there are fewer than two players, or no pair
+            of players is left once `excluded` players are removed.
+        """
+        n = len(mu)
+        if n - (0 if excluded is None else int(excluded.sum())) < 2:
+            raise ValueError("Not enough players to search matchups.")
+        with self._lock:
+            name, capacity = self._publish(mu, sigma, excluded)
+            played_name = None if played_bits is None else self._publish_played(played_bits)
+            if self._resources.executor is None:
+                self._resources.executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            futures = [
+                self._resources.executor.submit(
+                    _search_rows, name, capacity, n, start, stop, epsilon,
+                    self._block_rows, played_name, repeat_penalty
+                )
+                for start, stop in self._row_ranges(n)
+            ]
+            # Collected in row order, whatever order workers finish in.
+            results = [future.result() for future in futures]
+
+        minimum = min(result[0] for result in results)
+        player1_indexes, player2_indexes, evs = (
+            np.concatenate(parts) for parts in zip(*(result[1:] for result in results))
+        )
+        keep = evs <= minimum + epsilon
+        return player1_indexes[keep], player2_indexes[keep], evs[keep]
+
+    def close(self) -> None:
+        """
+        Stop the worker processes and free the shared block. The search
+        can still be used afterwards, restarting the pool.
+        """
+        with self._lock:
+            self._resources.release()
+            self._capacity = 0
@@ -0,0 +1,289 @@
+"""
+Vectorized closed-form Plackett-Luce math for 1v1 matches.
+
+openskill's `PlackettLuce` model is written around general team games and
+builds rating objects for every call. For the two player, one player per team
+case used by `PlackettLuceBackend`, the update collapses to a handful of
+arithmetic expressions. This module evaluates those expressions directly on
+NumPy arrays (or broadcastable scalars) so that whole populations of players
+can be scored at once.
+
+The formulas mirror `PlackettLuce.predict_win` and `PlackettLuce.rate` for
+the default model configuration (no margin, weights, balance or
+`limit_sigma`, default gamma).
+
+Functions
+---------
+normal_cdf: Vectorized standard normal cumulative distribution function.
+win_probability: Probability that one player beats another.
+rate_1v1: Ratings of a winner and loser after a single match.
+replay_1v1: Apply a sequence of matches in place, with scalar math.
+sigma_change_ev: Expected change in total sigma if two players are matched.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from openskill.models import PlackettLuce
+
+
+type FloatArray = NDArray[np.float64]
+
+# Rational approximation coefficients for erf/erfc (Cephes `ndtr.c`).
+# Accurate to double precision over the whole real line.
+_ERF_T = (
+    9.60497373987051638749e0, 9.00260197203842689217e1,
+    2.23200534594684319226e3, 7.00332514112805075473e3,
+    5.55923013010394962768e4,
+)
+_ERF_U = (
+    1.0, 3.35617141647503099647e1, 5.21357949780152679795e2,
+    4.59432382970980127987e3, 2.26290000613890934246e4,
+    4.92673942608635921086e4,
+)
+_ERFC_P = (
+    2.46196981473530512524e-10, 5.64189564831068821977e-1,
+    7.46321056442269912687e0, 4.86371970985681366614e1,
+    1.96520832956077098242e2, 5.26445194995477358631e2,
+    9.34528527171957607540e2, 1.02755188689515710272e3,
+    5.57535335369399327526e2,
+)
+_ERFC_Q = (
+    1.0, 1.32281951154744992508e1, 8.67072140885989742329e1,
+    3.54937778887819891062e2, 9.75708501743205489753e2,
+    1.82390916687909736289e3, 2.24633760818710981792e3,
+    1.65666309194161350182e3, 5.57535340817727675546e2,
+)
+_ERFC_R = (
+    5.64189583547755073984e-1, 1.27536670759978104416e0,
+    5.01905042251180477414e0, 6.16021097993053585195e0,
+    7.40974269950448939160e0, 2.97886665372100240670e0,
+)
+_ERFC_S = (
+    1.0, 2.26052863220117276590e0, 9.39603524938001434673e0,
+    1.20489539808096656605e1, 1.70814450747565897222e1,
+    9.60896809063285878198e0, 3.36907645100081516050e0,
+)
+
+
+def _polevl(x: FloatArray, coefficients: tuple[float, ...]) -> FloatArray:
+    """
+    Evaluate a polynomial with `coefficients` ordered from the highest degree.
+    """
+    result = np.full_like(x, coefficients[0])
+    for coefficient in coefficients[1:]:
+        result = result * x + coefficient
+    return result
+
+
+def _erfc(x: FloatArray) -> FloatArray:
+    """
+    Vectorized complementary error function.
+    """
+    abs_x = np.abs(x)
+    x_squared = x * x
+    erf_small = x * _polevl(x_squared, _ERF_T) / _polevl(x_squared, _ERF_U)
+
+    # Silence overflow for large |x|, those entries take the tail branch.
+    with np.errstate(over="ignore", under="ignore"):
+        exp_term = np.exp(-x_squared)
+        tail = np.where(
+            abs_x < 8,
+            exp_term * _polevl(abs_x, _ERFC_P) / _polevl(abs_x, _ERFC_Q),
+            exp_term * _polevl(abs_x, _ERFC_R) / _polevl(abs_x, _ERFC_S),
+        )
+    tail = np.where(x < 0, 2 - tail, tail)
+    return np.where(abs_x < 1, 1 - erf_small, tail)
+
+
+def normal_cdf(x: ArrayLike) -> FloatArray:
+    """
+    Standard normal cumulative distribution function.
+
+    Matches `statistics.NormalDist().cdf` (used by openskill) to within
+    a few ulp.
+    """
+    x_array = np.asarray(x, dtype=np.float64)
+    return 0.5 * _erfc(-x_array / np.sqrt(2.0))
+
+
+def win_probability(
+    model: PlackettLuce,
+    mu_a: ArrayLike,
+    sigma_a: ArrayLike,
+    mu_b: ArrayLike,
+    sigma_b: ArrayLike
+) -> FloatArray:
+    """
+    Probability that player a beats player b, as given by
+    `PlackettLuce.predict_win`. Arguments broadcast against each other.
+    """
+    mu_a, sigma_a, mu_b, sigma_b = (
+        np.asarray(v, dtype=np.float64) for v in (mu_a, sigma_a, mu_b, sigma_b)
+    )
+    denominator = np.sqrt(
+        2 * model.beta ** 2 + sigma_a * sigma_a + sigma_b * sigma_b
+    )
+    return normal_cdf((mu_a - mu_b) / denominator)
+
+
+def rate_1v1(
+    model: PlackettLuce,
+    mu_winner: ArrayLike,
+    sigma_winner: ArrayLike,
+    mu_loser: ArrayLike,
+    sigma_loser: ArrayLike
+) -> tuple[FloatArray, FloatArray, FloatArray, FloatArray]:
+    """
+    Closed form of `PlackettLuce.rate([[winner], [loser]])`.
+    Arguments broadcast against each other.
+
+    Returns:
+        Tuple of `(mu_winner, sigma_winner, mu_loser, sigma_loser)` after
+        the match.
+    """
+    mu_winner, sigma_winner, mu_loser, sigma_loser = (
+        np.asarray(v, dtype=np.float64)
+        for v in (mu_winner, sigma_winner, mu_loser, sigma_loser)
+    )
+    tau_squared = model.tau * model.tau
+    # Sigma is widened by the dynamics factor `tau` before rating.
+    sigma_squared_winner = sigma_winner * sigma_winner + tau_squared
+    sigma_squared_loser = sigma_loser * sigma_loser + tau_squared
+    c = np.sqrt(sigma_squared_winner + sigma_squared_loser + 2 * model.beta ** 2)
+
+    exp_winner = np.exp(mu_winner / c)
+    exp_loser = np.exp(mu_loser / c)
+    # Plackett-Luce probability of the observed outcome.
+    p_winner = exp_winner / (exp_winner + exp_loser)
+    p_loser = exp_loser / (exp_winner + exp_loser)
+
+    # Both players share the same information term p * (1 - p).
+    information_winner = p_winner * (1 - p_winner)
+    information_loser = p_loser * (1 - p_loser)
+
+    sigma_tilde_winner = np.sqrt(sigma_squared_winner)
+    sigma_tilde_loser = np.sqrt(sigma_squared_loser)
+    delta_winner = (
+        information_winner * (sigma_squared_winner / c ** 2) * (sigma_tilde_winner / c)
+    )
+    delta_loser = (
+        information_loser * (sigma_squared_loser / c ** 2) * (sigma_tilde_loser / c)
+    )
+
+    new_mu_winner = mu_winner + sigma_squared_winner * (1 - p_winner) / c
+    new_mu_loser = mu_loser - sigma_squared_loser * p_loser / c
+    new_sigma_winner = sigma_tilde_winner * np.sqrt(
+        np.maximum(1 - delta_winner, model.kappa)
+    )
+    new_sigma_loser = sigma_tilde_loser * np.sqrt(
+        np.maximum(1 - delta_loser, model.kappa)
+    )
+    return new_mu_winner, new_sigma_winner, new_mu_loser, new_sigma_loser
+
+
+def replay_1v1(
+    model: PlackettLuce,
+    mu: list[float],
+    sigma: list[float],
+    winners: Sequence[int],
+    losers: Sequence[int]
+) -> None:
+    """
+    Apply the matches `winners[k]` beat `losers[k]`, in order, to the
+    per-player `mu`/`sigma` lists in place. Matches where the winner and
+    loser are the same index are skipped.
+
+    Matches depend on each other sequentially, so this is a tight scalar
+    loop over Python floats, which is much faster than NumPy for one match
+    at a time. Results agree with `rate_1v1` to within float tolerance.
+    """
+    tau_squared = model.tau * model.tau
+    two_beta_squared = 2 * model.beta ** 2
+    kappa = model.kappa
+    exp = math.exp
+    sqrt = math.sqrt
+
+    for winner, loser in zip(winners, losers):
+        if winner == loser:
+            continue
+        mu_winner = mu[winner]
+        mu_loser = mu[loser]
+        sigma_squared_winner = sigma[winner] * sigma[winner] + tau_squared
+        sigma_squared_loser = sigma[loser] * sigma[loser] + tau_squared
+        c = sqrt(sigma_squared_winner + sigma_squared_loser + two_beta_squared)
+        c_squared = c * c
+
+        exp_winner = exp(mu_winner / c)
+        exp_loser = exp(mu_loser / c)
+        p_winner = exp_winner / (exp_winner + exp_loser)
+        p_loser = exp_loser / (exp_winner + exp_loser)
+
+        sigma_tilde_winner = sqrt(sigma_squared_winner)
+        sigma_tilde_loser = sqrt(sigma_squared_loser)
+        delta_winner = (
+            p_winner * (1 - p_winner) * (sigma_squared_winner / c_squared)
+            * (sigma_tilde_winner / c)
+        )
+        delta_loser = (
+            p_loser * (1 - p_loser) * (sigma_squared_loser / c_squared)
+            * (sigma_tilde_loser / c)
+        )
+
+        mu[winner] = mu_winner + sigma_squared_winner * (1 - p_winner) / c
+        mu[loser] = mu_loser - sigma_squared_loser * p_loser / c
+        sigma[winner] = sigma_tilde_winner * sqrt(max(1 - delta_winner, kappa))
+        sigma[loser] = sigma_tilde_loser * sqrt(max(1 - delta_loser, kappa))
+
+
+def _total_sigma_change_after_match(
+    model: PlackettLuce,
+    mu_winner: FloatArray,
+    sigma_winner: FloatArray,
+    mu_loser: FloatArray,
+    sigma_loser: FloatArray
+) -> FloatArray:
+    """
+    Change in `sigma_winner + sigma_loser` after a hypothetical match.
+    Positive change implies sigma increased.
+    """
+    _, new_sigma_winner, _, new_sigma_loser = rate_1v1(
+        model, mu_winner, sigma_winner, mu_loser, sigma_loser
+    )
+    return (new_sigma_winner + new_sigma_loser) - (sigma_winner + sigma_loser)
+
+
+def sigma_change_ev(
+    model: PlackettLuce,
+    mu_1: ArrayLike,
+    sigma_1: ArrayLike,
+    mu_2: ArrayLike,
+    sigma_2: ArrayLike
+) -> FloatArray:
+    """
+    Expected change in total sigma if player 1 and player 2 are matched up.
+
+    Both outcomes (player 1 wins vs player 2 wins) are rated, and weighted
+    by the win probability predicted by the model. Arguments broadcast
+    against each other, so passing column and row vectors yields the
+    full pairwise EV matrix in one call.
+    """
+    mu_1, sigma_1, mu_2, sigma_2 = (
+        np.asarray(v, dtype=np.float64) for v in (mu_1, sigma_1, mu_2, sigma_2)
+    )
+    player1_win_chance = win_probability(model, mu_1, sigma_1, mu_2, sigma_2)
+    player2_win_chance = 1 - player1_win_chance
+    player1_win_sigma_change = _total_sigma_change_after_match(
+        model, mu_1, sigma_1, mu_2, sigma_2
+    )
+    player2_win_sigma_change = _total_sigma_change_after_match(
+        model, mu_2, sigma_2, mu_1, sigma_1
+    )
+    return (
+        player1_win_sigma_change * player1_win_chance +
+        player2_win_sigma_change * player2_win_chance
+    )
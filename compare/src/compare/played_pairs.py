@@ -0,0 +1,145 @@
+"""
+Compact record of which pairs of players have already been matched.
+
+Pairs are stored as one bit each in a triangular bitset, so `n` players
+take about `n * n / 16` bytes (25 MB at 20k players). Bits are laid out
+column by column, pair `(i, j)`, `i < j`, at bit `j * (j - 1) / 2 + i`, so
+adding a player appends bits without moving existing ones.
+
+Classes
+-------
+PlayedPairs: Growable triangular bitset of played pairs.
+
+Functions
+---------
+played_mask: Look up pairs in the raw bits of a `PlayedPairs`.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from compare.ev_table import BoolArray
+
+
+type ByteArray = NDArray[np.uint8]
+
+
+def _bit_count(n: int) -> int:
+    return n * (n - 1) // 2
+
+
+def _bit_indexes(
+    player1_indexes: NDArray[np.int64], player2_indexes: NDArray[np.int64]
+) -> NDArray[np.int64]:
+    lower = np.minimum(player1_indexes, player2_indexes)
+    upper = np.maximum(player1_indexes, player2_indexes)
+    return upper * (upper - 1) // 2 + lower
+
+
+def played_mask(bits: ByteArray, player1_indexes: ArrayLike, player2_indexes: ArrayLike) -> BoolArray:
+    """
+    Return whether each pair `(player1_indexes, player2_indexes)` has been
+    played, according to the raw `bits` of a `PlayedPairs`. Arguments
+    broadcast against each other, and a player is never paired with itself.
+    """
+    player1_indexes = np.asarray(player1_indexes, dtype=np.int64)
+    player2_indexes = np.asarray(player2_indexes, dtype=np.int64)
+    distinct = player1_indexes != player2_indexes
+    # Self pairs would index past the bits of the last player.
+    indexes = np.where(distinct, _bit_indexes(player1_indexes, player2_indexes), 0)
+    return distinct & ((bits[indexes >> 3] >> (indexes & 7).astype(np.uint8)) & 1).astype(np.bool_)
+
+
+class PlayedPairs:
+    """
+    Triangular bitset of pairs of players, by internal index, that have
+    been matched. Lookups cost O(1) per pair.
+    """
+
+    def __init__(self) -> None:
+        self._size: int = 0
+        # Grown by doubling, only the first `_byte_count(_size)` bytes are used.
+        self._bits: ByteArray = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _byte_count(n: int) -> int:
+        return (_bit_count(n) + 7) // 8
+
+    def resize(self, n: int) -> None:
+        """
+        Grow the bitset to `n` players, with no pairs of new players played.
+        """
+        if n < self._size:
+            raise ValueError("Players cannot be removed.")
+        needed = self._byte_count(n)
+        if needed > len(self._bits):
+            bits = np.zeros(max(needed, 2 * len(self._bits)), dtype=np.uint8)
+            bits[:len(self._bits)] = self._bits
+            self._bits = bits
+        self._size = n
+
+    @property
+    def bits(self) -> ByteArray:
+        """
+        The used bytes of the bitset, for `played_mask`.
+        """
+        return self._bits[:self._byte_count(self._size)]
+
+    def add(self, player1_indexes: ArrayLike, player2_indexes: ArrayLike) -> None:
+        """
+        Record the pairs `(player1_indexes[i], player2_indexes[i])` as played.
+        Self pairs are ignored.
+        """
+        player1_indexes = np.asarray(player1_indexes, dtype=np.int64)
+        player2_indexes = np.asarray(player2_indexes, dtype=np.int64)
+        if np.any(np.maximum(player1_indexes, player2_indexes) >= self._size):
+            raise ValueError("Player index out of range.")
+        distinct = player1_indexes != player2_indexes
+        indexes = _bit_indexes(player1_indexes[distinct], player2_indexes[distinct])
+        np.bitwise_or.at(
+            self._bits, indexes >> 3, np.left_shift(1, indexes & 7).astype(np.uint8)
+        )
+
+    def contains(self, player1_index: int, player2_index: int) -> bool:
+        """
+        Return whether the pair has been played.
+        """
+        if player1_index == player2_index:
+            return False
+        index = int(_bit_indexes(
+            np.array(player1_index, dtype=np.int64), np.array(player2_index, dtype=np.int64)
+        ))
+        return bool((self._bits[index >> 3] >> (index & 7)) & 1)
+
+    def mask(self, player1_indexes: ArrayLike, player2_indexes: ArrayLike) -> BoolArray:
+        """
+        Return whether each pair has been played, see `played_mask`.
+        """
+        return played_mask(self._bits, player1_indexes, player2_indexes)
+
+    def count(self) -> int:
+        """
+        Return the number of distinct pairs played.
+        """
+        return int(np.unpackbits(self.bits).sum())
+
+    @classmethod
+    def from_bits(cls, bits: ByteArray, n: int) -> PlayedPairs:
+        """
+        Rebuild a bitset of `n` players from its `bits`.
+
+        Raises:
+            - `ValueError` if `bits` does not hold exactly `n` players.
+        """
+        bits = np.asarray(bits)
+        if bits.dtype != np.uint8 or bits.shape != (cls._byte_count(n),):
+            raise ValueError("Played pair bits do not match the player count.")
+        played = cls()
+        played._bits = bits.copy()
+        played._size = n
+        return played
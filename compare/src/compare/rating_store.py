@@ -0,0 +1,197 @@
+"""
+Compact struct-of-arrays storage for per-player ratings.
+
+Instead of one rating object per player, `RatingStore` keeps every
+player's mean (`mu`) and uncertainty (`sigma`) in contiguous float64
+arrays, with a dense id -> index array next to them, and a dict for the
+few ids too large for it. This keeps memory per player small and lets backends run vectorized operations over the whole
+population.
+
+Classes
+-------
+RatingStore: Contiguous mu/sigma arrays addressed by player id or index.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from compare.plackett_luce import FloatArray
+
+
+type IntArray = NDArray[np.intp]
+
+# Marks ids without a player in the dense id -> index array.
+_MISSING = -1
+
+# Ids below the larger of these go in the dense id -> index array, any
+# others in a dict, so one huge id cannot allocate a huge array.
+_DENSE_IDS_MINIMUM = 1 << 16
+_DENSE_IDS_PER_PLAYER = 4
+
+
+def _dense_id_limit(players: int) -> int:
+    return max(_DENSE_IDS_MINIMUM, _DENSE_IDS_PER_PLAYER * players)
+
+
+class RatingStore:
+    """
+    Ratings of a growing population of players.
+
+    Players get dense internal indexes `0..n-1` in insertion order and are
+    addressed externally by a non-negative integer id. Arrays grow
+    geometrically, so adding a player is amortized O(1).
+
+    The id -> index lookup is a dense array sized by the largest id, which
+    suits the small, contiguous ids used for songs. Ids beyond a few times
+    the number of players are looked up in a dict instead.
+    """
+
+    __slots__ = ("_size", "_mu", "_sigma", "_ids", "_id_to_index", "_sparse_ids")
+
+    def __init__(self) -> None:
+        self._size: int = 0
+        self._mu: FloatArray = np.empty(0, dtype=np.float64)
+        self._sigma: FloatArray = np.empty(0, dtype=np.float64)
+        self._ids: IntArray = np.empty(0, dtype=np.intp)
+        self._id_to_index: IntArray = np.empty(0, dtype=np.intp)
+        self._sparse_ids: dict[int, int] = {}
+
+    @classmethod
+    def from_arrays(cls, ids: ArrayLike, mu: ArrayLike, sigma: ArrayLike) -> RatingStore:
+        """
+        Build a store from per-player arrays, with index `i` holding player
+        `ids[i]`.
+
+        Raises:
+            - `ValueError` if the arrays differ in length, or any id is
+            negative or duplicated.
+        """
+        id_array = np.asarray(ids, dtype=np.intp)
+        mu_array = np.asarray(mu, dtype=np.float64)
+        sigma_array = np.asarray(sigma, dtype=np.float64)
+        if not (id_array.shape == mu_array.shape == sigma_array.shape) or id_array.ndim != 1:
+            raise ValueError("`ids`, `mu` and `sigma` must be 1D arrays of equal length.")
+        if (id_array < 0).any():
+            raise ValueError("ids must be >= 0.")
+        if len(np.unique(id_array)) != len(id_array):
+            raise ValueError("ids must be unique.")
+
+        store = cls()
+        store._size = len(id_array)
+        store._mu = mu_array.copy()
+        store._sigma = sigma_array.copy()
+        store._ids = id_array.copy()
+        dense = id_array < _dense_id_limit(len(id_array))
+        store._id_to_index = np.full(
+            int(id_array[dense].max(initial=-1)) + 1, _MISSING, dtype=np.intp
+        )
+        store._id_to_index[id_array[dense]] = np.flatnonzero(dense)
+        store._sparse_ids = {
+            int(id_array[index]): int(index) for index in np.flatnonzero(~dense)
+        }
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, id: int) -> bool:
+        if 0 <= id < len(self._id_to_index):
+            return bool(self._id_to_index[id] != _MISSING)
+        return id in self._sparse_ids
+
+    @property
+    def mu(self) -> FloatArray:
+        """
+        Per-player mu, indexed by internal index. Writable view.
+        """
+        return self._mu[:self._size]
+
+    @property
+    def sigma(self) -> FloatArray:
+        """
+        Per-player sigma, indexed by internal index. Writable view.
+        """
+        return self._sigma[:self._size]
+
+    @property
+    def ids(self) -> IntArray:
+        """
+        Per-player id, indexed by internal index. Read-only view.
+        """
+        ids = self._ids[:self._size]
+        ids.flags.writeable = False
+        return ids
+
+    def add(self, id: int, mu: float, sigma: float) -> int:
+        """
+        Add a player and return its internal index.
+
+        Raises:
+            - `ValueError` if `id` is negative or already exists.
+        """
+        if id < 0:
+            raise ValueError(f"id {id} is not >= 0.")
+        if id in self:
+            raise ValueError(f"Player with id {id} already exists.")
+
+        index = self._size
+        if index == len(self._mu):
+            capacity = max(16, 2 * len(self._mu))
+            for name in ("_mu", "_sigma", "_ids"):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:index] = old[:index]
+                setattr(self, name, new)
+        limit = _dense_id_limit(index + 1)
+        if len(self._id_to_index) <= id < limit:
+            lookup = np.full(
+                min(max(id + 1, 2 * len(self._id_to_index)), limit), _MISSING, dtype=np.intp
+            )
+            lookup[:len(self._id_to_index)] = self._id_to_index
+            self._id_to_index = lookup
+
+        self._mu[index] = mu
+        self._sigma[index] = sigma
+        self._ids[index] = id
+        if id < len(self._id_to_index):
+            self._id_to_index[id] = index
+        else:
+            self._sparse_ids[id] = index
+        self._size += 1
+        return index
+
+    def index_of(self, id: int) -> int:
+        """
+        Return the internal index of player `id`.
+
+        Raises:
+            - `ValueError` if the player does not exist.
+        """
+        if id not in self:
+            raise ValueError("Player does not exist.")
+        if id < len(self._id_to_index):
+            return int(self._id_to_index[id])
+        return self._sparse_ids[id]
+
+    def indexes_of(self, ids: ArrayLike) -> IntArray:
+        """
+        Vectorized `index_of` over an array of ids.
+
+        Raises:
+            - `ValueError` if any of the players does not exist.
+        """
+        id_array = np.asarray(ids, dtype=np.intp)
+        if (id_array < 0).any():
+            raise ValueError("Player does not exist.")
+        dense = id_array < len(self._id_to_index)
+        indexes = np.full(id_array.shape, _MISSING, dtype=np.intp)
+        indexes[dense] = self._id_to_index[id_array[dense]]
+        if not dense.all():
+            indexes[~dense] = [
+                self._sparse_ids.get(int(id), _MISSING) for id in id_array[~dense]
+            ]
+        if (indexes == _MISSING).any():
+            raise ValueError("Player does not exist.")
+        return indexes
@@ -3,9 +3,11 @@ Classes in order to receive input from, and render to, a matchmaking GUI.
 """
 
 import curses
+import math
 from enum import Enum, auto
 from typing import Protocol, override
 
+from compare.matchmaking import CertaintySummary
 from compare.song import Song
 
 class MatchInput(Enum):
@@ -14,13 +16,49 @@ class MatchInput(Enum):
 
     SONG_A_WINS indicates the player has chosen songa to beat songb.
     SONG_B_WINS indicates the player has chosen songb to beat songa.
-    SWAP_PLAYING_SONG indicata
+    SWAP_PLAYING_SONG indicates the player wants to hear the other song.
+    NONE indicates there was no input.
+
+    In group matches, SONG_X_WINS places song X (a to e) above every song
+    not yet placed, and SWAP_PLAYING_SONG moves playback to the next song.
+    1v1 matches ignore SONG_C_WINS to SONG_E_WINS.
     """
     SONG_A_WINS = auto()
     SONG_B_WINS = auto()
+    SONG_C_WINS = auto()
+    SONG_D_WINS = auto()
+    SONG_E_WINS = auto()
     SWAP_PLAYING_SONG = auto()
     NONE = auto()
 
+# Inputs selecting each song of a match, in song order.
+SONG_INPUTS: tuple[MatchInput, ...] = (
+    MatchInput.SONG_A_WINS,
+    MatchInput.SONG_B_WINS,
+    MatchInput.SONG_C_WINS,
+    MatchInput.SONG_D_WINS,
+    MatchInput.SONG_E_WINS,
+)
+# Largest group match the inputs can rank.
+MAX_GROUP_SIZE = len(SONG_INPUTS)
+
+# Histogram bar heights, from empty to full.
+_BARS = " ▁▂▃▄▅▆▇█"
+
+
+def certainty_lines(summary: CertaintySummary) -> list[str]:
+    """
+    Format a `CertaintySummary` as a line of its mean and quantiles, and a
+    line of its histogram as bars, least certain first.
+    """
+    quantiles = "/".join(f"{100 * q:.0f}" for q in summary.quantiles)
+    peak = max(summary.histogram)
+    bars = "".join(
+        _BARS[0 if peak == 0 else math.ceil(count / peak * (len(_BARS) - 1))]
+        for count in summary.histogram
+    )
+    return [f"certainty {summary.mean:.0%} ({quantiles}%)", f"0% [{bars}] 100%"]
+
 class MatchRenderer(Protocol):
     def get_input(self) -> MatchInput:
         """
@@ -32,10 +70,31 @@ class MatchRenderer(Protocol):
         song1: Song,
         song2: Song,
         song1_is_playing: bool,
-        song_stats: dict[Song, tuple[int, float]]
+        song_stats: dict[Song, tuple[int, float]],
+        certainty: CertaintySummary | None = None
     ) -> None:
         """
-        Renders the current matchmaking status to the GUI.
+        Renders the current matchmaking status to the GUI, with the
+        overall rating certainty if `certainty` is given.
+        """
+        ...
+
+    def render_group(self,
+        songs: list[Song],
+        playing_song: int,
+        placed: list[int],
+        song_stats: dict[Song, tuple[int, float]],
+        certainty: CertaintySummary | None = None
+    ) -> None:
+        """
+        Renders the status of a group match to the GUI.
+
+        Args:
+            songs: Songs of the match, at most `MAX_GROUP_SIZE`.
+            playing_song: Index in `songs` of the song currently playing.
+            placed: Indexes in `songs` placed so far, best first.
+            song_stats: Rank and rating of every song.
+            certainty: Overall rating certainty, if shown.
         """
         ...
 
@@ -67,6 +126,9 @@ class CursesMatchRenderer(MatchRenderer):
             return MatchInput.SONG_A_WINS
         elif char_input == ord('2'):
             return MatchInput.SONG_B_WINS
+        elif ord('a') <= char_input < ord('a') + MAX_GROUP_SIZE:
+            # Letters match the song labels, for group matches.
+            return SONG_INPUTS[char_input - ord('a')]
         return MatchInput.NONE
 
     def _render_player(
@@ -98,15 +160,44 @@ class CursesMatchRenderer(MatchRenderer):
         )
         self._window.move(0, 0)
 
+    def _render_group_player(
+        self,
+        songs: list[Song],
+        playing_song: int,
+        placed: list[int]
+    ) -> None:
+        for i, song in enumerate(songs):
+            place = f"[{placed.index(i) + 1}] " if i in placed else ""
+            self._window.addnstr(
+                self._player_bounds[1] + 3 * i,
+                self._player_bounds[0],
+                f"{chr(ord('a') + i)}: {place}{song.title}",
+                self._player_bounds[2] - self._player_bounds[0],
+                curses.A_BOLD if i == playing_song else curses.A_NORMAL,
+            )
+        self._window.move(0, 0)
+
+    def _render_certainty(self, certainty: CertaintySummary | None) -> None:
+        if certainty is None:
+            return
+        # Below the songs of the largest group match.
+        for i, line in enumerate(certainty_lines(certainty)):
+            self._window.addnstr(
+                self._player_bounds[1] + 3 * MAX_GROUP_SIZE + i,
+                self._player_bounds[0],
+                line,
+                self._player_bounds[2] - self._player_bounds[0],
+                curses.A_NORMAL,
+            )
+
     def _render_songlist(
         self,
-        song1: Song,
-        song2: Song,
+        match_songs: list[Song],
         song_ranks: dict[Song, tuple[int, float]]
     ) -> None:
         for song, info in song_ranks.items():
             highlight = curses.A_NORMAL
-            if song in [song1, song2]:
+            if song in match_songs:
                 highlight = curses.A_BOLD
             self._window.addnstr(
                 self._song_list_bounds[1] + info[0],
@@ -134,9 +225,25 @@ class CursesMatchRenderer(MatchRenderer):
         song1: Song,
         song2: Song,
         song1_is_playing: bool,
-        song_stats: dict[Song, tuple[int, float]]
+        song_stats: dict[Song, tuple[int, float]],
+        certainty: CertaintySummary | None = None
     ) -> None:
         self._window.clear()
         self._render_player(song1, song2, song1_is_playing)
-        self._render_songlist(song1, song2, song_stats)
+        self._render_certainty(certainty)
+        self._render_songlist([song1, song2], song_stats)
+        self._window.refresh()
+
+    @override
+    def render_group(self,
+        songs: list[Song],
+        playing_song: int,
+        placed: list[int],
+        song_stats: dict[Song, tuple[int, float]],
+        certainty: CertaintySummary | None = None
+    ) -> None:
+        self._window.clear()
+        self._render_group_player(songs, playing_song, placed)
+        self._render_certainty(certainty)
+        self._render_songlist(songs, song_stats)
         self._window.refresh()
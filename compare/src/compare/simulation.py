@@ -0,0 +1,333 @@
+"""
+Offline simulation of matchmaking efficiency.
+
+Songs are given synthetic ground-truth skills, and a noisy oracle decides
+each match picked by a `RatingBackend` in place of the curses UI. Rank
+correlation with the ground truth (Kendall tau and Spearman rho) is
+recorded against both the number of comparisons and the CPU time spent in
+the backend, so strategies can be judged on information per comparison
+and on compute per comparison.
+
+Seeds are run in parallel across a process pool. Backend factories must
+therefore be picklable, e.g. a module level function or a
+`functools.partial` of one, such as `plackett_luce_factory`.
+
+Run with `python -m compare.simulation --help`. A SAMPLED search with a
+single sampled matchup picks uniformly random pairs, giving a baseline.
+Searches are compared on the comparisons needed to reach `--target-rho`.
+
+Classes
+-------
+SimulationConfig: Population, oracle and evaluation settings.
+SimulationResult: Rank correlation over time for a single seed.
+
+Functions
+---------
+kendall_tau: Kendall rank correlation of two score arrays.
+spearman_rho: Spearman rank correlation of two score arrays.
+comparisons_to_converge: Comparisons a result took to reach a rank correlation.
+plackett_luce_factory: Picklable `PlackettLuceBackend` factory.
+simulate: Run a single seeded simulation.
+run_simulations: Run many seeds across a process pool.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from compare.matchmaking import MatchupSearch, PlackettLuceBackend, RatingBackend
+from compare.plackett_luce import FloatArray
+
+
+# Creates a backend from a seed.
+type BackendFactory = Callable[[int], RatingBackend]
+
+# Rows of the pairwise comparison matrix evaluated at once by `kendall_tau`.
+_KENDALL_BLOCK_ROWS = 512
+
+
+def kendall_tau(x: ArrayLike, y: ArrayLike) -> float:
+    """
+    Return the Kendall tau-a rank correlation of paired scores `x` and `y`.
+
+    Evaluates all pairs in blocks, costing O(n^2) time and O(n) memory
+    per block row.
+    """
+    x_array = np.asarray(x, dtype=np.float64)
+    y_array = np.asarray(y, dtype=np.float64)
+    n = len(x_array)
+    if n < 2:
+        raise ValueError("At least two scores are needed.")
+    concordance = 0.0
+    for start in range(0, n, _KENDALL_BLOCK_ROWS):
+        rows = slice(start, min(start + _KENDALL_BLOCK_ROWS, n))
+        signs = (
+            np.sign(x_array[rows, None] - x_array[None, :])
+            * np.sign(y_array[rows, None] - y_array[None, :])
+        )
+        concordance += float(signs.sum())
+    # Every pair is counted in both orders.
+    return concordance / (n * (n - 1))
+
+
+def _rank(scores: FloatArray) -> FloatArray:
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[np.argsort(scores, kind="stable")] = np.arange(len(scores))
+    return ranks
+
+
+def spearman_rho(x: ArrayLike, y: ArrayLike) -> float:
+    """
+    Return the Spearman rank correlation of paired scores `x` and `y`.
+    Ties are ranked in order of appearance.
+    """
+    x_array = np.asarray(x, dtype=np.float64)
+    y_array = np.asarray(y, dtype=np.float64)
+    if len(x_array) < 2:
+        raise ValueError("At least two scores are needed.")
+    return float(np.corrcoef(_rank(x_array), _rank(y_array))[0, 1])
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """
+    Settings of a simulated rating session.
+
+    Songs get skills drawn from a standard normal distribution. The oracle
+    adds independent `N(0, noise^2)` noise to both skills and picks the
+    higher, so `noise` is the per-match judgement noise in units of the
+    skill spread. Rank correlations are recorded every `evaluate_every`
+    comparisons.
+    """
+    pool_size: int = 100
+    comparisons: int = 1000
+    noise: float = 0.5
+    evaluate_every: int = 50
+
+    def __post_init__(self) -> None:
+        if self.pool_size < 2:
+            raise ValueError("`pool_size` must be >= 2")
+        if self.comparisons < 0 or self.evaluate_every <= 0:
+            raise ValueError("`comparisons` must be >= 0 and `evaluate_every` > 0")
+        if self.noise < 0:
+            raise ValueError("`noise` must be >= 0")
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    """
+    Rank correlation with the ground truth after `comparisons[i]`
+    comparisons, which took `cpu_seconds[i]` of CPU time in the backend
+    (`pick_two_players` plus `update`). `upset_rate` is the fraction of
+    matches the oracle decided against the ground truth.
+    """
+    seed: int
+    comparisons: list[int]
+    cpu_seconds: list[float]
+    kendall_tau: list[float]
+    spearman_rho: list[float]
+    upset_rate: float
+
+
+def comparisons_to_converge(result: SimulationResult, target_rho: float) -> int | None:
+    """
+    Return the first evaluated number of comparisons at which the Spearman
+    rho of `result` reached `target_rho`, or None if it never did.
+    """
+    for comparisons, rho in zip(result.comparisons, result.spearman_rho):
+        if rho >= target_rho:
+            return comparisons
+    return None
+
+
+def _make_plackett_luce(
+    seed: int, search: MatchupSearch, relative_matchup_epsilon: float, **kwargs: int
+) -> RatingBackend:
+    return PlackettLuceBackend(
+        rng_seed=seed,
+        search=search,
+        relative_matchup_epsilon=relative_matchup_epsilon,
+        **kwargs
+    )
+
+
+def plackett_luce_factory(
+    search: MatchupSearch = MatchupSearch.EXHAUSTIVE,
+    relative_matchup_epsilon: float = 0.01,
+    **kwargs: int
+) -> BackendFactory:
+    """
+    Return a picklable factory of seeded `PlackettLuceBackend`s.
+    Extra keyword arguments are passed on to the backend.
+    """
+    return partial(
+        _make_plackett_luce,
+        search=search,
+        relative_matchup_epsilon=relative_matchup_epsilon,
+        **kwargs
+    )
+
+
+def simulate(factory: BackendFactory, config: SimulationConfig, seed: int) -> SimulationResult:
+    """
+    Run a single simulation, seeding the skills, the oracle and the backend.
+    """
+    rng = np.random.default_rng(seed)
+    skills = rng.standard_normal(config.pool_size)
+    backend = factory(seed)
+    for song_id in range(config.pool_size):
+        backend.new_player(song_id)
+
+    comparisons: list[int] = []
+    cpu_seconds: list[float] = []
+    taus: list[float] = []
+    rhos: list[float] = []
+    upsets = 0
+    cpu_time = 0.0
+
+    def evaluate(played: int) -> None:
+        ranks = backend.ranks()
+        # Negate ranks so higher is better, as with skills.
+        estimate = -np.array([ranks[song_id] for song_id in range(config.pool_size)])
+        comparisons.append(played)
+        cpu_seconds.append(cpu_time)
+        taus.append(kendall_tau(estimate, skills))
+        rhos.append(spearman_rho(estimate, skills))
+
+    evaluate(0)
+    for played in range(1, config.comparisons + 1):
+        start = time.process_time()
+        player1, player2 = backend.pick_two_players()
+        cpu_time += time.process_time() - start
+
+        performance = skills[[player1, player2]] + config.noise * rng.standard_normal(2)
+        winner, loser = (
+            (player1, player2) if performance[0] >= performance[1] else (player2, player1)
+        )
+        upsets += int(skills[winner] < skills[loser])
+
+        start = time.process_time()
+        backend.update(winner, loser)
+        cpu_time += time.process_time() - start
+
+        if played % config.evaluate_every == 0 or played == config.comparisons:
+            evaluate(played)
+
+    return SimulationResult(
+        seed=seed,
+        comparisons=comparisons,
+        cpu_seconds=cpu_seconds,
+        kendall_tau=taus,
+        spearman_rho=rhos,
+        upset_rate=upsets / config.comparisons if config.comparisons else 0.0
+    )
+
+
+def run_simulations(
+    factory: BackendFactory,
+    config: SimulationConfig,
+    seeds: Sequence[int],
+    workers: int | None = None
+) -> list[SimulationResult]:
+    """
+    Run `simulate` for every seed, in order of `seeds`.
+
+    Args:
+        factory: Picklable backend factory, see `plackett_luce_factory`.
+        config: Simulation settings shared by every seed.
+        seeds: Seeds to run.
+        workers: Number of worker processes. 1 runs in this process,
+            None uses one per CPU.
+    """
+    if workers == 1:
+        return [simulate(factory, config, seed) for seed in seeds]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            simulate, [factory] * len(seeds), [config] * len(seeds), seeds
+        ))
+
+
+def _summary_table(results: list[SimulationResult], target_rho: float) -> str:
+    """
+    Mean CPU time and rank correlation across seeds at each evaluation,
+    and the mean comparisons to reach `target_rho` over seeds that did.
+    """
+    header = f"{'comparisons':>12}{'cpu ms':>10}{'kendall':>10}{'spearman':>10}"
+    lines = [header, "-" * len(header)]
+    for i, comparisons in enumerate(results[0].comparisons):
+        lines.append(
+            f"{comparisons:>12}"
+            f"{1000 * np.mean([r.cpu_seconds[i] for r in results]):>10.1f}"
+            f"{np.mean([r.kendall_tau[i] for r in results]):>10.3f}"
+            f"{np.mean([r.spearman_rho[i] for r in results]):>10.3f}"
+        )
+    converged = [
+        count for r in results
+        if (count := comparisons_to_converge(r, target_rho)) is not None
+    ]
+    lines.append(
+        f"comparisons to spearman >= {target_rho}: "
+        + (f"{np.mean(converged):.0f}" if converged else "-")
+        + f" ({len(converged)}/{len(results)} seeds)"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m compare.simulation",
+        description="Simulate rating sessions against a noisy oracle."
+    )
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--comparisons", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--evaluate-every", type=int, default=50)
+    parser.add_argument("--seeds", type=int, default=8, help="Number of seeds, from 0.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--search",
+        choices=[search.name.lower() for search in MatchupSearch],
+        default=MatchupSearch.EXHAUSTIVE.name.lower()
+    )
+    parser.add_argument("--epsilon", type=float, default=0.01)
+    parser.add_argument("--sampled-matchups", type=int, default=4096)
+    parser.add_argument("--tier-size", type=int, default=64)
+    parser.add_argument("--target-rho", type=float, default=0.9)
+    parser.add_argument("--output", type=Path, default=None, help="Save results as JSON.")
+    args = parser.parse_args(argv)
+
+    config = SimulationConfig(
+        args.pool_size, args.comparisons, args.noise, args.evaluate_every
+    )
+    factory = plackett_luce_factory(
+        MatchupSearch[args.search.upper()],
+        args.epsilon,
+        sampled_matchups=args.sampled_matchups,
+        tier_size=args.tier_size
+    )
+    results = run_simulations(factory, config, range(args.seeds), args.workers)
+    print(_summary_table(results, args.target_rho))
+    if args.output is not None:
+        args.output.write_text(json.dumps({
+            "config": asdict(config),
+            "search": args.search,
+            "epsilon": args.epsilon,
+            "sampled_matchups": args.sampled_matchups,
+            "tier_size": args.tier_size,
+            "target_rho": args.target_rho,
+            "results": [asdict(result) for result in results],
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
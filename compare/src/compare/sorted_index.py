@@ -0,0 +1,181 @@
+"""
+Array-backed sorted index over dense integer items.
+
+Matchmaking and ranking both need players kept in order of some rating
+derived key, with cheap repositioning when a single player's key changes.
+`SortedIndex` stores the order in contiguous NumPy arrays and moves items
+with bisect lookups plus a block shift, so a key change costs
+O(log n + d) for a move of distance d. Items are located by bisecting on
+their key, so the shift is a plain memory move with no per-item
+bookkeeping.
+
+Classes
+-------
+SortedIndex: Items ordered by ascending `(key, tiebreak)`.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.typing import NDArray
+
+from compare.plackett_luce import FloatArray
+
+
+type IntArray = NDArray[np.intp]
+
+
+class SortedIndex:
+    """
+    Dense items `0..n-1` kept in ascending `(key, tiebreak)` order.
+
+    Items are added in order with `insert` (item `n` is the next item)
+    and never removed. The item at a position is available in O(1), and
+    the position of an item in O(log n).
+    """
+
+    def __init__(self) -> None:
+        self._size: int = 0
+        # Per position, in sorted order.
+        self._keys: FloatArray = np.empty(0, dtype=np.float64)
+        self._tiebreaks: IntArray = np.empty(0, dtype=np.intp)
+        self._items: IntArray = np.empty(0, dtype=np.intp)
+        # Per item.
+        self._item_keys: FloatArray = np.empty(0, dtype=np.float64)
+        self._item_tiebreaks: IntArray = np.empty(0, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, capacity: int) -> None:
+        """
+        Grow the backing arrays geometrically to fit `capacity` items.
+        """
+        if capacity <= len(self._keys):
+            return
+        new_capacity = max(capacity, 2 * len(self._keys), 16)
+        for name in ("_keys", "_tiebreaks", "_items", "_item_keys", "_item_tiebreaks"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _search(self, key: float, tiebreak: int) -> int:
+        """
+        Return the position `(key, tiebreak)` would be inserted at.
+        """
+        keys = self._keys[:self._size]
+        low = int(keys.searchsorted(key, side="left"))
+        if low == self._size or keys[low] != key:
+            return low
+        # Equal keys are ordered by tiebreak.
+        high = int(keys.searchsorted(key, side="right"))
+        return low + int(self._tiebreaks[low:high].searchsorted(tiebreak))
+
+    def _locate(self, item: int) -> int:
+        """
+        Return the position of `item`, by searching for its key.
+        """
+        position = self._search(float(self._item_keys[item]), int(self._item_tiebreaks[item]))
+        # Items with equal key and tiebreak are adjacent, in no particular order.
+        while self._items[position] != item:
+            position += 1
+        return position
+
+    def _place(self, position: int, item: int, key: float, tiebreak: int) -> None:
+        self._keys[position] = key
+        self._tiebreaks[position] = tiebreak
+        self._items[position] = item
+        self._item_keys[item] = key
+        self._item_tiebreaks[item] = tiebreak
+
+    def insert(self, key: float, tiebreak: int) -> int:
+        """
+        Add the next item with `key`, returning its item number.
+        """
+        item = self._size
+        self._reserve(item + 1)
+        position = self._search(key, tiebreak)
+        # Shift the tail one to the right.
+        tail = slice(position, self._size)
+        shifted = slice(position + 1, self._size + 1)
+        # NumPy buffers overlapping slice assignments, so shifting in place is safe.
+        self._keys[shifted] = self._keys[tail]
+        self._tiebreaks[shifted] = self._tiebreaks[tail]
+        self._items[shifted] = self._items[tail]
+        self._size += 1
+        self._place(position, item, key, tiebreak)
+        return item
+
+    def update(self, item: int, key: float) -> None:
+        """
+        Change the key of `item`, moving it to its new position.
+        """
+        if self._item_keys[item] == key:
+            return
+        old_position = self._locate(item)
+        tiebreak = int(self._item_tiebreaks[item])
+
+        # Search as if the item were removed, by comparing against the
+        # neighbourhood without it.
+        new_position = self._search(key, tiebreak)
+        if new_position > old_position:
+            # Item moves right, everything between shifts left.
+            new_position -= 1
+            source = slice(old_position + 1, new_position + 1)
+            target = slice(old_position, new_position)
+        else:
+            # Item moves left, everything between shifts right.
+            source = slice(new_position, old_position)
+            target = slice(new_position + 1, old_position + 1)
+        self._keys[target] = self._keys[source]
+        self._tiebreaks[target] = self._tiebreaks[source]
+        self._items[target] = self._items[source]
+        self._place(new_position, item, key, tiebreak)
+
+    def rebuild(self, keys: FloatArray, tiebreaks: IntArray) -> None:
+        """
+        Replace the whole index with items `0..len(keys)-1`, sorting once.
+        """
+        n = len(keys)
+        self._size = 0
+        self._reserve(n)
+        order = np.lexsort((tiebreaks, keys))
+        self._keys[:n] = keys[order]
+        self._tiebreaks[:n] = tiebreaks[order]
+        self._items[:n] = order
+        self._item_keys[:n] = keys
+        self._item_tiebreaks[:n] = tiebreaks
+        self._size = n
+
+    def position(self, item: int) -> int:
+        """
+        Return the sorted position (0 based) of `item`.
+        """
+        return self._locate(item)
+
+    def positions(self) -> IntArray:
+        """
+        Return the sorted position of every item, indexed by item.
+        """
+        positions = np.empty(self._size, dtype=np.intp)
+        positions[self.items()] = np.arange(self._size)
+        return positions
+
+    def items(self, start: int = 0, stop: int | None = None) -> IntArray:
+        """
+        Return the items in sorted order between positions `start` and `stop`.
+        """
+        stop = self._size if stop is None else min(stop, self._size)
+        return self._items[max(start, 0):stop]
+
+    def neighbours(self, item: int, radius: int) -> IntArray:
+        """
+        Return up to `radius` items either side of `item` in sorted order,
+        excluding `item` itself.
+        """
+        position = self.position(item)
+        return np.concatenate([
+            self.items(position - radius, position),
+            self.items(position + 1, position + 1 + radius)
+        ])
@@ -0,0 +1,98 @@
+"""
+Speculative matchmaking while a match is in progress.
+
+A match takes the user tens of seconds, during which the CPU is idle.
+`SpeculativePicker` uses that time to copy the rating backend, apply a
+possible result of the current match to the copy and pick the next matchup
+on it, once for each result, in a background thread. Once the result is known,
+the matching copy is already in the state the backend would reach after
+`update` plus `pick_two_players`, so it can replace the backend directly.
+
+Classes
+-------
+SpeculativePicker: Prepares the next matchup for both outcomes of a match.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from copy import deepcopy
+
+from compare.matchmaking import PlayerID, RatingBackend
+
+
+def _advance(
+    backend: RatingBackend, winner: PlayerID, loser: PlayerID
+) -> tuple[RatingBackend, tuple[PlayerID, PlayerID]]:
+    backend = deepcopy(backend)
+    backend.update(winner, loser)
+    return backend, backend.pick_two_players()
+
+
+class SpeculativePicker:
+    """
+    Runs `update` plus `pick_two_players` for both outcomes of a match on
+    copies of a backend, in a single background thread.
+
+    Backends must support `copy.deepcopy` while other threads read them,
+    and the original backend must not be mutated between `prepare` and
+    `take`.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="speculative-pick"
+        )
+        self._pending: dict[
+            tuple[PlayerID, PlayerID],
+            Future[tuple[RatingBackend, tuple[PlayerID, PlayerID]]]
+        ] = {}
+
+    def prepare(self, backend: RatingBackend, player1: PlayerID, player2: PlayerID) -> None:
+        """
+        Start preparing the next matchup after `player1` vs `player2`,
+        for either result. Discards any previously prepared matchups.
+
+        Returns immediately. The backend is copied in the background
+        thread, one result at a time, and only read, so it is safe to read
+        from `backend` while preparation runs.
+        """
+        self.cancel()
+        for winner, loser in ((player1, player2), (player2, player1)):
+            self._pending[(winner, loser)] = self._executor.submit(
+                _advance, backend, winner, loser
+            )
+
+    def take(
+        self, winner: PlayerID, loser: PlayerID
+    ) -> tuple[RatingBackend, tuple[PlayerID, PlayerID]] | None:
+        """
+        Return the backend with `winner` beating `loser` applied, and the
+        matchup it picked next, waiting for preparation to finish if needed.
+
+        Returns None if this result was not prepared. Either way, all
+        prepared matchups are discarded.
+
+        Raises:
+            - Any exception raised by the backend during preparation.
+        """
+        future = self._pending.pop((winner, loser), None)
+        self.cancel()
+        if future is None:
+            return None
+        return future.result()
+
+    def cancel(self) -> None:
+        """
+        Discard all prepared matchups, cancelling work not yet started.
+        """
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def close(self) -> None:
+        """
+        Discard prepared matchups and stop the background thread.
+        """
+        self.cancel()
+        self._executor.shutdown(wait=True)
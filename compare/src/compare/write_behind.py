@@ -0,0 +1,376 @@
+"""
+Write-behind saving of match results, so voting never waits on the network.
+
+`WriteBehindMatchIO` wraps another `MatchIO`. Match saves only record the
+result, with the ratings of its songs at vote time, in a bounded in-memory
+queue and an append-only local spool file, then return. A background worker
+drains the queue, sending pending matches with `MatchIO.save_matches` in
+batches of up to `batch_size`, and retrying with backoff while the wrapped
+`MatchIO` fails transiently, e.g. while the API is down (see `is_transient`).
+
+A batch rejected for any other reason, e.g. a 4xx response, would fail the
+same way forever. Its matches are sent again one at a time, and those still
+rejected are moved to a separate file of rejected matches, in the spool
+format, so the matches behind them are not held up.
+
+The spool file holds every match not yet sent, one JSON object per line, and
+is rewritten after each sent batch. Matches left in it by a crash are sent
+again when a new `WriteBehindMatchIO` is opened on the same file, before any
+new match. Delivery is at least once: a crash between a batch being accepted
+and the spool being rewritten sends that batch again.
+
+Loads and `save_songs` first `flush` pending matches, so they always see
+every saved match in order, and raise the last error instead if pending
+matches cannot be sent within `flush_timeout`.
+
+Classes
+-------
+WriteBehindMatchIO: `MatchIO` wrapper saving matches in the background.
+
+Functions
+---------
+is_transient: Whether a failed save may succeed if retried.
+spool_line: Encode a match as a line of the spool file.
+parse_spool_line: Decode a line of the spool file.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Self, final, override
+
+import requests
+
+from compare.matchio import MatchIO, MatchResult
+from compare.matchmaking import RatingBackend
+from compare.song import Song, SongID
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Return whether a save that failed with `error` may succeed if retried:
+    connection errors, timeouts and 5xx (or 429) responses.
+    """
+    if isinstance(error, requests.HTTPError):
+        status = None if error.response is None else error.response.status_code
+        return status is None or status >= 500 or status == 429
+    if isinstance(error, requests.RequestException):
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+    return isinstance(error, OSError)
+
+
+def spool_line(match: MatchResult) -> str:
+    """
+    Encode `match` as a line of the spool file, without the newline.
+    """
+    return json.dumps({"songs": list(match.songs), "ratings": list(match.ratings)})
+
+
+def parse_spool_line(line: str) -> MatchResult:
+    """
+    Raises:
+        - `ValueError` if `line` is not a match written by `spool_line`.
+    """
+    try:
+        data = json.loads(line)
+        songs = tuple(int(song) for song in data["songs"])
+        ratings = tuple(float(rating) for rating in data["ratings"])
+    except (TypeError, KeyError, json.JSONDecodeError) as error:
+        raise ValueError("Malformed spooled match.") from error
+    if len(songs) < 2 or len(songs) != len(ratings):
+        raise ValueError("Malformed spooled match.")
+    return MatchResult(songs, ratings)
+
+
+@final
+class WriteBehindMatchIO(MatchIO):
+    """
+    Saves matches through `inner` on a background thread. Must be closed,
+    e.g. by using it as a context manager, to send pending matches on exit.
+    """
+
+    def __init__(self,
+        inner: MatchIO,
+        spool_path: Path,
+        max_pending: int = 10_000,
+        batch_size: int = 100,
+        retry_interval: float = 1.0,
+        max_retry_interval: float = 60.0,
+        flush_timeout: float = 30.0,
+        rejected_path: Path | None = None
+    ) -> None:
+        """
+        Args:
+            inner: `MatchIO` to send matches and every other call to.
+            spool_path: File of unsent matches, created if missing. Matches
+                already in it are sent first.
+            max_pending: Unsent matches kept before saves block until the
+                worker catches up. Must be > 0.
+            batch_size: Most matches sent before the spool file is
+                rewritten without them. Must be > 0.
+            retry_interval: Seconds before retrying a failed batch, doubled
+                after each further failure. Must be > 0.
+            max_retry_interval: Longest wait between retries, in seconds.
+                Must be >= `retry_interval`.
+            flush_timeout: Longest wait for pending matches to be sent
+                before loads and `save_songs`, in seconds. Must be >= 0.
+            rejected_path: File rejected matches are appended to, by
+                default next to `spool_path` with a `.rejected` stem suffix.
+        """
+        if max_pending <= 0 or batch_size <= 0:
+            raise ValueError("`max_pending` and `batch_size` must be > 0")
+        if not 0 < retry_interval <= max_retry_interval:
+            raise ValueError("Retry intervals must be > 0, with the maximum the largest.")
+        if flush_timeout < 0:
+            raise ValueError("`flush_timeout` must be >= 0")
+        self._inner: MatchIO = inner
+        self._spool_path: Path = spool_path
+        self._max_pending: int = max_pending
+        self._batch_size: int = batch_size
+        self._retry_interval: float = retry_interval
+        self._max_retry_interval: float = max_retry_interval
+        self._flush_timeout: float = flush_timeout
+        self._rejected_path: Path = (
+            rejected_path if rejected_path is not None
+            else spool_path.with_name(f"{spool_path.stem}.rejected{spool_path.suffix}")
+        )
+        # Guards every attribute below, and is notified when they change.
+        self._condition: threading.Condition = threading.Condition()
+        self._pending: deque[MatchResult] = deque(self._read_spool())
+        self._closing: bool = False
+        self._last_error: Exception | None = None
+        self._rejected_count: int = 0
+        # Serializes calls to `inner`, which need not be thread safe.
+        self._inner_lock: threading.Lock = threading.Lock()
+        self._spool_path.parent.mkdir(parents=True, exist_ok=True)
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+        self._worker: threading.Thread = threading.Thread(
+            target=self._run, name="match-write-behind", daemon=True
+        )
+        self._worker.start()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def _read_spool(self) -> list[MatchResult]:
+        """
+        Read matches left unsent, skipping a line truncated by a crash.
+        """
+        if not self._spool_path.exists():
+            return []
+        matches: list[MatchResult] = []
+        for line in self._spool_path.read_text(encoding="utf-8").splitlines():
+            try:
+                matches.append(parse_spool_line(line))
+            except ValueError:
+                continue
+        return matches
+
+    def _rewrite_spool(self) -> None:
+        """
+        Atomically replace the spool file with the matches still pending.
+        Called with `_condition` held.
+        """
+        self._spool.close()
+        temporary_path = self._spool_path.with_suffix(".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.writelines(spool_line(match) + "\n" for match in self._pending)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self._spool_path)
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+
+    def _reject(self, match: MatchResult, error: Exception) -> None:
+        """
+        Move `match`, at the front of `_pending`, to the rejected matches.
+        Called with `_condition` held.
+        """
+        with open(self._rejected_path, "a", encoding="utf-8") as file:
+            file.write(spool_line(match) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self._pending.popleft()
+        self._rejected_count += 1
+        self._last_error = error
+        self._rewrite_spool()
+        self._condition.notify_all()
+
+    def _enqueue(self, matches: Sequence[MatchResult]) -> None:
+        with self._condition:
+            try:
+                for match in matches:
+                    if self._closing:
+                        raise ValueError("Match saving is closed.")
+                    if len(self._pending) >= self._max_pending:
+                        self._condition.wait_for(
+                            lambda: len(self._pending) < self._max_pending
+                        )
+                    self._spool.write(spool_line(match) + "\n")
+                    self._pending.append(match)
+                    self._condition.notify_all()
+            finally:
+                if not self._spool.closed:
+                    self._spool.flush()
+                    os.fsync(self._spool.fileno())
+
+    def _run(self) -> None:
+        retry_interval = self._retry_interval
+        # Matches left to send one at a time, after their batch was rejected.
+        isolating = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return
+                # The batch stays at the front of `_pending` until it is sent.
+                batch = list(itertools.islice(
+                    self._pending, 1 if isolating else self._batch_size
+                ))
+            try:
+                with self._inner_lock:
+                    self._inner.save_matches(batch)
+            except Exception as error:
+                if not is_transient(error):
+                    if len(batch) == 1:
+                        with self._condition:
+                            self._reject(batch[0], error)
+                        isolating = max(isolating - 1, 0)
+                    else:
+                        isolating = len(batch)
+                    continue
+                with self._condition:
+                    self._last_error = error
+                    self._condition.notify_all()
+                    # Closing stops retrying, leaving the matches spooled.
+                    if self._condition.wait_for(lambda: self._closing, retry_interval):
+                        return
+                retry_interval = min(2 * retry_interval, self._max_retry_interval)
+                continue
+            retry_interval = self._retry_interval
+            isolating = max(isolating - len(batch), 0)
+            with self._condition:
+                for _ in batch:
+                    self._pending.popleft()
+                self._last_error = None
+                self._rewrite_spool()
+                self._condition.notify_all()
+
+    @property
+    def pending_count(self) -> int:
+        """
+        Saved matches not yet sent.
+        """
+        with self._condition:
+            return len(self._pending)
+
+    @property
+    def last_error(self) -> Exception | None:
+        """
+        Error of the last failed batch, or None once a batch succeeds.
+        """
+        with self._condition:
+            return self._last_error
+
+    @property
+    def rejected_count(self) -> int:
+        """
+        Matches moved to the rejected matches file since opening.
+        """
+        with self._condition:
+            return self._rejected_count
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every saved match has been sent, for at most `timeout`
+        seconds, returning whether they all were.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending and self._worker.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return not self._pending
+
+    def close(self, timeout: float | None = 10.0) -> bool:
+        """
+        Send pending matches for up to `timeout` seconds, then stop the
+        worker, leaving matches still unsent in the spool file. Returns
+        whether every match was sent.
+        """
+        self.flush(timeout)
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._worker.join()
+        with self._condition:
+            self._spool.close()
+            return not self._pending
+
+    def _flush_before_call(self) -> None:
+        """
+        Raises:
+            - The last error of the worker, or `TimeoutError` if there is
+            none, if pending matches are not sent within `flush_timeout`.
+        """
+        if self.flush(self._flush_timeout):
+            return
+        error = self.last_error
+        if error is not None:
+            raise error
+        raise TimeoutError("Pending matches were not sent in time.")
+
+    @override
+    def save_songs(self, rating_backend: RatingBackend, songs: list[Song]) -> None:
+        self._flush_before_call()
+        with self._inner_lock:
+            self._inner.save_songs(rating_backend, songs)
+
+    @override
+    def load_songs(self) -> list[Song]:
+        self._flush_before_call()
+        with self._inner_lock:
+            return self._inner.load_songs()
+
+    @override
+    def load_match_history(self) -> Iterable[tuple[SongID, ...]]:
+        self._flush_before_call()
+        # Pages may be fetched while iterating, after the lock is released,
+        # which is safe as nothing is pending again until matches are voted.
+        with self._inner_lock:
+            return self._inner.load_match_history()
+
+    @override
+    def save_match(self,
+        rating_backend: RatingBackend,
+        winner: SongID,
+        loser: SongID
+    ) -> None:
+        self._enqueue([MatchResult.of(rating_backend, (winner, loser))])
+
+    @override
+    def save_ranked_match(self,
+        rating_backend: RatingBackend,
+        ranking: list[SongID]
+    ) -> None:
+        self._enqueue([MatchResult.of(rating_backend, ranking)])
+
+    @override
+    def save_matches(self, matches: Sequence[MatchResult]) -> None:
+        self._enqueue(matches)
@@ -1,23 +1,34 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
 
+import numpy as np
 import pytest
 
 from compare.app import RateSongs
+from compare.checkpoint import Checkpoint, CheckpointStore, HistoryDigest
+from compare.matchio import MatchResult
+from compare.matchmaking import CertaintySummary, PlackettLuceBackend, RatingBackend
 from compare.render import MatchInput
 from compare.song import Song
+from compare.speculation import SpeculativePicker
 
 
 class _FakeBackend:
-    def __init__(self, *, pick: tuple[int, int] = (0, 1)) -> None:
+    def __init__(self, *, pick: tuple[int, int] = (0, 1), group: list[int] | None = None) -> None:
         self._pick = pick
+        self._group = group or []
         self.new_player_calls: list[int] = []
-        self.update_calls: list[tuple[int, int]] = []
+        self.update_calls: list[tuple[int, ...]] = []
+        self.update_many_calls: int = 0
+        self.loaded_states: list[bytes] = []
+        # Number of matches applied at each `consolidate` call.
+        self.consolidations: list[int] = []
         self._ranks: dict[int, int] = {}
         self._ratings: dict[int, float] = {}
+        self.focus_calls: list[list[int] | None] = []
 
     def new_player(self, id: int) -> None:
         self.new_player_calls.append(id)
@@ -31,9 +42,54 @@ class _FakeBackend:
     def overall_rating(self, player: int) -> float:
         return self._ratings.get(player, 0.0)
 
+    def overall_ratings(self) -> dict[int, float]:
+        return {player: self.overall_rating(player) for player in self._ranks}
+
+    def rank_of(self, player: int) -> int:
+        return self._ranks[player]
+
+    def rating_certainties(self) -> dict[int, float]:
+        return {player: 0.0 for player in self.new_player_calls}
+
+    def rating_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Settled, well separated ratings.
+        count = len(self.new_player_calls)
+        return np.arange(count), -np.arange(count, dtype=np.float64), np.full(count, 1e-3)
+
+    def top_k(self, k: int) -> list[int]:
+        return self.new_player_calls[:k]
+
+    def focus(self, players: Iterable[int] | None) -> None:
+        self.focus_calls.append(None if players is None else list(players))
+
+    def certainty_summary(self) -> CertaintySummary:
+        return CertaintySummary.of(np.zeros(len(self.new_player_calls)))
+
     def update(self, winner: int, loser: int) -> None:
         self.update_calls.append((winner, loser))
 
+    def pick_group(self, size: int) -> list[int]:
+        return self._group[:size]
+
+    def pick_k_matchups(self, k: int) -> list[tuple[int, int]]:
+        return [self._pick] * k
+
+    def update_ranked(self, ranking: Sequence[int]) -> None:
+        self.update_calls.append(tuple(ranking))
+
+    def update_many(self, matches: Iterable[Sequence[int]]) -> None:
+        self.update_many_calls += 1
+        self.update_calls.extend(tuple(match) for match in matches)
+
+    def consolidate(self) -> None:
+        self.consolidations.append(len(self.update_calls))
+
+    def save_state(self) -> bytes:
+        return repr(self.update_calls).encode()
+
+    def load_state(self, state: bytes) -> None:
+        self.loaded_states.append(state)
+
     def set_state(self, *, ranks: dict[int, int], ratings: dict[int, float]) -> None:
         self._ranks = dict(ranks)
         self._ratings = dict(ratings)
@@ -88,23 +144,29 @@ class _FakeAudioPlayerBuilder:
 class _FakeMatchIO:
     def __init__(self) -> None:
         self.save_songs_calls: list[list[Song]] = []
-        self.save_match_calls: list[tuple[int, int]] = []
+        self.save_match_calls: list[tuple[int, ...]] = []
         self._songs_to_load: list[Song] = []
-        self._history_to_load: list[tuple[int, int]] = []
+        self._history_to_load: list[tuple[int, ...]] = []
 
-    def save_songs(self, _rating_backend: Any, songs: list[Song]) -> None:
+    def save_songs(self, rating_backend: RatingBackend, songs: list[Song]) -> None:
         self.save_songs_calls.append(list(songs))
 
     def load_songs(self) -> list[Song]:
         return list(self._songs_to_load)
 
-    def load_match_history(self) -> list[tuple[int, int]]:
+    def load_match_history(self) -> list[tuple[int, ...]]:
         return list(self._history_to_load)
 
-    def save_match(self, _rating_backend: Any, winner: int, loser: int) -> None:
+    def save_match(self, rating_backend: RatingBackend, winner: int, loser: int) -> None:
         self.save_match_calls.append((winner, loser))
 
-    def set_load_data(self, *, songs: list[Song], history: list[tuple[int, int]]) -> None:
+    def save_ranked_match(self, rating_backend: RatingBackend, ranking: list[int]) -> None:
+        self.save_match_calls.append(tuple(ranking))
+
+    def save_matches(self, matches: Sequence[MatchResult]) -> None:
+        self.save_match_calls.extend(match.songs for match in matches)
+
+    def set_load_data(self, *, songs: list[Song], history: list[tuple[int, ...]]) -> None:
         self._songs_to_load = list(songs)
         self._history_to_load = list(history)
 
@@ -114,6 +176,9 @@ class _FakeRenderer:
         self._inputs = inputs
         self._idx = 0
         self.render_calls: int = 0
+        self.certainties: list[CertaintySummary | None] = []
+        self.song_infos: list[dict[Song, tuple[int, float]]] = []
+        self.render_group_calls: list[tuple[int, list[int]]] = []
 
     def get_input(self) -> MatchInput:
         if self._idx >= len(self._inputs):
@@ -122,8 +187,28 @@ class _FakeRenderer:
         self._idx += 1
         return value
 
-    def render(self, *_args: Any, **_kwargs: Any) -> None:
+    def render(
+        self,
+        song1: Song,
+        song2: Song,
+        song1_is_playing: bool,
+        song_stats: dict[Song, tuple[int, float]],
+        certainty: CertaintySummary | None = None
+    ) -> None:
         self.render_calls += 1
+        self.song_infos.append(song_stats)
+        self.certainties.append(certainty)
+
+    def render_group(
+        self,
+        songs: list[Song],
+        playing_song: int,
+        placed: list[int],
+        song_stats: dict[Song, tuple[int, float]],
+        certainty: CertaintySummary | None = None
+    ) -> None:
+        self.render_group_calls.append((playing_song, list(placed)))
+        self.certainties.append(certainty)
 
 
 def test_init_with_folder_saves_songs_and_creates_players(tmp_path: Path) -> None:
@@ -160,6 +245,7 @@ def test_init_without_folder_loads_songs_and_replays_history(tmp_path: Path) ->
 
     assert backend.new_player_calls == [0, 1, 2]
     assert backend.update_calls == [(0, 1), (2, 0)]
+    assert backend.update_many_calls == 1
     assert len(builder.create_calls) == 3
 
 
@@ -206,7 +292,333 @@ def test_perform_rating_swap_then_song_a_wins(monkeypatch: pytest.MonkeyPatch, t
     assert builder.players[0].toggle_calls == 1
     assert builder.players[1].toggle_calls == 1
 
+    # Every frame shows the certainty summary.
+    assert renderer.certainties
+    assert all(summary is not None and summary.count == 2 for summary in renderer.certainties)
+
     # Choosing SONG_A_WINS updates and saves the match with (0, 1).
     assert backend.update_calls == [(0, 1)]
     assert matchio.save_match_calls == [(0, 1)]
 
+
+def test_perform_rating_ignores_group_inputs_in_1v1(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    songs = [
+        Song(id=0, path=tmp_path / "a.mp3", title="a", extension=".mp3"),
+        Song(id=1, path=tmp_path / "b.mp3", title="b", extension=".mp3"),
+    ]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=[])
+    backend = _FakeBackend(pick=(0, 1))
+    backend.set_state(ranks={0: 1, 1: 2}, ratings={0: 10.0, 1: 5.0})
+    renderer = _FakeRenderer([MatchInput.SONG_C_WINS, MatchInput.SONG_E_WINS, MatchInput.SONG_B_WINS])
+    builder = _FakeAudioPlayerBuilder()
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+
+    app = RateSongs(renderer, backend, matchio, builder, None)
+    app.perform_rating()
+
+    # Songs c-e do not exist in a 1v1 match, so only SONG_B_WINS ends it.
+    assert builder.players[0].pause_calls == 1
+    assert backend.update_calls == [(1, 0)]
+    assert matchio.save_match_calls == [(1, 0)]
+
+
+def _history_digest(matches: list[tuple[int, ...]]) -> bytes:
+    digest = HistoryDigest()
+    digest.update(matches)
+    return digest.digest()
+
+
+def test_init_without_folder_replays_only_matches_after_checkpoint(tmp_path: Path) -> None:
+    songs = [
+        Song(id=0, path=tmp_path / "a.mp3", title="a", extension=".mp3"),
+        Song(id=1, path=tmp_path / "b.mp3", title="b", extension=".mp3"),
+    ]
+    history = [(0, 1), (1, 0), (0, 1)]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=history)
+
+    checkpoints = CheckpointStore(tmp_path / "checkpoints")
+    checkpoints.save(Checkpoint(2, _history_digest(history[:2]), b"state"))
+
+    backend = _FakeBackend()
+    _app = RateSongs(
+        _FakeRenderer([]), backend, matchio, _FakeAudioPlayerBuilder(), None, checkpoints
+    )
+
+    assert backend.loaded_states == [b"state"]
+    assert backend.update_calls == [(0, 1)]
+
+
+def test_init_falls_back_to_older_checkpoint_and_replays_in_pages(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=0, path=tmp_path / "a.mp3", title="a", extension=".mp3"),
+        Song(id=1, path=tmp_path / "b.mp3", title="b", extension=".mp3"),
+    ]
+    history = [(0, 1), (1, 0), (0, 1), (0, 1), (1, 0)]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=history)
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod, "REPLAY_PAGE_SIZE", 2)
+    checkpoints = CheckpointStore(tmp_path / "checkpoints")
+    checkpoints.save(Checkpoint(1, _history_digest(history[:1]), b"older"))
+    checkpoints.save(Checkpoint(3, _history_digest([(1, 0)] * 3), b"stale"))
+
+    backend = _FakeBackend()
+    _app = RateSongs(
+        _FakeRenderer([]), backend, matchio, _FakeAudioPlayerBuilder(), None, checkpoints
+    )
+
+    assert backend.loaded_states == [b"older"]
+    assert backend.update_calls == history[1:]
+    assert backend.update_many_calls == 2
+
+
+def test_init_ignores_checkpoint_from_other_history(tmp_path: Path) -> None:
+    songs = [
+        Song(id=0, path=tmp_path / "a.mp3", title="a", extension=".mp3"),
+        Song(id=1, path=tmp_path / "b.mp3", title="b", extension=".mp3"),
+    ]
+    history = [(0, 1), (1, 0)]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=history)
+
+    checkpoints = CheckpointStore(tmp_path / "checkpoints")
+    checkpoints.save(Checkpoint(2, _history_digest([(1, 0), (1, 0)]), b"state"))
+
+    backend = _FakeBackend()
+    _app = RateSongs(
+        _FakeRenderer([]), backend, matchio, _FakeAudioPlayerBuilder(), None, checkpoints
+    )
+
+    assert backend.loaded_states == []
+    assert backend.update_calls == history
+
+
+def test_perform_rating_writes_checkpoint_every_interval(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=0, path=tmp_path / "a.mp3", title="a", extension=".mp3"),
+        Song(id=1, path=tmp_path / "b.mp3", title="b", extension=".mp3"),
+    ]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=[(1, 0)])
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+
+    checkpoints = CheckpointStore(tmp_path / "checkpoints")
+    backend = _FakeBackend(pick=(0, 1))
+    renderer = _FakeRenderer([MatchInput.SONG_A_WINS, MatchInput.SONG_B_WINS])
+    app = RateSongs(
+        renderer, backend, matchio, _FakeAudioPlayerBuilder(), None,
+        checkpoints, checkpoint_interval=2
+    )
+    app.perform_rating()
+    app.perform_rating()
+
+    history = [(1, 0), (0, 1), (1, 0)]
+    checkpoint = next(checkpoints.checkpoints(), None)
+    assert checkpoint is not None
+    assert checkpoint.match_count == 2
+    assert checkpoint.history_digest == _history_digest(history[:2])
+    assert checkpoint.state == repr(history[:2]).encode()
+
+
+def test_perform_rating_consolidates_every_interval(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=0, path=tmp_path / "a.mp3", title="a", extension=".mp3"),
+        Song(id=1, path=tmp_path / "b.mp3", title="b", extension=".mp3"),
+    ]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=[(1, 0)])
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+
+    backend = _FakeBackend(pick=(0, 1))
+    renderer = _FakeRenderer([MatchInput.SONG_A_WINS] * 3)
+    app = RateSongs(
+        renderer, backend, matchio, _FakeAudioPlayerBuilder(), None,
+        consolidate_interval=2
+    )
+    for _ in range(3):
+        app.perform_rating()
+
+    # The history holds 2 and then 4 matches after the first and third votes.
+    assert backend.consolidations == [2, 4]
+    with pytest.raises(ValueError):
+        RateSongs(
+            renderer, backend, matchio, _FakeAudioPlayerBuilder(), None,
+            consolidate_interval=0
+        )
+
+
+def test_run_stops_once_ranking_converges(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=i, path=tmp_path / f"{i}.mp3", title=str(i), extension=".mp3")
+        for i in range(4)
+    ]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=[])
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+
+    def make_app(backend: _FakeBackend) -> RateSongs:
+        renderer = _FakeRenderer([MatchInput.SONG_A_WINS] * 100)
+        return RateSongs(renderer, backend, matchio, _FakeAudioPlayerBuilder(), None)
+
+    # Without a target, every run is performed.
+    backend = _FakeBackend(pick=(0, 1))
+    assert make_app(backend).run(15) == 15
+    assert len(backend.update_calls) == 15
+
+    # Settled ratings converge after the monitor's patience of 10 matches.
+    backend = _FakeBackend(pick=(0, 1))
+    assert make_app(backend).run(50, target_confidence=0.9) == 10
+    assert len(backend.update_calls) == 10
+    assert backend.focus_calls == [None]
+
+    # Verifying the top 2 focuses on them and the next song until they settle too.
+    backend = _FakeBackend(pick=(0, 1))
+    assert make_app(backend).run(50, target_confidence=0.9, verify_top_k=2) == 20
+    assert backend.focus_calls == [[0, 1, 2]] * 10 + [None]
+
+    with pytest.raises(ValueError):
+        make_app(_FakeBackend()).run(10, verify_top_k=2)
+
+
+def test_init_with_folder_clears_checkpoints(tmp_path: Path) -> None:
+    music = tmp_path / "music"
+    music.mkdir()
+    (music / "a.mp3").write_text("x")
+    (music / "b.mp3").write_text("x")
+
+    checkpoints = CheckpointStore(tmp_path / "checkpoints")
+    checkpoints.save(Checkpoint(0, _history_digest([]), b"state"))
+
+    _app = RateSongs(
+        _FakeRenderer([]), _FakeBackend(), _FakeMatchIO(), _FakeAudioPlayerBuilder(),
+        music, checkpoints
+    )
+
+    assert list(checkpoints.checkpoints()) == []
+
+
+def test_speculative_picks_match_synchronous_picks(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=i, path=tmp_path / f"{i}.mp3", title=str(i), extension=".mp3")
+        for i in range(6)
+    ]
+    inputs = [MatchInput.SONG_A_WINS, MatchInput.SONG_B_WINS, MatchInput.SONG_B_WINS] * 3
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+
+    def played_matches(speculative_picker: SpeculativePicker | None) -> list[tuple[int, ...]]:
+        matchio = _FakeMatchIO()
+        matchio.set_load_data(songs=songs, history=[(0, 1), (2, 3)])
+        app = RateSongs(
+            _FakeRenderer(list(inputs)), PlackettLuceBackend(rng_seed=1), matchio,
+            _FakeAudioPlayerBuilder(), None, speculative_picker=speculative_picker
+        )
+        for _ in inputs:
+            app.perform_rating()
+        return matchio.save_match_calls
+
+    picker = SpeculativePicker()
+    try:
+        assert played_matches(picker) == played_matches(None)
+    finally:
+        picker.close()
+
+
+def test_song_infos_are_only_rebuilt_after_votes(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=i, path=tmp_path / f"{i}.mp3", title=str(i), extension=".mp3")
+        for i in range(4)
+    ]
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=[])
+    renderer = _FakeRenderer([MatchInput.NONE, MatchInput.SONG_A_WINS, MatchInput.SONG_B_WINS])
+    backend = PlackettLuceBackend(rng_seed=0)
+    app = RateSongs(renderer, backend, matchio, _FakeAudioPlayerBuilder(), None)
+
+    app.perform_rating()
+    ratings = backend.overall_ratings()
+    expected = {song: (backend.rank_of(song.id), ratings[song.id]) for song in songs}
+    app.perform_rating()
+    first, idle, voted = renderer.song_infos
+    assert idle is first
+    assert voted is not first
+    assert voted == expected
+
+
+def test_perform_group_rating_ranks_every_song(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    songs = [
+        Song(id=i, path=tmp_path / f"{i}.mp3", title=str(i), extension=".mp3")
+        for i in range(4)
+    ]
+    matchio = _FakeMatchIO()
+    matchio.set_load_data(songs=songs, history=[])
+
+    import compare.app as app_mod
+
+    monkeypatch.setattr(app_mod.time, "sleep", lambda _s: None)
+
+    backend = _FakeBackend(group=[3, 1, 2])
+    renderer = _FakeRenderer([
+        MatchInput.SWAP_PLAYING_SONG,
+        MatchInput.SONG_C_WINS,
+        # Inputs outside the group and repeated placements are ignored.
+        MatchInput.SONG_D_WINS,
+        MatchInput.SONG_C_WINS,
+        MatchInput.SONG_A_WINS,
+    ])
+    builder = _FakeAudioPlayerBuilder()
+    app = RateSongs(renderer, backend, matchio, builder, None, group_size=3)
+    app.perform_rating()
+
+    # Songs are placed c, a, then b by elimination.
+    assert backend.update_calls == [(2, 3, 1)]
+    assert matchio.save_match_calls == [(2, 3, 1)]
+    assert renderer.render_group_calls[-1] == (1, [2])
+    for song_id in (1, 2, 3):
+        assert builder.players[song_id].positions == [0.15]
+        assert not builder.players[song_id].playing
+    assert builder.players[0].positions == []
+
+
+def test_group_size_must_be_in_range(tmp_path: Path) -> None:
+    for group_size in (1, 6):
+        with pytest.raises(ValueError):
+            RateSongs(
+                _FakeRenderer([]), _FakeBackend(), _FakeMatchIO(), _FakeAudioPlayerBuilder(),
+                None, group_size=group_size
+            )
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from compare.benchmark import OPERATIONS, main, run_benchmarks, skipped_pool_sizes
+from compare.matchmaking import MatchupSearch
+
+
+@pytest.mark.parametrize("search", list(MatchupSearch))
+def test_run_benchmarks_reports_every_operation_and_pool_size(search: MatchupSearch) -> None:
+    results = run_benchmarks(pool_sizes=(5, 20), repeats=3, search=search)
+
+    assert [(r.operation, r.pool_size) for r in results] == [
+        (operation, pool_size) for pool_size in (5, 20) for operation in OPERATIONS
+    ]
+    for result in results:
+        assert result.calls == (result.pool_size if result.operation == "new_player" else 3)
+        assert 0 <= result.latency_p50 <= result.latency_p90 <= result.latency_p99
+        assert result.latency_p99 <= result.latency_max
+        assert result.throughput_per_second > 0
+        assert result.peak_memory_bytes is not None and result.peak_memory_bytes >= 0
+
+
+@pytest.mark.parametrize("backend", ["glicko", "bradley-terry"])
+def test_run_benchmarks_supports_other_backends(backend: str) -> None:
+    results = run_benchmarks(pool_sizes=(6,), repeats=2, trace_memory=False, backend=backend)
+
+    assert [r.operation for r in results] == list(OPERATIONS)
+    assert all(r.peak_memory_bytes is None for r in results)
+
+
+def test_exhaustive_search_skips_pool_sizes_above_limit(
+    capsys: pytest.CaptureFixture[str]
+) -> None:
+    results = run_benchmarks(
+        pool_sizes=(4, 12, 6), repeats=2, trace_memory=False, exhaustive_limit=8
+    )
+    assert sorted({r.pool_size for r in results}) == [4, 6]
+    assert skipped_pool_sizes((4, 12, 6), exhaustive_limit=8) == (12,)
+    assert skipped_pool_sizes((4, 12), MatchupSearch.PRUNED, exhaustive_limit=8) == ()
+    assert skipped_pool_sizes((4, 12), backend="glicko", exhaustive_limit=8) == ()
+
+    main(["--pool-sizes", "4", "12", "--repeats", "2", "--no-memory", "--exhaustive-limit", "8"])
+    assert "Skipped pool sizes 12" in capsys.readouterr().out
+
+
+def test_run_benchmarks_validates_arguments() -> None:
+    with pytest.raises(ValueError):
+        run_benchmarks(pool_sizes=(1,))
+    with pytest.raises(ValueError):
+        run_benchmarks(pool_sizes=(10,), repeats=0)
+    with pytest.raises(ValueError):
+        run_benchmarks(pool_sizes=(10,), backend="elo")
+
+
+def test_main_saves_json_results(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    output = tmp_path / "results.json"
+    main([
+        "--pool-sizes", "4", "--repeats", "2", "--search", "sampled",
+        "--no-memory", "--output", str(output)
+    ])
+
+    assert "pick_two_players" in capsys.readouterr().out
+    document = json.loads(output.read_text())
+    assert document["settings"]["search"] == "sampled"
+    assert {"commit", "python", "timestamp"} <= document["metadata"].keys()
+    assert len(document["results"]) == len(OPERATIONS)
+    assert all(result["peak_memory_bytes"] is None for result in document["results"])
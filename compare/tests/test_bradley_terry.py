@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from compare.bradley_terry import (
+    MatchCounts,
+    deviation_change,
+    fit,
+    rate_ranked,
+    replay_1v1,
+)
+
+
+def _log_likelihood_gradient(
+    theta: np.ndarray,
+    matches: list[tuple[int, ...]],
+    prior_games: float
+) -> np.ndarray:
+    """Gradient of the Plackett-Luce log-likelihood plus prior games, per match."""
+    strength = np.exp(theta)
+    gradient = prior_games * (1 / (strength + 1) - strength / (strength + 1))
+    for ranking in matches:
+        for stage in range(len(ranking) - 1):
+            remaining = list(ranking[stage:])
+            total = strength[remaining].sum()
+            gradient[ranking[stage]] += 1
+            for player in remaining:
+                gradient[player] -= strength[player] / total
+    return gradient
+
+
+def _counts_of(matches: list[tuple[int, ...]]) -> MatchCounts:
+    counts = MatchCounts()
+    for match in matches:
+        if len(match) == 2:
+            counts.add_pairs([match[0]], [match[1]])
+        else:
+            counts.add_ranking(match)
+    return counts
+
+
+def test_fit_solves_likelihood_equations() -> None:
+    rng = np.random.default_rng(0)
+    matches: list[tuple[int, ...]] = [
+        tuple(rng.choice(6, 2, replace=False).tolist()) for _ in range(40)
+    ]
+    matches += [tuple(rng.permutation(6)[:4].tolist()) for _ in range(10)]
+
+    result = fit(_counts_of(matches), 6, prior_games=0.5, tolerance=1e-12)
+
+    assert result.converged
+    np.testing.assert_allclose(
+        _log_likelihood_gradient(result.theta, matches, 0.5), 0, atol=1e-8
+    )
+
+
+def test_fit_recovers_strength_order() -> None:
+    rng = np.random.default_rng(1)
+    true_theta = np.linspace(-2, 2, 10)
+    player1 = rng.integers(0, 10, 5000)
+    player2 = (player1 + 1 + rng.integers(0, 9, 5000)) % 10
+    player1_wins = rng.random(5000) < 1 / (1 + np.exp(true_theta[player2] - true_theta[player1]))
+    counts = MatchCounts()
+    counts.add_pairs(
+        np.where(player1_wins, player1, player2), np.where(player1_wins, player2, player1)
+    )
+
+    result = fit(counts, 10)
+
+    assert np.all(np.diff(result.theta) > 0)
+    np.testing.assert_allclose(result.theta - result.theta.mean(), true_theta, atol=0.2)
+    assert np.all(result.sigma < math.sqrt(2))
+
+
+def test_fit_warm_start_converges_to_same_solution_faster() -> None:
+    rng = np.random.default_rng(2)
+    counts = MatchCounts()
+    counts.add_pairs(rng.integers(0, 50, 2000), rng.integers(0, 50, 2000))
+    cold = fit(counts, 50, tolerance=1e-10)
+
+    counts.add_pairs([0], [1])
+    warm = fit(counts, 50, initial=cold.theta, tolerance=1e-10)
+    reference = fit(counts, 50, tolerance=1e-10)
+
+    assert warm.iterations < reference.iterations
+    np.testing.assert_allclose(warm.theta, reference.theta, atol=1e-8)
+
+
+def test_fit_without_results_gives_prior() -> None:
+    result = fit(MatchCounts(), 3, prior_games=2.0)
+
+    np.testing.assert_allclose(result.theta, 0)
+    np.testing.assert_allclose(result.sigma, 1.0)
+
+
+def test_fit_validates_arguments() -> None:
+    counts = _counts_of([(0, 3)])
+    with pytest.raises(ValueError):
+        fit(counts, 3)
+    with pytest.raises(ValueError):
+        fit(counts, 4, prior_games=0)
+    with pytest.raises(ValueError):
+        fit(counts, 4, initial=np.zeros(2))
+
+
+def test_match_counts_aggregate_pairs_and_round_trip() -> None:
+    counts = _counts_of([(0, 1), (1, 0), (0, 1), (2, 0, 1)])
+    for _ in range(3):
+        counts.add_pairs(np.arange(2000) % 7, (np.arange(2000) + 1) % 7)
+
+    winners, losers, wins = counts.pairs()
+    assert len(winners) == 7 + 1
+    assert wins[(winners == 0) & (losers == 1)].tolist() == [2 + 858]
+    assert counts.max_player() == 6
+
+    restored = MatchCounts.from_arrays(counts.to_arrays())
+    for original, copy in zip(counts.pairs(), restored.pairs()):
+        np.testing.assert_array_equal(original, copy)
+    assert [r.tolist() for r in restored.rankings()] == [[2, 0, 1]]
+
+    arrays = counts.to_arrays()
+    arrays["ranking_lengths"] = np.array([4])
+    with pytest.raises(ValueError):
+        MatchCounts.from_arrays(arrays)
+
+
+def test_online_steps_move_ratings_and_shrink_errors() -> None:
+    theta, sigma = [0.0, 0.0, 0.0], [1.0, 1.0, 1.0]
+    replay_1v1(theta, sigma, [0], [1])
+
+    assert theta[0] == pytest.approx(-theta[1]) and theta[0] > 0
+    assert sigma[0] == sigma[1] < 1.0
+
+    ranked_theta, ranked_sigma = rate_ranked([0.0, 0.0], [1.0, 1.0])
+    assert ranked_theta == pytest.approx(theta[:2])
+    assert ranked_sigma == pytest.approx(sigma[:2])
+
+    ranked_theta, _ = rate_ranked([0.0] * 4, [1.0] * 4)
+    assert ranked_theta == sorted(ranked_theta, reverse=True)
+
+
+def test_deviation_change_is_negative_and_favours_close_players() -> None:
+    change = deviation_change([0.0, 0.0], [1.0, 0.5], [0.0, 3.0], [1.0, 0.5])
+
+    assert np.all(change < 0)
+    assert change[0] < deviation_change(0.0, 1.0, 3.0, 1.0)
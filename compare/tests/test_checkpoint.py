@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from compare.checkpoint import Checkpoint, CheckpointStore, HistoryDigest
+
+
+def _digest(matches: list[tuple[int, ...]]) -> bytes:
+    digest = HistoryDigest()
+    digest.update(matches)
+    return digest.digest()
+
+
+def test_history_digest_depends_on_order() -> None:
+    assert _digest([(0, 1), (2, 3)]) == _digest([(0, 1), (2, 3)])
+    assert _digest([(0, 1), (2, 3)]) != _digest([(2, 3), (0, 1)])
+    assert _digest([(0, 1)]) != _digest([(1, 0)])
+
+
+def test_history_digest_distinguishes_ranked_matches() -> None:
+    assert _digest([(0, 1, 2)]) == _digest([(0, 1, 2)])
+    assert _digest([(0, 1, 2)]) != _digest([(0, 1), (2,)])
+    assert _digest([(0, 1), (0, 1, 2)]) != _digest([(0, 1, 0), (1, 2)])
+
+
+@pytest.mark.parametrize(
+    "history", [[(0, 1), (1, 2), (2, 0), (0, 2)], [(0, 1), (2, 0, 1), (1, 2), (0, 2, 1)]]
+)
+def test_history_digest_can_be_computed_in_pieces(history: list[tuple[int, ...]]) -> None:
+    digest = HistoryDigest()
+    assert digest.digest() == _digest([])
+    for start, end in [(0, 1), (1, 1), (1, 3), (3, 4)]:
+        digest.update(history[start:end])
+        assert digest.match_count == end
+        assert digest.digest() == _digest(history[:end])
+
+
+def test_checkpoints_yields_readable_checkpoints_newest_first(tmp_path: Path) -> None:
+    store = CheckpointStore(tmp_path, keep=3)
+    store.save(Checkpoint(1, _digest([(0, 1)]), b"a"))
+    store.save(Checkpoint(3, _digest([(0, 1)] * 3), b"c"))
+    (tmp_path / "checkpoint-000000000002.bin").write_bytes(b"junk")
+
+    assert [checkpoint.state for checkpoint in store.checkpoints()] == [b"c", b"a"]
+
+
+def test_save_prunes_old_checkpoints(tmp_path: Path) -> None:
+    history = [(0, 1)] * 5
+    store = CheckpointStore(tmp_path, keep=2)
+    for count in range(1, 6):
+        store.save(Checkpoint(count, _digest(history[:count]), b""))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "checkpoint-000000000004.bin", "checkpoint-000000000005.bin"
+    ]
+    store.clear()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_keep_must_be_positive(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        CheckpointStore(tmp_path, keep=0)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Callable
+
+import numpy as np
+import pytest
+
+from compare.convergence import ConvergenceMonitor, squared_rank_errors
+from compare.matchmaking import GlickoBackend
+
+
+def test_squared_rank_errors_of_certain_and_uncertain_players() -> None:
+    mu = np.array([3.0, 2.0, 1.0, 0.0])
+    np.testing.assert_allclose(squared_rank_errors(mu, np.full(4, 1e-6), 3), 0, atol=1e-12)
+
+    # Two indistinguishable players swap with probability 1/2.
+    errors = squared_rank_errors(np.array([0.0, 0.0]), np.ones(2), 1)
+    np.testing.assert_allclose(errors, 0.25 + 0.25)
+
+    # Uncertainty grows the error, and the window bounds it.
+    sigma = np.full(4, 2.0)
+    assert np.all(squared_rank_errors(mu, sigma, 3) > squared_rank_errors(mu, sigma / 2, 3))
+    assert np.all(squared_rank_errors(mu, sigma, 1) < squared_rank_errors(mu, sigma, 3))
+    with pytest.raises(ValueError):
+        squared_rank_errors(mu, sigma, 0)
+
+
+def _play(backend: GlickoBackend, skills: np.ndarray, rng: random.Random) -> None:
+    a, b = backend.pick_two_players()
+    winner, loser = (a, b) if skills[a] + rng.gauss(0, 0.3) > skills[b] else (b, a)
+    backend.update(winner, loser)
+
+
+def test_monitor_confidence_grows_and_converges() -> None:
+    rng = random.Random(0)
+    skills = np.linspace(2, -2, 20)
+    backend = GlickoBackend(rng_seed=0)
+    for player in range(20):
+        backend.new_player(player)
+    monitor = ConvergenceMonitor(target_confidence=0.95, max_rank_change=0.1)
+
+    first = monitor.observe(backend, 0)
+    assert first.comparisons == 0
+    assert first.rank_change == float("inf")
+    assert not first.converged
+
+    statuses = []
+    for _ in range(600):
+        _play(backend, skills, rng)
+        statuses.append(monitor.observe(backend))
+    assert statuses[-1].comparisons == 600
+    assert statuses[-1].confidence > statuses[10].confidence
+    assert statuses[-1].expected_rank_error < statuses[10].expected_rank_error
+    converged_at = next(s.comparisons for s in statuses if s.converged)
+    assert 10 <= converged_at < 600
+
+
+def test_monitor_top_k_judges_only_the_top() -> None:
+    backend = GlickoBackend()
+    for player in range(6):
+        backend.new_player(player)
+    # Settle the order of the top three, leaving the rest unordered.
+    for _ in range(30):
+        for bottom in (3, 4, 5):
+            backend.update_ranked([0, 1, 2, bottom])
+
+    full = ConvergenceMonitor().observe(backend)
+    top = ConvergenceMonitor(top_k=2).observe(backend)
+    assert top.confidence > full.confidence
+    assert top.expected_rank_error < full.expected_rank_error
+
+
+@pytest.mark.parametrize("make_monitor", [
+    lambda: ConvergenceMonitor(target_confidence=1.0),
+    lambda: ConvergenceMonitor(max_rank_change=-1.0),
+    lambda: ConvergenceMonitor(top_k=0),
+    lambda: ConvergenceMonitor(window=0),
+    lambda: ConvergenceMonitor(smoothing=0.0),
+    lambda: ConvergenceMonitor(patience=0),
+])
+def test_monitor_validates_arguments(make_monitor: Callable[[], ConvergenceMonitor]) -> None:
+    with pytest.raises(ValueError):
+        make_monitor()
+
+
+def test_judged_players_are_the_top_k_by_mu_and_the_next() -> None:
+    backend = GlickoBackend()
+    for player in range(5):
+        backend.new_player(player)
+    backend.update_ranked([3, 1, 4, 0, 2])
+
+    assert ConvergenceMonitor(top_k=2).judged_players(backend) == [3, 1, 4]
+    assert sorted(ConvergenceMonitor().judged_players(backend)) == list(range(5))
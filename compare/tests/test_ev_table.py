@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from functools import partial
+
+import numpy as np
+import pytest
+from openskill.models import PlackettLuce
+
+from compare.ev_table import _BLOCK_ROWS, MatchupEVTable, exhaustive_minimum
+from compare.plackett_luce import rate_1v1, sigma_change_ev
+
+
+def _full_upper_triangle(model: PlackettLuce, mu: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+    full = sigma_change_ev(model, mu[:, None], sigma[:, None], mu[None, :], sigma[None, :])
+    return full[np.triu_indices(len(mu), k=1)]
+
+
+def _assert_matches_full_evaluation(
+    table: MatchupEVTable, model: PlackettLuce, mu: np.ndarray, sigma: np.ndarray
+) -> None:
+    expected = _full_upper_triangle(model, mu, sigma)
+    assert table.minimum() == expected.min()
+
+    threshold = expected.min() + 0.05
+    rows, columns, evs = table.matchups_within(threshold)
+    expected_rows, expected_columns = np.triu_indices(len(mu), k=1)
+    keep = expected <= threshold
+    assert rows.tolist() == expected_rows[keep].tolist()
+    assert columns.tolist() == expected_columns[keep].tolist()
+    assert evs.tolist() == expected[keep].tolist()
+
+
+def test_refresh_builds_full_table_for_new_players() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(0)
+    mu = rng.uniform(10, 40, 30)
+    sigma = rng.uniform(1, model.sigma, 30)
+
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+
+    assert len(table) == 30
+    _assert_matches_full_evaluation(table, model, mu, sigma)
+
+
+def test_incremental_refresh_matches_full_recompute() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(1)
+    n = 25
+    mu = np.full(n, model.mu)
+    sigma = np.full(n, model.sigma)
+
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+
+    for _ in range(60):
+        winner, loser = rng.choice(n, size=2, replace=False)
+        mu[winner], sigma[winner], mu[loser], sigma[loser] = rate_1v1(
+            model, mu[winner], sigma[winner], mu[loser], sigma[loser]
+        )
+        table.invalidate(int(winner))
+        table.invalidate(int(loser))
+        table.refresh(mu, sigma)
+        _assert_matches_full_evaluation(table, model, mu, sigma)
+
+
+def test_refresh_grows_with_new_players() -> None:
+    model = PlackettLuce()
+    mu = np.full(3, model.mu)
+    sigma = np.array([1.0, 2.0, 3.0])
+
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+
+    mu = np.append(mu, [model.mu, model.mu])
+    sigma = np.append(sigma, [model.sigma, model.sigma])
+    table.refresh(mu, sigma)
+
+    assert len(table) == 5
+    _assert_matches_full_evaluation(table, model, mu, sigma)
+
+
+def test_exhaustive_minimum_matches_full_evaluation() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(2)
+    mu = rng.uniform(10, 40, 40)
+    sigma = rng.uniform(1, model.sigma, 40)
+
+    minimum = exhaustive_minimum(partial(sigma_change_ev, model), mu, sigma, block_rows=7)
+    assert minimum == _full_upper_triangle(model, mu, sigma).min()
+
+
+def test_excluded_players_are_ignored() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(3)
+    mu = rng.uniform(10, 40, 20)
+    sigma = rng.uniform(1, model.sigma, 20)
+
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+
+    # Exclude the players of the best matchup, plus a few others.
+    rows, columns, _ = table.matchups_within(table.minimum())
+    excluded = np.zeros(20, dtype=np.bool_)
+    excluded[[rows[0], columns[0], 5, 11]] = True
+
+    kept = np.flatnonzero(~excluded)
+    expected = _full_upper_triangle(model, mu[kept], sigma[kept])
+    assert table.minimum(excluded) == expected.min()
+
+    threshold = expected.min() + 0.05
+    rows, columns, evs = table.matchups_within(threshold, excluded)
+    expected_rows, expected_columns = np.triu_indices(len(kept), k=1)
+    keep = expected <= threshold
+    assert rows.tolist() == kept[expected_rows[keep]].tolist()
+    assert columns.tolist() == kept[expected_columns[keep]].tolist()
+    assert evs.tolist() == expected[keep].tolist()
+
+
+
+def test_blocked_table_matches_full_evaluation() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(3)
+    n = 2 * _BLOCK_ROWS + 17
+    mu = rng.uniform(20, 30, n)
+    sigma = rng.uniform(1, model.sigma, n)
+
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+    _assert_matches_full_evaluation(table, model, mu, sigma)
+
+    # Invalidate more rows than fit in a single block.
+    stale = rng.choice(n, _BLOCK_ROWS + 5, replace=False)
+    mu[stale] += 1.0
+    sigma[stale] *= 0.9
+    for index in stale:
+        table.invalidate(int(index))
+    table.refresh(mu, sigma)
+    _assert_matches_full_evaluation(table, model, mu, sigma)
+
+
+def test_count_and_position_agree_with_listed_matchups() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(4)
+    n = _BLOCK_ROWS + 40
+    mu = rng.uniform(20, 30, n)
+    sigma = rng.uniform(1, model.sigma, n)
+    excluded = np.zeros(n, dtype=np.bool_)
+    excluded[[0, 3, _BLOCK_ROWS, n - 1]] = True
+
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+    threshold = table.minimum(excluded) + 0.05
+    rows, columns, evs = table.matchups_within(threshold, excluded)
+    assert table.count_within(threshold, excluded) == len(rows) > 1
+
+    for position in (0, len(rows) // 2, len(rows) - 1):
+        assert table.matchup_at(threshold, position, excluded) == (
+            rows[position], columns[position], evs[position]
+        )
+    with pytest.raises(IndexError):
+        table.matchup_at(threshold, len(rows), excluded)
+
+def test_penalty_is_added_to_evaluated_matchups() -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(5)
+    n = 20
+    mu = rng.uniform(10, 40, n)
+    sigma = rng.uniform(1, model.sigma, n)
+    penalized = np.zeros((n, n))
+    penalized[3, 7] = penalized[7, 3] = 10.0
+
+    def penalty(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        return penalized[rows, columns]
+
+    table = MatchupEVTable(partial(sigma_change_ev, model), penalty)
+    table.refresh(mu, sigma)
+    table.invalidate(3)
+    sigma[3] = 2.0
+    table.refresh(mu, sigma)
+
+    expected = _full_upper_triangle(model, mu, sigma) + penalized[np.triu_indices(n, k=1)]
+    _, _, evs = table.matchups_within(np.inf)
+    assert evs.tolist() == expected.tolist()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+import pytest
+
+from compare.fenwick_tree import FenwickTree
+
+
+def _assert_matches(tree: FenwickTree, weights: list[float]) -> None:
+    prefix = np.concatenate([[0.0], np.cumsum(weights)])
+    assert len(tree) == len(weights)
+    assert [tree.weight(i) for i in range(len(weights))] == weights
+    assert tree.total() == pytest.approx(prefix[-1])
+    for i in range(len(weights)):
+        if weights[i] > 0:
+            # Values within an item's share of the total find that item.
+            assert tree.find((prefix[i] + prefix[i + 1]) / 2) == i
+
+
+def test_append_set_and_rebuild_match_reference() -> None:
+    rng = random.Random(0)
+    tree = FenwickTree()
+    weights: list[float] = []
+    for _ in range(37):
+        weight = rng.choice([0.0, rng.uniform(0, 10)])
+        tree.append(weight)
+        weights.append(weight)
+        _assert_matches(tree, weights)
+
+    for _ in range(100):
+        item, weight = rng.randrange(37), rng.uniform(0, 10)
+        tree.set(item, weight)
+        weights[item] = weight
+    _assert_matches(tree, weights)
+
+    weights = [rng.uniform(0, 10) for _ in range(70)]
+    tree.rebuild(weights)
+    _assert_matches(tree, weights)
+    tree.append(1.0)
+    _assert_matches(tree, [*weights, 1.0])
+
+
+def test_find_draws_in_proportion_to_weight() -> None:
+    rng = random.Random(1)
+    tree = FenwickTree()
+    tree.rebuild([1.0, 0.0, 3.0, 6.0])
+
+    counts = np.zeros(4)
+    for _ in range(10000):
+        counts[tree.find(rng.random() * tree.total())] += 1
+
+    np.testing.assert_allclose(counts / 10000, [0.1, 0.0, 0.3, 0.6], atol=0.02)
+    assert tree.find(tree.total()) == 3
+
+
+def test_rejects_invalid_weights_and_empty_find() -> None:
+    tree = FenwickTree()
+    with pytest.raises(ValueError):
+        tree.find(0.0)
+    with pytest.raises(ValueError):
+        tree.append(-1.0)
+    with pytest.raises(ValueError):
+        tree.rebuild([1.0, float("nan")])
+    tree.append(1.0)
+    with pytest.raises(ValueError):
+        tree.set(0, -1.0)
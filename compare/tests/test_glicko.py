@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from compare.glicko import (
+    DEFAULT_DEVIATION,
+    DEFAULT_RATING,
+    attenuation,
+    deviation_change,
+    expected_score,
+    rate_ranked,
+    replay_1v1,
+)
+
+
+def test_rate_ranked_matches_glickman_example() -> None:
+    # Worked example from Glickman's "The Glicko system": a 1500/200 player
+    # beats a 1400/30 player and loses to 1550/100 and 1700/300 players.
+    ratings, deviations = rate_ranked(
+        [1550.0, 1700.0, 1500.0, 1400.0], [100.0, 300.0, 200.0, 30.0], min_deviation=1.0
+    )
+
+    assert ratings[2] == pytest.approx(1464.1, abs=0.1)
+    assert deviations[2] == pytest.approx(151.4, abs=0.2)
+
+
+def test_expected_score_is_symmetric_for_equal_ratings() -> None:
+    assert expected_score(1500.0, 1500.0, 200.0) == pytest.approx(0.5)
+    assert expected_score(1600.0, 1500.0, 50.0) > expected_score(1600.0, 1500.0, 300.0) > 0.5
+    assert attenuation(0.0) == pytest.approx(1.0)
+
+
+def test_replay_1v1_moves_ratings_and_floors_deviations() -> None:
+    ratings = [DEFAULT_RATING] * 3
+    deviations = [DEFAULT_DEVIATION] * 3
+    replay_1v1(ratings, deviations, [0], [1], min_deviation=30.0)
+
+    assert ratings[0] > DEFAULT_RATING > ratings[1]
+    assert ratings[0] - DEFAULT_RATING == pytest.approx(DEFAULT_RATING - ratings[1])
+    assert deviations[0] == deviations[1] < DEFAULT_DEVIATION
+    assert (ratings[2], deviations[2]) == (DEFAULT_RATING, DEFAULT_DEVIATION)
+
+    replay_1v1(ratings, deviations, [0, 1] * 500, [1, 0] * 500, min_deviation=30.0)
+    assert deviations[0] == deviations[1] == 30.0
+
+
+def test_rate_ranked_orders_players_by_placement() -> None:
+    ratings, deviations = rate_ranked([DEFAULT_RATING] * 4, [DEFAULT_DEVIATION] * 4)
+
+    assert ratings == sorted(ratings, reverse=True)
+    assert all(deviation < DEFAULT_DEVIATION for deviation in deviations)
+
+
+def test_rate_ranked_of_two_players_matches_replay() -> None:
+    ratings, deviations = [1600.0, 1450.0], [120.0, 250.0]
+    replayed_ratings, replayed_deviations = list(ratings), list(deviations)
+    replay_1v1(replayed_ratings, replayed_deviations, [1], [0])
+
+    ranked_ratings, ranked_deviations = rate_ranked(ratings[::-1], deviations[::-1])
+
+    assert ranked_ratings[::-1] == pytest.approx(replayed_ratings)
+    assert ranked_deviations[::-1] == pytest.approx(replayed_deviations)
+
+
+def test_deviation_change_is_negative_symmetric_and_broadcasts() -> None:
+    rng = np.random.default_rng(0)
+    r1, r2 = rng.uniform(1000, 2000, (2, 50))
+    rd1, rd2 = rng.uniform(40, 350, (2, 50))
+
+    change = deviation_change(r1, rd1, r2, rd2)
+
+    assert change.shape == (50,)
+    assert np.all(change < 0)
+    np.testing.assert_allclose(change, deviation_change(r2, rd2, r1, rd1))
+    # Closer ratings are more informative.
+    assert deviation_change(1500, 200, 1500, 200) < deviation_change(1500, 200, 1900, 200)
+    assert deviation_change(r1[:, None], rd1[:, None], r2[None, :], rd2[None, :]).shape == (50, 50)
+
+
+def test_deviation_change_respects_floor() -> None:
+    assert deviation_change(1500, 30, 1500, 30, min_deviation=30.0) == 0.0
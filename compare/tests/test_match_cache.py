@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import compare.match_cache as match_cache
+from compare.match_cache import CachedMatchIO
+from compare.song import Song
+
+
+class _FakeServer:
+    """In-memory `MatchSource`, recording the loads it serves."""
+
+    def __init__(self, songs: list[Song], matches: list[tuple[int, tuple[int, ...]]]) -> None:
+        self.songs = songs
+        self.matches = matches
+        self.song_loads = 0
+        self.history_loads: list[int] = []
+
+    def save_songs(self, _rating_backend: Any, songs: list[Song]) -> None:
+        self.songs = list(songs)
+        self.matches = []
+
+    def load_songs(self) -> list[Song]:
+        self.song_loads += 1
+        return list(self.songs)
+
+    def load_match_history(self) -> Iterator[tuple[int, ...]]:
+        return (songs for _, songs in self.load_match_history_after(0))
+
+    def load_match_history_after(self, after: int) -> Iterator[tuple[int, tuple[int, ...]]]:
+        self.history_loads.append(after)
+        yield from (match for match in self.matches if match[0] > after)
+
+    def save_match(self, _rating_backend: Any, winner: int, loser: int) -> None:
+        self.save_ranked_match(_rating_backend, [winner, loser])
+
+    def save_ranked_match(self, _rating_backend: Any, ranking: list[int]) -> None:
+        next_id = self.matches[-1][0] + 1 if self.matches else 1
+        self.matches.append((next_id, tuple(ranking)))
+
+
+def _songs() -> list[Song]:
+    return [
+        Song(id=id, path=Path(f"/music/{id}.mp3"), title=str(id), extension=".mp3")
+        for id in range(3)
+    ]
+
+
+def _resume(server: _FakeServer, folder: Path) -> tuple[list[Song], list[tuple[int, ...]]]:
+    match_io = CachedMatchIO(server, folder)  # type: ignore[arg-type]
+    return match_io.load_songs(), list(match_io.load_match_history())
+
+
+def test_resume_only_fetches_matches_after_cached_ones(tmp_path: Path) -> None:
+    server = _FakeServer(_songs(), [(1, (0, 1)), (2, (2, 0, 1)), (4, (1, 2))])
+    assert _resume(server, tmp_path) == (_songs(), [(0, 1), (2, 0, 1), (1, 2)])
+    assert server.song_loads == 1
+
+    CachedMatchIO(server, tmp_path).save_match(None, 2, 1)  # type: ignore[arg-type]
+    assert _resume(server, tmp_path) == (_songs(), [(0, 1), (2, 0, 1), (1, 2), (2, 1)])
+    assert _resume(server, tmp_path)[1] == [(0, 1), (2, 0, 1), (1, 2), (2, 1)]
+
+    # Each resume checks the newest cached match, fetching from just before it.
+    assert server.song_loads == 1
+    assert server.history_loads == [0, 3, 4]
+
+
+def test_reads_and_writes_history_in_chunks(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(match_cache, "_CHUNK_SIZE", 2)
+    matches = [(id, (id % 3, (id + 1) % 3, (id + 2) % 3)[:2 + id % 2]) for id in range(1, 8)]
+    server = _FakeServer(_songs(), matches)
+
+    assert _resume(server, tmp_path)[1] == [songs for _, songs in matches]
+    assert _resume(server, tmp_path)[1] == [songs for _, songs in matches]
+    assert server.history_loads == [0, 6]
+
+
+def test_cache_is_discarded_when_server_history_differs(tmp_path: Path) -> None:
+    server = _FakeServer(_songs(), [(1, (0, 1)), (2, (1, 2))])
+    _resume(server, tmp_path)
+
+    # E.g. a new session started from another machine.
+    server.songs = _songs()[:2]
+    server.matches = [(1, (1, 0)), (2, (0, 1))]
+    assert _resume(server, tmp_path) == (_songs()[:2], [(1, 0), (0, 1)])
+    assert server.song_loads == 2
+
+
+def test_partial_records_are_cut_off(tmp_path: Path) -> None:
+    server = _FakeServer(_songs(), [(1, (0, 1)), (2, (1, 2))])
+    _resume(server, tmp_path)
+    with open(tmp_path / "match_songs.bin", "ab") as file:
+        file.write(b"\x01" * 12)
+    with open(tmp_path / "match_ids.bin", "ab") as file:
+        file.write(b"\x01" * 9)
+
+    server.matches.append((3, (2, 0)))
+    assert _resume(server, tmp_path)[1] == [(0, 1), (1, 2), (2, 0)]
+    assert server.history_loads == [0, 1]
+
+
+def test_save_songs_starts_a_new_cache(tmp_path: Path) -> None:
+    server = _FakeServer(_songs(), [(1, (0, 1))])
+    _resume(server, tmp_path)
+
+    match_io = CachedMatchIO(server, tmp_path)  # type: ignore[arg-type]
+    match_io.save_songs(None, _songs()[1:])  # type: ignore[arg-type]
+    assert match_io.load_songs() == _songs()[1:]
+    assert list(match_io.load_match_history()) == []
+    assert server.song_loads == 1
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import json
+import threading
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Any
 
 import pytest
 
-from compare.matchio import OnlineMatchIO
+import compare.matchio as matchio
+from compare.matchio import MatchResult, OnlineMatchIO
+from compare.matchmaking import RatingBackend
 from compare.song import Song
 
 
@@ -21,6 +26,35 @@ class _FakeResponse:
             raise RuntimeError(f"HTTP {self.status_code}")
 
 
+class _FakeSession:
+    """Records requests, answering GETs and POSTs with the given handlers."""
+
+    def __init__(
+        self,
+        get: Callable[..., _FakeResponse] | None = None,
+        post: Callable[..., _FakeResponse] | None = None
+    ) -> None:
+        self._handlers = {"GET": get, "POST": post}
+        self.closed = False
+
+    def request(self, method: str, url: str, **kwargs: Any) -> _FakeResponse:
+        handler = self._handlers[method]
+        assert handler is not None, f"Unexpected {method} {url}"
+        return handler(url, **kwargs)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _online_match_io(
+    get: Callable[..., _FakeResponse] | None = None,
+    post: Callable[..., _FakeResponse] | None = None
+) -> OnlineMatchIO:
+    return OnlineMatchIO(
+        base_url="http://example.test/api", session=_FakeSession(get, post)  # type: ignore[arg-type]
+    )
+
+
 class _FakeBackend:
     def __init__(self, ratings: dict[int, float]) -> None:
         self._ratings = ratings
@@ -29,7 +63,12 @@ class _FakeBackend:
         return self._ratings[player]
 
 
-def test_save_songs_deletes_then_posts_payload(monkeypatch: pytest.MonkeyPatch) -> None:
+def _fake_backend(ratings: dict[int, float]) -> RatingBackend:
+    # `MatchIO` only reads `overall_rating` from the backend.
+    return _FakeBackend(ratings)  # type: ignore[return-value]
+
+
+def test_save_songs_deletes_then_posts_payload() -> None:
     calls: list[tuple[str, str, dict[str, Any]]] = []
 
     def fake_get(url: str, **kwargs: Any) -> _FakeResponse:
@@ -40,18 +79,14 @@ def test_save_songs_deletes_then_posts_payload(monkeypatch: pytest.MonkeyPatch)
         calls.append(("post", url, dict(kwargs)))
         return _FakeResponse(status_code=200)
 
-    import compare.matchio as matchio_mod
 
-    monkeypatch.setattr(matchio_mod.requests, "get", fake_get)
-    monkeypatch.setattr(matchio_mod.requests, "post", fake_post)
-
-    backend = _FakeBackend({0: 10.0, 1: 20.5})
+    backend = _fake_backend({0: 10.0, 1: 20.5})
     songs = [
         Song(id=0, path=Path(r"C:\music\a.mp3"), title="a", extension=".mp3"),
         Song(id=1, path=Path(r"C:\music\b.wav"), title="b", extension=".wav"),
     ]
 
-    io = OnlineMatchIO(base_url="http://example.test/api")
+    io = _online_match_io(fake_get, fake_post)
     io.save_songs(backend, songs)
 
     assert [c[0] for c in calls] == ["get", "post"]
@@ -77,19 +112,16 @@ def test_save_songs_deletes_then_posts_payload(monkeypatch: pytest.MonkeyPatch)
     ]
 
 
-def test_load_songs_raises_on_non_200(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_load_songs_raises_on_non_200() -> None:
     def fake_get(_url: str, **_kwargs: Any) -> _FakeResponse:
         return _FakeResponse(status_code=500, text="[]")
 
-    import compare.matchio as matchio_mod
-
-    monkeypatch.setattr(matchio_mod.requests, "get", fake_get)
-    io = OnlineMatchIO(base_url="http://example.test/api")
+    io = _online_match_io(fake_get)
     with pytest.raises(RuntimeError):
         io.load_songs()
 
 
-def test_load_songs_parses_models(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_load_songs_parses_models() -> None:
     songs_json = json.dumps(
         [
             {"id": 0, "path": r"C:\m\a.mp3", "title": "a", "extension": ".mp3"},
@@ -100,10 +132,7 @@ def test_load_songs_parses_models(monkeypatch: pytest.MonkeyPatch) -> None:
     def fake_get(_url: str, **_kwargs: Any) -> _FakeResponse:
         return _FakeResponse(status_code=200, text=songs_json)
 
-    import compare.matchio as matchio_mod
-
-    monkeypatch.setattr(matchio_mod.requests, "get", fake_get)
-    io = OnlineMatchIO(base_url="http://example.test/api")
+    io = _online_match_io(fake_get)
     songs = io.load_songs()
 
     assert [s.id for s in songs] == [0, 1]
@@ -111,50 +140,89 @@ def test_load_songs_parses_models(monkeypatch: pytest.MonkeyPatch) -> None:
     assert [str(s.path) for s in songs] == [r"C:\m\a.mp3", r"C:\m\b.wav"]
 
 
-def test_load_match_history_raises_on_non_200(monkeypatch: pytest.MonkeyPatch) -> None:
+def _match_pages(*pages: list[dict[str, Any]]) -> Callable[..., _FakeResponse]:
+    """Answer match history requests with `pages`, keyed by the id they follow."""
+    afters = [0] + [page[-1]["id"] for page in pages[:-1]]
+    responses = {
+        after: json.dumps({"matches": page, "next_after": next_after})
+        for after, page, next_after in zip(afters, pages, afters[1:] + [None])
+    }
+
+    def fake_get(url: str, **kwargs: Any) -> _FakeResponse:
+        assert url.endswith("/match/page")
+        return _FakeResponse(status_code=200, text=responses[kwargs["params"]["after"]])
+
+    return fake_get
+
+
+def test_load_match_history_raises_on_non_200() -> None:
     def fake_get(_url: str, **_kwargs: Any) -> _FakeResponse:
         return _FakeResponse(status_code=404, text="[]")
 
-    import compare.matchio as matchio_mod
-
-    monkeypatch.setattr(matchio_mod.requests, "get", fake_get)
-    io = OnlineMatchIO(base_url="http://example.test/api")
+    io = _online_match_io(fake_get)
     with pytest.raises(RuntimeError):
-        io.load_match_history()
+        list(io.load_match_history())
 
 
-def test_load_match_history_parses_models(monkeypatch: pytest.MonkeyPatch) -> None:
-    matches_json = json.dumps(
-        [
-            {"id": 1, "winner_id": 0, "loser_id": 1},
-            {"id": 2, "winner_id": 2, "loser_id": 0},
-        ]
-    )
+def test_load_match_history_parses_models() -> None:
+    io = _online_match_io(_match_pages([
+        {"id": 1, "winner_id": 0, "loser_id": 1},
+        {"id": 2, "winner_id": 2, "loser_id": 0},
+    ]))
+    assert list(io.load_match_history()) == [(0, 1), (2, 0)]
 
-    def fake_get(_url: str, **_kwargs: Any) -> _FakeResponse:
-        return _FakeResponse(status_code=200, text=matches_json)
 
-    import compare.matchio as matchio_mod
+def test_load_match_history_uses_ranked_songs() -> None:
+    io = _online_match_io(_match_pages([
+        {"id": 1, "winner_id": 0, "loser_id": 1, "songs": [0, 1]},
+        {"id": 2, "winner_id": 2, "loser_id": 1, "songs": [2, 0, 1]},
+        {"id": 3, "winner_id": 1, "loser_id": 2, "songs": None},
+    ]))
+    assert list(io.load_match_history()) == [(0, 1), (2, 0, 1), (1, 2)]
 
-    monkeypatch.setattr(matchio_mod.requests, "get", fake_get)
-    io = OnlineMatchIO(base_url="http://example.test/api")
+
+def test_load_match_history_follows_pages_lazily() -> None:
+    requested: list[dict[str, int]] = []
+    fake_get = _match_pages(
+        [{"id": 1, "winner_id": 0, "loser_id": 1}, {"id": 4, "winner_id": 1, "loser_id": 0}],
+        [{"id": 7, "winner_id": 2, "loser_id": 1, "songs": [2, 1, 0]}]
+    )
+
+    def recording_get(url: str, **kwargs: Any) -> _FakeResponse:
+        requested.append(kwargs["params"])
+        return fake_get(url, **kwargs)
+
+    io = OnlineMatchIO(
+        base_url="http://example.test/api",
+        history_page_size=2,
+        session=_FakeSession(recording_get)  # type: ignore[arg-type]
+    )
     history = io.load_match_history()
-    assert history == [(0, 1), (2, 0)]
+    assert requested == []
+    assert next(history) == (0, 1)
+    assert requested == [{"after": 0, "limit": 2}]
+    assert list(history) == [(1, 0), (2, 1, 0)]
+    assert requested == [{"after": 0, "limit": 2}, {"after": 4, "limit": 2}]
+
+
+def test_load_match_history_after_yields_matchup_ids() -> None:
+    io = _online_match_io(_match_pages([
+        {"id": 5, "winner_id": 0, "loser_id": 1},
+        {"id": 9, "winner_id": 2, "loser_id": 1, "songs": [2, 0, 1]},
+    ]))
+    assert list(io.load_match_history_after(0)) == [(5, (0, 1)), (9, (2, 0, 1))]
 
 
-def test_save_match_posts_payload(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_save_match_posts_payload() -> None:
     calls: list[tuple[str, str, dict[str, Any]]] = []
 
     def fake_post(url: str, **kwargs: Any) -> _FakeResponse:
         calls.append(("post", url, dict(kwargs)))
         return _FakeResponse(status_code=201)
 
-    import compare.matchio as matchio_mod
 
-    monkeypatch.setattr(matchio_mod.requests, "post", fake_post)
-
-    backend = _FakeBackend({0: 99.0, 1: 12.25})
-    io = OnlineMatchIO(base_url="http://example.test/api")
+    backend = _fake_backend({0: 99.0, 1: 12.25})
+    io = _online_match_io(post=fake_post)
     io.save_match(backend, winner=0, loser=1)
 
     assert len(calls) == 1
@@ -166,3 +234,131 @@ def test_save_match_posts_payload(monkeypatch: pytest.MonkeyPatch) -> None:
         "losing_song_rating": 12.25,
     }
 
+
+
+def test_save_matches_posts_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(matchio, "_MAX_BATCH_SIZE", 2)
+    calls: list[tuple[str, dict[str, Any]]] = []
+
+    def fake_post(url: str, **kwargs: Any) -> _FakeResponse:
+        calls.append((url, dict(kwargs)))
+        return _FakeResponse(status_code=201)
+
+    backend = _fake_backend({0: 99.0, 1: 12.25, 2: 50.0})
+    io = _online_match_io(post=fake_post)
+    io.save_matches([
+        MatchResult.of(backend, (0, 1)),  # type: ignore[arg-type]
+        MatchResult.of(backend, [2, 0, 1]),  # type: ignore[arg-type]
+        MatchResult((1, 2), (13.0, 49.0)),
+    ])
+
+    assert [url for url, _ in calls] == ["http://example.test/api/match/batch"] * 2
+    assert calls[0][1]["json"] == [
+        {"songs": [0, 1], "ratings": [99.0, 12.25]},
+        {"songs": [2, 0, 1], "ratings": [50.0, 99.0, 12.25]},
+    ]
+    assert calls[1][1]["json"] == [{"songs": [1, 2], "ratings": [13.0, 49.0]}]
+
+
+def test_save_ranked_match_posts_payload() -> None:
+    calls: list[tuple[str, str, dict[str, Any]]] = []
+
+    def fake_post(url: str, **kwargs: Any) -> _FakeResponse:
+        calls.append(("post", url, dict(kwargs)))
+        return _FakeResponse(status_code=201)
+
+
+    backend = _fake_backend({0: 99.0, 1: 12.25, 2: 50.5})
+    io = _online_match_io(post=fake_post)
+    io.save_ranked_match(backend, [2, 0, 1])
+
+    assert len(calls) == 1
+    assert calls[0][1] == "http://example.test/api/match/ranked"
+    assert calls[0][2]["json"] == {
+        "songs": [2, 0, 1],
+        "ratings": [50.5, 99.0, 12.25],
+    }
+
+
+def test_requests_use_configured_timeouts_and_close_with_context() -> None:
+    calls: list[dict[str, Any]] = []
+
+    def fake_get(_url: str, **kwargs: Any) -> _FakeResponse:
+        calls.append(kwargs)
+        return _FakeResponse(status_code=200, text="[]")
+
+    session = _FakeSession(get=fake_get)
+    with OnlineMatchIO(
+        "http://example.test/api", connect_timeout=1.5, read_timeout=30.0,
+        session=session  # type: ignore[arg-type]
+    ) as io:
+        assert io.load_songs() == []
+        assert not session.closed
+    assert session.closed
+    assert calls[0]["timeout"] == (1.5, 30.0)
+
+    stats = io.request_stats()
+    assert stats.requests == 1
+    assert stats.total_seconds == stats.last_seconds >= 0.0
+
+
+@pytest.mark.parametrize(
+    "kwargs", [
+        {"pool_size": 0}, {"connect_timeout": 0.0}, {"read_timeout": -1.0},
+        {"history_page_size": 0}, {"history_page_size": 50_001}
+    ]
+)
+def test_rejects_invalid_pool_settings(kwargs: dict[str, float]) -> None:
+    with pytest.raises(ValueError):
+        OnlineMatchIO(**kwargs)  # type: ignore[arg-type]
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one write, as real servers do, so delayed
+    # ACKs do not stall reused connections.
+    wbufsize = 1 << 16
+
+    def do_GET(self) -> None:
+        self._reply(b"[]")
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self._reply(b"{}")
+
+    def _reply(self, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def keep_alive_server() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pooled_session_reuses_one_connection(keep_alive_server: str) -> None:
+    backend = _fake_backend({0: 1.0, 1: 2.0})
+    with OnlineMatchIO(keep_alive_server) as io:
+        assert io.load_songs() == []
+        for _ in range(5):
+            io.save_match(backend, winner=0, loser=1)
+
+        stats = io.request_stats()
+        assert stats.requests == 6
+        assert stats.new_connections == 1
+        assert stats.reused_connections == 5
+        assert 0.0 < stats.mean_seconds <= stats.total_seconds
+
@@ -11,18 +11,32 @@ from __future__ import annotations
 import math
 import random
 from collections.abc import Callable, Iterable
+from typing import TypedDict, Unpack
+from itertools import combinations
 
+import numpy as np
 import pytest
+from openskill.models import PlackettLuce, PlackettLuceRating
 
-from compare.matchmaking import PlackettLuceBackend
+from compare.matchmaking import (
+    CERTAINTY_BINS, BradleyTerryBackend, CacheStats, CertaintySummary, GlickoBackend,
+    MatchupSearch, PlackettLuceBackend, RatingBackend
+)
+from compare.plackett_luce import sigma_change_ev
 
 
-def make_plackett_luce_backend(**kwargs: object) -> PlackettLuceBackend:
+class _BackendOptions(TypedDict, total=False):
+    """Constructor arguments every backend factory accepts."""
+    rng_seed: int | None
+    relative_repeat_penalty: float | None
+
+
+def make_plackett_luce_backend(**kwargs: Unpack[_BackendOptions]) -> PlackettLuceBackend:
     """Backend factory for `PlackettLuceBackend`."""
     return PlackettLuceBackend(**kwargs)
 
 
-def _create_players(backend: PlackettLuceBackend, ids: Iterable[int]) -> list[int]:
+def _create_players(backend: RatingBackend, ids: Iterable[int]) -> list[int]:
     """Create players with the given IDs and return them in creation order."""
     id_list = list(ids)
     for player_id in id_list:
@@ -36,7 +50,7 @@ def _assert_ranks_are_permutation(ranks: dict[int, int], player_ids: list[int])
     assert set(ranks.values()) == set(range(1, len(player_ids) + 1))
 
 
-def _assert_all_finite_overall_ratings(backend: PlackettLuceBackend, player_ids: list[int]) -> None:
+def _assert_all_finite_overall_ratings(backend: RatingBackend, player_ids: list[int]) -> None:
     """Assert `overall_rating` returns finite floats for all players."""
     for player_id in player_ids:
         rating = backend.overall_rating(player_id)
@@ -45,7 +59,7 @@ def _assert_all_finite_overall_ratings(backend: PlackettLuceBackend, player_ids:
 
 
 def _simulate_random_matches(
-    backend: PlackettLuceBackend,
+    backend: RatingBackend,
     player_ids: list[int],
     rng: random.Random,
     *,
@@ -59,7 +73,62 @@ def _simulate_random_matches(
         backend.update(winner, loser)
 
 
-@pytest.fixture(params=[pytest.param(make_plackett_luce_backend, id="plackett_luce")])
+def make_pruned_plackett_luce_backend(**kwargs: Unpack[_BackendOptions]) -> PlackettLuceBackend:
+    """Backend factory for `PlackettLuceBackend` with pruned matchup search."""
+    return PlackettLuceBackend(
+        search=MatchupSearch.PRUNED, pruned_candidates=4, pruned_neighbours=2, **kwargs
+    )
+
+
+def make_sampled_plackett_luce_backend(**kwargs: Unpack[_BackendOptions]) -> PlackettLuceBackend:
+    """Backend factory for `PlackettLuceBackend` with sampled matchup search."""
+    return PlackettLuceBackend(search=MatchupSearch.SAMPLED, sampled_matchups=16, **kwargs)
+
+
+def make_parallel_plackett_luce_backend(**kwargs: Unpack[_BackendOptions]) -> PlackettLuceBackend:
+    """Backend factory for `PlackettLuceBackend` with parallel exhaustive search."""
+    return PlackettLuceBackend(search=MatchupSearch.PARALLEL, search_workers=2, **kwargs)
+
+
+def make_tiered_plackett_luce_backend(**kwargs: Unpack[_BackendOptions]) -> PlackettLuceBackend:
+    """Backend factory for `PlackettLuceBackend` with tiered matchup search."""
+    return PlackettLuceBackend(search=MatchupSearch.TIERED, tier_size=2, **kwargs)
+
+
+def make_glicko_backend(**kwargs: Unpack[_BackendOptions]) -> GlickoBackend:
+    """Backend factory for `GlickoBackend`."""
+    return GlickoBackend(**kwargs)
+
+
+def make_bradley_terry_backend(**kwargs: Unpack[_BackendOptions]) -> BradleyTerryBackend:
+    """Backend factory for `BradleyTerryBackend`, refitting on every update by default."""
+    return BradleyTerryBackend(**kwargs)
+
+
+def make_approximate_bradley_terry_backend(
+    **kwargs: Unpack[_BackendOptions]
+) -> BradleyTerryBackend:
+    """Backend factory for `BradleyTerryBackend` applying results approximately."""
+    return BradleyTerryBackend(refit_threshold=10**9, **kwargs)
+
+
+# Refits only converge to `BradleyTerryBackend` tolerance, so ratings from
+# bulk and sequential updates agree up to about this much.
+_REFIT_RATING_TOLERANCES: dict[Callable[..., RatingBackend], float] = {
+    make_bradley_terry_backend: 1e-4
+}
+
+
+@pytest.fixture(params=[
+    pytest.param(make_plackett_luce_backend, id="plackett_luce"),
+    pytest.param(make_pruned_plackett_luce_backend, id="plackett_luce_pruned"),
+    pytest.param(make_sampled_plackett_luce_backend, id="plackett_luce_sampled"),
+    pytest.param(make_parallel_plackett_luce_backend, id="plackett_luce_parallel"),
+    pytest.param(make_tiered_plackett_luce_backend, id="plackett_luce_tiered"),
+    pytest.param(make_glicko_backend, id="glicko"),
+    pytest.param(make_bradley_terry_backend, id="bradley_terry"),
+    pytest.param(make_approximate_bradley_terry_backend, id="bradley_terry_approximate"),
+])
 def backend_factory(
     request: pytest.FixtureRequest,
 ) -> Callable[..., PlackettLuceBackend]:
@@ -98,6 +167,125 @@ class TestRatingBackendContract:
                 backend.overall_rating(player_id)
             )
 
+    def test_update_many_matches_sequential_updates(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Bulk replay gives the same state as one `update` per match."""
+        rng = random.Random(0)
+        matches = [tuple(rng.sample(range(8), 2)) for _ in range(100)]
+        matches.append((3, 3))
+
+        sequential = backend_factory(rng_seed=0)
+        bulk = backend_factory(rng_seed=0)
+        player_ids = _create_players(sequential, range(8))
+        _create_players(bulk, player_ids)
+        for winner, loser in matches:
+            sequential.update(winner, loser)
+        bulk.update_many(matches)
+
+        tolerance = _REFIT_RATING_TOLERANCES.get(backend_factory, 0.0)
+        assert bulk.ranks() == sequential.ranks()
+        assert bulk.rating_certainties() == pytest.approx(
+            sequential.rating_certainties(), rel=0, abs=tolerance
+        )
+        assert bulk.overall_ratings() == pytest.approx(
+            sequential.overall_ratings(), rel=0, abs=tolerance
+        )
+        assert bulk.pick_two_players() == sequential.pick_two_players()
+
+    def test_update_many_with_unknown_player_applies_nothing(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Invalid IDs raise `ValueError` before any result is applied."""
+        backend = backend_factory()
+        player_ids = _create_players(backend, range(3))
+        before = {pid: backend.overall_rating(pid) for pid in player_ids}
+        with pytest.raises(ValueError):
+            backend.update_many([(0, 1), (1, 10_000)])
+        assert {pid: backend.overall_rating(pid) for pid in player_ids} == before
+
+        backend.update_many([])
+        assert {pid: backend.overall_rating(pid) for pid in player_ids} == before
+
+    def test_load_state_restores_saved_backend(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """A backend loaded from `save_state` behaves exactly like the original."""
+        original = backend_factory(rng_seed=3)
+        player_ids = _create_players(original, [4, 0, 7, 2, 9, 5])
+        _simulate_random_matches(original, player_ids, random.Random(3), n_matches=30)
+        original.pick_two_players()
+
+        restored = backend_factory()
+        _create_players(restored, [1])
+        restored.load_state(original.save_state())
+
+        assert restored.ranks() == original.ranks()
+        assert restored.rating_certainties() == original.rating_certainties()
+        for player_id in player_ids:
+            assert restored.overall_rating(player_id) == original.overall_rating(player_id)
+        for _ in range(10):
+            pick = original.pick_two_players()
+            assert restored.pick_two_players() == pick
+            original.update(*pick)
+            restored.update(*pick)
+
+    def test_load_state_rejects_malformed_state(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Malformed state raises `ValueError` and leaves the backend unchanged."""
+        backend = backend_factory()
+        player_ids = _create_players(backend, range(3))
+        ranks = backend.ranks()
+        state = backend.save_state()
+        for bad_state in (b"", b"junk", state[:len(state) // 2]):
+            with pytest.raises(ValueError):
+                backend.load_state(bad_state)
+        assert backend.ranks() == ranks
+        backend.update(player_ids[2], player_ids[0])
+
+    @pytest.mark.parametrize("n_players, k", [(10, 3), (9, 4), (8, 4), (30, 12)])
+    def test_pick_k_matchups_returns_disjoint_pairs(
+        self, backend_factory: Callable[..., PlackettLuceBackend], n_players: int, k: int
+    ) -> None:
+        """`pick_k_matchups` returns `k` valid matchups sharing no player."""
+        rng = random.Random(n_players)
+        backend = backend_factory(rng_seed=n_players)
+        player_ids = _create_players(backend, rng.sample(range(100), n_players))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=40)
+
+        matchups = backend.pick_k_matchups(k)
+        assert len(matchups) == k
+        picked = [player_id for matchup in matchups for player_id in matchup]
+        assert len(set(picked)) == 2 * k
+        assert set(picked) <= set(player_ids)
+        assert backend.pick_k_matchups(0) == []
+
+    def test_pick_k_matchups_starts_with_pick_two_players(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """The first batch matchup is the one `pick_two_players` would pick."""
+        single = backend_factory(rng_seed=5)
+        batch = backend_factory(rng_seed=5)
+        player_ids = _create_players(single, range(12))
+        _create_players(batch, player_ids)
+        matches = [(0, 1), (2, 3), (4, 5), (1, 6), (7, 0)]
+        single.update_many(matches)
+        batch.update_many(matches)
+
+        assert batch.pick_k_matchups(1) == [single.pick_two_players()]
+
+    def test_pick_k_matchups_validates_k(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Negative `k`, or too few players for `k` disjoint pairs, raise."""
+        backend = backend_factory()
+        _create_players(backend, range(5))
+        with pytest.raises(ValueError):
+            backend.pick_k_matchups(-1)
+        with pytest.raises(ValueError):
+            backend.pick_k_matchups(3)
+
     def test_pick_two_players_requires_at_least_two_players(
         self, backend_factory: Callable[..., PlackettLuceBackend]
     ) -> None:
@@ -163,6 +351,76 @@ class TestRatingBackendContract:
         assert set(certainties.keys()) == set(player_ids)
         assert all(certainties[player_id] == 0.0 for player_id in player_ids)
 
+    def test_certainty_summary_describes_rating_certainties(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """The summary matches statistics of the per-player certainties."""
+        backend = backend_factory()
+        assert backend.certainty_summary() == CertaintySummary.of(np.zeros(0))
+        player_ids = _create_players(backend, range(30))
+        _simulate_random_matches(backend, player_ids, random.Random(0), n_matches=60)
+
+        certainties = np.array(list(backend.rating_certainties().values()))
+        summary = backend.certainty_summary()
+        assert summary.count == 30
+        assert summary.mean == pytest.approx(certainties.mean())
+        assert summary.median == pytest.approx(np.median(certainties))
+        assert sum(summary.histogram) == 30
+        assert len(summary.histogram) == CERTAINTY_BINS
+        assert list(summary.quantiles) == sorted(summary.quantiles)
+
+    def test_rating_arrays_are_aligned_copies(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Rating arrays list every player, and later updates leave them as is."""
+        backend = backend_factory()
+        _create_players(backend, [5, 2, 9])
+        ids, mu, sigma = backend.rating_arrays()
+        assert sorted(ids.tolist()) == [2, 5, 9]
+        assert len(mu) == len(sigma) == 3
+
+        backend.update(9, 5)
+        assert backend.rating_arrays()[1].tolist() != mu.tolist()
+        winner = ids.tolist().index(9)
+        assert backend.rating_arrays()[1][winner] > mu[winner]
+
+    def test_focus_restricts_picks_until_lifted(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Focused picks only use focused players, including new ones added after."""
+        rng = random.Random(0)
+        backend = backend_factory(rng_seed=0)
+        player_ids = _create_players(backend, range(12))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=30)
+        focused = {3, 7, 8, 11}
+        backend.focus(focused)
+        _create_players(backend, [12, 13])
+
+        for _ in range(5):
+            a, b = backend.pick_two_players()
+            assert {a, b} <= focused
+            backend.update(a, b)
+        assert set(backend.pick_group(3)) <= focused
+        matchups = backend.pick_k_matchups(2)
+        assert {player for matchup in matchups for player in matchup} == focused
+        with pytest.raises(ValueError):
+            backend.pick_group(5)
+        with pytest.raises(ValueError):
+            backend.pick_k_matchups(3)
+
+        backend.focus(None)
+        assert len(backend.pick_k_matchups(7)) == 7
+
+    def test_focus_rejects_invalid_players(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        backend = backend_factory()
+        _create_players(backend, range(3))
+        with pytest.raises(ValueError):
+            backend.focus([0, 5])
+        with pytest.raises(ValueError):
+            backend.focus([1, 1])
+
     def test_ranks_break_ties_by_id_for_fresh_players(
         self, backend_factory: Callable[..., PlackettLuceBackend]
     ) -> None:
@@ -253,6 +511,198 @@ class TestRatingBackendContract:
         for expected_rank, player_id in enumerate(expected_order, start=1):
             assert ranks[player_id] == expected_rank
 
+    def test_rank_of_and_top_k_agree_with_ranks(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """`rank_of` and `top_k` stay consistent with `ranks` through updates."""
+        rng = random.Random(7)
+        backend = backend_factory(rng_seed=7)
+        player_ids = _create_players(backend, rng.sample(range(500), 100))
+
+        def check() -> None:
+            ranks = backend.ranks()
+            by_rank = sorted(ranks, key=ranks.__getitem__)
+            assert backend.top_k(10) == by_rank[:10]
+            assert backend.top_k(0) == []
+            assert backend.top_k(len(by_rank) + 5) == by_rank
+            for player_id in player_ids:
+                assert backend.rank_of(player_id) == ranks[player_id]
+
+        check()
+        _simulate_random_matches(backend, player_ids, rng, n_matches=50)
+        check()
+        # Bulk replay touching many players at once.
+        backend.update_many(
+            [tuple(rng.sample(player_ids, 2)) for _ in range(300)]
+        )
+        check()
+        player_ids += _create_players(backend, [1000, 1001])
+        check()
+
+        with pytest.raises(ValueError):
+            backend.rank_of(5000)
+        with pytest.raises(ValueError):
+            backend.top_k(-1)
+
+    def test_update_ranked_pair_matches_update(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """A ranking of two players is a 1v1 result."""
+        ranked = backend_factory(rng_seed=0)
+        paired = backend_factory(rng_seed=0)
+        player_ids = _create_players(ranked, range(4))
+        _create_players(paired, player_ids)
+
+        ranked.update_ranked([2, 0])
+        paired.update(2, 0)
+
+        for player_id in player_ids:
+            assert ranked.overall_rating(player_id) == paired.overall_rating(player_id)
+        assert ranked.ranks() == paired.ranks()
+
+    def test_update_ranked_orders_players_by_finish(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Players finishing higher end up rated higher, from equal ratings."""
+        backend = backend_factory()
+        _create_players(backend, range(5))
+        before = backend.state_version
+
+        backend.update_ranked([3, 1, 4, 0])
+
+        ratings = [backend.overall_rating(player_id) for player_id in (3, 1, 4, 0)]
+        assert ratings == sorted(ratings, reverse=True)
+        assert ratings[0] > ratings[-1]
+        assert backend.state_version > before
+        assert backend.ranks()[3] == 1
+        assert backend.top_k(1) == [3]
+
+    def test_update_ranked_rejects_invalid_rankings(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Invalid rankings raise and leave ratings unchanged."""
+        backend = backend_factory()
+        player_ids = _create_players(backend, range(4))
+        ratings = [backend.overall_rating(player_id) for player_id in player_ids]
+
+        for ranking in ([0], [0, 1, 0], [0, 1, 99]):
+            with pytest.raises(ValueError):
+                backend.update_ranked(ranking)
+        with pytest.raises(ValueError):
+            backend.update_many([(0, 1), (1, 2, 3), (2, 3, 2)])
+
+        assert [backend.overall_rating(player_id) for player_id in player_ids] == ratings
+
+    def test_update_many_with_rankings_matches_sequential_updates(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Bulk replay of mixed 1v1 and multi-way results matches one call each."""
+        rng = random.Random(3)
+        matches = [
+            tuple(rng.sample(range(8), rng.choice([2, 2, 3, 4]))) for _ in range(60)
+        ]
+
+        sequential = backend_factory(rng_seed=0)
+        bulk = backend_factory(rng_seed=0)
+        player_ids = _create_players(sequential, range(8))
+        _create_players(bulk, player_ids)
+        for match in matches:
+            sequential.update_ranked(match)
+        bulk.update_many(matches)
+
+        tolerance = _REFIT_RATING_TOLERANCES.get(backend_factory, 0.0)
+        assert bulk.ranks() == sequential.ranks()
+        for player_id in player_ids:
+            assert bulk.overall_rating(player_id) == pytest.approx(
+                sequential.overall_rating(player_id), rel=1e-6, abs=tolerance
+            )
+
+    def test_pick_group_returns_distinct_players(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """Groups are distinct existing players of the requested size."""
+        rng = random.Random(5)
+        backend = backend_factory(rng_seed=5)
+        player_ids = _create_players(backend, range(10))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=30)
+
+        for size in range(2, 11):
+            group = backend.pick_group(size)
+            assert len(group) == size
+            assert len(set(group)) == size
+            assert set(group) <= set(player_ids)
+
+        for size in (1, 11):
+            with pytest.raises(ValueError):
+                backend.pick_group(size)
+
+    def test_pick_group_of_two_matches_pick_two_players(
+        self, backend_factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """A group of two is the pair `pick_two_players` would pick."""
+        rng = random.Random(9)
+        grouped = backend_factory(rng_seed=9)
+        paired = backend_factory(rng_seed=9)
+        player_ids = _create_players(grouped, range(12))
+        _create_players(paired, player_ids)
+        matches = [tuple(rng.sample(player_ids, 2)) for _ in range(40)]
+        grouped.update_many(matches)
+        paired.update_many(matches)
+
+        assert tuple(grouped.pick_group(2)) == paired.pick_two_players()
+
+
+class TestRepeatPenalty:
+    """Played pair tracking, shared by every backend."""
+
+    @pytest.mark.parametrize("factory", [
+        pytest.param(make_plackett_luce_backend, id="plackett_luce"),
+        pytest.param(make_parallel_plackett_luce_backend, id="plackett_luce_parallel"),
+        pytest.param(make_glicko_backend, id="glicko"),
+        pytest.param(make_bradley_terry_backend, id="bradley_terry"),
+        pytest.param(make_approximate_bradley_terry_backend, id="bradley_terry_approximate"),
+    ])
+    def test_large_penalty_avoids_repeats_until_all_pairs_played(
+        self, factory: Callable[..., PlackettLuceBackend]
+    ) -> None:
+        """
+        Every pair is picked once before any pair is picked twice. Five
+        players keep every pair within the default search neighbourhoods.
+        """
+        rng = random.Random(0)
+        backend = factory(rng_seed=0, relative_repeat_penalty=4.0)
+        player_ids = _create_players(backend, range(5))
+        picked: list[tuple[int, ...]] = []
+        for _ in range(10):
+            a, b = backend.pick_two_players()
+            picked.append(tuple(sorted((a, b))))
+            backend.update(*((a, b) if rng.random() < 0.5 else (b, a)))
+        assert sorted(picked) == list(combinations(player_ids, 2))
+
+    def test_replay_and_state_restore_played_pairs(self) -> None:
+        """Bulk replay records pairs, and states carry them."""
+        history = [(0, 1), (2, 3), (1, 2, 4)]
+        replayed = PlackettLuceBackend(rng_seed=0, relative_repeat_penalty=1.0)
+        _create_players(replayed, range(6))
+        replayed.update_many(history)
+        assert replayed._played is not None
+        assert replayed._played.count() == 5
+
+        restored = PlackettLuceBackend(relative_repeat_penalty=1.0)
+        restored.load_state(replayed.save_state())
+        assert restored._played is not None and restored._played.count() == 5
+        assert restored.pick_two_players() == replayed.pick_two_players()
+
+        untracked = PlackettLuceBackend()
+        _create_players(untracked, range(6))
+        with pytest.raises(ValueError):
+            restored.load_state(untracked.save_state())
+
+    @pytest.mark.parametrize("penalty", [-0.1, math.inf])
+    def test_rejects_invalid_penalty(self, penalty: float) -> None:
+        with pytest.raises(ValueError):
+            GlickoBackend(relative_repeat_penalty=penalty)
+
 
 class TestPlackettLuceBackendSpecific:
     """Tests specific to `PlackettLuceBackend` configuration and determinism."""
@@ -262,6 +712,177 @@ class TestPlackettLuceBackendSpecific:
         with pytest.raises(ValueError):
             PlackettLuceBackend(relative_matchup_epsilon=-0.0001)
 
+    @pytest.mark.parametrize(
+        "make_backend",
+        [
+            lambda: PlackettLuceBackend(pruned_candidates=0),
+            lambda: PlackettLuceBackend(pruned_neighbours=0),
+            lambda: PlackettLuceBackend(sampled_matchups=0),
+            lambda: PlackettLuceBackend(tier_size=0),
+        ],
+    )
+    def test_rejects_non_positive_search_sizes(
+        self, make_backend: Callable[[], PlackettLuceBackend]
+    ) -> None:
+        """Constructor input validation for search size parameters."""
+        with pytest.raises(ValueError):
+            make_backend()
+
+    def test_matchup_report_requires_pick_since_last_update(self) -> None:
+        """Reports describe the last pick, so updates invalidate them."""
+        backend = PlackettLuceBackend(rng_seed=0)
+        _create_players(backend, range(5))
+        with pytest.raises(ValueError):
+            backend.matchup_report()
+
+        a, b = backend.pick_two_players()
+        backend.matchup_report()
+        backend.update(a, b)
+        with pytest.raises(ValueError):
+            backend.matchup_report()
+
+    def test_exhaustive_matchup_report_is_optimal_without_epsilon(self) -> None:
+        """With no tie tolerance, exhaustive search always picks the optimum."""
+        rng = random.Random(0)
+        backend = PlackettLuceBackend(rng_seed=0, relative_matchup_epsilon=0.0)
+        player_ids = _create_players(backend, range(20))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=40)
+
+        backend.pick_two_players()
+        report = backend.matchup_report()
+        assert report.search == MatchupSearch.EXHAUSTIVE
+        assert report.candidates == 20 * 19 // 2
+        assert report.ev == report.optimal_ev
+        assert report.ev_ratio == 1.0
+
+    @pytest.mark.parametrize(
+        "search", [MatchupSearch.PRUNED, MatchupSearch.SAMPLED, MatchupSearch.TIERED]
+    )
+    def test_approximate_search_report_is_bounded_by_optimum(
+        self, search: MatchupSearch
+    ) -> None:
+        """Approximate searches never beat the exhaustive optimum."""
+        rng = random.Random(1)
+        backend = PlackettLuceBackend(rng_seed=1, search=search, sampled_matchups=64)
+        player_ids = _create_players(backend, range(60))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=100)
+
+        backend.pick_two_players()
+        report = backend.matchup_report()
+        assert report.search == search
+        assert 0 < report.candidates < 60 * 59 // 2
+        assert report.ev >= report.optimal_ev
+        assert 0.0 < report.ev_ratio <= 1.0
+
+    def test_pruned_search_with_full_coverage_finds_optimum(self) -> None:
+        """Pruning that covers every pair is equivalent to exhaustive search."""
+        rng = random.Random(2)
+        backend = PlackettLuceBackend(
+            rng_seed=2,
+            relative_matchup_epsilon=0.0,
+            search=MatchupSearch.PRUNED,
+            pruned_candidates=30,
+            pruned_neighbours=30,
+        )
+        player_ids = _create_players(backend, range(30))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=60)
+
+        backend.pick_two_players()
+        report = backend.matchup_report()
+        assert report.ev == report.optimal_ev
+
+    def test_tiered_search_pairs_players_within_adjacent_tiers(self) -> None:
+        """
+        Picks pair players at most one tier apart, and favour uncertain
+        players, so settled players are rarely drawn.
+        """
+        rng = random.Random(3)
+        backend = PlackettLuceBackend(rng_seed=3, search=MatchupSearch.TIERED, tier_size=5)
+        player_ids = _create_players(backend, range(40))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=200)
+        settled = player_ids[:10]
+        for _ in range(50):
+            backend.update(*rng.sample(settled, 2))
+        _create_players(backend, range(40, 50))
+
+        drawn = 0
+        for _ in range(100):
+            a, b = backend.pick_two_players()
+            positions = [backend._mu_index.position(player) for player in (a, b)]
+            assert abs(positions[0] // 5 - positions[1] // 5) <= 1
+            drawn += a in settled or b in settled
+        assert drawn < 25
+
+    def test_tiered_weights_follow_updates_and_state_loads(self) -> None:
+        """Draw weights track sigma across single, bulk and restored updates."""
+        rng = random.Random(4)
+        backend = PlackettLuceBackend(rng_seed=4, search=MatchupSearch.TIERED)
+        player_ids = _create_players(backend, range(100))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=10)
+        backend.update_many([tuple(rng.sample(player_ids, 2)) for _ in range(100)])
+
+        restored = PlackettLuceBackend(search=MatchupSearch.TIERED)
+        restored.load_state(backend.save_state())
+        for candidate in (backend, restored):
+            assert candidate._tier_weights is not None
+            weights = [candidate._tier_weights.weight(i) for i in range(100)]
+            assert weights == pytest.approx(candidate._store.sigma.tolist())
+            assert candidate._tier_weights.total() == pytest.approx(sum(weights))
+
+    def test_exhaustive_pick_k_matchups_is_greedy_over_all_pairs(self) -> None:
+        """Without tie tolerance, batches match a greedy pass over all pairs."""
+        backend = PlackettLuceBackend(rng_seed=0, relative_matchup_epsilon=0)
+        model = PlackettLuce()
+        rng = random.Random(0)
+        player_ids = _create_players(backend, range(16))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=60)
+
+        mu, sigma = backend._store.mu, backend._store.sigma
+        evs = sigma_change_ev(model, mu[:, None], sigma[:, None], mu[None, :], sigma[None, :])
+        expected: list[tuple[int, int]] = []
+        used: set[int] = set()
+        # Ids equal internal indexes here. Ties keep `combinations` order.
+        for a, b in sorted(combinations(player_ids, 2), key=lambda pair: evs[pair]):
+            if a not in used and b not in used:
+                expected.append((a, b))
+                used.update((a, b))
+
+        assert backend.pick_k_matchups(8) == expected
+
+    def test_read_views_are_memoized_until_mutation(self) -> None:
+        """Read views are computed once per state version."""
+        backend = PlackettLuceBackend(rng_seed=0)
+        player_ids = _create_players(backend, range(5))
+        version = backend.state_version
+
+        ranks = backend.ranks()
+        certainties = backend.rating_certainties()
+        ratings = backend.overall_ratings()
+        assert ratings == {pid: backend.overall_rating(pid) for pid in player_ids}
+        assert backend.cache_stats() == CacheStats(hits=0, misses=3)
+
+        # Idle reads, e.g. a render loop, are all cache hits.
+        for _ in range(10):
+            assert backend.ranks() is ranks
+            assert backend.rating_certainties() is certainties
+            assert backend.overall_ratings() is ratings
+        assert backend.cache_stats() == CacheStats(hits=30, misses=3)
+        assert backend.state_version == version
+
+        backend.pick_two_players()
+        assert backend.state_version == version
+
+        backend.update(player_ids[4], player_ids[0])
+        assert backend.state_version > version
+        assert backend.ranks()[player_ids[4]] == 1
+        assert backend.overall_ratings()[player_ids[4]] > ratings[player_ids[4]]
+        assert backend.cache_stats().misses == 5
+
+        backend.new_player(10)
+        assert len(backend.ranks()) == 6
+        with pytest.raises(ValueError):
+            backend.overall_rating(11)
+
     def test_pick_two_players_is_reproducible_with_seed_when_ties_are_common(self) -> None:
         """Two identical seeded backends produce the same pick sequence."""
         seed = 123
@@ -276,3 +897,181 @@ class TestPlackettLuceBackendSpecific:
         picks_a = [backend_a.pick_two_players() for _ in range(10)]
         picks_b = [backend_b.pick_two_players() for _ in range(10)]
         assert picks_a == picks_b
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_pick_two_players_matches_per_pair_reference(self, seed: int) -> None:
+        """
+        The vectorized EV engine picks exactly what the original per-pair
+        openskill implementation would, given the same seed and history.
+        """
+        rng = random.Random(seed)
+        backend = PlackettLuceBackend(rng_seed=seed)
+        player_ids = _create_players(backend, range(12))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=30)
+
+        model = PlackettLuce()
+        reference_rng = random.Random(seed)
+
+        def reference_ev(player1: PlackettLuceRating, player2: PlackettLuceRating) -> float:
+            win_chances = model.predict_win([[player1], [player2]])
+            ev = 0.0
+            for (winner, loser), chance in zip(
+                ((player1, player2), (player2, player1)), win_chances
+            ):
+                [winner_after], [loser_after] = model.rate([[winner], [loser]])
+                ev += chance * (
+                    winner_after.sigma + loser_after.sigma - winner.sigma - loser.sigma
+                )
+            return ev
+
+        for _ in range(5):
+            store = backend._store
+            ratings = {
+                pid: model.rating(
+                    mu=float(store.mu[store.index_of(pid)]),
+                    sigma=float(store.sigma[store.index_of(pid)])
+                )
+                for pid in player_ids
+            }
+            evs = {
+                (a, b): reference_ev(ratings[a], ratings[b])
+                for a, b in combinations(player_ids, 2)
+            }
+            minimum = min(evs.values())
+            best = [
+                pair for pair, ev in evs.items()
+                if abs(ev - minimum) <= backend._matchup_epsilon
+            ]
+            expected = reference_rng.choice(best)
+            assert backend.pick_two_players() == expected
+            backend.update(*expected)
+
+
+class TestGlickoBackendSpecific:
+    """Tests specific to `GlickoBackend` configuration and matchmaking."""
+
+    @pytest.mark.parametrize(
+        "make_backend",
+        [
+            lambda: GlickoBackend(relative_matchup_epsilon=-0.0001),
+            lambda: GlickoBackend(candidates=0),
+            lambda: GlickoBackend(neighbours=0),
+            lambda: GlickoBackend(min_deviation=0.0),
+        ],
+    )
+    def test_rejects_invalid_arguments(self, make_backend: Callable[[], GlickoBackend]) -> None:
+        """Constructor input validation."""
+        with pytest.raises(ValueError):
+            make_backend()
+
+    def test_load_state_rejects_other_backend_state(self) -> None:
+        """States of a different backend type are rejected, not misread."""
+        plackett_luce = PlackettLuceBackend(rng_seed=0)
+        _create_players(plackett_luce, range(4))
+        backend = GlickoBackend(rng_seed=0)
+        _create_players(backend, range(2))
+
+        with pytest.raises(ValueError):
+            backend.load_state(plackett_luce.save_state())
+        assert set(backend.ranks()) == {0, 1}
+
+    def test_picks_most_uncertain_player(self) -> None:
+        """A fresh player is matched before settled ones."""
+        rng = random.Random(0)
+        backend = GlickoBackend(rng_seed=0)
+        player_ids = _create_players(backend, range(30))
+        _simulate_random_matches(backend, player_ids, rng, n_matches=300)
+        backend.new_player(30)
+
+        assert 30 in backend.pick_two_players()
+
+    def test_certainties_grow_with_matches(self) -> None:
+        """Certainties start at 0 and increase as deviations shrink."""
+        backend = GlickoBackend(rng_seed=0)
+        _create_players(backend, range(3))
+        assert backend.rating_certainties() == {0: 0.0, 1: 0.0, 2: 0.0}
+
+        backend.update(0, 1)
+        certainties = backend.rating_certainties()
+        assert certainties[0] == certainties[1] > certainties[2] == 0.0
+
+
+class TestBradleyTerryBackendSpecific:
+    """Tests specific to `BradleyTerryBackend` refits."""
+
+    @pytest.mark.parametrize(
+        "make_backend",
+        [
+            lambda: BradleyTerryBackend(relative_matchup_epsilon=-0.0001),
+            lambda: BradleyTerryBackend(candidates=0),
+            lambda: BradleyTerryBackend(prior_games=0.0),
+            lambda: BradleyTerryBackend(refit_threshold=0),
+            lambda: BradleyTerryBackend(tolerance=0.0),
+        ],
+    )
+    def test_rejects_invalid_arguments(
+        self, make_backend: Callable[[], BradleyTerryBackend]
+    ) -> None:
+        """Constructor input validation."""
+        with pytest.raises(ValueError):
+            make_backend()
+
+    def test_ratings_do_not_depend_on_match_order(self) -> None:
+        """Refitted ratings only depend on the set of results."""
+        rng = random.Random(0)
+        matches = [tuple(rng.sample(range(10), 2)) for _ in range(80)]
+        matches += [tuple(rng.sample(range(10), 4)) for _ in range(5)]
+        shuffled = list(matches)
+        rng.shuffle(shuffled)
+
+        ordered = BradleyTerryBackend(tolerance=1e-10)
+        reordered = BradleyTerryBackend(tolerance=1e-10)
+        _create_players(ordered, range(10))
+        _create_players(reordered, range(10))
+        for match in matches:
+            ordered.update_ranked(match)
+        reordered.update_many(shuffled)
+
+        assert ordered.ranks() == reordered.ranks()
+        for player in range(10):
+            assert ordered.overall_rating(player) == pytest.approx(
+                reordered.overall_rating(player), abs=1e-6
+            )
+
+    def test_consolidate_refits_approximate_updates(self) -> None:
+        """Between refits results are approximate, `consolidate` makes them exact."""
+        rng = random.Random(1)
+        refitting = BradleyTerryBackend(tolerance=1e-10)
+        approximate = BradleyTerryBackend(tolerance=1e-10, refit_threshold=1000)
+        player_ids = _create_players(refitting, range(8))
+        _create_players(approximate, player_ids)
+        for _ in range(30):
+            match = tuple(rng.sample(player_ids, 2))
+            refitting.update(*match)
+            approximate.update(*match)
+
+        assert approximate.last_fit is None
+        approximate.consolidate()
+        assert approximate.last_fit is not None and approximate.last_fit.converged
+        for player in player_ids:
+            assert approximate.overall_rating(player) == pytest.approx(
+                refitting.overall_rating(player), abs=1e-6
+            )
+
+    def test_load_state_restores_match_counts(self) -> None:
+        """Results survive a save/load round trip, so later refits include them."""
+        rng = random.Random(2)
+        original = BradleyTerryBackend(refit_threshold=1000)
+        player_ids = _create_players(original, range(6))
+        _simulate_random_matches(original, player_ids, rng, n_matches=20)
+        original.update_ranked([5, 4, 3])
+
+        restored = BradleyTerryBackend()
+        restored.load_state(original.save_state())
+        original.consolidate()
+        restored.consolidate()
+        assert restored.ranks() == original.ranks()
+
+        glicko_state = GlickoBackend().save_state()
+        with pytest.raises(ValueError):
+            restored.load_state(glicko_state)
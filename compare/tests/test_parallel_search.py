@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from copy import deepcopy
+from functools import partial
+
+import numpy as np
+import pytest
+from openskill.models import PlackettLuce
+
+from compare.ev_table import MatchupEVTable
+from compare.matchmaking import MatchupSearch, PlackettLuceBackend
+from compare.parallel_search import ParallelMatchupSearch
+from compare.plackett_luce import sigma_change_ev
+from compare.played_pairs import PlayedPairs
+
+
+@pytest.fixture(scope="module")
+def search() -> Iterator[ParallelMatchupSearch]:
+    # Small blocks, so each worker merges near-ties across several blocks.
+    parallel_search = ParallelMatchupSearch(workers=2, block_rows=7)
+    yield parallel_search
+    parallel_search.close()
+
+
+def test_search_matches_ev_table(search: ParallelMatchupSearch) -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(0)
+    mu = rng.uniform(10, 40, 90)
+    sigma = rng.uniform(1, model.sigma, 90)
+    table = MatchupEVTable(partial(sigma_change_ev, model))
+    table.refresh(mu, sigma)
+
+    excluded = np.zeros(90, dtype=np.bool_)
+    excluded[rng.choice(90, size=30, replace=False)] = True
+    for mask in (None, excluded):
+        for epsilon in (0.0, 0.05, 1.0):
+            expected = table.matchups_within(table.minimum(mask) + epsilon, mask)
+            found = search.search(mu, sigma, epsilon, mask)
+            for expected_array, found_array in zip(expected, found):
+                assert found_array.tolist() == expected_array.tolist()
+
+
+def test_search_adds_repeat_penalty(search: ParallelMatchupSearch) -> None:
+    model = PlackettLuce()
+    rng = np.random.default_rng(3)
+    mu = rng.uniform(10, 40, 40)
+    sigma = rng.uniform(1, model.sigma, 40)
+    played = PlayedPairs()
+    played.resize(40)
+    played.add(rng.integers(0, 40, 200), rng.integers(0, 40, 200))
+
+    def penalty(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        return np.where(played.mask(rows, columns), 0.5, 0.0)
+
+    table = MatchupEVTable(partial(sigma_change_ev, model), penalty)
+    table.refresh(mu, sigma)
+    expected = table.matchups_within(table.minimum() + 0.1)
+    found = search.search(mu, sigma, 0.1, played_bits=played.bits, repeat_penalty=0.5)
+    for expected_array, found_array in zip(expected, found):
+        assert found_array.tolist() == expected_array.tolist()
+
+
+def test_search_grows_shared_block(search: ParallelMatchupSearch) -> None:
+    for n in (2, 3, 200):
+        mu = np.linspace(20, 30, n)
+        sigma = np.full(n, 8.0)
+        player1_indexes, player2_indexes, evs = search.search(mu, sigma, 0.0)
+        assert len(evs) > 0
+        assert (player1_indexes < player2_indexes).all()
+        assert (player2_indexes < n).all()
+
+
+def test_search_rejects_too_few_players(search: ParallelMatchupSearch) -> None:
+    with pytest.raises(ValueError):
+        search.search(np.array([25.0]), np.array([8.0]), 0.0)
+    with pytest.raises(ValueError):
+        search.search(
+            np.array([25.0, 26.0, 27.0]), np.full(3, 8.0), 0.0,
+            np.array([True, False, True])
+        )
+
+
+def test_rejects_non_positive_sizes() -> None:
+    with pytest.raises(ValueError):
+        ParallelMatchupSearch(workers=0)
+    with pytest.raises(ValueError):
+        ParallelMatchupSearch(block_rows=0)
+    with pytest.raises(ValueError):
+        PlackettLuceBackend(search_workers=0)
+
+
+def test_deepcopy_shares_search(search: ParallelMatchupSearch) -> None:
+    assert deepcopy(search) is search
+
+
+def test_parallel_backend_picks_match_exhaustive_backend() -> None:
+    exhaustive = PlackettLuceBackend(rng_seed=3)
+    parallel = PlackettLuceBackend(rng_seed=3, search=MatchupSearch.PARALLEL, search_workers=2)
+    rng = np.random.default_rng(3)
+    try:
+        for player_id in range(60):
+            exhaustive.new_player(player_id)
+            parallel.new_player(player_id)
+        for _ in range(40):
+            matchup = exhaustive.pick_two_players()
+            assert parallel.pick_two_players() == matchup
+            winner, loser = matchup if rng.random() < 0.5 else matchup[::-1]
+            exhaustive.update(winner, loser)
+            parallel.update(winner, loser)
+        assert parallel.pick_k_matchups(5) == exhaustive.pick_k_matchups(5)
+        assert parallel.pick_group(4) == exhaustive.pick_group(4)
+    finally:
+        parallel.close()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import random
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+from openskill.models import PlackettLuce, PlackettLuceRating
+
+from compare.plackett_luce import (
+    normal_cdf,
+    rate_1v1,
+    replay_1v1,
+    sigma_change_ev,
+    win_probability,
+)
+
+
+def _random_ratings(
+    model: PlackettLuce, rng: random.Random, n: int
+) -> list[PlackettLuceRating]:
+    return [
+        model.rating(mu=rng.uniform(0.0, 50.0), sigma=rng.uniform(0.5, model.sigma))
+        for _ in range(n)
+    ]
+
+
+def _reference_sigma_change_ev(
+    model: PlackettLuce, player1: PlackettLuceRating, player2: PlackettLuceRating
+) -> float:
+    """Per-pair EV computed through openskill's general team machinery."""
+    player1_win_chance, player2_win_chance = model.predict_win([[player1], [player2]])
+    changes: list[float] = []
+    for winner, loser in ((player1, player2), (player2, player1)):
+        [winner_after], [loser_after] = model.rate([[winner], [loser]])
+        changes.append(
+            (winner_after.sigma + loser_after.sigma) - (winner.sigma + loser.sigma)
+        )
+    return changes[0] * player1_win_chance + changes[1] * player2_win_chance
+
+
+def test_normal_cdf_matches_statistics() -> None:
+    xs = np.linspace(-40.0, 40.0, 4001)
+    expected = np.array([NormalDist().cdf(x) for x in xs])
+    np.testing.assert_allclose(normal_cdf(xs), expected, rtol=1e-13, atol=1e-16)
+
+
+def test_win_probability_matches_predict_win() -> None:
+    model = PlackettLuce()
+    rng = random.Random(0)
+    players = _random_ratings(model, rng, 20)
+    for a in players:
+        for b in players:
+            expected = model.predict_win([[a], [b]])[0]
+            assert win_probability(model, a.mu, a.sigma, b.mu, b.sigma) == pytest.approx(
+                expected, rel=1e-12
+            )
+
+
+def test_rate_1v1_matches_openskill_rate() -> None:
+    model = PlackettLuce()
+    rng = random.Random(1)
+    players = _random_ratings(model, rng, 20)
+    for winner, loser in zip(players[::2], players[1::2]):
+        [winner_after], [loser_after] = model.rate([[winner], [loser]])
+        mu_w, sigma_w, mu_l, sigma_l = rate_1v1(
+            model, winner.mu, winner.sigma, loser.mu, loser.sigma
+        )
+        assert mu_w == pytest.approx(winner_after.mu, rel=1e-12)
+        assert sigma_w == pytest.approx(winner_after.sigma, rel=1e-12)
+        assert mu_l == pytest.approx(loser_after.mu, rel=1e-12)
+        assert sigma_l == pytest.approx(loser_after.sigma, rel=1e-12)
+
+
+def test_replay_1v1_matches_sequential_openskill_rate() -> None:
+    model = PlackettLuce()
+    rng = random.Random(3)
+    players = [model.rating() for _ in range(6)]
+    mu = [p.mu for p in players]
+    sigma = [p.sigma for p in players]
+    winners = [rng.randrange(6) for _ in range(50)]
+    losers = [rng.randrange(6) for _ in range(50)]
+
+    for winner, loser in zip(winners, losers):
+        if winner != loser:
+            [players[winner]], [players[loser]] = model.rate(
+                [[players[winner]], [players[loser]]]
+            )
+    replay_1v1(model, mu, sigma, winners, losers)
+
+    assert mu == pytest.approx([p.mu for p in players], rel=1e-10)
+    assert sigma == pytest.approx([p.sigma for p in players], rel=1e-10)
+
+
+def test_sigma_change_ev_matrix_matches_per_pair_path() -> None:
+    model = PlackettLuce()
+    rng = random.Random(2)
+    players = _random_ratings(model, rng, 15)
+    mu = np.array([p.mu for p in players])
+    sigma = np.array([p.sigma for p in players])
+
+    matrix = sigma_change_ev(model, mu[:, None], sigma[:, None], mu[None, :], sigma[None, :])
+    assert matrix.shape == (15, 15)
+    for i, player1 in enumerate(players):
+        for j, player2 in enumerate(players):
+            if i == j:
+                continue
+            expected = _reference_sigma_change_ev(model, player1, player2)
+            assert matrix[i, j] == pytest.approx(expected, rel=1e-10, abs=1e-14)
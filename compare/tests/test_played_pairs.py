@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from compare.played_pairs import PlayedPairs, played_mask
+
+
+def test_matches_set_of_pairs_while_growing() -> None:
+    rng = np.random.default_rng(0)
+    played = PlayedPairs()
+    reference: set[tuple[int, int]] = set()
+    for n in (2, 3, 17, 64, 65, 300):
+        played.resize(n)
+        player1_indexes = rng.integers(0, n, 40)
+        player2_indexes = rng.integers(0, n, 40)
+        played.add(player1_indexes, player2_indexes)
+        reference.update(
+            (min(a, b), max(a, b))
+            for a, b in zip(player1_indexes.tolist(), player2_indexes.tolist()) if a != b
+        )
+
+    assert len(played) == 300
+    assert played.count() == len(reference)
+    mask = played.mask(np.arange(300)[:, None], np.arange(300)[None, :])
+    expected = np.zeros((300, 300), dtype=np.bool_)
+    for a, b in reference:
+        expected[a, b] = expected[b, a] = True
+    np.testing.assert_array_equal(mask, expected)
+    assert all(played.contains(b, a) for a, b in list(reference)[:20])
+    assert not played.contains(5, 5)
+
+
+def test_bits_round_trip_and_size() -> None:
+    played = PlayedPairs()
+    played.resize(100)
+    played.add([0, 98], [99, 99])
+
+    # 100 * 99 / 2 pairs, one bit each.
+    assert len(played.bits) == 619
+    restored = PlayedPairs.from_bits(played.bits, 100)
+    assert restored.contains(99, 0) and restored.contains(98, 99)
+    assert played_mask(restored.bits, [0, 1], [99, 99]).tolist() == [True, False]
+    with pytest.raises(ValueError):
+        PlayedPairs.from_bits(played.bits, 101)
+
+
+def test_rejects_out_of_range_players() -> None:
+    played = PlayedPairs()
+    played.resize(3)
+    with pytest.raises(ValueError):
+        played.add([0], [3])
+    with pytest.raises(ValueError):
+        played.resize(2)
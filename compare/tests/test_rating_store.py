@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import pytest
+
+from compare.rating_store import RatingStore
+
+
+def test_add_assigns_dense_indexes_in_insertion_order() -> None:
+    store = RatingStore()
+    assert store.add(10, 25.0, 8.0) == 0
+    assert store.add(3, 20.0, 7.0) == 1
+    assert len(store) == 2
+    assert store.ids.tolist() == [10, 3]
+    assert store.mu.tolist() == [25.0, 20.0]
+    assert store.sigma.tolist() == [8.0, 7.0]
+    assert store.index_of(3) == 1
+    assert 10 in store and 4 not in store and -1 not in store
+
+
+@pytest.mark.parametrize("bad_id", [-1, 7])
+def test_add_rejects_negative_and_duplicate_ids(bad_id: int) -> None:
+    store = RatingStore()
+    store.add(7, 25.0, 8.0)
+    with pytest.raises(ValueError):
+        store.add(bad_id, 25.0, 8.0)
+
+
+def test_lookups_of_missing_players_raise() -> None:
+    store = RatingStore()
+    store.add(0, 25.0, 8.0)
+    store.add(2, 25.0, 8.0)
+    for missing in (-1, 1, 100):
+        with pytest.raises(ValueError):
+            store.index_of(missing)
+    with pytest.raises(ValueError):
+        store.indexes_of([0, 1])
+    assert store.indexes_of([2, 0, 2]).tolist() == [1, 0, 1]
+
+
+def test_growth_preserves_existing_ratings() -> None:
+    store = RatingStore()
+    for player_id in range(100):
+        store.add(player_id, float(player_id), 1.0)
+    assert store.mu.tolist() == [float(i) for i in range(100)]
+    assert store.index_of(99) == 99
+
+
+def test_ids_are_read_only() -> None:
+    store = RatingStore()
+    store.add(0, 25.0, 8.0)
+    with pytest.raises(ValueError):
+        store.ids[0] = 1
+
+
+def test_from_arrays_matches_sequential_adds() -> None:
+    store = RatingStore.from_arrays([10, 3, 6], [25.0, 20.0, 22.0], [8.0, 7.0, 6.0])
+    assert store.ids.tolist() == [10, 3, 6]
+    assert store.mu.tolist() == [25.0, 20.0, 22.0]
+    assert store.index_of(6) == 2
+    assert 4 not in store
+    assert store.add(4, 25.0, 8.0) == 3
+    assert len(RatingStore.from_arrays([], [], [])) == 0
+
+
+@pytest.mark.parametrize("ids, mu", [([1, 1], [0.0, 0.0]), ([-1], [0.0]), ([0, 1], [0.0])])
+def test_from_arrays_rejects_invalid_arrays(ids: list[int], mu: list[float]) -> None:
+    with pytest.raises(ValueError):
+        RatingStore.from_arrays(ids, mu, [1.0] * len(mu))
+
+
+def test_large_and_sparse_ids_are_supported() -> None:
+    large_ids = [2**40, 2**62, 1 << 20]
+    store = RatingStore()
+    store.add(5, 25.0, 8.0)
+    for player_id in large_ids:
+        store.add(player_id, 25.0, 8.0)
+    assert store.indexes_of([2**62, 5, 1 << 20, 2**40]).tolist() == [2, 0, 3, 1]
+    assert store.index_of(2**40) == 1
+    assert 2**40 in store and 2**40 + 1 not in store
+    with pytest.raises(ValueError):
+        store.add(2**62, 25.0, 8.0)
+    with pytest.raises(ValueError):
+        store.indexes_of([5, 2**41])
+
+    loaded = RatingStore.from_arrays(store.ids, store.mu, store.sigma)
+    assert loaded.indexes_of(store.ids).tolist() == [0, 1, 2, 3]
+    assert 2**40 + 1 not in loaded
@@ -5,7 +5,8 @@ from pathlib import Path
 
 import pytest
 
-from compare.render import CursesMatchRenderer, MatchInput
+from compare.matchmaking import CertaintySummary
+from compare.render import SONG_INPUTS, CursesMatchRenderer, MatchInput, certainty_lines
 from compare.song import Song
 
 
@@ -50,6 +51,12 @@ class _FakeWindow:
         self.refreshed += 1
 
 
+
+def _renderer(window: _FakeWindow) -> CursesMatchRenderer:
+    # `_FakeWindow` implements the part of `curses.window` the renderer uses.
+    return CursesMatchRenderer(window, (0, 0, 80, 80))  # type: ignore[arg-type]
+
+
 def test_get_input_maps_keys(monkeypatch: pytest.MonkeyPatch) -> None:
     import compare.render as render_mod
 
@@ -57,7 +64,7 @@ def test_get_input_maps_keys(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(render_mod.curses, "cbreak", lambda: None, raising=False)
 
     window = _FakeWindow([ord("1"), ord("2"), ord("3"), ord("x")])
-    renderer = CursesMatchRenderer(window, (0, 0, 80, 80))
+    renderer = _renderer(window)
 
     assert renderer.get_input() == MatchInput.SONG_A_WINS
     assert renderer.get_input() == MatchInput.SONG_B_WINS
@@ -65,6 +72,18 @@ def test_get_input_maps_keys(monkeypatch: pytest.MonkeyPatch) -> None:
     assert renderer.get_input() == MatchInput.NONE
 
 
+def test_get_input_maps_letters_to_group_songs(monkeypatch: pytest.MonkeyPatch) -> None:
+    import compare.render as render_mod
+
+    monkeypatch.setattr(render_mod.curses, "noecho", lambda: None, raising=False)
+    monkeypatch.setattr(render_mod.curses, "cbreak", lambda: None, raising=False)
+
+    window = _FakeWindow([ord(c) for c in "abcdef"])
+    renderer = _renderer(window)
+
+    assert [renderer.get_input() for _ in range(6)] == [*SONG_INPUTS, MatchInput.NONE]
+
+
 def test_render_uses_bold_for_currently_playing(monkeypatch: pytest.MonkeyPatch) -> None:
     import compare.render as render_mod
 
@@ -74,7 +93,7 @@ def test_render_uses_bold_for_currently_playing(monkeypatch: pytest.MonkeyPatch)
     monkeypatch.setattr(render_mod.curses, "cbreak", lambda: None, raising=False)
 
     window = _FakeWindow([])
-    renderer = CursesMatchRenderer(window, (0, 0, 80, 80))
+    renderer = _renderer(window)
 
     song_a = Song(id=0, path=Path("a.mp3"), title="A", extension=".mp3")
     song_b = Song(id=1, path=Path("b.mp3"), title="B", extension=".mp3")
@@ -88,3 +107,64 @@ def test_render_uses_bold_for_currently_playing(monkeypatch: pytest.MonkeyPatch)
     assert window.addnstr_calls[0].attr == 999
     assert window.addnstr_calls[1].attr == 111
 
+
+
+def test_render_group_labels_placed_songs(monkeypatch: pytest.MonkeyPatch) -> None:
+    import compare.render as render_mod
+
+    monkeypatch.setattr(render_mod.curses, "A_BOLD", 999, raising=False)
+    monkeypatch.setattr(render_mod.curses, "A_NORMAL", 111, raising=False)
+    monkeypatch.setattr(render_mod.curses, "noecho", lambda: None, raising=False)
+    monkeypatch.setattr(render_mod.curses, "cbreak", lambda: None, raising=False)
+
+    window = _FakeWindow([])
+    renderer = _renderer(window)
+
+    songs = [
+        Song(id=i, path=Path(f"{title}.mp3"), title=title, extension=".mp3")
+        for i, title in enumerate(["A", "B", "C"])
+    ]
+    stats = {song: (i + 1, 10.0 - i) for i, song in enumerate(songs)}
+
+    renderer.render_group(songs, 1, [2], stats)
+    assert window.cleared == 1
+    assert window.refreshed == 1
+
+    player_lines = window.addnstr_calls[:3]
+    assert [call.text for call in player_lines] == ["a: A", "b: B", "c: [1] C"]
+    assert [call.attr for call in player_lines] == [111, 999, 111]
+    # Every song of the group is highlighted in the song list.
+    titles = [call for call in window.addnstr_calls[3:] if call.text in ("A", "B", "C")]
+    assert len(titles) == 3
+    assert all(call.attr == 999 for call in titles)
+
+
+def test_certainty_lines_show_quantiles_and_histogram() -> None:
+    summary = CertaintySummary(4, 0.42, (0.05, 0.4, 0.8), (2, 0, 0, 0, 1, 0, 0, 0, 0, 1))
+    assert certainty_lines(summary) == ["certainty 42% (5/40/80%)", "0% [█   ▄    ▄] 100%"]
+
+    empty = CertaintySummary(0, 0.0, (0.0, 0.0, 0.0), (0,) * 10)
+    assert certainty_lines(empty)[1] == "0% [          ] 100%"
+
+
+def test_render_shows_certainty_when_given(monkeypatch: pytest.MonkeyPatch) -> None:
+    import compare.render as render_mod
+
+    monkeypatch.setattr(render_mod.curses, "A_BOLD", 999, raising=False)
+    monkeypatch.setattr(render_mod.curses, "A_NORMAL", 111, raising=False)
+    monkeypatch.setattr(render_mod.curses, "noecho", lambda: None, raising=False)
+    monkeypatch.setattr(render_mod.curses, "cbreak", lambda: None, raising=False)
+
+    window = _FakeWindow([])
+    renderer = _renderer(window)
+    song_a = Song(id=0, path=Path("a.mp3"), title="A", extension=".mp3")
+    song_b = Song(id=1, path=Path("b.mp3"), title="B", extension=".mp3")
+    stats = {song_a: (1, 10.0), song_b: (2, 5.0)}
+
+    renderer.render(song_a, song_b, True, stats)
+    without = len(window.addnstr_calls)
+    summary = CertaintySummary(2, 0.5, (0.5, 0.5, 0.5), (0,) * 5 + (2,) + (0,) * 4)
+    renderer.render(song_a, song_b, True, stats, summary)
+
+    texts = [call.text for call in window.addnstr_calls[without:]]
+    assert certainty_lines(summary) == texts[2:4]
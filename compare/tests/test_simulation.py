@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from compare.matchmaking import MatchupSearch
+from compare.simulation import (
+    SimulationConfig, SimulationResult, comparisons_to_converge, kendall_tau,
+    plackett_luce_factory, run_simulations, simulate, spearman_rho
+)
+
+
+def _reference_kendall_tau(x: list[float], y: list[float]) -> float:
+    pairs = list(combinations(range(len(x)), 2))
+    return sum(
+        np.sign(x[i] - x[j]) * np.sign(y[i] - y[j]) for i, j in pairs
+    ) / len(pairs)
+
+
+def test_rank_correlations_of_known_orderings() -> None:
+    x = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert kendall_tau(x, x) == 1.0
+    assert kendall_tau(x, x[::-1]) == -1.0
+    assert spearman_rho(x, [10.0, 20.0, 30.0, 40.0, 50.0]) == pytest.approx(1.0)
+    assert spearman_rho(x, x[::-1]) == pytest.approx(-1.0)
+    # One swapped adjacent pair out of 10.
+    assert kendall_tau(x, [2.0, 1.0, 3.0, 4.0, 5.0]) == pytest.approx(0.8)
+    assert spearman_rho(x, [2.0, 1.0, 3.0, 4.0, 5.0]) == pytest.approx(0.9)
+    with pytest.raises(ValueError):
+        kendall_tau([1.0], [1.0])
+
+
+def test_kendall_tau_matches_pairwise_reference_across_blocks() -> None:
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(700).tolist()
+    y = (np.asarray(x) + rng.standard_normal(700)).tolist()
+    assert kendall_tau(x, y) == pytest.approx(_reference_kendall_tau(x, y))
+
+
+def test_simulation_rank_correlation_improves_with_comparisons() -> None:
+    config = SimulationConfig(pool_size=20, comparisons=200, noise=0.1, evaluate_every=50)
+    result = simulate(plackett_luce_factory(), config, seed=0)
+
+    assert result.comparisons == [0, 50, 100, 150, 200]
+    assert result.cpu_seconds == sorted(result.cpu_seconds)
+    assert result.kendall_tau[-1] > 0.7
+    assert result.spearman_rho[-1] > result.spearman_rho[0]
+    assert 0.0 <= result.upset_rate < 0.5
+
+
+@pytest.mark.parametrize("search", list(MatchupSearch))
+def test_process_pool_matches_in_process_results(search: MatchupSearch) -> None:
+    config = SimulationConfig(pool_size=10, comparisons=30, evaluate_every=10)
+    factory = plackett_luce_factory(
+        search, sampled_matchups=8, pruned_candidates=4, tier_size=3
+    )
+
+    in_process = run_simulations(factory, config, [3, 4], workers=1)
+    pooled = run_simulations(factory, config, [3, 4], workers=2)
+
+    for a, b in zip(in_process, pooled, strict=True):
+        assert a.seed == b.seed
+        assert a.kendall_tau == b.kendall_tau
+        assert a.spearman_rho == b.spearman_rho
+        assert a.upset_rate == b.upset_rate
+
+
+def test_comparisons_to_converge_finds_first_evaluation_at_target() -> None:
+    result = SimulationResult(
+        seed=0,
+        comparisons=[0, 10, 20, 30],
+        cpu_seconds=[0.0] * 4,
+        kendall_tau=[0.0] * 4,
+        spearman_rho=[0.0, 0.85, 0.8, 0.95],
+        upset_rate=0.0
+    )
+    assert comparisons_to_converge(result, 0.8) == 10
+    assert comparisons_to_converge(result, 0.9) == 30
+    assert comparisons_to_converge(result, 0.99) is None
+
+
+def test_config_validation() -> None:
+    with pytest.raises(ValueError):
+        SimulationConfig(pool_size=1)
+    with pytest.raises(ValueError):
+        SimulationConfig(evaluate_every=0)
+    with pytest.raises(ValueError):
+        SimulationConfig(noise=-1.0)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import numpy as np
+
+from compare.sorted_index import SortedIndex
+
+
+def _expected_order(keys: list[float], tiebreaks: list[int]) -> list[int]:
+    return sorted(range(len(keys)), key=lambda item: (keys[item], tiebreaks[item]))
+
+
+def _assert_consistent(index: SortedIndex, keys: list[float], tiebreaks: list[int]) -> None:
+    expected = _expected_order(keys, tiebreaks)
+    assert index.items().tolist() == expected
+    for position, item in enumerate(expected):
+        assert index.position(item) == position
+    assert index.positions().tolist() == [expected.index(i) for i in range(len(keys))]
+
+
+def test_insert_orders_by_key_then_tiebreak() -> None:
+    index = SortedIndex()
+    keys = [3.0, 1.0, 3.0, 2.0, 1.0]
+    tiebreaks = [5, 9, 1, 0, 2]
+    for key, tiebreak in zip(keys, tiebreaks):
+        index.insert(key, tiebreak)
+    assert len(index) == 5
+    _assert_consistent(index, keys, tiebreaks)
+
+
+def test_random_updates_keep_index_sorted() -> None:
+    rng = np.random.default_rng(0)
+    index = SortedIndex()
+    # Few distinct keys so ties are common.
+    keys = [float(key) for key in rng.integers(0, 5, 40)]
+    tiebreaks = [int(tiebreak) for tiebreak in rng.permutation(1000)[:40]]
+    for key, tiebreak in zip(keys, tiebreaks):
+        index.insert(key, tiebreak)
+
+    for _ in range(300):
+        item = int(rng.integers(0, len(keys)))
+        keys[item] = float(rng.integers(0, 8)) - 1.5
+        index.update(item, keys[item])
+        _assert_consistent(index, keys, tiebreaks)
+
+
+def test_rebuild_matches_incremental_inserts() -> None:
+    rng = np.random.default_rng(1)
+    keys = rng.integers(0, 4, 25).astype(np.float64)
+    tiebreaks = rng.permutation(25).astype(np.intp)
+    index = SortedIndex()
+    index.rebuild(keys, tiebreaks)
+    _assert_consistent(index, keys.tolist(), tiebreaks.tolist())
+
+    index.insert(-1.0, 0)
+    assert index.items()[0] == 25
+
+
+def test_neighbours_clip_at_edges() -> None:
+    index = SortedIndex()
+    for key in [0.0, 1.0, 2.0, 3.0, 4.0]:
+        index.insert(key, 0)
+    assert index.neighbours(0, 2).tolist() == [1, 2]
+    assert index.neighbours(2, 1).tolist() == [1, 3]
+    assert index.neighbours(4, 10).tolist() == [0, 1, 2, 3]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from copy import deepcopy
+
+import pytest
+
+from compare.matchmaking import MatchupSearch, PlackettLuceBackend
+from compare.speculation import SpeculativePicker
+
+
+@pytest.mark.parametrize("search", list(MatchupSearch))
+def test_take_returns_backend_and_pick_after_result(search: MatchupSearch) -> None:
+    backend = PlackettLuceBackend(rng_seed=0, search=search, pruned_candidates=4)
+    for player_id in range(12):
+        backend.new_player(player_id)
+    backend.update_many([(0, 1), (2, 3), (4, 5), (1, 6)])
+    player1, player2 = backend.pick_two_players()
+    reference = deepcopy(backend)
+    ranks = backend.ranks()
+
+    picker = SpeculativePicker()
+    try:
+        picker.prepare(backend, player1, player2)
+        prepared = picker.take(player2, player1)
+    finally:
+        picker.close()
+
+    assert prepared is not None
+    prepared_backend, next_pick = prepared
+    reference.update(player2, player1)
+    assert next_pick == reference.pick_two_players()
+    assert prepared_backend.ranks() == reference.ranks()
+    assert prepared_backend.pick_two_players() == reference.pick_two_players()
+    # The original backend is left untouched.
+    assert prepared_backend is not backend
+    assert backend.ranks() == ranks
+
+
+def test_take_of_unprepared_result_returns_none() -> None:
+    backend = PlackettLuceBackend(rng_seed=0)
+    for player_id in range(3):
+        backend.new_player(player_id)
+
+    picker = SpeculativePicker()
+    try:
+        assert picker.take(0, 1) is None
+        picker.prepare(backend, 0, 1)
+        assert picker.take(0, 2) is None
+        # Taking discards every prepared result.
+        assert picker.take(0, 1) is None
+    finally:
+        picker.close()
+
+
+def test_backend_can_be_read_while_preparing() -> None:
+    backend = PlackettLuceBackend(rng_seed=0)
+    for player_id in range(200):
+        backend.new_player(player_id)
+    player1, player2 = backend.pick_two_players()
+    reference = deepcopy(backend)
+
+    picker = SpeculativePicker()
+    try:
+        picker.prepare(backend, player1, player2)
+        for _ in range(50):
+            backend.ranks()
+            backend.rating_certainties()
+        prepared = picker.take(player1, player2)
+    finally:
+        picker.close()
+
+    assert prepared is not None
+    reference.update(player1, player2)
+    assert prepared[1] == reference.pick_two_players()
+    assert prepared[0].ranks() == reference.ranks()
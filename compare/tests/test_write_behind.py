@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+from compare.song import Song
+from compare.matchio import MatchResult
+from compare.write_behind import WriteBehindMatchIO, is_transient, parse_spool_line, spool_line
+
+
+class _FakeBackend:
+    def __init__(self, ratings: dict[int, float]) -> None:
+        self.ratings = ratings
+
+    def overall_rating(self, player: int) -> float:  # matches RatingBackend shape
+        return self.ratings[player]
+
+
+def _http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class _RecordingMatchIO:
+    """
+    Records saved batches of matches, failing while `failing` is set, and
+    rejecting batches with a song in `rejected_songs` with a 400 response.
+    """
+
+    def __init__(self) -> None:
+        self.batches: list[list[MatchResult]] = []
+        self.failing = False
+        self.rejected_songs: set[int] = set()
+        self.release = threading.Event()
+        self.release.set()
+
+    def save_songs(self, rating_backend: object, songs: list[Song]) -> None:
+        pass
+
+    def load_songs(self) -> list[Song]:
+        return []
+
+    def load_match_history(self) -> list[tuple[int, ...]]:
+        return [match.songs for match in self.saved]
+
+    @property
+    def saved(self) -> list[MatchResult]:
+        return [match for batch in self.batches for match in batch]
+
+    def save_matches(self, matches: list[MatchResult]) -> None:
+        self.release.wait()
+        if self.failing:
+            raise OSError("API unreachable")
+        if any(song in self.rejected_songs for match in matches for song in match.songs):
+            raise _http_error(400)
+        self.batches.append(list(matches))
+
+
+def _write_behind(inner: _RecordingMatchIO, spool_path: Path, **kwargs: float) -> WriteBehindMatchIO:
+    return WriteBehindMatchIO(
+        inner, spool_path, retry_interval=0.01, max_retry_interval=0.02, **kwargs  # type: ignore[arg-type]
+    )
+
+
+def test_saves_are_sent_in_order_with_ratings_at_vote_time(tmp_path: Path) -> None:
+    inner = _RecordingMatchIO()
+    inner.release.clear()
+    backend = _FakeBackend({1: 10.0, 2: 20.0, 3: 30.0})
+    with _write_behind(inner, tmp_path / "spool.jsonl") as match_io:
+        match_io.save_match(backend, 1, 2)  # type: ignore[arg-type]
+        backend.ratings = {1: 11.0, 2: 19.0, 3: 30.0}
+        match_io.save_ranked_match(backend, [3, 1, 2])  # type: ignore[arg-type]
+        assert match_io.pending_count == 2
+        inner.release.set()
+        assert match_io.flush(timeout=5)
+
+    assert inner.saved == [
+        MatchResult((1, 2), (10.0, 20.0)), MatchResult((3, 1, 2), (30.0, 11.0, 19.0))
+    ]
+    assert (tmp_path / "spool.jsonl").read_text() == ""
+
+
+def test_failed_batches_are_retried(tmp_path: Path) -> None:
+    inner = _RecordingMatchIO()
+    inner.failing = True
+    with _write_behind(inner, tmp_path / "spool.jsonl") as match_io:
+        match_io.save_match(_FakeBackend({1: 1.0, 2: 2.0}), 1, 2)  # type: ignore[arg-type]
+        assert not match_io.flush(timeout=0.1)
+        assert isinstance(match_io.last_error, OSError)
+
+        inner.failing = False
+        assert match_io.flush(timeout=5)
+        assert match_io.last_error is None
+
+    assert inner.saved == [MatchResult((1, 2), (1.0, 2.0))]
+
+
+def test_unsent_matches_survive_in_spool_and_are_sent_first(tmp_path: Path) -> None:
+    spool_path = tmp_path / "spool.jsonl"
+    offline = _RecordingMatchIO()
+    offline.failing = True
+    match_io = _write_behind(offline, spool_path)
+    match_io.save_match(_FakeBackend({1: 1.0, 2: 2.0}), 1, 2)  # type: ignore[arg-type]
+    match_io.save_ranked_match(_FakeBackend({1: 1.0, 2: 2.0, 3: 3.0}), [3, 2, 1])  # type: ignore[arg-type]
+    assert not match_io.close(timeout=0.1)
+    # A crash can cut the last line short.
+    with open(spool_path, "a") as spool:
+        spool.write('{"songs": [4')
+
+    online = _RecordingMatchIO()
+    with _write_behind(online, spool_path) as match_io:
+        assert list(match_io.load_match_history()) == [(1, 2), (3, 2, 1)]
+        match_io.save_match(_FakeBackend({4: 4.0, 5: 5.0}), 4, 5)  # type: ignore[arg-type]
+
+    assert [match.songs for match in online.saved] == [(1, 2), (3, 2, 1), (4, 5)]
+    assert spool_path.read_text() == ""
+
+
+def test_rejected_matches_are_set_aside_without_blocking_others(tmp_path: Path) -> None:
+    inner = _RecordingMatchIO()
+    inner.release.clear()
+    inner.rejected_songs = {9}
+    matches = [
+        MatchResult((1, 2), (1.0, 2.0)),
+        MatchResult((9, 1), (9.0, 1.0)),
+        MatchResult((2, 1), (2.0, 1.0)),
+    ]
+    with _write_behind(inner, tmp_path / "spool.jsonl") as match_io:
+        match_io.save_matches(matches)
+        inner.release.set()
+        assert match_io.flush(timeout=5)
+        assert match_io.rejected_count == 1
+
+    assert inner.saved == [matches[0], matches[2]]
+    rejected = (tmp_path / "spool.rejected.jsonl").read_text().splitlines()
+    assert [parse_spool_line(line) for line in rejected] == [matches[1]]
+    assert (tmp_path / "spool.jsonl").read_text() == ""
+
+
+def test_loads_raise_the_last_error_if_matches_cannot_be_sent(tmp_path: Path) -> None:
+    inner = _RecordingMatchIO()
+    inner.failing = True
+    match_io = _write_behind(inner, tmp_path / "spool.jsonl", flush_timeout=0.1)
+    try:
+        match_io.save_match(_FakeBackend({1: 1.0, 2: 2.0}), 1, 2)  # type: ignore[arg-type]
+        with pytest.raises(OSError, match="API unreachable"):
+            match_io.load_songs()
+    finally:
+        match_io.close(timeout=0)
+
+
+def test_only_connection_errors_and_server_errors_are_transient() -> None:
+    assert is_transient(OSError("API unreachable"))
+    assert is_transient(requests.ConnectionError())
+    assert is_transient(requests.Timeout())
+    assert is_transient(_http_error(503))
+    assert is_transient(_http_error(429))
+    assert not is_transient(_http_error(400))
+    assert not is_transient(_http_error(404))
+    assert not is_transient(ValueError("Malformed match."))
+
+
+def test_batches_are_limited_to_batch_size(tmp_path: Path) -> None:
+    inner = _RecordingMatchIO()
+    inner.release.clear()
+    backend = _FakeBackend({1: 1.0, 2: 2.0})
+    with _write_behind(inner, tmp_path / "spool.jsonl", batch_size=2) as match_io:
+        match_io.save_match(backend, 1, 2)  # type: ignore[arg-type]
+        match_io.save_matches([MatchResult((2, 1), (2.5, 0.5))] * 4)
+        inner.release.set()
+        assert match_io.flush(timeout=5)
+
+    assert len(inner.saved) == 5
+    assert all(len(batch) <= 2 for batch in inner.batches)
+    assert len(inner.batches) >= 3
+
+
+def test_closed_match_io_rejects_saves(tmp_path: Path) -> None:
+    match_io = _write_behind(_RecordingMatchIO(), tmp_path / "spool.jsonl")
+    assert match_io.close()
+    with pytest.raises(ValueError):
+        match_io.save_match(_FakeBackend({1: 1.0, 2: 2.0}), 1, 2)  # type: ignore[arg-type]
+
+
+def test_validates_arguments_and_spooled_matches(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        WriteBehindMatchIO(_RecordingMatchIO(), tmp_path / "spool.jsonl", max_pending=0)  # type: ignore[arg-type]
+    with pytest.raises(ValueError):
+        WriteBehindMatchIO(
+            _RecordingMatchIO(), tmp_path / "spool.jsonl", retry_interval=2, max_retry_interval=1  # type: ignore[arg-type]
+        )
+    with pytest.raises(ValueError):
+        WriteBehindMatchIO(_RecordingMatchIO(), tmp_path / "spool.jsonl", flush_timeout=-1)  # type: ignore[arg-type]
+    match = MatchResult((1, 2), (1.5, 2.5))
+    assert parse_spool_line(spool_line(match)) == match
+    with pytest.raises(ValueError):
+        parse_spool_line('{"songs": [1], "ratings": [1.0]}')
@@ -1,5 +1,7 @@
 -- Initialization script for the database schema.
 -- Will run if the docker database volume is empty (first time).
+-- Tables added since are also created by the api on startup, see
+-- `migrate` in viz/api/src/database.ts, so keep the two in sync.
 
 
 CREATE TABLE IF NOT EXISTS song (
@@ -15,6 +17,14 @@ CREATE TABLE IF NOT EXISTS matchup (
   loser_id integer NOT NULL REFERENCES song(id) ON DELETE CASCADE
 );
 
+-- Finishing order of every song in a multi-way (ranked) matchup, 1 is best.
+-- The matchup row holds the first and last placed songs as winner/loser.
+CREATE TABLE IF NOT EXISTS matchup_placement (
+  matchup_id integer NOT NULL REFERENCES matchup(id) ON DELETE CASCADE,
+  place integer NOT NULL,
+  song_id integer NOT NULL REFERENCES song(id) ON DELETE CASCADE,
+  PRIMARY KEY (matchup_id, place)
+);
 
 CREATE TABLE IF NOT EXISTS song_stats(
     id serial PRIMARY KEY,
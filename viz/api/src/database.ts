@@ -1,5 +1,6 @@
 import { forceEnvVar } from "./tools.js"
 import { Pool } from "pg";
+import type { PoolClient } from "pg";
 
 export const pool = new Pool({
   host: process.env["PG_HOST"],
@@ -9,3 +10,50 @@ export const pool = new Pool({
   password: forceEnvVar(process.env["PG_PASSWORD"]),
   allowExitOnIdle: true,
 });
+
+/**
+ * Runs `work` on a single pooled client inside a transaction, committing
+ * if it resolves and rolling back if it throws.
+ *
+ * @param work - Queries to run, using the given client.
+ * @returns - The value `work` resolves to.
+ */
+export async function withTransaction<T>(
+  work: (client: PoolClient) => Promise<T>
+): Promise<T> {
+  const client = await pool.connect();
+  try {
+    await client.query("BEGIN");
+    const result = await work(client);
+    await client.query("COMMIT");
+    return result;
+  } catch (err) {
+    await client.query("ROLLBACK");
+    throw err;
+  } finally {
+    client.release();
+  }
+}
+
+// Schema added after databases were first created. create_tables.sql only
+// runs on an empty volume, so existing volumes get these on startup.
+const MIGRATIONS = [
+  `
+    CREATE TABLE IF NOT EXISTS matchup_placement (
+      matchup_id integer NOT NULL REFERENCES matchup(id) ON DELETE CASCADE,
+      place integer NOT NULL,
+      song_id integer NOT NULL REFERENCES song(id) ON DELETE CASCADE,
+      PRIMARY KEY (matchup_id, place)
+    )
+  `,
+];
+
+/**
+ * Brings an existing database up to the schema in create_tables.sql.
+ * Every migration is idempotent, so this is safe to run on every start.
+ */
+export async function migrate(): Promise<void> {
+  for (const migration of MIGRATIONS) {
+    await pool.query(migration);
+  }
+}
@@ -6,7 +6,7 @@ import { wrapHandler } from "../tools.js";
 export const deleteRouter = Router();
 
 const DELETE_ALL_DATA_QUERY = `
-  TRUNCATE song, matchup, song_stats RESTART IDENTITY CASCADE;
+  TRUNCATE song, matchup, matchup_placement, song_stats RESTART IDENTITY CASCADE;
 `;
 
 // End point to delete all data in all tables.
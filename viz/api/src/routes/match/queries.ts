@@ -1,43 +1,157 @@
+// The first 1000 matchups, in id order, for the visualization. Longer
+// histories are read in pages through GET_MATCHES_PAGE_QUERY.
 export const GET_ALL_MATCHES_QUERY = `
-  SELECT * FROM matchup
+  SELECT matchup.id, matchup.winner_id, matchup.loser_id,
+    COALESCE(placement.songs, ARRAY[matchup.winner_id, matchup.loser_id]) AS songs
+  FROM matchup
+  LEFT JOIN LATERAL (
+    SELECT array_agg(song_id ORDER BY place) AS songs
+    FROM matchup_placement
+    WHERE matchup_placement.matchup_id = matchup.id
+  ) AS placement ON true
+  ORDER BY matchup.id
   LIMIT 1000
 `;
+
+// Keyset page of the match history: up to $2 matchups with ids above $1,
+// in id order. Placements are looked up per matchup through the
+// (matchup_id, place) primary key, so each page costs O($2) however long
+// the history is.
+export const GET_MATCHES_PAGE_QUERY = `
+  SELECT matchup.id, matchup.winner_id, matchup.loser_id,
+    COALESCE(placement.songs, ARRAY[matchup.winner_id, matchup.loser_id]) AS songs
+  FROM matchup
+  LEFT JOIN LATERAL (
+    SELECT array_agg(song_id ORDER BY place) AS songs
+    FROM matchup_placement
+    WHERE matchup_placement.matchup_id = matchup.id
+  ) AS placement ON true
+  WHERE matchup.id > $1
+  ORDER BY matchup.id
+  LIMIT $2
+`;
+// Latest matchup with song_stats before matchup `id`, or NULL if there is
+// none, whose song_stats are the starting ratings. Serial ids can skip
+// values, e.g. when a transaction inserting a matchup rolls back, so the
+// previous matchup is not always `id - 1`.
+function previousMatchup(id: string): string {
+  return `(
+      SELECT MAX(earlier.matchup_id)
+      FROM song_stats AS earlier
+      WHERE earlier.matchup_id < ${id}
+    )`;
+}
+
 export const SAVE_MATCH_QUERY = `
     INSERT INTO matchup (winner_id, loser_id)
     VALUES ($1, $2)
     RETURNING id
 `;
 
-export const SAVE_SECOND_SONG_STATS_QUERY = `
+export const SAVE_SONG_STATS_QUERY = `
   WITH song_rating AS (
     SELECT song_stats.song_id,
       CASE
-        WHEN song_stats.song_id = $1 THEN $3
         WHEN song_stats.song_id = $2 THEN $4
+        WHEN song_stats.song_id = $3 THEN $5
         ELSE song_stats.rating
       END AS rating
     FROM song_stats
-    WHERE song_stats.matchup_id IS NULL
+    WHERE song_stats.matchup_id IS NOT DISTINCT FROM ${previousMatchup("$1")}
   )
   INSERT INTO song_stats (matchup_id, song_id, rating, rank)
-  SELECT 1, song_rating.song_id, song_rating.rating,
+  SELECT $1, song_rating.song_id, song_rating.rating,
     DENSE_RANK() OVER (ORDER BY rating DESC, song_id ASC)
   FROM song_rating
 `;
 
-export const SAVE_SONG_STATS_QUERY = `
+export const SAVE_PLACEMENTS_QUERY = `
+  INSERT INTO matchup_placement (matchup_id, place, song_id)
+  SELECT $1, placement.place, placement.song_id
+  FROM UNNEST($2::integer[]) WITH ORDINALITY AS placement(song_id, place)
+`;
+
+export const SAVE_RANKED_SONG_STATS_QUERY = `
   WITH song_rating AS (
     SELECT song_stats.song_id,
-      CASE
-        WHEN song_stats.song_id = $2 THEN $4
-        WHEN song_stats.song_id = $3 THEN $5
-        ELSE song_stats.rating
-      END AS rating
+      COALESCE(updated.rating, song_stats.rating) AS rating
     FROM song_stats
-    WHERE song_stats.matchup_id = $1 - 1
+    LEFT JOIN UNNEST($2::integer[], $3::real[]) AS updated(song_id, rating)
+      ON updated.song_id = song_stats.song_id
+    WHERE song_stats.matchup_id IS NOT DISTINCT FROM ${previousMatchup("$1")}
   )
   INSERT INTO song_stats (matchup_id, song_id, rating, rank)
   SELECT $1, song_rating.song_id, song_rating.rating,
     DENSE_RANK() OVER (ORDER BY rating DESC, song_id ASC)
   FROM song_rating
 `;
+
+// Inserts the matchups of a batch, from their winners $1 and losers $2.
+// Ids are drawn in batch order, so sorting them gives each match its id.
+export const SAVE_MATCH_BATCH_QUERY = `
+  INSERT INTO matchup (winner_id, loser_id)
+  SELECT batch.winner_id, batch.loser_id
+  FROM UNNEST($1::integer[], $2::integer[])
+    WITH ORDINALITY AS batch(winner_id, loser_id, position)
+  ORDER BY batch.position
+  RETURNING id
+`;
+
+// One row per song of the multi-way matchups of a batch.
+export const SAVE_BATCH_PLACEMENTS_QUERY = `
+  INSERT INTO matchup_placement (matchup_id, place, song_id)
+  SELECT placement.matchup_id, placement.place, placement.song_id
+  FROM UNNEST($1::integer[], $2::integer[], $3::integer[])
+    AS placement(matchup_id, place, song_id)
+`;
+
+// Snapshots song_stats after every matchup $1 of a batch, in order. $2-$4
+// hold one row per song of each matchup: its 1 based position in the
+// batch, the song and its rating after the matchup. $5 is the first
+// matchup of the batch, whose previous snapshot the batch starts from.
+// Each song carries
+// its latest rating forward, the group of snapshots after its most recent
+// update being counted by `updates`.
+export const SAVE_BATCH_SONG_STATS_QUERY = `
+  WITH batch AS (
+    SELECT batch.matchup_id, batch.position
+    FROM UNNEST($1::integer[]) WITH ORDINALITY AS batch(matchup_id, position)
+  ),
+  updated AS (
+    SELECT updated.position, updated.song_id, updated.rating
+    FROM UNNEST($2::integer[], $3::integer[], $4::real[])
+      AS updated(position, song_id, rating)
+  ),
+  previous AS (
+    SELECT song_stats.song_id, song_stats.rating
+    FROM song_stats
+    WHERE song_stats.matchup_id IS NOT DISTINCT FROM ${previousMatchup("$5::integer")}
+  ),
+  grid AS (
+    SELECT batch.matchup_id, batch.position, previous.song_id,
+      previous.rating AS previous_rating, updated.rating,
+      COUNT(updated.rating) OVER (
+        PARTITION BY previous.song_id ORDER BY batch.position
+      ) AS updates
+    FROM batch
+    CROSS JOIN previous
+    LEFT JOIN updated
+      ON updated.position = batch.position AND updated.song_id = previous.song_id
+  ),
+  song_rating AS (
+    SELECT grid.matchup_id, grid.song_id,
+      COALESCE(
+        FIRST_VALUE(grid.rating) OVER (
+          PARTITION BY grid.song_id, grid.updates ORDER BY grid.position
+        ),
+        grid.previous_rating
+      ) AS rating
+    FROM grid
+  )
+  INSERT INTO song_stats (matchup_id, song_id, rating, rank)
+  SELECT song_rating.matchup_id, song_rating.song_id, song_rating.rating,
+    DENSE_RANK() OVER (
+      PARTITION BY song_rating.matchup_id ORDER BY rating DESC, song_id ASC
+    )
+  FROM song_rating
+`;
@@ -1,13 +1,23 @@
 import { Router } from "express";
 import type { Request, Response } from "express";
-import { MatchInSchema } from "./schema.js";
+import {
+  MatchBatchInSchema,
+  MatchInSchema,
+  MatchPageQuerySchema,
+  RankedMatchInSchema
+} from "./schema.js";
 import { wrapHandler } from "../../tools.js";
-import { pool } from "../../database.js";
+import { pool, withTransaction } from "../../database.js";
 import {
   GET_ALL_MATCHES_QUERY,
+  GET_MATCHES_PAGE_QUERY,
   SAVE_MATCH_QUERY,
   SAVE_SONG_STATS_QUERY,
-  SAVE_SECOND_SONG_STATS_QUERY
+  SAVE_PLACEMENTS_QUERY,
+  SAVE_RANKED_SONG_STATS_QUERY,
+  SAVE_MATCH_BATCH_QUERY,
+  SAVE_BATCH_PLACEMENTS_QUERY,
+  SAVE_BATCH_SONG_STATS_QUERY
 } from "./queries.js";
 export const matchRouter = Router();
 
@@ -16,6 +26,25 @@ matchRouter.get("/all", wrapHandler(async (_req: Request, res: Response) => {
   res.json(rows);
 }, "Could not send matches."));
 
+// Keyset-paginated match history, for clients loading histories too long
+// for one response. `next_after` is the `after` of the next page, or null
+// once the last page has been sent.
+matchRouter.get("/page", wrapHandler(async (req: Request, res: Response) => {
+  const parsed = MatchPageQuerySchema.safeParse(req.query);
+  if (!parsed.success) {
+    return res.status(400).json({
+        error: "invalid query",
+        issues: parsed.error.issues
+    });
+  }
+  const { after, limit } = parsed.data;
+  const rows = (await pool.query(GET_MATCHES_PAGE_QUERY, [after, limit])).rows;
+  res.json({
+    matches: rows,
+    next_after: rows.length === limit ? rows[rows.length - 1].id : null
+  });
+}, "Could not send matches."));
+
 matchRouter.post("/one", wrapHandler(async (req: Request, res: Response) => {
   const parsed = MatchInSchema.safeParse(req.body);
   if (!parsed.success) {
@@ -29,22 +58,90 @@ matchRouter.post("/one", wrapHandler(async (req: Request, res: Response) => {
     SAVE_MATCH_QUERY,
     [match.winning_song, match.losing_song]
   )).rows[0].id;
-  if (match_id === 1) {
-    await pool.query(
-      SAVE_SECOND_SONG_STATS_QUERY,
-      [
-        match.winning_song, match.losing_song,
-        match.winning_song_rating, match.losing_song_rating
-      ]
+  await pool.query(
+    SAVE_SONG_STATS_QUERY,
+    [
+      match_id, match.winning_song, match.losing_song,
+      match.winning_song_rating, match.losing_song_rating
+    ]
+  );
+  res.status(201).json({ ok: true });
+}, "Could not save match."));
+
+// Saves a multi-way match. The matchup row records the first and last
+// placed songs as winner and loser, so 1v1 views of the history still work.
+matchRouter.post("/ranked", wrapHandler(async (req: Request, res: Response) => {
+  const parsed = RankedMatchInSchema.safeParse(req.body);
+  if (!parsed.success) {
+    return res.status(400).json({
+        error: "invalid payload",
+        issues: parsed.error.issues
+    });
+  }
+  const match = parsed.data;
+  await withTransaction(async (client) => {
+    const match_id: number = (await client.query(
+      SAVE_MATCH_QUERY,
+      [match.songs[0], match.songs[match.songs.length - 1]]
+    )).rows[0].id;
+    await client.query(SAVE_PLACEMENTS_QUERY, [match_id, match.songs]);
+    await client.query(
+      SAVE_RANKED_SONG_STATS_QUERY,
+      [match_id, match.songs, match.ratings]
     );
-  } else {
-    await pool.query(
-      SAVE_SONG_STATS_QUERY,
+  });
+  res.status(201).json({ ok: true });
+}, "Could not save match."));
+
+// Saves many matches in one transaction, in play order, with a constant
+// number of queries however large the batch. Each match is a ranking of
+// its songs, with their ratings after it. 1v1 matches are stored as by
+// /one, multi-way matches as by /ranked.
+matchRouter.post("/batch", wrapHandler(async (req: Request, res: Response) => {
+  const parsed = MatchBatchInSchema.safeParse(req.body);
+  if (!parsed.success) {
+    return res.status(400).json({
+        error: "invalid payload",
+        issues: parsed.error.issues
+    });
+  }
+  const matches = parsed.data;
+  await withTransaction(async (client) => {
+    const match_ids: number[] = (await client.query(
+      SAVE_MATCH_BATCH_QUERY,
       [
-        match_id, match.winning_song, match.losing_song,
-        match.winning_song_rating, match.losing_song_rating
+        matches.map((match) => match.songs[0]),
+        matches.map((match) => match.songs[match.songs.length - 1])
       ]
+    )).rows.map((row: { id: number }) => row.id).sort((a, b) => a - b);
+
+    const placement_ids: number[] = [];
+    const places: number[] = [];
+    const placed_songs: number[] = [];
+    const positions: number[] = [];
+    const songs: number[] = [];
+    const ratings: number[] = [];
+    matches.forEach((match, index) => {
+      match.songs.forEach((song, place) => {
+        if (match.songs.length > 2) {
+          placement_ids.push(match_ids[index]);
+          places.push(place + 1);
+          placed_songs.push(song);
+        }
+        positions.push(index + 1);
+        songs.push(song);
+        ratings.push(match.ratings[place]);
+      });
+    });
+    if (placement_ids.length > 0) {
+      await client.query(
+        SAVE_BATCH_PLACEMENTS_QUERY, [placement_ids, places, placed_songs]
+      );
+    }
+    await client.query(
+      SAVE_BATCH_SONG_STATS_QUERY,
+      [match_ids, positions, songs, ratings, match_ids[0]]
     );
-  }
+  });
   res.status(201).json({ ok: true });
-}, "Could not save match."));
+}, "Could not save matches."));
@@ -6,3 +6,26 @@ export const MatchInSchema = z.object({
   winning_song_rating: z.number().finite(),
   losing_song_rating: z.number().finite(),
 }).strict();
+
+// Songs of a multi-way match in finishing order, best first, with the
+// rating of each song after the match.
+export const RankedMatchInSchema = z.object({
+  songs: z.array(z.number().finite().int().nonnegative()).min(2).max(5),
+  ratings: z.array(z.number().finite()),
+}).strict().refine(
+  (match) => match.ratings.length === match.songs.length,
+  { message: "ratings must have one entry per song", path: ["ratings"] }
+).refine(
+  (match) => new Set(match.songs).size === match.songs.length,
+  { message: "songs must be distinct", path: ["songs"] }
+);
+
+// Matches saved together, in play order. 1v1 matches are [winner, loser].
+export const MatchBatchInSchema = z.array(RankedMatchInSchema).min(1).max(5_000);
+
+// Query string of a match history page: matchups after the id `after`,
+// at most `limit` of them.
+export const MatchPageQuerySchema = z.object({
+  after: z.coerce.number().finite().int().nonnegative().default(0),
+  limit: z.coerce.number().finite().int().min(1).max(50_000).default(10_000),
+}).strict();
@@ -1,6 +1,12 @@
 import { createApp } from "./app.js";
+import { migrate } from "./database.js";
 
 import { forceEnvVar } from "./tools.js";
 const port = parseInt(forceEnvVar(process.env["PORT"]));
+await migrate();
 const app = createApp();
-app.listen(port, () => console.log(`API listening on :${port}`));
+const server = app.listen(port, () => console.log(`API listening on :${port}`));
+// Votes arrive tens of seconds apart, so keep idle client connections open
+// well past Node's 5 second default for the comparison app to reuse.
+server.keepAliveTimeout = 120_000;
+server.headersTimeout = 121_000;
@@ -1,11 +1,11 @@
 import request from "supertest";
 import { createApp } from "../app.js";
-import { pool } from "../database.js";
+import { migrate, pool } from "../database.js";
 
 const app = createApp();
 
 const TRUNCATE_ALL_DATA_QUERY = `
-  TRUNCATE song, matchup, song_stats RESTART IDENTITY CASCADE;
+  TRUNCATE song, matchup, matchup_placement, song_stats RESTART IDENTITY CASCADE;
 `;
 
 type SongSeed = {
@@ -207,6 +207,424 @@ test("POST /match/one appends per-match song_stats with updated ratings and rank
   });
 });
 
+test("POST /match/ranked saves placements and song_stats for every song", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+    {
+      id: 4,
+      path: "/music/d.mp3",
+      title: "D",
+      extension: "mp3",
+      starting_rating: 120,
+    },
+  ]);
+
+  await request(app)
+    .post("/api/match/ranked")
+    .send({ songs: [3, 1, 2], ratings: [230, 110, 190] })
+    .expect(201)
+    .expect({ ok: true });
+
+  await request(app)
+    .post("/api/match/one")
+    .send({
+      winning_song: 4,
+      losing_song: 3,
+      winning_song_rating: 240,
+      losing_song_rating: 225,
+    })
+    .expect(201);
+
+  const matchRes = await request(app).get("/api/match/all").expect(200);
+  const matches = matchRes.body as Array<Record<string, unknown>>;
+  expect(matches).toHaveLength(2);
+  expect(matches[0]).toMatchObject({
+    id: 1, winner_id: 3, loser_id: 2, songs: [3, 1, 2],
+  });
+  expect(matches[1]).toMatchObject({
+    id: 2, winner_id: 4, loser_id: 3, songs: [4, 3],
+  });
+
+  const statsRes = await request(app).get("/api/songstats/all").expect(200);
+  const allStats = statsRes.body as Array<Record<string, unknown>>;
+  expect(allStats.filter((s) => s["matchup_id"] === 1)).toHaveLength(4);
+
+  expect(findSongStat(allStats, 1, 3)).toMatchObject({ rating: 230, rank: 1 });
+  expect(findSongStat(allStats, 1, 2)).toMatchObject({ rating: 190, rank: 2 });
+  expect(findSongStat(allStats, 1, 4)).toMatchObject({ rating: 120, rank: 3 });
+  expect(findSongStat(allStats, 1, 1)).toMatchObject({ rating: 110, rank: 4 });
+  expect(findSongStat(allStats, 2, 4)).toMatchObject({ rating: 240, rank: 1 });
+});
+
+test("POST /match/ranked rejects mismatched or repeated songs", async () => {
+  await request(app)
+    .post("/api/match/ranked")
+    .send({ songs: [1, 2, 3], ratings: [1, 2] })
+    .expect(400);
+
+  await request(app)
+    .post("/api/match/ranked")
+    .send({ songs: [1, 2, 1], ratings: [1, 2, 3] })
+    .expect(400);
+});
+
+test("GET /match/page pages through matches in id order", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+  ]);
+  for (let i = 0; i < 2; i++) {
+    await request(app)
+      .post("/api/match/one")
+      .send({
+        winning_song: 1,
+        losing_song: 2,
+        winning_song_rating: 110 + i,
+        losing_song_rating: 190 - i,
+      })
+      .expect(201);
+  }
+  await request(app)
+    .post("/api/match/ranked")
+    .send({ songs: [3, 2, 1], ratings: [160, 185, 105] })
+    .expect(201);
+
+  const first = await request(app).get("/api/match/page?limit=2").expect(200);
+  expect(first.body.matches).toHaveLength(2);
+  expect(first.body.matches[0]).toMatchObject({ id: 1, songs: [1, 2] });
+  expect(first.body.next_after).toBe(2);
+
+  const second = await request(app)
+    .get(`/api/match/page?after=${first.body.next_after}&limit=2`)
+    .expect(200);
+  expect(second.body.matches).toHaveLength(1);
+  expect(second.body.matches[0]).toMatchObject({ id: 3, songs: [3, 2, 1] });
+  expect(second.body.next_after).toBeNull();
+
+  await request(app).get("/api/match/page?limit=0").expect(400);
+  await request(app).get("/api/match/page?after=-1").expect(400);
+});
+
+test("POST /match/batch saves matches in order with carried forward stats", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+  ]);
+
+  await request(app)
+    .post("/api/match/batch")
+    .send([
+      { songs: [1, 2], ratings: [210, 190] },
+      { songs: [3, 1, 2], ratings: [230, 205, 185] },
+      { songs: [2, 3], ratings: [200, 220] },
+    ])
+    .expect(201)
+    .expect({ ok: true });
+
+  const matchRes = await request(app).get("/api/match/page").expect(200);
+  expect(matchRes.body.matches).toEqual([
+    { id: 1, winner_id: 1, loser_id: 2, songs: [1, 2] },
+    { id: 2, winner_id: 3, loser_id: 2, songs: [3, 1, 2] },
+    { id: 3, winner_id: 2, loser_id: 3, songs: [2, 3] },
+  ]);
+
+  const statsRes = await request(app).get("/api/songstats/all").expect(200);
+  const allStats = statsRes.body as Array<Record<string, unknown>>;
+  expect(allStats.filter((s) => s["matchup_id"] !== null)).toHaveLength(9);
+  expect(findSongStat(allStats, 1, 3)).toMatchObject({ rating: 150, rank: 3 });
+  expect(findSongStat(allStats, 2, 1)).toMatchObject({ rating: 205, rank: 2 });
+  expect(findSongStat(allStats, 3, 3)).toMatchObject({ rating: 220, rank: 1 });
+  expect(findSongStat(allStats, 3, 1)).toMatchObject({ rating: 205, rank: 2 });
+  expect(findSongStat(allStats, 3, 2)).toMatchObject({ rating: 200, rank: 3 });
+
+  // Later batches continue from the last snapshot.
+  await request(app)
+    .post("/api/match/batch")
+    .send([{ songs: [1, 3], ratings: [240, 210] }])
+    .expect(201);
+  const laterStats = (await request(app).get("/api/songstats/all").expect(200))
+    .body as Array<Record<string, unknown>>;
+  expect(findSongStat(laterStats, 4, 2)).toMatchObject({ rating: 200, rank: 3 });
+
+  await request(app).post("/api/match/batch").send([]).expect(400);
+  await request(app)
+    .post("/api/match/batch")
+    .send([{ songs: [1, 1], ratings: [1, 2] }])
+    .expect(400);
+});
+
+test("POST /match/batch saves nothing if any match of it fails", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+  ]);
+
+  // Song 4 does not exist, so the second match violates a foreign key.
+  await request(app)
+    .post("/api/match/batch")
+    .send([
+      { songs: [1, 2], ratings: [210, 190] },
+      { songs: [3, 4], ratings: [160, 140] },
+    ])
+    .expect(500);
+
+  await request(app).get("/api/match/page").expect(200).expect({
+    matches: [], next_after: null,
+  });
+  const stats = (await request(app).get("/api/songstats/all").expect(200))
+    .body as Array<Record<string, unknown>>;
+  expect(stats.filter((s) => s["matchup_id"] !== null)).toHaveLength(0);
+
+  // The next batch still starts from the initial ratings.
+  await request(app)
+    .post("/api/match/batch")
+    .send([{ songs: [3, 1], ratings: [170, 90] }])
+    .expect(201);
+  const page = await request(app).get("/api/match/page").expect(200);
+  expect(page.body.matches).toHaveLength(1);
+  const matchupId = page.body.matches[0].id as number;
+  const laterStats = (await request(app).get("/api/songstats/all").expect(200))
+    .body as Array<Record<string, unknown>>;
+  expect(findSongStat(laterStats, matchupId, 2)).toMatchObject({ rating: 200, rank: 1 });
+  expect(findSongStat(laterStats, matchupId, 3)).toMatchObject({ rating: 170, rank: 2 });
+  expect(findSongStat(laterStats, matchupId, 1)).toMatchObject({ rating: 90, rank: 3 });
+});
+
+test("POST /match/batch keeps play order past nine matches", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+  ]);
+
+  // Ids sort numerically, so match 10 stays after match 9.
+  const batch = Array.from({ length: 12 }, (_, i) => ({
+    songs: i % 2 === 0 ? [1, 2] : [2, 3],
+    ratings: [300 - i, 100 + i],
+  }));
+  await request(app).post("/api/match/batch").send(batch).expect(201);
+
+  const page = await request(app).get("/api/match/page").expect(200);
+  expect(
+    (page.body.matches as Array<Record<string, unknown>>).map((m) => m["winner_id"])
+  ).toEqual(batch.map((match) => match.songs[0]));
+
+  const stats = (await request(app).get("/api/songstats/all").expect(200))
+    .body as Array<Record<string, unknown>>;
+  expect(findSongStat(stats, 12, 2)).toMatchObject({ rating: 289 });
+  expect(findSongStat(stats, 12, 3)).toMatchObject({ rating: 111 });
+  expect(findSongStat(stats, 12, 1)).toMatchObject({ rating: 290 });
+});
+
+test("song_stats continue from the latest snapshot across skipped ids", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+  ]);
+
+  // A rolled back insert still draws its serial id.
+  async function skipMatchupId() {
+    const client = await pool.connect();
+    try {
+      await client.query("BEGIN");
+      await client.query(
+        "INSERT INTO matchup (winner_id, loser_id) VALUES (1, 2)"
+      );
+      await client.query("ROLLBACK");
+    } finally {
+      client.release();
+    }
+  }
+
+  await skipMatchupId();
+  await request(app)
+    .post("/api/match/one")
+    .send({
+      winning_song: 1,
+      losing_song: 2,
+      winning_song_rating: 210,
+      losing_song_rating: 190,
+    })
+    .expect(201);
+  await skipMatchupId();
+  await request(app)
+    .post("/api/match/ranked")
+    .send({ songs: [3, 1, 2], ratings: [230, 205, 185] })
+    .expect(201);
+  await skipMatchupId();
+  await request(app)
+    .post("/api/match/batch")
+    .send([{ songs: [2, 3], ratings: [240, 220] }])
+    .expect(201);
+
+  const allStats = (await request(app).get("/api/songstats/all").expect(200))
+    .body as Array<Record<string, unknown>>;
+  expect(allStats.filter((s) => s["matchup_id"] !== null)).toHaveLength(9);
+  expect(findSongStat(allStats, 2, 1)).toMatchObject({ rating: 210, rank: 1 });
+  expect(findSongStat(allStats, 2, 3)).toMatchObject({ rating: 150, rank: 3 });
+  expect(findSongStat(allStats, 4, 1)).toMatchObject({ rating: 205, rank: 2 });
+  expect(findSongStat(allStats, 6, 2)).toMatchObject({ rating: 240, rank: 1 });
+  expect(findSongStat(allStats, 6, 1)).toMatchObject({ rating: 205, rank: 3 });
+});
+
+test("migrate can run again on an up to date database", async () => {
+  await migrate();
+  await migrate();
+  await request(app).get("/api/match/page").expect(200);
+});
+
+test("migrate adds matchup_placement to a database created before it", async () => {
+  await seedSongs([
+    {
+      id: 1,
+      path: "/music/a.mp3",
+      title: "A",
+      extension: "mp3",
+      starting_rating: 100,
+    },
+    {
+      id: 2,
+      path: "/music/b.mp3",
+      title: "B",
+      extension: "mp3",
+      starting_rating: 200,
+    },
+    {
+      id: 3,
+      path: "/music/c.mp3",
+      title: "C",
+      extension: "mp3",
+      starting_rating: 150,
+    },
+  ]);
+
+  await pool.query("DROP TABLE matchup_placement");
+  await migrate();
+
+  await request(app)
+    .post("/api/match/ranked")
+    .send({ songs: [3, 1, 2], ratings: [230, 205, 185] })
+    .expect(201);
+  await request(app).get("/api/match/page").expect(200).expect({
+    matches: [{ id: 1, winner_id: 3, loser_id: 2, songs: [3, 1, 2] }],
+    next_after: null,
+  });
+});
+
 test("GET /delete/all truncates tables", async () => {
   await seedSongs([
     {